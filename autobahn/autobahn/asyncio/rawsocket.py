@@ -0,0 +1,129 @@
+###############################################################################
+##
+##  Copyright (C) 2014 Tavendo GmbH
+##
+##  Licensed under the Apache License, Version 2.0 (the "License");
+##  you may not use this file except in compliance with the License.
+##  You may obtain a copy of the License at
+##
+##      http://www.apache.org/licenses/LICENSE-2.0
+##
+##  Unless required by applicable law or agreed to in writing, software
+##  distributed under the License is distributed on an "AS IS" BASIS,
+##  WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+##  See the License for the specific language governing permissions and
+##  limitations under the License.
+##
+###############################################################################
+
+__all__ = ['WampRawSocketServerProtocol',
+           'WampRawSocketClientProtocol',
+           'WampRawSocketServerFactory',
+           'WampRawSocketClientFactory']
+
+import socket
+
+import asyncio
+
+from autobahn.wamp import rawsocket
+
+
+class WampRawSocketAdapterProtocol(asyncio.Protocol):
+   """
+   Adapter class for Asyncio WAMP-over-RawSocket client and server protocols.
+   """
+
+   def connection_made(self, transport):
+      self.transport = transport
+
+      ## disable "Nagle" (Unix domain sockets have no such option)
+      sock = transport.get_extra_info('socket')
+      if sock is not None and sock.family in (socket.AF_INET, socket.AF_INET6):
+         sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+
+      self._connectionMade()
+
+
+   def connection_lost(self, exc):
+      self._connectionLost(exc)
+      self.transport = None
+
+
+   def data_received(self, data):
+      self._dataReceived(data)
+
+
+   def _write(self, data):
+      self.transport.write(data)
+
+
+   def _closeConnection(self, abort = False):
+      if abort:
+         self.transport.abort()
+      else:
+         self.transport.close()
+
+
+
+class WampRawSocketServerProtocol(rawsocket.WampRawSocketServerProtocol, WampRawSocketAdapterProtocol):
+   """
+   Asyncio WAMP-over-RawSocket server protocol.
+   """
+
+   def connection_made(self, transport):
+      self.factory.countConnections += 1
+      WampRawSocketAdapterProtocol.connection_made(self, transport)
+
+
+   def connection_lost(self, exc):
+      self.factory.countConnections -= 1
+      WampRawSocketAdapterProtocol.connection_lost(self, exc)
+
+
+
+class WampRawSocketClientProtocol(rawsocket.WampRawSocketClientProtocol, WampRawSocketAdapterProtocol):
+   """
+   Asyncio WAMP-over-RawSocket client protocol.
+   """
+
+
+
+class WampRawSocketAdapterFactory:
+   """
+   Adapter class for Asyncio WAMP-over-RawSocket client and server factories.
+   """
+
+   def _log(self, msg):
+      print(msg)
+
+
+   def __call__(self):
+      proto = self.protocol()
+      proto.factory = self
+      return proto
+
+
+
+class WampRawSocketServerFactory(WampRawSocketAdapterFactory, rawsocket.WampRawSocketServerFactory):
+   """
+   Asyncio WAMP-over-RawSocket server factory. Use the factory as protocol
+   factory with `loop.create_server()` or `loop.create_unix_server()`.
+
+   See :class:`autobahn.wamp.rawsocket.WampRawSocketServerFactory` for the
+   constructor arguments.
+   """
+
+   protocol = WampRawSocketServerProtocol
+
+
+
+class WampRawSocketClientFactory(WampRawSocketAdapterFactory, rawsocket.WampRawSocketClientFactory):
+   """
+   Asyncio WAMP-over-RawSocket client factory. Use the factory as protocol
+   factory with `loop.create_connection()` or `loop.create_unix_connection()`.
+
+   See :class:`autobahn.wamp.rawsocket.WampRawSocketClientFactory` for the
+   constructor arguments.
+   """
+
+   protocol = WampRawSocketClientProtocol
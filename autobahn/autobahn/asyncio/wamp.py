@@ -0,0 +1,165 @@
+###############################################################################
+##
+##  Copyright (C) 2014 Tavendo GmbH
+##
+##  Licensed under the Apache License, Version 2.0 (the "License");
+##  you may not use this file except in compliance with the License.
+##  You may obtain a copy of the License at
+##
+##      http://www.apache.org/licenses/LICENSE-2.0
+##
+##  Unless required by applicable law or agreed to in writing, software
+##  distributed under the License is distributed on an "AS IS" BASIS,
+##  WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+##  See the License for the specific language governing permissions and
+##  limitations under the License.
+##
+###############################################################################
+
+__all__ = ['ApplicationSession',
+           'ApplicationSessionFactory',
+           'RouterSession',
+           'RouterSessionFactory',
+           'RouterFactory']
+
+import asyncio
+from asyncio import iscoroutine
+from asyncio import Future
+
+from autobahn.wamp import protocol
+from autobahn.wamp import router
+
+
+class FutureMixin:
+   """
+   Mixin for Asyncio style Futures. Procedure endpoints, event handlers and
+   session callbacks (`onJoin` etc) may be coroutines.
+   """
+
+   def _create_future(self, canceller = None):
+      f = Future()
+      if canceller is not None:
+         def done(f):
+            if f.cancelled():
+               canceller(f)
+         f.add_done_callback(done)
+      return f
+
+
+   def _as_future(self, fun, *args, **kwargs):
+      try:
+         res = fun(*args, **kwargs)
+      except Exception as e:
+         f = Future()
+         f.set_exception(e)
+         return f
+      else:
+         if isinstance(res, Future):
+            return res
+         elif iscoroutine(res):
+            return asyncio.async(res)
+         else:
+            f = Future()
+            f.set_result(res)
+            return f
+
+
+   def _resolve_future(self, future, value):
+      ## the future might have been cancelled meanwhile
+      if not future.done():
+         future.set_result(value)
+
+
+   def _reject_future(self, future, exc):
+      if not future.done():
+         future.set_exception(exc)
+
+
+   def _add_future_callbacks(self, future, callback, errback):
+      def done(f):
+         try:
+            res = f.result()
+         except Exception as e:
+            errback(e)
+         else:
+            callback(res)
+      future.add_done_callback(done)
+      return future
+
+
+   def _run_callback(self, fun, *args, **kwargs):
+      res = fun(*args, **kwargs)
+      if iscoroutine(res):
+         asyncio.async(res)
+      return res
+
+
+   def _log(self, msg):
+      print(msg)
+
+
+
+class ApplicationSession(FutureMixin, protocol.ApplicationSession):
+   """
+   WAMP application session for Asyncio-based applications.
+   """
+
+
+
+class ApplicationSessionFactory(protocol.ApplicationSessionFactory):
+   """
+   WAMP application session factory for Asyncio-based applications.
+   """
+
+   session = ApplicationSession
+   """
+   WAMP application session class to be used in this factory.
+   """
+
+
+
+class RouterSession(FutureMixin, protocol.RouterSession):
+   """
+   WAMP router session for Asyncio-based applications.
+   """
+
+
+
+class RouterSessionFactory(protocol.RouterSessionFactory):
+   """
+   WAMP router session factory for Asyncio-based applications.
+   """
+
+   session = RouterSession
+   """
+   WAMP router session class to be used in this factory.
+   """
+
+
+
+class RouterFactory(router.RouterFactory):
+   """
+   WAMP router factory for Asyncio-based routers.
+   """
+
+   def __init__(self, *args, **kwargs):
+      """
+      In addition to all arguments to the constructor of
+      :class:`autobahn.wamp.router.RouterFactory`,
+      you can supply a `loop` keyword argument to specify the
+      Asyncio loop to be used.
+      """
+      if 'loop' in kwargs:
+         if kwargs['loop']:
+            self.loop = kwargs['loop']
+         else:
+            self.loop = asyncio.get_event_loop()
+         del kwargs['loop']
+      else:
+         self.loop = asyncio.get_event_loop()
+
+      router.RouterFactory.__init__(self, *args, **kwargs)
+
+
+   def _callLater(self, delay, fun):
+      return self.loop.call_later(delay, fun)
@@ -19,18 +19,31 @@
 __all__ = ['WebSocketServerProtocol',
            'WebSocketServerFactory',
            'WebSocketClientProtocol',
-           'WebSocketClientFactory']
+           'WebSocketClientFactory',
+           'WampWebSocketServerProtocol',
+           'WampWebSocketServerFactory',
+           'WampWebSocketClientProtocol',
+           'WampWebSocketClientFactory',
+           'IncomingMessage']
 
 from collections import deque
 
 import asyncio
-from asyncio.tasks import iscoroutine
+from asyncio import iscoroutine
 from asyncio import Future
 
+from autobahn.wamp import websocket
 from autobahn.websocket import protocol
 from autobahn.websocket import http
 
 
+try:
+   StopAsyncIteration = StopAsyncIteration
+except NameError:
+   ## Python < 3.5 has no asynchronous iteration
+   StopAsyncIteration = StopIteration
+
+
 def yields(value):
    """
    Return True iff the value yields.
@@ -41,13 +54,137 @@ def yields(value):
 
 
 
+class IncomingMessage:
+   """
+   An incoming WebSocket message delivered as a stream of payload chunks
+   (see :attr:`autobahn.asyncio.websocket.WebSocketAdapterProtocol.STREAMING_MESSAGES`).
+
+   Read chunks using :meth:`read` or, on Python 3.5+, iterate asynchronously:
+
+   .. code-block:: python
+
+      async for chunk in message:
+         ...
+
+   When more than `readAhead` octets are buffered, reading from the
+   transport is paused until the consumer catches up.
+   """
+
+   def __init__(self, proto, isBinary, readAhead):
+      self.isBinary = isBinary
+      self._proto = proto
+      self._loop = proto.factory.loop
+      self._readAhead = readAhead
+      self._chunks = deque()
+      self._buffered = 0
+      self._paused = False
+      self._done = False
+      self._error = None
+      self._waiter = None
+
+
+   def _feed(self, chunk):
+      self._chunks.append(chunk)
+      self._buffered += len(chunk)
+      if not self._paused and self._buffered > self._readAhead and self._proto.transport:
+         self._proto.transport.pause_reading()
+         self._paused = True
+      self._wakeup()
+
+
+   def _finish(self):
+      self._done = True
+      self._wakeup()
+
+
+   def _abort(self, error):
+      self._error = error
+      self._wakeup()
+
+
+   def _next(self):
+      if self._chunks:
+         chunk = self._chunks.popleft()
+         self._buffered -= len(chunk)
+         if self._paused and self._buffered <= self._readAhead:
+            self._paused = False
+            if self._proto.transport:
+               self._proto.transport.resume_reading()
+         return chunk
+      return None
+
+
+   def _wakeup(self):
+      waiter, self._waiter = self._waiter, None
+      if waiter is not None and not waiter.done():
+         if self._chunks or self._done:
+            waiter.set_result(self._next())
+         elif self._error is not None:
+            waiter.set_exception(self._error)
+         else:
+            self._waiter = waiter
+
+
+   def read(self):
+      """
+      Read the next chunk of message payload.
+
+      :returns: obj -- A future that resolves to the next chunk (bytes) or
+                       to `None` when the whole message has been read.
+      """
+      if self._waiter is not None:
+         raise Exception("read() called while another read() is pending")
+      f = Future(loop = self._loop)
+      self._waiter = f
+      self._wakeup()
+      return f
+
+
+   def __aiter__(self):
+      return self
+
+
+   def __anext__(self):
+      f = Future(loop = self._loop)
+
+      def done(r):
+         if r.cancelled():
+            f.cancel()
+         elif r.exception() is not None:
+            f.set_exception(r.exception())
+         elif r.result() is None:
+            f.set_exception(StopAsyncIteration())
+         else:
+            f.set_result(r.result())
+
+      self.read().add_done_callback(done)
+      return f
+
+
+
 class WebSocketAdapterProtocol(asyncio.Protocol):
    """
    Adapter class for Asyncio WebSocket client and server protocols.
    """
 
+   STREAMING_MESSAGES = False
+   """
+   Iff `True`, incoming data messages are delivered as they arrive as
+   :class:`autobahn.asyncio.websocket.IncomingMessage` streams to
+   :meth:`onMessageStream` (instead of being buffered for :meth:`onMessage`).
+   """
+
+   STREAMING_READ_AHEAD = 1024 * 1024
+   """
+   Maximum number of octets buffered for an incoming message stream before
+   reading from the transport is paused.
+   """
+
    def connection_made(self, transport):
       self.transport = transport
+      self._incomingMessage = None
+      self._writePaused = False
+      self._drainWaiters = []
 
       self.receive_queue = deque()
       self._consume()
@@ -63,8 +200,33 @@ class WebSocketAdapterProtocol(asyncio.Protocol):
 
 
    def connection_lost(self, exc):
+      if self._incomingMessage is not None:
+         self._incomingMessage._abort(exc or Exception("connection lost"))
+         self._incomingMessage = None
       self._connectionLost(exc)
       self.transport = None
+      self.resume_writing()
+
+
+   def pause_writing(self):
+      self._writePaused = True
+
+
+   def resume_writing(self):
+      self._writePaused = False
+      waiters, self._drainWaiters = self._drainWaiters, []
+      for waiter in waiters:
+         if not waiter.done():
+            waiter.set_result(None)
+
+
+   def _drain(self):
+      f = Future(loop = self.factory.loop)
+      if self._writePaused:
+         self._drainWaiters.append(f)
+      else:
+         f.set_result(None)
+      return f
 
 
    def _consume(self):
@@ -96,13 +258,23 @@ class WebSocketAdapterProtocol(asyncio.Protocol):
       self.transport.close()
 
 
+   def _writeSequence(self, data):
+      self.transport.writelines(data)
+
+
    def _onOpen(self):
       res = self.onOpen()
       if yields(res):
          asyncio.async(res)
 
    def _onMessageBegin(self, isBinary):
-      res = self.onMessageBegin(isBinary)
+      if self.STREAMING_MESSAGES:
+         ## keep payload size accounting, but deliver the message as a stream
+         protocol.WebSocketProtocol.onMessageBegin(self, isBinary)
+         self._incomingMessage = IncomingMessage(self, isBinary, self.STREAMING_READ_AHEAD)
+         res = self.onMessageStream(self._incomingMessage)
+      else:
+         res = self.onMessageBegin(isBinary)
       if yields(res):
          asyncio.async(res)
 
@@ -112,11 +284,24 @@ class WebSocketAdapterProtocol(asyncio.Protocol):
          asyncio.async(res)
 
    def _onMessageFrameData(self, payload):
+      if self.STREAMING_MESSAGES:
+         if not self.failedByMe:
+            if self.websocket_version == 0:
+               self.message_data_total_length += len(payload)
+               if self.maxMessagePayloadSize > 0 and self.message_data_total_length > self.maxMessagePayloadSize:
+                  self.wasMaxMessagePayloadSizeExceeded = True
+                  self.failConnection(protocol.WebSocketProtocol.CLOSE_STATUS_CODE_MESSAGE_TOO_BIG, "message exceeds payload limit of %d octets" % self.maxMessagePayloadSize)
+                  return
+            self._incomingMessage._feed(payload)
+         return
       res = self.onMessageFrameData(payload)
       if yields(res):
          asyncio.async(res)
 
    def _onMessageFrameEnd(self):
+      if self.STREAMING_MESSAGES:
+         self.frame_data = None
+         return
       res = self.onMessageFrameEnd()
       if yields(res):
          asyncio.async(res)
@@ -127,6 +312,10 @@ class WebSocketAdapterProtocol(asyncio.Protocol):
          asyncio.async(res)
 
    def _onMessageEnd(self):
+      if self.STREAMING_MESSAGES:
+         self._incomingMessage._finish()
+         self._incomingMessage = None
+         return
       res = self.onMessageEnd()
       if yields(res):
          asyncio.async(res)
@@ -136,6 +325,11 @@ class WebSocketAdapterProtocol(asyncio.Protocol):
       if yields(res):
          asyncio.async(res)
 
+   def _onMessageBatch(self, messages):
+      res = self.onMessageBatch(messages)
+      if yields(res):
+         asyncio.async(res)
+
    def _onPing(self, payload):
       res = self.onPing(payload)
       if yields(res):
@@ -156,6 +350,88 @@ class WebSocketAdapterProtocol(asyncio.Protocol):
       raise Exception("not implemented")
 
 
+   def onMessageStream(self, message):
+      """
+      Callback fired when an incoming data message begins and
+      :attr:`STREAMING_MESSAGES` is enabled. May return a coroutine.
+
+      :param message: The incoming message stream.
+      :type message: instance of :class:`autobahn.asyncio.websocket.IncomingMessage`
+      """
+
+
+   def sendMessageStream(self, chunks, isBinary = False):
+      """
+      Send a WebSocket message with payload produced chunk by chunk. Each
+      chunk is sent as one frame, and sending the next chunk waits until
+      the transport has drained its write buffer, so memory use stays
+      bounded by the chunk size.
+
+      :param chunks: An asynchronous iterator (Python 3.5+) or a plain iterable producing the payload chunks (bytes).
+      :type chunks: obj
+      :param isBinary: `True` for a binary message.
+      :type isBinary: bool
+
+      :returns: obj -- A future that resolves when the whole message has been sent.
+      """
+      loop = self.factory.loop
+      done = Future(loop = loop)
+
+      if hasattr(chunks, '__anext__'):
+         def nextChunk():
+            return asyncio.async(chunks.__anext__(), loop = loop)
+      else:
+         it = iter(chunks)
+         def nextChunk():
+            f = Future(loop = loop)
+            try:
+               f.set_result(next(it))
+            except StopIteration:
+               f.set_exception(StopAsyncIteration())
+            except Exception as e:
+               f.set_exception(e)
+            return f
+
+      def step(_ = None):
+         if self.state != protocol.WebSocketProtocol.STATE_OPEN:
+            done.set_exception(Exception("WebSocket connection closed while sending message stream"))
+         else:
+            nextChunk().add_done_callback(send)
+
+      def send(f):
+         if f.cancelled():
+            done.cancel()
+            return
+
+         e = f.exception()
+         try:
+            if e is None:
+               chunk = f.result()
+               if chunk:
+                  if self.websocket_version != 0:
+                     self.beginMessageFrame(len(chunk))
+                  self.sendMessageFrameData(chunk)
+            elif isinstance(e, StopAsyncIteration):
+               self.endMessage()
+               done.set_result(None)
+               return
+            else:
+               ## the message cannot be completed anymore
+               self.failConnection(protocol.WebSocketProtocol.CLOSE_STATUS_CODE_INTERNAL_ERROR, "message stream failed")
+               done.set_exception(e)
+               return
+         except Exception as e:
+            done.set_exception(e)
+            return
+
+         self._drain().add_done_callback(step)
+
+      ## streamed frames are not compressed
+      self.beginMessage(isBinary, doNotCompress = True)
+      step()
+      return done
+
+
 
 class WebSocketServerProtocol(WebSocketAdapterProtocol, protocol.WebSocketServerProtocol):
    """
@@ -190,6 +466,12 @@ class WebSocketClientProtocol(WebSocketAdapterProtocol, protocol.WebSocketClient
          asyncio.async(res)
 
 
+   def connection_lost(self, exc):
+      WebSocketAdapterProtocol.connection_lost(self, exc)
+      if self.factory._reconnectOnLost:
+         self.factory._scheduleReconnect(self.factory.connect)
+
+
 
 class WebSocketAdapterFactory:
    """
@@ -204,6 +486,10 @@ class WebSocketAdapterFactory:
       return self.loop.call_later(delay, fun)
 
 
+   def _callSoon(self, fun):
+      return self.loop.call_soon(fun)
+
+
    def __call__(self):
       proto = self.protocol()
       proto.factory = self
@@ -258,3 +544,86 @@ class WebSocketClientFactory(WebSocketAdapterFactory, protocol.WebSocketClientFa
          self.loop = asyncio.get_event_loop()
 
       protocol.WebSocketClientFactory.__init__(self, *args, **kwargs)
+
+
+   def connect(self):
+      """
+      Establish a WebSocket connection to the server given by the factory URL.
+
+      When auto-reconnect is enabled, failed connection attempts and lost
+      connections are retried.
+
+      .. seealso:: :meth:`autobahn.websocket.protocol.WebSocketClientFactory.setReconnectOptions`
+
+      :returns: obj -- A future that resolves to a `(transport, protocol)` pair.
+      """
+      if self.proxy is not None:
+         raise Exception("connecting via explicit proxies not implemented")
+
+      if self.isSecure:
+         ssl = True
+      else:
+         ssl = None
+
+      coro = self.loop.create_connection(self, self.host, self.port, ssl = ssl)
+      if self.connectTimeout:
+         coro = asyncio.wait_for(coro, self.connectTimeout, loop = self.loop)
+
+      f = asyncio.async(coro, loop = self.loop)
+
+      def done(f):
+         if not f.cancelled() and f.exception() is not None:
+            self._scheduleReconnect(self.connect)
+
+      f.add_done_callback(done)
+      return f
+
+
+
+class WampWebSocketServerProtocol(websocket.WampWebSocketServerProtocol, WebSocketServerProtocol):
+   pass
+
+
+
+class WampWebSocketServerFactory(websocket.WampWebSocketServerFactory, WebSocketServerFactory):
+
+   protocol = WampWebSocketServerProtocol
+
+   def __init__(self, factory, *args, **kwargs):
+
+      if 'serializers' in kwargs:
+         serializers = kwargs['serializers']
+         del kwargs['serializers']
+      else:
+         serializers = None
+
+      websocket.WampWebSocketServerFactory.__init__(self, factory, serializers)
+
+      kwargs['protocols'] = self._protocols
+
+      WebSocketServerFactory.__init__(self, *args, **kwargs)
+
+
+
+class WampWebSocketClientProtocol(websocket.WampWebSocketClientProtocol, WebSocketClientProtocol):
+   pass
+
+
+
+class WampWebSocketClientFactory(websocket.WampWebSocketClientFactory, WebSocketClientFactory):
+
+   protocol = WampWebSocketClientProtocol
+
+   def __init__(self, factory, *args, **kwargs):
+
+      if 'serializers' in kwargs:
+         serializers = kwargs['serializers']
+         del kwargs['serializers']
+      else:
+         serializers = None
+
+      websocket.WampWebSocketClientFactory.__init__(self, factory, serializers)
+
+      kwargs['protocols'] = self._protocols
+
+      WebSocketClientFactory.__init__(self, *args, **kwargs)
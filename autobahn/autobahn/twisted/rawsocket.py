@@ -0,0 +1,123 @@
+###############################################################################
+##
+##  Copyright (C) 2014 Tavendo GmbH
+##
+##  Licensed under the Apache License, Version 2.0 (the "License");
+##  you may not use this file except in compliance with the License.
+##  You may obtain a copy of the License at
+##
+##      http://www.apache.org/licenses/LICENSE-2.0
+##
+##  Unless required by applicable law or agreed to in writing, software
+##  distributed under the License is distributed on an "AS IS" BASIS,
+##  WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+##  See the License for the specific language governing permissions and
+##  limitations under the License.
+##
+###############################################################################
+
+from __future__ import absolute_import
+
+__all__ = ['WampRawSocketServerProtocol',
+           'WampRawSocketClientProtocol',
+           'WampRawSocketServerFactory',
+           'WampRawSocketClientFactory']
+
+import twisted.internet.protocol
+from twisted.python import log
+
+from autobahn.wamp import rawsocket
+
+
+class WampRawSocketAdapterProtocol(twisted.internet.protocol.Protocol):
+   """
+   Adapter class for Twisted WAMP-over-RawSocket client and server protocols.
+   """
+
+   def connectionMade(self):
+      self._connectionMade()
+
+      ## disable "Nagle"
+      try:
+         self.transport.setTcpNoDelay(True)
+      except:
+         ## eg Unix Domain sockets throw Errno 22 on this
+         pass
+
+
+   def connectionLost(self, reason):
+      self._connectionLost(reason)
+
+
+   def dataReceived(self, data):
+      self._dataReceived(data)
+
+
+   def _write(self, data):
+      self.transport.write(data)
+
+
+   def _closeConnection(self, abort = False):
+      if abort and hasattr(self.transport, 'abortConnection'):
+         self.transport.abortConnection()
+      else:
+         self.transport.loseConnection()
+
+
+
+class WampRawSocketServerProtocol(rawsocket.WampRawSocketServerProtocol, WampRawSocketAdapterProtocol):
+   """
+   Twisted WAMP-over-RawSocket server protocol.
+   """
+
+   def connectionMade(self):
+      self.factory.countConnections += 1
+      WampRawSocketAdapterProtocol.connectionMade(self)
+
+
+   def connectionLost(self, reason):
+      self.factory.countConnections -= 1
+      WampRawSocketAdapterProtocol.connectionLost(self, reason)
+
+
+
+class WampRawSocketClientProtocol(rawsocket.WampRawSocketClientProtocol, WampRawSocketAdapterProtocol):
+   """
+   Twisted WAMP-over-RawSocket client protocol.
+   """
+
+
+
+class WampRawSocketAdapterFactory:
+   """
+   Adapter class for Twisted WAMP-over-RawSocket client and server factories.
+   """
+
+   def _log(self, msg):
+      log.msg(msg)
+
+
+
+class WampRawSocketServerFactory(WampRawSocketAdapterFactory, rawsocket.WampRawSocketServerFactory, twisted.internet.protocol.Factory):
+   """
+   Twisted WAMP-over-RawSocket server factory. Listen on TCP or Unix domain
+   sockets with the factory, e.g. using a server endpoint.
+
+   See :class:`autobahn.wamp.rawsocket.WampRawSocketServerFactory` for the
+   constructor arguments.
+   """
+
+   protocol = WampRawSocketServerProtocol
+
+
+
+class WampRawSocketClientFactory(WampRawSocketAdapterFactory, rawsocket.WampRawSocketClientFactory, twisted.internet.protocol.ClientFactory):
+   """
+   Twisted WAMP-over-RawSocket client factory. Connect over TCP or Unix domain
+   sockets with the factory, e.g. using a client endpoint.
+
+   See :class:`autobahn.wamp.rawsocket.WampRawSocketClientFactory` for the
+   constructor arguments.
+   """
+
+   protocol = WampRawSocketClientProtocol
@@ -161,16 +161,24 @@ class WebSocketResource(object):
          transport.protocol = protocol
       protocol.makeConnection(transport)
 
-      ## We recreate the request and forward the raw data. This is somewhat
-      ## silly (since Twisted Web already did the HTTP request parsing
-      ## which we will do a 2nd time), but it's totally non-invasive to our
-      ## code. Maybe improve this.
+      ## Hand over the HTTP request already parsed by Twisted Web and
+      ## continue directly with validating the WebSocket opening handshake
+      ## (rather than recreating the raw request and parsing it again).
       ##
-      data = "%s %s HTTP/1.1\x0d\x0a" % (request.method, request.path)
-      for h in request.requestHeaders.getAllRawHeaders():
-         data += "%s: %s\x0d\x0a" % (h[0], ",".join(h[1]))
-      data += "\x0d\x0a"
-      data += request.content.read() # we need this for Hixie-76
-      protocol.dataReceived(data)
+      protocol.http_request_data = None
+      protocol.http_status_line = u"%s %s HTTP/1.1" % (request.method.decode('utf8'), request.uri.decode('utf8'))
+
+      http_headers = {}
+      http_headers_cnt = {}
+      for name, values in request.requestHeaders.getAllRawHeaders():
+         ## HTTP header keys are case-insensitive. Twisted Web already merged
+         ## repeated headers, so each counts as appearing once.
+         key = name.decode('utf8').lower()
+         http_headers[key] = u", ".join([v.decode('utf8').strip() for v in values])
+         http_headers_cnt[key] = 1
+      protocol.http_headers = http_headers
+
+      protocol.data = request.content.read() # we need this for Hixie-76
+      protocol.processHandshakeRequest(http_headers_cnt, 0)
 
       return NOT_DONE_YET
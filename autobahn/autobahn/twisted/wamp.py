@@ -21,30 +21,114 @@ from __future__ import absolute_import
 __all__ = ['ApplicationSession',
            'ApplicationSessionFactory',
            'RouterSession',
-           'RouterSessionFactory']
+           'RouterSessionFactory',
+           'RouterFactory']
+
+from twisted.python import log
+from twisted.internet.defer import Deferred, maybeDeferred
 
 from autobahn.wamp import protocol
+from autobahn.wamp import router
+
+
+class FutureMixin:
+   """
+   Mixin for Twisted style Futures ("Deferreds").
+   """
+
+   def _create_future(self, canceller = None):
+      return Deferred(canceller)
+
+
+   def _as_future(self, fun, *args, **kwargs):
+      return maybeDeferred(fun, *args, **kwargs)
+
+
+   def _resolve_future(self, future, value):
+      future.callback(value)
+
+
+   def _reject_future(self, future, exc):
+      future.errback(exc)
+
+
+   def _add_future_callbacks(self, future, callback, errback):
+      return future.addCallbacks(callback, lambda failure: errback(failure.value))
+
+
+   def _run_callback(self, fun, *args, **kwargs):
+      return fun(*args, **kwargs)
+
+
+   def _log(self, msg):
+      log.msg(msg)
+
 
 
-class ApplicationSession(protocol.ApplicationSession):
+class ApplicationSession(FutureMixin, protocol.ApplicationSession):
    """
    WAMP application session for Twisted-based applications.
    """
 
 
+
 class ApplicationSessionFactory(protocol.ApplicationSessionFactory):
    """
    WAMP application session factory for Twisted-based applications.
    """
 
+   session = ApplicationSession
+   """
+   WAMP application session class to be used in this factory.
+   """
+
+
 
-class RouterSession(protocol.RouterSession):
+class RouterSession(FutureMixin, protocol.RouterSession):
    """
    WAMP router session for Twisted-based applications.
    """
 
 
+
 class RouterSessionFactory(protocol.RouterSessionFactory):
    """
    WAMP router session factory for Twisted-based applications.
    """
+
+   session = RouterSession
+   """
+   WAMP router session class to be used in this factory.
+   """
+
+
+
+class RouterFactory(router.RouterFactory):
+   """
+   WAMP router factory for Twisted-based routers.
+   """
+
+   def __init__(self, *args, **kwargs):
+      """
+      In addition to all arguments to the constructor of
+      :class:`autobahn.wamp.router.RouterFactory`,
+      you can supply a `reactor` keyword argument to specify the
+      Twisted reactor to be used.
+      """
+      ## lazy import to avoid reactor install upon module import
+      if 'reactor' in kwargs:
+         if kwargs['reactor']:
+            self.reactor = kwargs['reactor']
+         else:
+            from twisted.internet import reactor
+            self.reactor = reactor
+         del kwargs['reactor']
+      else:
+         from twisted.internet import reactor
+         self.reactor = reactor
+
+      router.RouterFactory.__init__(self, *args, **kwargs)
+
+
+   def _callLater(self, delay, fun):
+      return self.reactor.callLater(delay, fun)
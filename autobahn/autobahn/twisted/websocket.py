@@ -34,7 +34,7 @@ from zope.interface import implementer
 import twisted.internet.protocol
 from twisted.internet.defer import maybeDeferred
 from twisted.python import log
-from twisted.internet.interfaces import ITransport
+from twisted.internet.interfaces import ITransport, IConsumer, IPushProducer
 
 from autobahn.wamp import websocket
 from autobahn.websocket import protocol
@@ -91,6 +91,10 @@ class WebSocketAdapterProtocol(twisted.internet.protocol.Protocol):
          self.transport.loseConnection()
 
 
+   def _writeSequence(self, data):
+      self.transport.writeSequence(data)
+
+
    def _onOpen(self):
       self.onOpen()
 
@@ -115,6 +119,9 @@ class WebSocketAdapterProtocol(twisted.internet.protocol.Protocol):
    def _onMessage(self, payload, isBinary):
       self.onMessage(payload, isBinary)
 
+   def _onMessageBatch(self, messages):
+      self.onMessageBatch(messages)
+
    def _onPing(self, payload):
       self.onPing(payload)
 
@@ -188,6 +195,10 @@ class WebSocketAdapterFactory:
       return self.reactor.callLater(delay, fun)
 
 
+   def _callSoon(self, fun):
+      return self.reactor.callLater(0, fun)
+
+
 
 class WebSocketServerFactory(WebSocketAdapterFactory, protocol.WebSocketServerFactory, twisted.internet.protocol.ServerFactory):
    """
@@ -248,8 +259,28 @@ class WebSocketClientFactory(WebSocketAdapterFactory, protocol.WebSocketClientFa
       protocol.WebSocketClientFactory.__init__(self, *args, **kwargs)
 
 
+   def clientConnectionFailed(self, connector, reason):
+      """
+      Retry a failed connection attempt when auto-reconnect is enabled.
+
+      .. seealso:: :meth:`autobahn.websocket.protocol.WebSocketClientFactory.setReconnectOptions`
+      """
+      self._scheduleReconnect(connector.connect)
+
 
-@implementer(ITransport)
+   def clientConnectionLost(self, connector, reason):
+      """
+      Reconnect after a lost connection when auto-reconnect is enabled, unless
+      the connection was closed by this side.
+
+      .. seealso:: :meth:`autobahn.websocket.protocol.WebSocketClientFactory.setReconnectOptions`
+      """
+      if self._reconnectOnLost:
+         self._scheduleReconnect(connector.connect)
+
+
+
+@implementer(ITransport, IConsumer, IPushProducer)
 class WrappingWebSocketAdapter:
    """
    An adapter for stream-based transport over WebSocket.
@@ -266,6 +297,12 @@ class WrappingWebSocketAdapter:
    binary compatible subprotocol), or encoded with Base64
    and then transmitted as the payload of WebSocket text messages when
    using the 'base64' subprotocol.
+
+   Optionally, writes of the wrapped protocol within one reactor iteration
+   are coalesced into one WebSocket message (up to the factory's
+   `coalesceSize`). By default, every write is sent right away.
+   Producers registered by the wrapped protocol, and pausing/resuming
+   the wrapped stream, are passed through to the underlying transport.
    """
 
    def onConnect(self, requestOrResponse):
@@ -289,6 +326,9 @@ class WrappingWebSocketAdapter:
          raise Exception("logic error")
 
    def onOpen(self):
+      self._writeBuffer = []
+      self._writeBufferLen = 0
+      self._writeFlushPending = False
       self._proto.connectionMade()
 
    def onMessage(self, payload, isBinary):
@@ -304,27 +344,74 @@ class WrappingWebSocketAdapter:
          self._proto.dataReceived(payload)
 
    def onClose(self, wasClean, code, reason):
+      self._writeBuffer = []
+      self._writeBufferLen = 0
       self._proto.connectionLost(None)
 
-   def write(self, data):
+   def _sendPayload(self, data):
       #print("sending payload: {}".format(binascii.hexlify(data)))
-      ## part of ITransport
-      assert(type(data) == bytes)
       if self._binaryMode:
          self.sendMessage(data, isBinary = True)
       else:
          data = b64encode(data)
          self.sendMessage(data, isBinary = False)
 
+   def _flushWrites(self):
+      if self._writeBuffer:
+         data = b''.join(self._writeBuffer)
+         self._writeBuffer = []
+         self._writeBufferLen = 0
+         self._sendPayload(data)
+
+   def _onWriteFlush(self):
+      self._writeFlushPending = False
+      if self.state == protocol.WebSocketProtocol.STATE_OPEN:
+         self._flushWrites()
+
+   def write(self, data):
+      ## part of ITransport
+      assert(type(data) == bytes)
+      if self.factory._coalesceSize > 0:
+         self._writeBuffer.append(data)
+         self._writeBufferLen += len(data)
+         if self._writeBufferLen >= self.factory._coalesceSize:
+            self._flushWrites()
+         elif not self._writeFlushPending:
+            self._writeFlushPending = True
+            self.factory._callSoon(self._onWriteFlush)
+      else:
+         self._sendPayload(data)
+
    def writeSequence(self, data):
       ## part of ITransport
-      for d in data:
-         self.write(data)
+      self.write(b''.join(data))
 
    def loseConnection(self):
       ## part of ITransport
+      if self.state == protocol.WebSocketProtocol.STATE_OPEN:
+         self._flushWrites()
       self.sendClose()
 
+   def registerProducer(self, producer, streaming):
+      ## part of IConsumer
+      self.transport.registerProducer(producer, streaming)
+
+   def unregisterProducer(self):
+      ## part of IConsumer
+      self.transport.unregisterProducer()
+
+   def pauseProducing(self):
+      ## part of IPushProducer
+      self.transport.pauseProducing()
+
+   def resumeProducing(self):
+      ## part of IPushProducer
+      self.transport.resumeProducing()
+
+   def stopProducing(self):
+      ## part of IPushProducer
+      self.transport.stopProducing()
+
 
 
 class WrappingWebSocketServerProtocol(WrappingWebSocketAdapter, WebSocketServerProtocol):
@@ -353,7 +440,8 @@ class WrappingWebSocketServerFactory(WebSocketServerFactory):
                 enableCompression = True,
                 autoFragmentSize = 0,
                 subprotocol = None,
-                debug = False):
+                debug = False,
+                coalesceSize = 0):
       """
       Constructor.
 
@@ -361,8 +449,11 @@ class WrappingWebSocketServerFactory(WebSocketServerFactory):
       :type factory: A subclass of `twisted.internet.protocol.Factory`
       :param url: WebSocket URL of the server this server factory will work for.
       :type url: str
+      :param coalesceSize: Coalesce writes of the wrapped protocol within one reactor iteration into one WebSocket message, sent early when reaching this many octets, or `0` to send every write as its own message right away (default: `0`).
+      :type coalesceSize: int
       """
       self._factory = factory
+      self._coalesceSize = coalesceSize
       self._subprotocols = ['binary', 'base64']
       if subprotocol:
           self._subprotocols.append(subprotocol)
@@ -424,7 +515,8 @@ class WrappingWebSocketClientFactory(WebSocketClientFactory):
                 enableCompression = True,
                 autoFragmentSize = 0,
                 subprotocol = None,
-                debug = False):
+                debug = False,
+                coalesceSize = 0):
       """
       Constructor.
 
@@ -432,8 +524,11 @@ class WrappingWebSocketClientFactory(WebSocketClientFactory):
       :type factory: A subclass of `twisted.internet.protocol.Factory`
       :param url: WebSocket URL of the server this client factory will connect to.
       :type url: str
+      :param coalesceSize: Coalesce writes of the wrapped protocol within one reactor iteration into one WebSocket message, sent early when reaching this many octets, or `0` to send every write as its own message right away (default: `0`).
+      :type coalesceSize: int
       """
       self._factory = factory
+      self._coalesceSize = coalesceSize
       self._subprotocols = ['binary', 'base64']
       if subprotocol:
           self._subprotocols.append(subprotocol)
@@ -476,7 +571,7 @@ class WrappingWebSocketClientFactory(WebSocketClientFactory):
 
 
 
-def connectWS(factory, contextFactory = None, timeout = 30, bindAddress = None):
+def connectWS(factory, contextFactory = None, timeout = None, bindAddress = None):
    """
    Establish WebSocket connection to a server. The connection parameters like target
    host, port, resource and others are provided via the factory.
@@ -485,7 +580,7 @@ def connectWS(factory, contextFactory = None, timeout = 30, bindAddress = None):
    :type factory: An :class:`autobahn.websocket.WebSocketClientFactory` instance.
    :param contextFactory: SSL context factory, required for secure WebSocket connections ("wss").
    :type contextFactory: A `twisted.internet.ssl.ClientContextFactory <http://twistedmatrix.com/documents/current/api/twisted.internet.ssl.ClientContextFactory.html>`_ instance.
-   :param timeout: Number of seconds to wait before assuming the connection has failed.
+   :param timeout: Number of seconds to wait before assuming the connection has failed (default: the factory's `connectTimeout`).
    :type timeout: int
    :param bindAddress: A (host, port) tuple of local address to bind to, or None.
    :type bindAddress: tuple
@@ -498,6 +593,9 @@ def connectWS(factory, contextFactory = None, timeout = 30, bindAddress = None):
    else:
       from twisted.internet import reactor
 
+   if timeout is None:
+      timeout = getattr(factory, 'connectTimeout', 30)
+
    if factory.proxy is not None:
       if factory.isSecure:
          raise Exception("WSS over explicit proxies not implemented")
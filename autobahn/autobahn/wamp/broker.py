@@ -18,12 +18,67 @@
 
 from __future__ import absolute_import
 
+from collections import deque, OrderedDict
+
 from zope.interface import implementer
 
 from autobahn import util
 from autobahn.wamp import message
 from autobahn.wamp.exception import ApplicationError
 from autobahn.wamp.interfaces import IBroker
+from autobahn.wamp.stats import TopicStats
+
+
+
+def _payloadSize(obj):
+   """
+   Estimate the size (in octets) of an (unserialized) application payload.
+   """
+   if type(obj) in (list, tuple):
+      return sum(_payloadSize(x) for x in obj) + 2
+   elif type(obj) == dict:
+      return sum(_payloadSize(k) + _payloadSize(v) for k, v in obj.items()) + 2
+   elif isinstance(obj, (bytes, type(u''))):
+      return len(obj) + 2
+   else:
+      return 8
+
+
+
+class RetainedEvent(object):
+   """
+   An event retained by the broker: the parts of the `PUBLISH` message needed
+   to dispatch it to later subscribers.
+   """
+
+   __slots__ = ('publication', 'publisher', 'args', 'kwargs', 'payload',
+                'eligible', 'exclude', 'excludeMe', 'discloseMe', 'size')
+
+   def __init__(self, publication, publisher, publish):
+      """
+      Constructor.
+
+      :param publication: The publication ID of the event.
+      :type publication: int
+      :param publisher: The WAMP session ID of the publisher.
+      :type publisher: int
+      :param publish: The `PUBLISH` message of the event.
+      :type publish: Instance of :class:`autobahn.wamp.message.Publish`
+      """
+      self.publication = publication
+      self.publisher = publisher
+      self.args = publish.args
+      self.kwargs = publish.kwargs
+      self.payload = publish.payload
+      self.eligible = publish.eligible
+      self.exclude = publish.exclude
+      self.excludeMe = publish.excludeMe
+      self.discloseMe = publish.discloseMe
+
+      if publish.payload is not None:
+         self.size = len(publish.payload.data)
+      else:
+         self.size = _payloadSize(publish.args) + _payloadSize(publish.kwargs)
 
 
 
@@ -31,11 +86,51 @@ from autobahn.wamp.interfaces import IBroker
 class Broker:
    """
    Basic WAMP broker, implements :class:`autobahn.wamp.interfaces.IBroker`.
+
+   The broker can retain the last events published to a topic, and dispatch
+   those to sessions subscribing to the topic later (right after `SUBSCRIBED`).
+   Events are retained for topics configured with :func:`retain`, and for events
+   published with the `retain` option.
+
+   The broker counts publications and deliveries per topic (see :func:`stats`).
+   """
+
+   RETAIN_COUNT = 1
+   """
+   Number of events retained per topic for events published with the `retain`
+   option (on topics not configured with :func:`retain`).
    """
 
-   def __init__(self, realm):
+   RETAIN_MAX_EVENTS = 10000
+   """
+   Maximum number of events retained over all topics. When exceeded, the oldest
+   events of the topic least recently published to are dropped.
+   """
+
+   RETAIN_MAX_OCTETS = 16 * 2**20
+   """
+   Maximum total size (in octets) of the payloads of events retained over all
+   topics, dropping events like :attr:`RETAIN_MAX_EVENTS` when exceeded. The size
+   of a payload kept serialized (see :class:`autobahn.wamp.message.EncodedPayload`)
+   is exact, the size of other payloads is estimated.
+   """
+
+   STATS_MAX_TOPICS = 1000
+   """
+   Maximum number of topics to keep statistics for. When exceeded, the statistics
+   of the topic least recently published to are dropped (publications remain
+   counted in the totals).
+   """
+
+   def __init__(self, realm, retain = None):
       """
       Constructor.
+
+      :param realm: The realm this broker is working for.
+      :type realm: str
+      :param retain: Topics to retain events for: a dict mapping topic URIs to
+                     the number of events to retain (see :func:`retain`).
+      :type retain: dict
       """
       self.realm = realm
 
@@ -55,6 +150,135 @@ class Broker:
       ## needed for UNSUBSCRIBE
       self._subscription_to_sessions = {}
 
+      ## map: topic -> number of events to retain
+      self._retain_topics = {}
+
+      ## map: topic -> deque(RetainedEvent), ordered by last publication
+      ## (least recent first), plus number and total size of events
+      self._retained = OrderedDict()
+      self._retained_count = 0
+      self._retained_octets = 0
+
+      ## statistics: totals, and map: topic -> TopicStats
+      self._stats_publishes = 0
+      self._stats_deliveries = 0
+      self._stats_topics = OrderedDict()
+
+      if retain:
+         for topic, count in retain.items():
+            self.retain(topic, count)
+
+
+   def retain(self, topic, count = RETAIN_COUNT):
+      """
+      Retain the last events published to a topic, whether published with the
+      `retain` option or not.
+
+      :param topic: The URI of the topic.
+      :type topic: str
+      :param count: The number of events to retain, or `0` to only retain events
+                    published with the `retain` option again (and drop the events
+                    retained).
+      :type count: int
+      """
+      assert(type(count) == int and count >= 0)
+
+      if count:
+         self._retain_topics[topic] = count
+      else:
+         self._retain_topics.pop(topic, None)
+
+      events = self._retained.get(topic)
+      if events is not None:
+         while len(events) > count:
+            self._dropEvent(events)
+         if count:
+            self._retained[topic] = deque(events, count)
+         else:
+            del self._retained[topic]
+
+
+   def _dropEvent(self, events):
+      event = events.popleft()
+      self._retained_count -= 1
+      self._retained_octets -= event.size
+
+
+   def _retainEvent(self, topic, count, event):
+      """
+      Retain an event, and drop old events when over the memory bounds.
+      """
+      events = self._retained.pop(topic, None)
+      if events is None:
+         events = deque(maxlen = count)
+      elif len(events) == events.maxlen:
+         self._dropEvent(events)
+      events.append(event)
+      self._retained_count += 1
+      self._retained_octets += event.size
+      self._retained[topic] = events
+
+      while self._retained_count > self.RETAIN_MAX_EVENTS or self._retained_octets > self.RETAIN_MAX_OCTETS:
+         oldest = next(iter(self._retained))
+         events = self._retained[oldest]
+         self._dropEvent(events)
+         if not events:
+            del self._retained[oldest]
+
+
+   def stats(self):
+      """
+      Get the statistics of this broker.
+
+      :returns: dict -- The statistics: totals of publications and deliveries,
+                the number of subscriptions and retained events, and the
+                statistics per topic.
+      """
+      topics = {}
+      for topic, stats in self._stats_topics.items():
+         topics[topic] = stats.marshal()
+
+      return {'publishes': self._stats_publishes,
+              'deliveries': self._stats_deliveries,
+              'subscriptions': len(self._subscription_to_sessions),
+              'retained': self._retained_count,
+              'topics': topics}
+
+
+   def _countPublish(self, topic, receivers):
+      self._stats_publishes += 1
+      self._stats_deliveries += receivers
+
+      ## keep topics in order of last publication, so cold topics are evicted first
+      ##
+      stats = self._stats_topics.pop(topic, None)
+      if stats is None:
+         stats = TopicStats()
+         if len(self._stats_topics) >= self.STATS_MAX_TOPICS:
+            self._stats_topics.popitem(last = False)
+      self._stats_topics[topic] = stats
+      stats.add(receivers)
+
+
+   def publish(self, topic, args = None, kwargs = None):
+      """
+      Publish an event originating from the router itself (e.g. a meta event) to
+      the subscribers of a topic. The event is neither retained nor counted.
+
+      :param topic: The URI of the topic.
+      :type topic: str
+      :param args: Positional values of the event payload.
+      :type args: list
+      :param kwargs: Keyword values of the event payload.
+      :type kwargs: dict
+      """
+      if topic in self._topic_to_sessions:
+         subscription, receivers = self._topic_to_sessions[topic]
+         if receivers:
+            msg = message.Event(subscription, util.id(), args = args, kwargs = kwargs)
+            for session in receivers:
+               session._transport.send(msg)
+
 
    def attach(self, session):
       """
@@ -134,6 +358,14 @@ class Broker:
          msg = message.Published(publish.request, publication)
          session._transport.send(msg)
 
+      ## retain event for later subscribers
+      ##
+      count = self._retain_topics.get(publish.topic)
+      if count is None and publish.retain:
+         count = self.RETAIN_COUNT
+      if count:
+         self._retainEvent(publish.topic, count, RetainedEvent(publication, session._session_id, publish))
+
       ## if receivers is non-empty, dispatch event ..
       ##
       if receivers:
@@ -145,9 +377,12 @@ class Broker:
                              publication,
                              args = publish.args,
                              kwargs = publish.kwargs,
-                             publisher = publisher)
-         for session in receivers:
-            session._transport.send(msg)
+                             publisher = publisher,
+                             payload = publish.payload)
+         for receiver in receivers:
+            receiver._transport.send(msg)
+
+      self._countPublish(publish.topic, len(receivers))
 
 
    def processSubscribe(self, session, subscribe):
@@ -176,14 +411,42 @@ class Broker:
 
          if not subscription in self._session_to_subscriptions[session]:
             self._session_to_subscriptions[session].add(subscription)
+            retained = self._retained.get(subscribe.topic)
+         else:
+            retained = None
 
          reply = message.Subscribed(subscribe.request, subscription)
 
       else:
          reply = message.Error(message.Subscribe.MESSAGE_TYPE, subscribe.request, ApplicationError.INVALID_TOPIC)
+         retained = None
 
       session._transport.send(reply)
 
+      ## dispatch retained events to the new subscriber
+      ##
+      if retained:
+         session_id = session._session_id
+         for event in retained:
+            if event.eligible and session_id not in event.eligible:
+               continue
+            if event.exclude and session_id in event.exclude:
+               continue
+            if session_id == event.publisher and (event.excludeMe is None or event.excludeMe):
+               continue
+            if event.discloseMe:
+               publisher = event.publisher
+            else:
+               publisher = None
+            msg = message.Event(subscription,
+                                event.publication,
+                                args = event.args,
+                                kwargs = event.kwargs,
+                                publisher = publisher,
+                                retained = True,
+                                payload = event.payload)
+            session._transport.send(msg)
+
 
    def processUnsubscribe(self, session, unsubscribe):
       """
@@ -18,12 +18,29 @@
 
 from __future__ import absolute_import
 
+from collections import OrderedDict
+
 from zope.interface import implementer
 
 from autobahn import util
 from autobahn.wamp import message
-from autobahn.wamp.exception import ProtocolError
+from autobahn.wamp.exception import ProtocolError, ApplicationError
 from autobahn.wamp.interfaces import IDealer
+from autobahn.wamp.stats import ProcedureStats
+
+
+
+def _freeze(obj):
+   """
+   Convert call arguments into a hashable value, keeping types: unlike e.g. JSON,
+   `{1: 'a'}` and `{'1': 'a'}` (or `1` and `True`) give different values.
+   """
+   if type(obj) == dict:
+      return (dict, frozenset((_freeze(k), _freeze(v)) for k, v in obj.items()))
+   elif type(obj) in (list, tuple):
+      return (list, tuple(_freeze(x) for x in obj))
+   else:
+      return (type(obj), obj)
 
 
 
@@ -31,6 +48,30 @@ from autobahn.wamp.interfaces import IDealer
 class Dealer:
    """
    Basic WAMP dealer, implements :class:`autobahn.wamp.interfaces.IDealer`.
+
+   The dealer counts calls and errors, and measures call latencies (from
+   dispatching the call to the final result) per procedure (see :func:`stats`).
+   Besides procedures registered by callees, the dealer can serve meta procedures
+   implemented by the router (see :func:`registerMetaProcedure`).
+
+   Results of procedures registered with the `cache` option are cached: calls
+   to such a procedure with the same arguments are answered from the cache until
+   the result expires, without invoking the callee. Cached results are dropped
+   when the procedure is unregistered, and can be dropped explicitly by calling
+   the meta procedure `wamp.metaproc.cache.invalidate` with the procedure URI.
+   """
+
+   STATS_MAX_PROCEDURES = 1000
+   """
+   Maximum number of procedures to keep statistics for. When exceeded, the
+   statistics of the procedure least recently called are dropped (calls remain
+   counted in the totals).
+   """
+
+   CACHE_MAX_ENTRIES = 10000
+   """
+   Maximum number of cached call results over all procedures. When exceeded,
+   the least recently used results are dropped.
    """
 
    def __init__(self, realm):
@@ -53,9 +94,118 @@ class Dealer:
       ## map: registration -> procedure
       self._regs_to_procs = {}
 
+      ## map: invocation request -> (call, session, time dispatched, ProcedureStats,
+      ##                             (registration, cache key, generation) or None)
       ## pending callee invocation requests
       self._invocations = {}
 
+      ## map: registration -> time to cache results for
+      self._cache_ttl = {}
+
+      ## map: registration -> number of times the cache was invalidated, so
+      ## results of invocations pending while invalidating are not cached
+      self._cache_generation = {}
+
+      ## map: (procedure, arguments) -> (time expires, args, kwargs, payload),
+      ## ordered by last use (least recent first)
+      self._cache = OrderedDict()
+
+      ## map: procedure -> callable
+      self._meta_procedures = {}
+
+      ## statistics: totals, and map: procedure -> ProcedureStats
+      self._stats_calls = 0
+      self._stats_errors = 0
+      self._stats_cached = 0
+      self._stats_procedures = OrderedDict()
+
+      self.registerMetaProcedure('wamp.metaproc.cache.invalidate', lambda session, procedure: self.invalidateCache(procedure))
+
+
+   def registerMetaProcedure(self, procedure, fn):
+      """
+      Register a meta procedure implemented by the router. Meta procedures cannot
+      be registered by callees.
+
+      :param procedure: The URI of the procedure (usually `wamp.metaproc.*`).
+      :type procedure: str
+      :param fn: The implementation, called with the calling session and the call
+                 arguments. Raise :class:`autobahn.wamp.exception.ApplicationError`
+                 to return an error.
+      :type fn: callable
+      """
+      self._meta_procedures[procedure] = fn
+
+
+   def stats(self):
+      """
+      Get the statistics of this dealer.
+
+      :returns: dict -- The statistics: totals of calls and errors, the number of
+                registrations and pending invocations, and the statistics per
+                procedure.
+      """
+      procedures = {}
+      for procedure, stats in self._stats_procedures.items():
+         procedures[procedure] = stats.marshal()
+
+      return {'calls': self._stats_calls,
+              'errors': self._stats_errors,
+              'cached': self._stats_cached,
+              'registrations': len(self._regs_to_procs),
+              'pending': len(self._invocations),
+              'cache': len(self._cache),
+              'procedures': procedures}
+
+
+   def invalidateCache(self, procedure):
+      """
+      Drop the cached results of a procedure.
+
+      :param procedure: The URI of the procedure.
+      :type procedure: str
+
+      :returns: int -- The number of results dropped.
+      """
+      if procedure in self._procs_to_regs:
+         registration_id, _ = self._procs_to_regs[procedure]
+         if registration_id in self._cache_generation:
+            self._cache_generation[registration_id] += 1
+
+      keys = [key for key in self._cache if key[0] == procedure]
+      for key in keys:
+         del self._cache[key]
+      return len(keys)
+
+
+   def _cacheKey(self, call):
+      """
+      Get the key to cache the result of a call under, or `None` if the
+      arguments cannot be used as a key.
+      """
+      if call.payload is not None:
+         ## the payload as received: equal arguments serialized differently
+         ## (e.g. in another format) are cached separately
+         return (call.procedure, call.payload.serializer.__class__, call.payload.data, call.payload.count)
+      try:
+         key = (call.procedure, _freeze(call.args), _freeze(call.kwargs))
+         hash(key)
+      except TypeError:
+         return None
+      return key
+
+
+   def _unregister(self, registration):
+      """
+      Remove a registration, and drop the results cached for it.
+      """
+      procedure = self._regs_to_procs[registration]
+      if self._cache_ttl.pop(registration, None):
+         self.invalidateCache(procedure)
+         del self._cache_generation[registration]
+      del self._regs_to_procs[registration]
+      del self._procs_to_regs[procedure]
+
 
    def attach(self, session):
       """
@@ -74,8 +224,7 @@ class Dealer:
       assert(session in self._session_to_registrations)
 
       for registration in self._session_to_registrations[session]:
-         del self._procs_to_regs[self._regs_to_procs[registration]]
-         del self._regs_to_procs[registration]
+         self._unregister(registration)
 
       del self._session_to_registrations[session]
       del self._session_id_to_session[session._session_id]
@@ -87,10 +236,13 @@ class Dealer:
       """
       assert(session in self._session_to_registrations)
 
-      if not register.procedure in self._procs_to_regs:
+      if not register.procedure in self._procs_to_regs and not register.procedure in self._meta_procedures:
          registration_id = util.id()
          self._procs_to_regs[register.procedure] = (registration_id, session)
          self._regs_to_procs[registration_id] = register.procedure
+         if register.cache:
+            self._cache_ttl[registration_id] = register.cache
+            self._cache_generation[registration_id] = 0
 
          self._session_to_registrations[session].add(registration_id)
 
@@ -108,8 +260,7 @@ class Dealer:
       assert(session in self._session_to_registrations)
 
       if unregister.registration in self._regs_to_procs:
-         del self._procs_to_regs[self._regs_to_procs[unregister.registration]]
-         del self._regs_to_procs[unregister.registration]
+         self._unregister(unregister.registration)
 
          self._session_to_registrations[session].discard(unregister.registration)
 
@@ -126,31 +277,97 @@ class Dealer:
       """
       assert(session in self._session_to_registrations)
 
-      if call.procedure in self._procs_to_regs:
+      self._stats_calls += 1
+
+      if call.procedure in self._meta_procedures:
+         self._processMetaCall(session, call)
+
+      elif call.procedure in self._procs_to_regs:
          registration_id, endpoint_session = self._procs_to_regs[call.procedure]
 
-         request_id = util.id()
+         ## keep procedures in order of last call, so cold procedures are evicted first
+         ##
+         stats = self._stats_procedures.pop(call.procedure, None)
+         if stats is None:
+            stats = ProcedureStats()
+            if len(self._stats_procedures) >= self.STATS_MAX_PROCEDURES:
+               self._stats_procedures.popitem(last = False)
+         self._stats_procedures[call.procedure] = stats
+         stats.calls += 1
+
+         ## results may depend on the caller when disclosed, and progressive
+         ## results are not cached
+         ##
+         cache = None
+         if registration_id in self._cache_ttl and not call.discloseMe and not call.receive_progress:
+            key = self._cacheKey(call)
+            if key is not None:
+               cache = (registration_id, key, self._cache_generation[registration_id])
+
+         entry = self._cache.pop(cache[1], None) if cache else None
+         if entry is not None and entry[0] <= util.rtime():
+            entry = None
+
+         if entry is not None:
+            self._cache[cache[1]] = entry
+
+            self._stats_cached += 1
+            stats.cached += 1
+
+            _, args, kwargs, payload = entry
+            msg = message.Result(call.request, args = args, kwargs = kwargs, payload = payload)
+            session._transport.send(msg)
 
-         if call.discloseMe:
-            caller = session._session_id
          else:
-            caller = None
-
-         invocation = message.Invocation(request_id,
-                                         registration_id,
-                                         args = call.args,
-                                         kwargs = call.kwargs,
-                                         timeout = call.timeout,
-                                         receive_progress = call.receive_progress,
-                                         caller = caller)
-
-         self._invocations[request_id] = (call, session)
-         endpoint_session._transport.send(invocation)
+            request_id = util.id()
+
+            if call.discloseMe:
+               caller = session._session_id
+            else:
+               caller = None
+
+            invocation = message.Invocation(request_id,
+                                            registration_id,
+                                            args = call.args,
+                                            kwargs = call.kwargs,
+                                            timeout = call.timeout,
+                                            receive_progress = call.receive_progress,
+                                            caller = caller,
+                                            payload = call.payload)
+
+            self._invocations[request_id] = (call, session, util.rtime(), stats, cache)
+            endpoint_session._transport.send(invocation)
       else:
+         self._stats_errors += 1
          reply = message.Error(message.Call.MESSAGE_TYPE, call.request, 'wamp.error.no_such_procedure')
          session._transport.send(reply)
 
 
+   def _processMetaCall(self, session, call):
+      """
+      Process a call to a meta procedure.
+      """
+      if call.payload is not None:
+         payload = call.payload.unserialize()
+         args = payload[0]
+         kwargs = payload[1] if len(payload) > 1 else None
+      else:
+         args, kwargs = call.args, call.kwargs
+
+      try:
+         res = self._meta_procedures[call.procedure](session, *(args or []), **(kwargs or {}))
+      except ApplicationError as e:
+         self._stats_errors += 1
+         reply = message.Error(message.Call.MESSAGE_TYPE, call.request, e.error, args = list(e.args), kwargs = e.kwargs)
+      except Exception as e:
+         self._stats_errors += 1
+         reply = message.Error(message.Call.MESSAGE_TYPE, call.request, 'wamp.error.runtime_error', args = list(e.args))
+      else:
+         reply = message.Result(call.request, args = [res])
+
+      session._transport.send(reply)
+
+
    def processCancel(self, session, cancel):
       """
       Implements :func:`autobahn.wamp.interfaces.IDealer.processCancel`
@@ -167,11 +384,25 @@ class Dealer:
       assert(session in self._session_to_registrations)
 
       if yield_.request in self._invocations:
-         call_msg, call_session = self._invocations[yield_.request]
-         msg = message.Result(call_msg.request, args = yield_.args, kwargs = yield_.kwargs, progress = yield_.progress)
+         call_msg, call_session, started, stats, cache = self._invocations[yield_.request]
+         msg = message.Result(call_msg.request, args = yield_.args, kwargs = yield_.kwargs, progress = yield_.progress, payload = yield_.payload)
          call_session._transport.send(msg)
          if not yield_.progress:
             del self._invocations[yield_.request]
+            now = util.rtime()
+            stats.latency.add(now - started)
+
+            ## cache the result, unless the procedure was unregistered or its
+            ## cache invalidated meanwhile
+            ##
+            if cache:
+               registration_id, key, generation = cache
+               ttl = self._cache_ttl.get(registration_id)
+               if ttl and self._cache_generation[registration_id] == generation:
+                  self._cache.pop(key, None)
+                  self._cache[key] = (now + ttl, yield_.args, yield_.kwargs, yield_.payload)
+                  while len(self._cache) > self.CACHE_MAX_ENTRIES:
+                     self._cache.popitem(last = False)
       else:
          raise ProtocolError("Dealer.onYield(): YIELD received for non-pending request ID {}".format(yield_.request))
 
@@ -183,9 +414,11 @@ class Dealer:
       assert(session in self._session_to_registrations)
 
       if error.request in self._invocations:
-         call_msg, call_session = self._invocations[error.request]
+         call_msg, call_session, _, stats, _ = self._invocations[error.request]
          msg = message.Error(message.Call.MESSAGE_TYPE, call_msg.request, error.error, args = error.args, kwargs = error.kwargs)
          call_session._transport.send(msg)
          del self._invocations[error.request]
+         self._stats_errors += 1
+         stats.errors += 1
       else:
          raise ProtocolError("Dealer.onInvocationError(): ERROR received for non-pending request_type {} and request ID {}".format(error.request_type, error.request))
@@ -51,6 +51,39 @@ class IObjectSerializer(Interface):
       :returns: obj -- Any type that can be unserialized.
       """
 
+   def unserializeSplit(bytes, splits):
+      """
+      Unserialize a WAMP message from a byte string, but keep the elements following
+      the first few elements in serialized form. Only needed for serializers used in
+      passthrough mode.
+
+      :param bytes: Serialized WAMP message.
+      :type bytes: bytes
+      :param splits: Mapping of WAMP message type codes to the number of leading
+                     message elements to unserialize. Messages of other types are
+                     unserialized completely.
+      :type splits: dict
+
+      :returns: tuple -- A pair `(elements, tail)` with the unserialized (leading) elements
+                         and either `None` or a pair `(data, types)` with the serialized
+                         trailing elements and a list of their Python types.
+      """
+
+   def serializeSplice(obj, data, count):
+      """
+      Serialize a list, followed by elements already serialized. Only needed for
+      serializers used in passthrough mode.
+
+      :param obj: Leading elements to serialize.
+      :type obj: list
+      :param data: Serialized trailing elements (as returned by :func:`unserializeSplit`).
+      :type data: bytes
+      :param count: Number of trailing elements.
+      :type count: int
+
+      :returns: bytes -- Serialized byte string.
+      """
+
 
 
 class IMessage(Interface):
@@ -123,6 +156,10 @@ class ISerializer(Interface):
 
    SERIALIZER_ID = Attribute("""The WAMP serialization format ID.""")
 
+   BATCHED = Attribute("""Flag to indicate if the serializer packs several WAMP messages
+      into one transport message. Serializations of messages can then be concatenated,
+      and transport messages must be unserialized with :func:`unserializeBatch`.""")
+
 
    def serialize(message):
       """
@@ -144,6 +181,16 @@ class ISerializer(Interface):
       :returns: obj -- An instance that implements :class:`autobahn.wamp.interfaces.IMessage`.
       """
 
+   def unserializeBatch(bytes, isBinary):
+      """
+      Unserializes bytes from a transport and parses all WAMP messages contained.
+
+      :param bytes: Byte string from wire.
+      :type bytes: bytes
+
+      :returns: list -- A list of instances that implement :class:`autobahn.wamp.interfaces.IMessage`.
+      """
+
 
 
 class ITransport(Interface):
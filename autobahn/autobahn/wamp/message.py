@@ -18,7 +18,8 @@
 
 from __future__ import absolute_import
 
-__all__ = ['Error',
+__all__ = ['EncodedPayload',
+           'Error',
            'Subscribe',
            'Subscribed',
            'Unsubscribe',
@@ -44,6 +45,8 @@ __all__ = ['Error',
            'Heartbeat']
 
 
+import sys
+
 from zope.interface import implementer
 
 import autobahn
@@ -53,8 +56,22 @@ from autobahn.wamp.interfaces import IMessage
 
 
 
+PY3 = sys.version_info >= (3,)
+
+## types valid for URIs, IDs and integer options, and the largest valid ID
+if PY3:
+   _URI_TYPES = frozenset([str])
+   _INT_TYPES = frozenset([int])
+else:
+   _URI_TYPES = frozenset([str, unicode])
+   _INT_TYPES = frozenset([int, long])
+
+_ID_MAX = 9007199254740992 # 2**53
+
+
+
 def check_or_raise_uri(value, message):
-   if type(value) not in [str, unicode]:
+   if type(value) not in _URI_TYPES:
       raise ProtocolError("{}: invalid type {} for URI".format(message, type(value)))
    if len(value) == 0:
       raise ProtocolError("{}: invalid value '{}' for URI".format(message, value))
@@ -63,9 +80,9 @@ def check_or_raise_uri(value, message):
 
 
 def check_or_raise_id(value, message):
-   if type(value) not in [int, long]:
+   if type(value) not in _INT_TYPES:
       raise ProtocolError("{}: invalid type {} for ID".format(message, type(value)))
-   if value < 0 or value > 9007199254740992: # 2**53
+   if value < 0 or value > _ID_MAX:
       raise ProtocolError("{}: invalid value {} for ID".format(message, value))
    return value
 
@@ -74,33 +91,108 @@ def check_or_raise_id(value, message):
 def check_or_raise_extra(value, message):
    if type(value) != dict:
       raise ProtocolError("{}: invalid type {}".format(message, type(value)))
-   for k in value.keys():
-      if type(k) not in (str, unicode):
-         raise ProtocolError("{}: invalid type {} for key '{}'".format(type(k), k))
+   for k in value:
+      if type(k) not in _URI_TYPES:
+         raise ProtocolError("{}: invalid type {} for key '{}'".format(message, type(k), k))
    return value
 
+## The parsers of the frequent messages (PUBLISH, EVENT, CALL, INVOCATION,
+## YIELD, RESULT) check IDs, URIs and extra dicts inline, and only call the
+## functions above to raise the error when a check failed. Options/details
+## are checked and extracted in one pass over the dict.
+
 
 
-class Message(util.EqualityMixin):
+class EncodedPayload(util.EqualityMixin):
+   """
+   Application payload (positional and keyword arguments) of a WAMP message,
+   kept in the serialized form it was received in.
+
+   A router using a serializer in passthrough mode (see
+   :class:`autobahn.wamp.serializer.Serializer`) does not unserialize the
+   payload of `PUBLISH`, `CALL` and `YIELD` messages, but forwards it in
+   `EVENT`, `INVOCATION` and `RESULT` messages. The payload is spliced into
+   those unchanged for receivers using the same serialization format, and only
+   unserialized for receivers using a different one.
+   """
+
+   def __init__(self, serializer, data, count):
+      """
+      Constructor.
+
+      :param serializer: The object serializer the payload was serialized with.
+      :type serializer: An object that implements :class:`autobahn.wamp.interfaces.IObjectSerializer`.
+      :param data: The serialized payload elements.
+      :type data: bytes
+      :param count: Number of payload elements (`1` for `args` only, `2` for `args` and `kwargs`).
+      :type count: int
+      """
+      self.serializer = serializer
+      self.data = data
+      self.count = count
+
+
+   def unserialize(self):
+      """
+      Unserialize the payload.
+
+      :returns: list -- `[args]` or `[args, kwargs]`.
+      """
+      return self.serializer.unserialize(self.serializer.serializeSplice([], self.data, self.count))
+
+
+
+class Message(object):
    """
    WAMP message base class. This is not supposed to be instantiated.
+
+   Message classes use `__slots__` (routers create lots of messages). Attributes
+   of derived classes are listed in their `__slots__`, and these are the ones
+   compared for equality.
+   """
+
+   __slots__ = ('_serializer', '_serialized', '_serializedMore')
+
+   payload = None
+   """
+   Application payload kept in serialized form (an instance of :class:`autobahn.wamp.message.EncodedPayload`),
+   for messages that carry `args` and `kwargs`. When set, `args` and `kwargs` are `None` and
+   :func:`marshal` returns the message without payload elements.
    """
 
    def __init__(self):
       """
       Base constructor.
       """
-      ## serialization cache: mapping from ISerializer instances
-      ## to serialized bytes
+      ## serialization cache: the serializer used first and the serialized
+      ## bytes, plus a mapping from further serializers to serialized bytes
+      ## (created only when a message is serialized more than one way)
       ##
-      self._serialized = {}
+      self._serializer = None
+      self._serialized = None
+      self._serializedMore = None
+
+
+   def __eq__(self, other):
+      if not isinstance(other, self.__class__):
+         return False
+      for k in self.__slots__:
+         if not getattr(self, k) == getattr(other, k):
+            return False
+      return True
+
+
+   def __ne__(self, other):
+      return not self.__eq__(other)
 
 
    def uncache(self):
       """
       Implements :func:`autobahn.wamp.interfaces.IMessage.uncache`
       """
-      self._serialized = {}
+      self._serializer = None
+      self._serialized = None
+      self._serializedMore = None
 
 
    def serialize(self, serializer):
@@ -108,9 +200,28 @@ class Message(util.EqualityMixin):
       Implements :func:`autobahn.wamp.interfaces.IMessage.serialize`
       """
       ## only serialize if not cached ..
-      if not self._serialized.has_key(serializer):
-         self._serialized[serializer] = serializer.serialize(self.marshal())
-      return self._serialized[serializer]
+      if serializer is self._serializer:
+         return self._serialized
+
+      if self._serializedMore is not None and serializer in self._serializedMore:
+         return self._serializedMore[serializer]
+
+      if self.payload is None:
+         data = serializer.serialize(self.marshal())
+      elif self.payload.serializer.__class__ == serializer.__class__:
+         ## splice the payload (serialized in the same format) in as is
+         data = serializer.serializeSplice(self.marshal(), self.payload.data, self.payload.count)
+      else:
+         data = serializer.serialize(self.marshal() + self.payload.unserialize())
+
+      if self._serializer is None:
+         self._serializer = serializer
+         self._serialized = data
+      else:
+         if self._serializedMore is None:
+            self._serializedMore = {}
+         self._serializedMore[serializer] = data
+      return data
 
 
 
@@ -125,6 +236,8 @@ class Error(Message):
      * `[ERROR, REQUEST.Type|int, REQUEST.Request|id, Details|dict, Error|uri, Arguments|list, ArgumentsKw|dict]`
    """
 
+   __slots__ = ('request_type', 'request', 'error', 'args', 'kwargs')
+
    MESSAGE_TYPE = 7
    """
    The WAMP message code for this type of message.
@@ -174,7 +287,7 @@ class Error(Message):
          raise ProtocolError("invalid message length {} for ERROR".format(len(wmsg)))
 
       request_type = wmsg[1]
-      if type(request_type) not in [int, long]:
+      if type(request_type) not in _INT_TYPES:
          raise ProtocolError("invalid type {} for 'request_type' in ERROR".format(request_type))
 
       if request_type not in [Subscribe.MESSAGE_TYPE,
@@ -237,6 +350,8 @@ class Subscribe(Message):
    Format: `[SUBSCRIBE, Request|id, Options|dict, Topic|uri]`
    """
 
+   __slots__ = ('request', 'topic', 'match')
+
    MESSAGE_TYPE = 32
    """
    The WAMP message code for this type of message.
@@ -286,10 +401,10 @@ class Subscribe(Message):
 
       match = Subscribe.MATCH_EXACT
 
-      if options.has_key('match'):
+      if 'match' in options:
 
          option_match = options['match']
-         if type(option_match) not in [str, unicode]:
+         if type(option_match) not in _URI_TYPES:
             raise ProtocolError("invalid type {} for 'match' option in SUBSCRIBE".format(type(option_match)))
 
          if option_match not in [Subscribe.MATCH_EXACT, Subscribe.MATCH_PREFIX, Subscribe.MATCH_WILDCARD]:
@@ -330,6 +445,8 @@ class Subscribed(Message):
    Format: `[SUBSCRIBED, SUBSCRIBE.Request|id, Subscription|id]`
    """
 
+   __slots__ = ('request', 'subscription')
+
    MESSAGE_TYPE = 33
    """
    The WAMP message code for this type of message.
@@ -397,6 +514,8 @@ class Unsubscribe(Message):
    Format: `[UNSUBSCRIBE, Request|id, SUBSCRIBED.Subscription|id]`
    """
 
+   __slots__ = ('request', 'subscription')
+
    MESSAGE_TYPE = 34
    """
    The WAMP message code for this type of message.
@@ -465,6 +584,8 @@ class Unsubscribed(Message):
    Format: `[UNSUBSCRIBED, UNSUBSCRIBE.Request|id]`
    """
 
+   __slots__ = ('request',)
+
    MESSAGE_TYPE = 35
    """
    The WAMP message code for this type of message.
@@ -531,6 +652,8 @@ class Publish(Message):
      * `[PUBLISH, Request|id, Options|dict, Topic|uri, Arguments|list, ArgumentsKw|dict]`
    """
 
+   __slots__ = ('request', 'topic', 'args', 'kwargs', 'acknowledge', 'excludeMe', 'exclude', 'eligible', 'discloseMe', 'retain', 'payload')
+
    MESSAGE_TYPE = 16
    """
    The WAMP message code for this type of message.
@@ -545,7 +668,9 @@ class Publish(Message):
                 excludeMe = None,
                 exclude = None,
                 eligible = None,
-                discloseMe = None):
+                discloseMe = None,
+                retain = None,
+                payload = None):
       """
       Message constructor.
 
@@ -573,8 +698,15 @@ class Publish(Message):
       :param discloseMe: If True, request to disclose the publisher of this event
                          to subscribers.
       :type discloseMe: bool
+      :param retain: If True, request the broker to retain this event and dispatch it
+                     to sessions subscribing later.
+      :type retain: bool
+      :param payload: Application payload kept in serialized form (instead of `args` and `kwargs`),
+                      see :class:`autobahn.wamp.message.EncodedPayload`.
+      :type payload: obj
       """
       assert(not (kwargs and not args))
+      assert(payload is None or (args is None and kwargs is None))
       Message.__init__(self)
       self.request = request
       self.topic = topic
@@ -585,6 +717,8 @@ class Publish(Message):
       self.exclude = exclude
       self.eligible = eligible
       self.discloseMe = discloseMe
+      self.retain = retain
+      self.payload = payload
 
 
    @staticmethod
@@ -601,78 +735,79 @@ class Publish(Message):
       ##
       assert(len(wmsg) > 0 and wmsg[0] == Publish.MESSAGE_TYPE)
 
-      if len(wmsg) not in (4, 5, 6):
+      n = len(wmsg)
+      args = None
+      kwargs = None
+      if n == 4:
+         _, request, options, topic = wmsg
+      elif n == 5:
+         _, request, options, topic, args = wmsg
+      elif n == 6:
+         _, request, options, topic, args, kwargs = wmsg
+      else:
          raise ProtocolError("invalid message length {} for PUBLISH".format(len(wmsg)))
 
-      request = check_or_raise_id(wmsg[1], "'request' in PUBLISH")
-      options = check_or_raise_extra(wmsg[2], "'options' in PUBLISH")
-      topic = check_or_raise_uri(wmsg[3], "'topic' in PUBLISH")
+      if type(request) not in _INT_TYPES or request < 0 or request > _ID_MAX:
+         check_or_raise_id(request, "'request' in PUBLISH")
+      if type(options) != dict:
+         check_or_raise_extra(options, "'options' in PUBLISH")
+      if type(topic) not in _URI_TYPES or not topic:
+         check_or_raise_uri(topic, "'topic' in PUBLISH")
 
-      args = None
-      if len(wmsg) > 4:
-         args = wmsg[4]
-         if type(args) != list:
-            raise ProtocolError("invalid type {} for 'args' in PUBLISH".format(type(args)))
+      if n > 4 and type(args) != list:
+         raise ProtocolError("invalid type {} for 'args' in PUBLISH".format(type(args)))
 
-      kwargs = None
-      if len(wmsg) > 5:
-         kwargs = wmsg[5]
-         if type(kwargs) != dict:
-            raise ProtocolError("invalid type {} for 'kwargs' in PUBLISH".format(type(kwargs)))
+      if n > 5 and type(kwargs) != dict:
+         raise ProtocolError("invalid type {} for 'kwargs' in PUBLISH".format(type(kwargs)))
 
       acknowledge = None
       excludeMe = None
       exclude = None
       eligible = None
       discloseMe = None
-
-      if options.has_key('acknowledge'):
-
-         option_acknowledge = options['acknowledge']
-         if type(option_acknowledge) != bool:
-            raise ProtocolError("invalid type {} for 'acknowledge' option in PUBLISH".format(type(option_acknowledge)))
-
-         acknowledge = option_acknowledge
-
-      if options.has_key('excludeme'):
-
-         option_excludeMe = options['excludeme']
-         if type(option_excludeMe) != bool:
-            raise ProtocolError("invalid type {} for 'excludeme' option in PUBLISH".format(type(option_excludeMe)))
-
-         excludeMe = option_excludeMe
-
-      if options.has_key('exclude'):
-
-         option_exclude = options['exclude']
-         if type(option_exclude) != list:
-            raise ProtocolError("invalid type {} for 'exclude' option in PUBLISH".format(type(option_exclude)))
-
-         for sessionId in option_exclude:
-            if type(sessionId) not in [int, long]:
-               raise ProtocolError("invalid type {} for value in 'exclude' option in PUBLISH".format(type(sessionId)))
-
-         exclude = option_exclude
-
-      if options.has_key('eligible'):
-
-         option_eligible = options['eligible']
-         if type(option_eligible) != list:
-            raise ProtocolError("invalid type {} for 'eligible' option in PUBLISH".format(type(option_eligible)))
-
-         for sessionId in option_eligible:
-            if type(sessionId) not in [int, long]:
-               raise ProtocolError("invalid type {} for value in 'eligible' option in PUBLISH".format(type(sessionId)))
-
-         eligible = option_eligible
-
-      if options.has_key('discloseme'):
-
-         option_discloseMe = options['discloseme']
-         if type(option_discloseMe) != bool:
-            raise ProtocolError("invalid type {} for 'discloseme' option in PUBLISH".format(type(option_discloseMe)))
-
-         discloseMe = option_discloseMe
+      retain = None
+
+      for key in options:
+         if key == u'acknowledge':
+            acknowledge = options[key]
+            if type(acknowledge) != bool:
+               raise ProtocolError("invalid type {} for 'acknowledge' option in PUBLISH".format(type(acknowledge)))
+
+         elif key == u'excludeme':
+            excludeMe = options[key]
+            if type(excludeMe) != bool:
+               raise ProtocolError("invalid type {} for 'excludeme' option in PUBLISH".format(type(excludeMe)))
+
+         elif key == u'exclude':
+            exclude = options[key]
+            if type(exclude) != list:
+               raise ProtocolError("invalid type {} for 'exclude' option in PUBLISH".format(type(exclude)))
+
+            for sessionId in exclude:
+               if type(sessionId) not in _INT_TYPES:
+                  raise ProtocolError("invalid type {} for value in 'exclude' option in PUBLISH".format(type(sessionId)))
+
+         elif key == u'eligible':
+            eligible = options[key]
+            if type(eligible) != list:
+               raise ProtocolError("invalid type {} for 'eligible' option in PUBLISH".format(type(eligible)))
+
+            for sessionId in eligible:
+               if type(sessionId) not in _INT_TYPES:
+                  raise ProtocolError("invalid type {} for value in 'eligible' option in PUBLISH".format(type(sessionId)))
+
+         elif key == u'discloseme':
+            discloseMe = options[key]
+            if type(discloseMe) != bool:
+               raise ProtocolError("invalid type {} for 'discloseme' option in PUBLISH".format(type(discloseMe)))
+
+         elif key == u'retain':
+            retain = options[key]
+            if type(retain) != bool:
+               raise ProtocolError("invalid type {} for 'retain' option in PUBLISH".format(type(retain)))
+
+         elif type(key) not in _URI_TYPES:
+            check_or_raise_extra(options, "'options' in PUBLISH")
 
       obj = Publish(request,
                     topic,
@@ -682,7 +817,8 @@ class Publish(Message):
                     excludeMe = excludeMe,
                     exclude = exclude,
                     eligible = eligible,
-                    discloseMe = discloseMe)
+                    discloseMe = discloseMe,
+                    retain = retain)
 
       return obj
 
@@ -703,6 +839,8 @@ class Publish(Message):
          options['eligible'] = self.eligible
       if self.discloseMe is not None:
          options['discloseme'] = self.discloseMe
+      if self.retain is not None:
+         options['retain'] = self.retain
 
       if self.kwargs:
          return [Publish.MESSAGE_TYPE, self.request, options, self.topic, self.args, self.kwargs]
@@ -716,7 +854,7 @@ class Publish(Message):
       """
       Implements :func:`autobahn.wamp.interfaces.IMessage.__str__`
       """
-      return "WAMP PUBLISH Message (request = {}, topic = {}, args = {}, kwargs = {}, acknowledge = {}, excludeMe = {}, exclude = {}, eligible = {}, discloseMe = {})".format(self.request, self.topic, self.args, self.kwargs, self.acknowledge, self.excludeMe, self.exclude, self.eligible, self.discloseMe)
+      return "WAMP PUBLISH Message (request = {}, topic = {}, args = {}, kwargs = {}, acknowledge = {}, excludeMe = {}, exclude = {}, eligible = {}, discloseMe = {}, retain = {})".format(self.request, self.topic, self.args, self.kwargs, self.acknowledge, self.excludeMe, self.exclude, self.eligible, self.discloseMe, self.retain)
 
 
 
@@ -728,6 +866,8 @@ class Published(Message):
    Format: `[PUBLISHED, PUBLISH.Request|id, Publication|id]`
    """
 
+   __slots__ = ('request', 'publication')
+
    MESSAGE_TYPE = 17
    """
    The WAMP message code for this type of message.
@@ -799,13 +939,15 @@ class Event(Message):
      * `[EVENT, SUBSCRIBED.Subscription|id, PUBLISHED.Publication|id, Details|dict, PUBLISH.Arguments|list, PUBLISH.ArgumentsKw|dict]`
    """
 
+   __slots__ = ('subscription', 'publication', 'args', 'kwargs', 'publisher', 'retained', 'payload')
+
    MESSAGE_TYPE = 36
    """
    The WAMP message code for this type of message.
    """
 
 
-   def __init__(self, subscription, publication, args = None, kwargs = None, publisher = None):
+   def __init__(self, subscription, publication, args = None, kwargs = None, publisher = None, retained = None, payload = None):
       """
       Message constructor.
 
@@ -821,14 +963,23 @@ class Event(Message):
       :type kwargs: dict
       :param publisher: If present, the WAMP session ID of the publisher of this event.
       :type publisher: str
+      :param retained: If True, this is an event retained by the broker and dispatched
+                       to a new subscriber.
+      :type retained: bool
+      :param payload: Application payload kept in serialized form (instead of `args` and `kwargs`),
+                      see :class:`autobahn.wamp.message.EncodedPayload`.
+      :type payload: obj
       """
       assert(not (kwargs and not args))
+      assert(payload is None or (args is None and kwargs is None))
       Message.__init__(self)
       self.subscription = subscription
       self.publication = publication
       self.args = args
       self.kwargs = kwargs
       self.publisher = publisher
+      self.retained = retained
+      self.payload = payload
 
 
    @staticmethod
@@ -845,39 +996,54 @@ class Event(Message):
       ##
       assert(len(wmsg) > 0 and wmsg[0] == Event.MESSAGE_TYPE)
 
-      if len(wmsg) not in (4, 5, 6):
+      n = len(wmsg)
+      args = None
+      kwargs = None
+      if n == 4:
+         _, subscription, publication, details = wmsg
+      elif n == 5:
+         _, subscription, publication, details, args = wmsg
+      elif n == 6:
+         _, subscription, publication, details, args, kwargs = wmsg
+      else:
          raise ProtocolError("invalid message length {} for EVENT".format(len(wmsg)))
 
-      subscription = check_or_raise_id(wmsg[1], "'subscription' in EVENT")
-      publication = check_or_raise_id(wmsg[2], "'publication' in EVENT")
-      details = check_or_raise_extra(wmsg[3], "'details' in EVENT")
+      if type(subscription) not in _INT_TYPES or subscription < 0 or subscription > _ID_MAX:
+         check_or_raise_id(subscription, "'subscription' in EVENT")
+      if type(publication) not in _INT_TYPES or publication < 0 or publication > _ID_MAX:
+         check_or_raise_id(publication, "'publication' in EVENT")
+      if type(details) != dict:
+         check_or_raise_extra(details, "'details' in EVENT")
 
-      args = None
-      if len(wmsg) > 4:
-         args = wmsg[4]
-         if type(args) != list:
-            raise ProtocolError("invalid type {} for 'args' in EVENT".format(type(args)))
+      if n > 4 and type(args) != list:
+         raise ProtocolError("invalid type {} for 'args' in EVENT".format(type(args)))
 
-      kwargs = None
-      if len(wmsg) > 5:
-         kwargs = wmsg[5]
-         if type(kwargs) != dict:
-            raise ProtocolError("invalid type {} for 'kwargs' in EVENT".format(type(kwargs)))
+      if n > 5 and type(kwargs) != dict:
+         raise ProtocolError("invalid type {} for 'kwargs' in EVENT".format(type(kwargs)))
 
       publisher = None
-      if details.has_key('publisher'):
+      retained = None
 
-         detail_publisher = details['publisher']
-         if type(detail_publisher) not in [int, long]:
-            raise ProtocolError("invalid type {} for 'publisher' detail in EVENT".format(type(detail_publisher)))
+      for key in details:
+         if key == u'publisher':
+            publisher = details[key]
+            if type(publisher) not in _INT_TYPES:
+               raise ProtocolError("invalid type {} for 'publisher' detail in EVENT".format(type(publisher)))
 
-         publisher = detail_publisher
+         elif key == u'retained':
+            retained = details[key]
+            if type(retained) != bool:
+               raise ProtocolError("invalid type {} for 'retained' detail in EVENT".format(type(retained)))
+
+         elif type(key) not in _URI_TYPES:
+            check_or_raise_extra(details, "'details' in EVENT")
 
       obj = Event(subscription,
                   publication,
                   args = args,
                   kwargs = kwargs,
-                  publisher = publisher)
+                  publisher = publisher,
+                  retained = retained)
 
       return obj
 
@@ -890,6 +1056,8 @@ class Event(Message):
 
       if self.publisher is not None:
          details['publisher'] = self.publisher
+      if self.retained is not None:
+         details['retained'] = self.retained
 
       if self.kwargs:
          return [Event.MESSAGE_TYPE, self.subscription, self.publication, details, self.args, self.kwargs]
@@ -903,7 +1071,7 @@ class Event(Message):
       """
       Implements :func:`autobahn.wamp.interfaces.IMessage.__str__`
       """
-      return "WAMP EVENT Message (subscription = {}, publication = {}, args = {}, kwargs = {}, publisher = {})".format(self.subscription, self.publication, self.args, self.kwargs, self.publisher)
+      return "WAMP EVENT Message (subscription = {}, publication = {}, args = {}, kwargs = {}, publisher = {}, retained = {})".format(self.subscription, self.publication, self.args, self.kwargs, self.publisher, self.retained)
 
 
 
@@ -915,12 +1083,14 @@ class Register(Message):
    Format: `[REGISTER, Request|id, Options|dict, Procedure|uri]`
    """
 
+   __slots__ = ('request', 'procedure', 'pkeys', 'cache')
+
    MESSAGE_TYPE = 64
    """
    The WAMP message code for this type of message.
    """
 
-   def __init__(self, request, procedure, pkeys = None):
+   def __init__(self, request, procedure, pkeys = None, cache = None):
       """
       Message constructor.
 
@@ -930,11 +1100,17 @@ class Register(Message):
       :type procedure: str
       :param pkeys: The endpoint can work for this list of application partition keys.
       :type pkeys: list
+      :param cache: If present, let the dealer cache call results for this
+                    time (in seconds).
+      :type cache: float
       """
+      assert(cache is None or ((type(cache) in _INT_TYPES or type(cache) == float) and cache > 0))
+
       Message.__init__(self)
       self.request = request
       self.procedure = procedure
       self.pkeys = pkeys
+      self.cache = cache
 
 
    @staticmethod
@@ -960,19 +1136,32 @@ class Register(Message):
 
       pkeys = None
 
-      if options.has_key('pkeys'):
+      if 'pkeys' in options:
 
          option_pkeys = options['pkeys']
          if type(option_pkeys) != list:
             raise ProtocolError("invalid type {} for 'pkeys' option in REGISTER".format(type(option_pkeys)))
 
          for pk in option_pkeys:
-            if type(pk) not in [int, long]:
+            if type(pk) not in _INT_TYPES:
                raise ProtocolError("invalid type for value '{}' in 'pkeys' option in REGISTER".format(type(pk)))
 
          pkeys = option_pkeys
 
-      obj = Register(request, procedure, pkeys = pkeys)
+      cache = None
+
+      if 'cache' in options:
+
+         option_cache = options['cache']
+         if type(option_cache) not in _INT_TYPES and type(option_cache) != float:
+            raise ProtocolError("invalid type {} for 'cache' option in REGISTER".format(type(option_cache)))
+
+         if option_cache <= 0:
+            raise ProtocolError("invalid value {} for 'cache' option in REGISTER".format(option_cache))
+
+         cache = option_cache
+
+      obj = Register(request, procedure, pkeys = pkeys, cache = cache)
 
       return obj
 
@@ -986,6 +1175,9 @@ class Register(Message):
       if self.pkeys is not None:
          options['pkeys'] = self.pkeys
 
+      if self.cache is not None:
+         options['cache'] = self.cache
+
       return [Register.MESSAGE_TYPE, self.request, options, self.procedure]
 
 
@@ -993,7 +1185,7 @@ class Register(Message):
       """
       Implements :func:`autobahn.wamp.interfaces.IMessage.__str__`
       """
-      return "WAMP REGISTER Message (request = {}, procedure = {}, pkeys = {})".format(self.request, self.procedure, self.pkeys)
+      return "WAMP REGISTER Message (request = {}, procedure = {}, pkeys = {}, cache = {})".format(self.request, self.procedure, self.pkeys, self.cache)
 
 
 
@@ -1005,6 +1197,8 @@ class Registered(Message):
    Format: `[REGISTERED, REGISTER.Request|id, Registration|id]`
    """
 
+   __slots__ = ('request', 'registration')
+
    MESSAGE_TYPE = 65
    """
    The WAMP message code for this type of message.
@@ -1072,6 +1266,8 @@ class Unregister(Message):
    Format: `[UNREGISTER, Request|id, REGISTERED.Registration|id]`
    """
 
+   __slots__ = ('request', 'registration')
+
    MESSAGE_TYPE = 66
    """
    The WAMP message code for this type of message.
@@ -1140,6 +1336,8 @@ class Unregistered(Message):
    Format: `[UNREGISTERED, UNREGISTER.Request|id]`
    """
 
+   __slots__ = ('request',)
+
    MESSAGE_TYPE = 67
    """
    The WAMP message code for this type of message.
@@ -1206,6 +1404,8 @@ class Call(Message):
      * `[CALL, Request|id, Options|dict, Procedure|uri, Arguments|list, ArgumentsKw|dict]`
    """
 
+   __slots__ = ('request', 'procedure', 'args', 'kwargs', 'timeout', 'receive_progress', 'discloseMe', 'payload')
+
    MESSAGE_TYPE = 48
    """
    The WAMP message code for this type of message.
@@ -1218,7 +1418,8 @@ class Call(Message):
                 kwargs = None,
                 timeout = None,
                 receive_progress = None,
-                discloseMe = None):
+                discloseMe = None,
+                payload = None):
       """
       Message constructor.
 
@@ -1234,7 +1435,11 @@ class Call(Message):
       :param timeout: If present, let the callee automatically cancel
                       the call after this ms.
       :type timeout: int
+      :param payload: Application payload kept in serialized form (instead of `args` and `kwargs`),
+                      see :class:`autobahn.wamp.message.EncodedPayload`.
+      :type payload: obj
       """
+      assert(payload is None or (args is None and kwargs is None))
       Message.__init__(self)
       self.request = request
       self.procedure = procedure
@@ -1243,6 +1448,7 @@ class Call(Message):
       self.timeout = timeout
       self.receive_progress = receive_progress
       self.discloseMe = discloseMe
+      self.payload = payload
 
 
    @staticmethod
@@ -1259,54 +1465,56 @@ class Call(Message):
       ##
       assert(len(wmsg) > 0 and wmsg[0] == Call.MESSAGE_TYPE)
 
-      if len(wmsg) not in (4, 5, 6):
-         raise ProtocolError("invalid message length {} for CALL".format(len(wmsg)))
-
-      request = check_or_raise_id(wmsg[1], "'request' in CALL")
-      options = check_or_raise_extra(wmsg[2], "'options' in CALL")
-      procedure = check_or_raise_uri(wmsg[3], "'procedure' in CALL")
-
+      n = len(wmsg)
       args = None
-      if len(wmsg) > 4:
-         args = wmsg[4]
-         if type(args) != list:
-            raise ProtocolError("invalid type {} for 'args' in CALL".format(type(args)))
-
       kwargs = None
-      if len(wmsg) > 5:
-         kwargs = wmsg[5]
-         if type(kwargs) != dict:
-            raise ProtocolError("invalid type {} for 'kwargs' in CALL".format(type(kwargs)))
-
-      timeout = None
-      if options.has_key('timeout'):
+      if n == 4:
+         _, request, options, procedure = wmsg
+      elif n == 5:
+         _, request, options, procedure, args = wmsg
+      elif n == 6:
+         _, request, options, procedure, args, kwargs = wmsg
+      else:
+         raise ProtocolError("invalid message length {} for CALL".format(len(wmsg)))
 
-         option_timeout = options['timeout']
-         if type(option_timeout) not in [int, long]:
-            raise ProtocolError("invalid type {} for 'timeout' option in CALL".format(type(option_timeout)))
+      if type(request) not in _INT_TYPES or request < 0 or request > _ID_MAX:
+         check_or_raise_id(request, "'request' in CALL")
+      if type(options) != dict:
+         check_or_raise_extra(options, "'options' in CALL")
+      if type(procedure) not in _URI_TYPES or not procedure:
+         check_or_raise_uri(procedure, "'procedure' in CALL")
 
-         if option_timeout < 0:
-            raise ProtocolError("invalid value {} for 'timeout' option in CALL".format(option_timeout))
+      if n > 4 and type(args) != list:
+         raise ProtocolError("invalid type {} for 'args' in CALL".format(type(args)))
 
-         timeout = option_timeout
+      if n > 5 and type(kwargs) != dict:
+         raise ProtocolError("invalid type {} for 'kwargs' in CALL".format(type(kwargs)))
 
+      timeout = None
       receive_progress = None
-      if options.has_key('receive_progress'):
+      discloseMe = None
 
-         option_receive_progress = options['receive_progress']
-         if type(option_receive_progress) != bool:
-            raise ProtocolError("invalid type {} for 'receive_progress' option in CALL".format(type(option_receive_progress)))
+      for key in options:
+         if key == u'timeout':
+            timeout = options[key]
+            if type(timeout) not in _INT_TYPES:
+               raise ProtocolError("invalid type {} for 'timeout' option in CALL".format(type(timeout)))
 
-         receive_progress = option_receive_progress
+            if timeout < 0:
+               raise ProtocolError("invalid value {} for 'timeout' option in CALL".format(timeout))
 
-      discloseMe = None
-      if options.has_key('discloseme'):
+         elif key == u'receive_progress':
+            receive_progress = options[key]
+            if type(receive_progress) != bool:
+               raise ProtocolError("invalid type {} for 'receive_progress' option in CALL".format(type(receive_progress)))
 
-         option_discloseMe = options['discloseme']
-         if type(option_discloseMe) != bool:
-            raise ProtocolError("invalid type {} for 'discloseme' option in CALL".format(type(option_discloseMe)))
+         elif key == u'discloseme':
+            discloseMe = options[key]
+            if type(discloseMe) != bool:
+               raise ProtocolError("invalid type {} for 'discloseme' option in CALL".format(type(discloseMe)))
 
-         discloseMe = option_discloseMe
+         elif type(key) not in _URI_TYPES:
+            check_or_raise_extra(options, "'options' in CALL")
 
       obj = Call(request,
                  procedure,
@@ -1358,6 +1566,8 @@ class Cancel(Message):
    Format: `[CANCEL, CALL.Request|id, Options|dict]`
    """
 
+   __slots__ = ('request', 'mode')
+
    MESSAGE_TYPE = 49
    """
    The WAMP message code for this type of message.
@@ -1406,10 +1616,10 @@ class Cancel(Message):
       ##
       mode = None
 
-      if options.has_key('mode'):
+      if 'mode' in options:
 
          option_mode = options['mode']
-         if type(option_mode) not in (str, unicode):
+         if type(option_mode) not in _URI_TYPES:
             raise ProtocolError("invalid type {} for 'mode' option in CANCEL".format(type(option_mode)))
 
          if option_mode not in [Cancel.SKIP, Cancel.ABORT, Cancel.KILL]:
@@ -1453,12 +1663,14 @@ class Result(Message):
      * `[RESULT, CALL.Request|id, Details|dict, YIELD.Arguments|list, YIELD.ArgumentsKw|dict]`
    """
 
+   __slots__ = ('request', 'args', 'kwargs', 'progress', 'payload')
+
    MESSAGE_TYPE = 50
    """
    The WAMP message code for this type of message.
    """
 
-   def __init__(self, request, args = None, kwargs = None, progress = None):
+   def __init__(self, request, args = None, kwargs = None, progress = None, payload = None):
       """
       Message constructor.
 
@@ -1472,12 +1684,17 @@ class Result(Message):
       :type kwargs: dict
       :progress: If `True`, this result is a progressive call result, and subsequent
                  results (or a final error) will follow.
+      :param payload: Application payload kept in serialized form (instead of `args` and `kwargs`),
+                      see :class:`autobahn.wamp.message.EncodedPayload`.
+      :type payload: obj
       """
+      assert(payload is None or (args is None and kwargs is None))
       Message.__init__(self)
       self.request = request
       self.args = args
       self.kwargs = kwargs
       self.progress = progress
+      self.payload = payload
 
 
    @staticmethod
@@ -1494,33 +1711,39 @@ class Result(Message):
       ##
       assert(len(wmsg) > 0 and wmsg[0] == Result.MESSAGE_TYPE)
 
-      if len(wmsg) not in (3, 4, 5):
+      n = len(wmsg)
+      args = None
+      kwargs = None
+      if n == 3:
+         _, request, details = wmsg
+      elif n == 4:
+         _, request, details, args = wmsg
+      elif n == 5:
+         _, request, details, args, kwargs = wmsg
+      else:
          raise ProtocolError("invalid message length {} for RESULT".format(len(wmsg)))
 
-      request = check_or_raise_id(wmsg[1], "'request' in RESULT")
-      details = check_or_raise_extra(wmsg[2], "'details' in RESULT")
+      if type(request) not in _INT_TYPES or request < 0 or request > _ID_MAX:
+         check_or_raise_id(request, "'request' in RESULT")
+      if type(details) != dict:
+         check_or_raise_extra(details, "'details' in RESULT")
 
-      args = None
-      if len(wmsg) > 3:
-         args = wmsg[3]
-         if type(args) != list:
-            raise ProtocolError("invalid type {} for 'args' in RESULT".format(type(args)))
+      if n > 3 and type(args) != list:
+         raise ProtocolError("invalid type {} for 'args' in RESULT".format(type(args)))
 
-      kwargs = None
-      if len(wmsg) > 4:
-         kwargs = wmsg[4]
-         if type(kwargs) != dict:
-            raise ProtocolError("invalid type {} for 'kwargs' in RESULT".format(type(kwargs)))
+      if n > 4 and type(kwargs) != dict:
+         raise ProtocolError("invalid type {} for 'kwargs' in RESULT".format(type(kwargs)))
 
       progress = None
 
-      if details.has_key('progress'):
+      for key in details:
+         if key == u'progress':
+            progress = details[key]
+            if type(progress) != bool:
+               raise ProtocolError("invalid type {} for 'progress' option in RESULT".format(type(progress)))
 
-         detail_progress = details['progress']
-         if type(detail_progress) != bool:
-            raise ProtocolError("invalid type {} for 'progress' option in RESULT".format(type(detail_progress)))
-
-         progress = detail_progress
+         elif type(key) not in _URI_TYPES:
+            check_or_raise_extra(details, "'details' in RESULT")
 
       obj = Result(request, args = args, kwargs = kwargs, progress = progress)
 
@@ -1563,6 +1786,8 @@ class Invocation(Message):
      * `[INVOCATION, Request|id, REGISTERED.Registration|id, Details|dict, CALL.Arguments|list, CALL.ArgumentsKw|dict]`
    """
 
+   __slots__ = ('request', 'registration', 'args', 'kwargs', 'timeout', 'receive_progress', 'caller', 'payload')
+
    MESSAGE_TYPE = 68
    """
    The WAMP message code for this type of message.
@@ -1576,7 +1801,8 @@ class Invocation(Message):
                 kwargs = None,
                 timeout = None,
                 receive_progress = None,
-                caller = None):
+                caller = None,
+                payload = None):
       """
       Message constructor.
 
@@ -1593,7 +1819,11 @@ class Invocation(Message):
       :param timeout: If present, let the callee automatically cancels
                       the invocation after this ms.
       :type timeout: int
+      :param payload: Application payload kept in serialized form (instead of `args` and `kwargs`),
+                      see :class:`autobahn.wamp.message.EncodedPayload`.
+      :type payload: obj
       """
+      assert(payload is None or (args is None and kwargs is None))
       Message.__init__(self)
       self.request = request
       self.registration = registration
@@ -1602,6 +1832,7 @@ class Invocation(Message):
       self.timeout = timeout
       self.receive_progress = receive_progress
       self.caller = caller
+      self.payload = payload
 
 
    @staticmethod
@@ -1618,54 +1849,56 @@ class Invocation(Message):
       ##
       assert(len(wmsg) > 0 and wmsg[0] == Invocation.MESSAGE_TYPE)
 
-      if len(wmsg) not in (4, 5, 6):
-         raise ProtocolError("invalid message length {} for INVOCATION".format(len(wmsg)))
-
-      request = check_or_raise_id(wmsg[1], "'request' in INVOCATION")
-      registration = check_or_raise_id(wmsg[2], "'registration' in INVOCATION")
-      details = check_or_raise_extra(wmsg[3], "'details' in INVOCATION")
-
+      n = len(wmsg)
       args = None
-      if len(wmsg) > 4:
-         args = wmsg[4]
-         if type(args) != list:
-            raise ProtocolError("invalid type {} for 'args' in INVOCATION".format(type(args)))
-
       kwargs = None
-      if len(wmsg) > 5:
-         kwargs = wmsg[5]
-         if type(kwargs) != dict:
-            raise ProtocolError("invalid type {} for 'kwargs' in INVOCATION".format(type(kwargs)))
-
-      timeout = None
-      if details.has_key('timeout'):
+      if n == 4:
+         _, request, registration, details = wmsg
+      elif n == 5:
+         _, request, registration, details, args = wmsg
+      elif n == 6:
+         _, request, registration, details, args, kwargs = wmsg
+      else:
+         raise ProtocolError("invalid message length {} for INVOCATION".format(len(wmsg)))
 
-         detail_timeout = details['timeout']
-         if type(detail_timeout) not in [int, long]:
-            raise ProtocolError("invalid type {} for 'timeout' detail in INVOCATION".format(type(detail_timeout)))
+      if type(request) not in _INT_TYPES or request < 0 or request > _ID_MAX:
+         check_or_raise_id(request, "'request' in INVOCATION")
+      if type(registration) not in _INT_TYPES or registration < 0 or registration > _ID_MAX:
+         check_or_raise_id(registration, "'registration' in INVOCATION")
+      if type(details) != dict:
+         check_or_raise_extra(details, "'details' in INVOCATION")
 
-         if detail_timeout < 0:
-            raise ProtocolError("invalid value {} for 'timeout' detail in INVOCATION".format(detail_timeout))
+      if n > 4 and type(args) != list:
+         raise ProtocolError("invalid type {} for 'args' in INVOCATION".format(type(args)))
 
-         timeout = detail_timeout
+      if n > 5 and type(kwargs) != dict:
+         raise ProtocolError("invalid type {} for 'kwargs' in INVOCATION".format(type(kwargs)))
 
+      timeout = None
       receive_progress = None
-      if details.has_key('receive_progress'):
+      caller = None
 
-         detail_receive_progress = details['receive_progress']
-         if type(detail_receive_progress) != bool:
-            raise ProtocolError("invalid type {} for 'receive_progress' detail in INVOCATION".format(type(detail_receive_progress)))
+      for key in details:
+         if key == u'timeout':
+            timeout = details[key]
+            if type(timeout) not in _INT_TYPES:
+               raise ProtocolError("invalid type {} for 'timeout' detail in INVOCATION".format(type(timeout)))
 
-         receive_progress = detail_receive_progress
+            if timeout < 0:
+               raise ProtocolError("invalid value {} for 'timeout' detail in INVOCATION".format(timeout))
 
-      caller = None
-      if details.has_key('caller'):
+         elif key == u'receive_progress':
+            receive_progress = details[key]
+            if type(receive_progress) != bool:
+               raise ProtocolError("invalid type {} for 'receive_progress' detail in INVOCATION".format(type(receive_progress)))
 
-         detail_caller = details['caller']
-         if type(detail_caller) not in [int, long]:
-            raise ProtocolError("invalid type {} for 'caller' detail in INVOCATION".format(type(detail_caller)))
+         elif key == u'caller':
+            caller = details[key]
+            if type(caller) not in _INT_TYPES:
+               raise ProtocolError("invalid type {} for 'caller' detail in INVOCATION".format(type(caller)))
 
-         caller = detail_caller
+         elif type(key) not in _URI_TYPES:
+            check_or_raise_extra(details, "'details' in INVOCATION")
 
       obj = Invocation(request,
                        registration,
@@ -1717,6 +1950,8 @@ class Interrupt(Message):
    Format: `[INTERRUPT, INVOCATION.Request|id, Options|dict]`
    """
 
+   __slots__ = ('request', 'mode')
+
    MESSAGE_TYPE = 69
    """
    The WAMP message code for this type of message.
@@ -1764,10 +1999,10 @@ class Interrupt(Message):
       ##
       mode = None
 
-      if options.has_key('mode'):
+      if 'mode' in options:
 
          option_mode = options['mode']
-         if type(option_mode) not in (str, unicode):
+         if type(option_mode) not in _URI_TYPES:
             raise ProtocolError("invalid type {} for 'mode' option in INTERRUPT".format(type(option_mode)))
 
          if option_mode not in [Interrupt.ABORT, Interrupt.KILL]:
@@ -1811,13 +2046,15 @@ class Yield(Message):
      * `[YIELD, INVOCATION.Request|id, Options|dict, Arguments|list, ArgumentsKw|dict]`
    """
 
+   __slots__ = ('request', 'args', 'kwargs', 'progress', 'payload')
+
    MESSAGE_TYPE = 70
    """
    The WAMP message code for this type of message.
    """
 
 
-   def __init__(self, request, args = None, kwargs = None, progress = None):
+   def __init__(self, request, args = None, kwargs = None, progress = None, payload = None):
       """
       Message constructor.
 
@@ -1831,12 +2068,17 @@ class Yield(Message):
       :type kwargs: dict
       :progress: If `True`, this result is a progressive invocation result, and subsequent
                  results (or a final error) will follow.
+      :param payload: Application payload kept in serialized form (instead of `args` and `kwargs`),
+                      see :class:`autobahn.wamp.message.EncodedPayload`.
+      :type payload: obj
       """
+      assert(payload is None or (args is None and kwargs is None))
       Message.__init__(self)
       self.request = request
       self.args = args
       self.kwargs = kwargs
       self.progress = progress
+      self.payload = payload
 
 
    @staticmethod
@@ -1853,33 +2095,39 @@ class Yield(Message):
       ##
       assert(len(wmsg) > 0 and wmsg[0] == Yield.MESSAGE_TYPE)
 
-      if len(wmsg) not in (3, 4, 5):
+      n = len(wmsg)
+      args = None
+      kwargs = None
+      if n == 3:
+         _, request, options = wmsg
+      elif n == 4:
+         _, request, options, args = wmsg
+      elif n == 5:
+         _, request, options, args, kwargs = wmsg
+      else:
          raise ProtocolError("invalid message length {} for YIELD".format(len(wmsg)))
 
-      request = check_or_raise_id(wmsg[1], "'request' in YIELD")
-      options = check_or_raise_extra(wmsg[2], "'options' in YIELD")
+      if type(request) not in _INT_TYPES or request < 0 or request > _ID_MAX:
+         check_or_raise_id(request, "'request' in YIELD")
+      if type(options) != dict:
+         check_or_raise_extra(options, "'options' in YIELD")
 
-      args = None
-      if len(wmsg) > 3:
-         args = wmsg[3]
-         if type(args) != list:
-            raise ProtocolError("invalid type {} for 'args' in YIELD".format(type(args)))
+      if n > 3 and type(args) != list:
+         raise ProtocolError("invalid type {} for 'args' in YIELD".format(type(args)))
 
-      kwargs = None
-      if len(wmsg) > 4:
-         kwargs = wmsg[4]
-         if type(kwargs) != dict:
-            raise ProtocolError("invalid type {} for 'kwargs' in YIELD".format(type(kwargs)))
+      if n > 4 and type(kwargs) != dict:
+         raise ProtocolError("invalid type {} for 'kwargs' in YIELD".format(type(kwargs)))
 
       progress = None
 
-      if options.has_key('progress'):
-
-         option_progress = options['progress']
-         if type(option_progress) != bool:
-            raise ProtocolError("invalid type {} for 'progress' option in YIELD".format(type(option_progress)))
+      for key in options:
+         if key == u'progress':
+            progress = options[key]
+            if type(progress) != bool:
+               raise ProtocolError("invalid type {} for 'progress' option in YIELD".format(type(progress)))
 
-         progress = option_progress
+         elif type(key) not in _URI_TYPES:
+            check_or_raise_extra(options, "'options' in YIELD")
 
       obj = Yield(request, args = args, kwargs = kwargs, progress = progress)
 
@@ -1919,6 +2167,8 @@ class Hello(Message):
    Format: `[HELLO, Realm|uri, Details|dict]`
    """
 
+   __slots__ = ('realm', 'roles')
+
    MESSAGE_TYPE = 1
    """
    The WAMP message code for this type of message.
@@ -1963,7 +2213,7 @@ class Hello(Message):
 
       roles = []
 
-      if not details.has_key('roles'):
+      if 'roles' not in details:
          raise ProtocolError("missing mandatory roles attribute in options in HELLO")
 
       details_roles = check_or_raise_extra(details['roles'], "'roles' in 'details' in HELLO")
@@ -1975,7 +2225,7 @@ class Hello(Message):
          if role not in autobahn.wamp.role.ROLE_NAME_TO_CLASS:
             raise ProtocolError("invalid role '{}' in 'roles' in 'details' in HELLO".format(role))
 
-         if details_roles[role].has_key('features'):
+         if 'features' in details_roles[role]:
             details_role_features = check_or_raise_extra(details_roles[role]['features'], "'features' in role '{}' in 'roles' in 'details' in HELLO".format(role))
 
             ## FIXME: skip unknown attributes
@@ -2000,7 +2250,7 @@ class Hello(Message):
          details['roles'][role.ROLE] = {}
          for feature in role.__dict__:
             if not feature.startswith('_') and feature != 'ROLE' and getattr(role, feature) is not None:
-               if not details['roles'][role.ROLE].has_key('features'):
+               if 'features' not in details['roles'][role.ROLE]:
                   details['roles'][role.ROLE] = {'features': {}}
                details['roles'][role.ROLE]['features'][feature] = getattr(role, feature)
 
@@ -2023,6 +2273,8 @@ class Welcome(Message):
    Format: `[WELCOME, Session|id, Details|dict]`
    """
 
+   __slots__ = ('session', 'roles')
+
    MESSAGE_TYPE = 2
    """
    The WAMP message code for this type of message.
@@ -2065,7 +2317,7 @@ class Welcome(Message):
 
       roles = []
 
-      if not details.has_key('roles'):
+      if 'roles' not in details:
          raise ProtocolError("missing mandatory roles attribute in options in WELCOME")
 
       details_roles = check_or_raise_extra(details['roles'], "'roles' in 'details' in WELCOME")
@@ -2077,7 +2329,7 @@ class Welcome(Message):
          if role not in autobahn.wamp.role.ROLE_NAME_TO_CLASS:
             raise ProtocolError("invalid role '{}' in 'roles' in 'details' in WELCOME".format(role))
 
-         if details_roles[role].has_key('features'):
+         if 'features' in details_roles[role]:
             details_role_features = check_or_raise_extra(details_roles[role]['features'], "'features' in role '{}' in 'roles' in 'details' in WELCOME".format(role))
 
             ## FIXME: skip unknown attributes
@@ -2102,7 +2354,7 @@ class Welcome(Message):
          details['roles'][role.ROLE] = {}
          for feature in role.__dict__:
             if not feature.startswith('_') and feature != 'ROLE' and getattr(role, feature) is not None:
-               if not details['roles'][role.ROLE].has_key('features'):
+               if 'features' not in details['roles'][role.ROLE]:
                   details['roles'][role.ROLE] = {'features': {}}
                details['roles'][role.ROLE]['features'][feature] = getattr(role, feature)
 
@@ -2125,6 +2377,8 @@ class Challenge(Message):
    Format: `[CHALLENGE, Challenge|string, Extra|dict]`
    """
 
+   __slots__ = ('challenge',)
+
    MESSAGE_TYPE = 3
    """
    The WAMP message code for this type of message.
@@ -2194,6 +2448,8 @@ class Authenticate(Message):
    Format: `[AUTHENTICATE, Signature|string, Extra|dict]`
    """
 
+   __slots__ = ('signature',)
+
    MESSAGE_TYPE = 4
    """
    The WAMP message code for this type of message.
@@ -2263,6 +2519,8 @@ class Goodbye(Message):
    Format: `[GOODBYE, Reason|uri, Details|dict]`
    """
 
+   __slots__ = ('reason', 'message')
+
    MESSAGE_TYPE = 5
    """
    The WAMP message code for this type of message.
@@ -2310,10 +2568,10 @@ class Goodbye(Message):
 
       message = None
 
-      if details.has_key('message'):
+      if 'message' in details:
 
          details_message = details['message']
-         if type(details_message) not in [str, unicode]:
+         if type(details_message) not in _URI_TYPES:
             raise ProtocolError("invalid type {} for 'message' detail in GOODBYE".format(type(details_message)))
 
          message = details_message
@@ -2353,6 +2611,8 @@ class Heartbeat(Message):
      * `[HEARTBEAT, Incoming|integer, Outgoing|integer, Discard|string]`
    """
 
+   __slots__ = ('incoming', 'outgoing', 'discard')
+
    MESSAGE_TYPE = 6
    """
    The WAMP message code for this type of message.
@@ -2395,7 +2655,7 @@ class Heartbeat(Message):
 
       incoming = wmsg[1]
 
-      if type(incoming) not in [int, long]:
+      if type(incoming) not in _INT_TYPES:
          raise ProtocolError("invalid type {} for 'incoming' in HEARTBEAT".format(type(incoming)))
 
       if incoming < 0: # must be non-negative
@@ -2403,7 +2663,7 @@ class Heartbeat(Message):
 
       outgoing = wmsg[2]
 
-      if type(outgoing) not in [int, long]:
+      if type(outgoing) not in _INT_TYPES:
          raise ProtocolError("invalid type {} for 'outgoing' in HEARTBEAT".format(type(outgoing)))
 
       if outgoing <= 0: # must be positive
@@ -2412,7 +2672,7 @@ class Heartbeat(Message):
       discard = None
       if len(wmsg) > 3:
          discard = wmsg[3]
-         if type(discard) not in (str, unicode):
+         if type(discard) not in _URI_TYPES:
             raise ProtocolError("invalid type {} for 'discard' in HEARTBEAT".format(type(discard)))
 
       obj = Heartbeat(incoming, outgoing, discard = discard)
@@ -18,9 +18,10 @@
 
 from __future__ import absolute_import
 
-from zope.interface import implementer
+import sys
+import copy
 
-from twisted.internet.defer import Deferred, maybeDeferred
+from zope.interface import implementer
 
 from autobahn.wamp.interfaces import ISession, \
                                      IPublication, \
@@ -43,14 +44,23 @@ from autobahn.wamp.exception import ProtocolError, SessionNotReady
 from autobahn.wamp.types import SessionDetails
 
 
+PY3 = sys.version_info >= (3,)
+
+if PY3:
+   unicode = str
+
+
 
 class Endpoint:
    """
    """
 
-   def __init__(self, fn, details_arg = None):
+   def __init__(self, fn, details_arg = None, procedure = None, options = None):
       self.fn = fn
       self.details_arg = details_arg
+      self.procedure = procedure
+      self.options = options
+      self.registration = None
 
 
 
@@ -58,9 +68,12 @@ class Handler:
    """
    """
 
-   def __init__(self, fn, details_arg = None):
+   def __init__(self, fn, details_arg = None, topic = None, options = None):
       self.fn = fn
       self.details_arg = details_arg
+      self.topic = topic
+      self.options = options
+      self.subscription = None
 
 
 
@@ -121,6 +134,14 @@ class BaseSession:
    This class implements:
 
      * :class:`autobahn.wamp.interfaces.ISession`
+
+   Sessions are independent of the networking framework. This class (and
+   the session classes derived from it in this module) is abstract: the
+   framework specific session classes in :mod:`autobahn.twisted.wamp` and
+   :mod:`autobahn.asyncio.wamp` provide the hooks used to create and fire
+   futures (`_create_future`, `_as_future`, `_resolve_future`, `_reject_future`,
+   `_add_future_callbacks`), to run user callbacks (`_run_callback`) and to
+   log (`_log`). Use those classes.
    """
 
    def __init__(self):
@@ -128,6 +149,62 @@ class BaseSession:
       self._uri_to_ecls = {}
 
 
+   def _create_future(self, canceller = None):
+      """
+      Create a new future, calling `canceller` with the future when it is cancelled.
+      Has to be overridden in subclasses.
+      """
+      raise NotImplementedError
+
+
+   def _as_future(self, fun, *args, **kwargs):
+      """
+      Call a function and return its result as a future (a failed one when it raised).
+      Has to be overridden in subclasses.
+      """
+      raise NotImplementedError
+
+
+   def _resolve_future(self, future, value):
+      """
+      Resolve a future with a value.
+      Has to be overridden in subclasses.
+      """
+      raise NotImplementedError
+
+
+   def _reject_future(self, future, exc):
+      """
+      Reject a future with an exception.
+      Has to be overridden in subclasses.
+      """
+      raise NotImplementedError
+
+
+   def _add_future_callbacks(self, future, callback, errback):
+      """
+      Add a callback and an errback (called with the exception) to a future.
+      Has to be overridden in subclasses.
+      """
+      raise NotImplementedError
+
+
+   def _run_callback(self, fun, *args, **kwargs):
+      """
+      Run a user callback (which may return a future or be a coroutine).
+      Has to be overridden in subclasses.
+      """
+      raise NotImplementedError
+
+
+   def _log(self, msg):
+      """
+      Log a message.
+      Has to be overridden in subclasses.
+      """
+      raise NotImplementedError
+
+
    def onConnect(self):
       """
       Implements :func:`autobahn.wamp.interfaces.ISession.define`
@@ -178,7 +255,7 @@ class BaseSession:
       if isinstance(exc, exception.ApplicationError):
          msg = message.Error(request_type, request, exc.error, args = list(exc.args), kwargs = exc.kwargs)
       else:
-         if self._ecls_to_uri_pat.has_key(exc.__class__):
+         if exc.__class__ in self._ecls_to_uri_pat:
             error = self._ecls_to_uri_pat[exc.__class__][0]._uri
          else:
             error = "wamp.error.runtime_error"
@@ -208,7 +285,7 @@ class BaseSession:
 
       exc = None
 
-      if self._uri_to_ecls.has_key(msg.error):
+      if msg.error in self._uri_to_ecls:
          ecls = self._uri_to_ecls[msg.error]
          try:
             ## the following might fail, eg. TypeError when
@@ -275,6 +352,11 @@ class ApplicationSession(BaseSession):
       self._goodbye_sent = False
       self._transport_is_closing = False
 
+      ## set when the transport was lost while joined: the session
+      ## may then be resumed on a new transport (see onOpen)
+      self._resumable = False
+      self._resuming = False
+
       ## outstanding requests
       self._publish_reqs = {}
       self._subscribe_reqs = {}
@@ -299,13 +381,22 @@ class ApplicationSession(BaseSession):
       """
       self._transport = transport
       self._session_id = None
-      self.onConnect()
+
+      if self._resumable:
+         ## the previous transport was lost while joined: re-join the
+         ## realm and replay subscriptions and registrations on WELCOME
+         self._resumable = False
+         self._resuming = True
+         self.join(self.realm)
+      else:
+         self._run_callback(self.onConnect)
 
 
    def join(self, realm):
       if self._session_id:
          raise Exception("already joined")
 
+      self.realm = realm
       self._goodbye_sent = False
 
       roles = [
@@ -336,7 +427,11 @@ class ApplicationSession(BaseSession):
          if isinstance(msg, message.Welcome):
             self._session_id = msg.session
 
-            self.onJoin(SessionDetails(self._session_id))
+            if self._resuming:
+               self._resuming = False
+               self._resume()
+            else:
+               self._run_callback(self.onJoin, SessionDetails(self._session_id))
          else:
             raise ProtocolError("Received {} message, and session is not yet established".format(msg.__class__))
 
@@ -351,7 +446,7 @@ class ApplicationSession(BaseSession):
             self._session_id = None
 
             ## fire callback and close the transport
-            self.onLeave(types.CloseDetails(msg.reason, msg.message))
+            self._run_callback(self.onLeave, types.CloseDetails(msg.reason, msg.message))
 
          ## consumer messages
          ##
@@ -364,19 +459,19 @@ class ApplicationSession(BaseSession):
                if handler.details_arg:
                   if not msg.kwargs:
                      msg.kwargs = {}
-                  msg.kwargs[handler.details_arg] = types.EventDetails(publication = msg.publication, publisher = msg.publisher)
+                  msg.kwargs[handler.details_arg] = types.EventDetails(publication = msg.publication, publisher = msg.publisher, retained = msg.retained)
 
                try:
                   if msg.kwargs:
                      if msg.args:
-                        handler.fn(*msg.args, **msg.kwargs)
+                        self._run_callback(handler.fn, *msg.args, **msg.kwargs)
                      else:
-                        handler.fn(**msg.kwargs)
+                        self._run_callback(handler.fn, **msg.kwargs)
                   else:
                      if msg.args:
-                        handler.fn(*msg.args)
+                        self._run_callback(handler.fn, *msg.args)
                      else:
-                        handler.fn()
+                        self._run_callback(handler.fn)
                except Exception as e:
                   print("Exception raised in event handler: {}".format(e))
 
@@ -388,20 +483,22 @@ class ApplicationSession(BaseSession):
             if msg.request in self._publish_reqs:
                d, opts = self._publish_reqs.pop(msg.request)
                p = Publication(msg.publication)
-               d.callback(p)
+               self._resolve_future(d, p)
             else:
                raise ProtocolError("PUBLISHED received for non-pending request ID {}".format(msg.request))
 
          elif isinstance(msg, message.Subscribed):
 
             if msg.request in self._subscribe_reqs:
-               d, fn, options = self._subscribe_reqs.pop(msg.request)
+               d, fn, topic, options = self._subscribe_reqs.pop(msg.request)
                if options:
-                  self._subscriptions[msg.subscription] = Handler(fn, options.details_arg)
+                  handler = Handler(fn, options.details_arg, topic, options)
                else:
-                  self._subscriptions[msg.subscription] = Handler(fn)
+                  handler = Handler(fn, topic = topic)
                s = Subscription(self, msg.subscription)
-               d.callback(s)
+               handler.subscription = s
+               self._subscriptions[msg.subscription] = handler
+               self._resolve_future(d, s)
             else:
                raise ProtocolError("SUBSCRIBED received for non-pending request ID {}".format(msg.request))
 
@@ -412,7 +509,7 @@ class ApplicationSession(BaseSession):
                if subscription.id in self._subscriptions:
                   del self._subscriptions[subscription.id]
                subscription.active = False
-               d.callback(None)
+               self._resolve_future(d, None)
             else:
                raise ProtocolError("UNSUBSCRIBED received for non-pending request ID {}".format(msg.request))
 
@@ -439,7 +536,7 @@ class ApplicationSession(BaseSession):
                               opts.onProgress()
                      except Exception as e:
                         ## silently drop exceptions raised in progressive results handlers
-                        print e
+                        print(e)
                   else:
                      ## silently ignore progressive results
                      pass
@@ -453,16 +550,16 @@ class ApplicationSession(BaseSession):
                         res = types.CallResult(*msg.args, **msg.kwargs)
                      else:
                         res = types.CallResult(**msg.kwargs)
-                     d.callback(res)
+                     self._resolve_future(d, res)
                   else:
                      if msg.args:
                         if len(msg.args) > 1:
                            res = types.CallResult(*msg.args)
-                           d.callback(res)
+                           self._resolve_future(d, res)
                         else:
-                           d.callback(msg.args[0])
+                           self._resolve_future(d, msg.args[0])
                      else:
-                        d.callback(None)
+                        self._resolve_future(d, None)
             else:
                raise ProtocolError("RESULT received for non-pending request ID {}".format(msg.request))
 
@@ -502,17 +599,17 @@ class ApplicationSession(BaseSession):
 
                   if msg.kwargs:
                      if msg.args:
-                        d = maybeDeferred(endpoint.fn, *msg.args, **msg.kwargs)
+                        d = self._as_future(endpoint.fn, *msg.args, **msg.kwargs)
                      else:
-                        d = maybeDeferred(endpoint.fn, **msg.kwargs)
+                        d = self._as_future(endpoint.fn, **msg.kwargs)
                   else:
                      if msg.args:
-                        d = maybeDeferred(endpoint.fn, *msg.args)
+                        d = self._as_future(endpoint.fn, *msg.args)
                      else:
-                        d = maybeDeferred(endpoint.fn)
+                        d = self._as_future(endpoint.fn)
 
                   def success(res):
-                     del self._invocations[msg.request]
+                     self._invocations.pop(msg.request, None)
 
                      if isinstance(res, types.CallResult):
                         reply = message.Yield(msg.request, args = res.results, kwargs = res.kwresults)
@@ -520,15 +617,15 @@ class ApplicationSession(BaseSession):
                         reply = message.Yield(msg.request, args = [res])
                      self._transport.send(reply)
 
-                  def error(err):
-                     del self._invocations[msg.request]
+                  def error(exc):
+                     self._invocations.pop(msg.request, None)
 
-                     reply = self._message_from_exception(message.Invocation.MESSAGE_TYPE, msg.request, err.value)
+                     reply = self._message_from_exception(message.Invocation.MESSAGE_TYPE, msg.request, exc)
                      self._transport.send(reply)
 
                   self._invocations[msg.request] = d
 
-                  d.addCallbacks(success, error)
+                  self._add_future_callbacks(d, success, error)
 
          elif isinstance(msg, message.Interrupt):
 
@@ -538,20 +635,22 @@ class ApplicationSession(BaseSession):
                try:
                   self._invocations[msg.request].cancel()
                except Exception as e:
-                  print "could not cancel"
+                  print("could not cancel")
                finally:
-                  del self._invocations[msg.request]
+                  self._invocations.pop(msg.request, None)
 
          elif isinstance(msg, message.Registered):
 
             if msg.request in self._register_reqs:
-               d, fn, options = self._register_reqs.pop(msg.request)
+               d, fn, procedure, options = self._register_reqs.pop(msg.request)
                if options:
-                  self._registrations[msg.registration] = Endpoint(fn, options.details_arg)
+                  endpoint = Endpoint(fn, options.details_arg, procedure, options)
                else:
-                  self._registrations[msg.registration] = Endpoint(fn)
+                  endpoint = Endpoint(fn, procedure = procedure)
                r = Registration(self, msg.registration)
-               d.callback(r)
+               endpoint.registration = r
+               self._registrations[msg.registration] = endpoint
+               self._resolve_future(d, r)
             else:
                raise ProtocolError("REGISTERED received for non-pending request ID {}".format(msg.request))
 
@@ -562,7 +661,7 @@ class ApplicationSession(BaseSession):
                if registration.id in self._registrations:
                   del self._registrations[registration.id]
                registration.active = False
-               d.callback(None)
+               self._resolve_future(d, None)
             else:
                raise ProtocolError("UNREGISTERED received for non-pending request ID {}".format(msg.request))
 
@@ -601,7 +700,7 @@ class ApplicationSession(BaseSession):
                d = self._call_reqs.pop(msg.request)[0]
 
             if d:
-               d.errback(self._exception_from_message(msg))
+               self._reject_future(d, self._exception_from_message(msg))
             else:
                raise ProtocolError("WampAppSession.onMessage(): ERROR received for non-pending request_type {} and request ID {}".format(msg.request_type, msg.request))
 
@@ -622,15 +721,52 @@ class ApplicationSession(BaseSession):
 
       if self._session_id:
 
+         ## transport lost while joined (no GOODBYE): remember to resume
+         self._resumable = not self._goodbye_sent
+
          ## fire callback and close the transport
          try:
-            self.onLeave(types.CloseDetails())
+            self._run_callback(self.onLeave, types.CloseDetails())
          except Exception as e:
-            print e
+            print(e)
 
          self._session_id = None
 
-      self.onDisconnect()
+      self._run_callback(self.onDisconnect)
+
+
+   def _resume(self):
+      """
+      Replay subscriptions and registrations after the session re-joined its
+      realm on a new transport. The :class:`autobahn.wamp.protocol.Subscription`
+      and :class:`autobahn.wamp.protocol.Registration` objects handed out
+      before stay valid and are rebound to the new IDs.
+      """
+      subscriptions, self._subscriptions = self._subscriptions, {}
+      registrations, self._registrations = self._registrations, {}
+
+      def rebind_subscription(old):
+         def rebind(subscription):
+            old.id = subscription.id
+            self._subscriptions[subscription.id].subscription = old
+         return rebind
+
+      def rebind_registration(old):
+         def rebind(registration):
+            old.id = registration.id
+            self._registrations[registration.id].registration = old
+         return rebind
+
+      def failed(exc):
+         self.onUserError(exc, "Could not resume subscription or registration")
+
+      for handler in subscriptions.values():
+         d = self.subscribe(handler.fn, handler.topic, handler.options)
+         self._add_future_callbacks(d, rebind_subscription(handler.subscription), failed)
+
+      for endpoint in registrations.values():
+         d = self.register(endpoint.fn, endpoint.procedure, endpoint.options)
+         self._add_future_callbacks(d, rebind_registration(endpoint.registration), failed)
 
 
    def onJoin(self, details):
@@ -645,6 +781,20 @@ class ApplicationSession(BaseSession):
       """
 
 
+   def onUserError(self, e, msg):
+      """
+      Called for errors that can't be reported to the application otherwise,
+      e.g. a subscription or registration that could not be replayed when
+      resuming the session. The default implementation logs the error.
+
+      :param e: The error.
+      :type e: Instance of :class:`Exception` or subclass thereof.
+      :param msg: Description of what failed.
+      :type msg: str
+      """
+      self._log("{}: {}".format(msg, e))
+
+
    def leave(self, reason = None, log_message = None):
       """
       Implements :func:`autobahn.wamp.interfaces.ISession.leave`
@@ -681,7 +831,7 @@ class ApplicationSession(BaseSession):
          msg = message.Publish(request, topic, args = args, kwargs = kwargs)
 
       if opts and opts.options['acknowledge'] == True:
-         d = Deferred()
+         d = self._create_future()
          self._publish_reqs[request] = d, opts
          self._transport.send(msg)
          return d
@@ -703,8 +853,8 @@ class ApplicationSession(BaseSession):
 
       request = util.id()
 
-      d = Deferred()
-      self._subscribe_reqs[request] = (d, handler, options)
+      d = self._create_future()
+      self._subscribe_reqs[request] = (d, handler, topic, options)
 
       if options is not None:
          msg = message.Subscribe(request, topic, **options.options)
@@ -728,7 +878,7 @@ class ApplicationSession(BaseSession):
 
       request = util.id()
 
-      d = Deferred()
+      d = self._create_future()
       self._unsubscribe_reqs[request] = (d, subscription)
 
       msg = message.Unsubscribe(request, subscription.id)
@@ -759,7 +909,7 @@ class ApplicationSession(BaseSession):
          cancel_msg = message.Cancel(request)
          self._transport.send(cancel_msg)
 
-      d = Deferred(canceller)
+      d = self._create_future(canceller)
       self._call_reqs[request] = d, opts
 
       self._transport.send(msg)
@@ -779,8 +929,8 @@ class ApplicationSession(BaseSession):
 
       request = util.id()
 
-      d = Deferred()
-      self._register_reqs[request] = (d, endpoint, options)
+      d = self._create_future()
+      self._register_reqs[request] = (d, endpoint, procedure, options)
 
       if options is not None:
          msg = message.Register(request, procedure, **options.options)
@@ -804,7 +954,7 @@ class ApplicationSession(BaseSession):
 
       request = util.id()
 
-      d = Deferred()
+      d = self._create_future()
       self._unregister_reqs[request] = (d, registration)
 
       msg = message.Unregister(request, registration.id)
@@ -865,7 +1015,7 @@ class RouterApplicationSession:
       ##
       self._session._transport = self
 
-      self._session.onConnect()
+      self._session._run_callback(self._session.onConnect)
 
 
    def send(self, msg):
@@ -884,7 +1034,7 @@ class RouterApplicationSession:
 
          ## fake app session open
          ##
-         self._session.onJoin(SessionDetails(self._session._session_id))
+         self._session._run_callback(self._session.onJoin, SessionDetails(self._session._session_id))
 
 
       ## app-to-router
@@ -915,6 +1065,21 @@ class RouterApplicationSession:
            isinstance(msg, message.Unregistered) or \
           (isinstance(msg, message.Error) and msg.request_type == message.Call.MESSAGE_TYPE):
 
+         ## the application payload of messages routed from a session using a
+         ## serializer in passthrough mode is still serialized: unserialize it
+         ## for the app session (on a copy, since the router shares messages
+         ## between receivers)
+         ##
+         payload = getattr(msg, 'payload', None)
+         if payload is not None:
+            msg = copy.copy(msg)
+            msg.uncache()
+            msg.payload = None
+            elements = payload.unserialize()
+            msg.args = elements[0]
+            if len(elements) > 1:
+               msg.kwargs = elements[1]
+
          ## deliver message to app session
          ##
          self._session.onMessage(msg)
@@ -978,14 +1143,14 @@ class RouterSession(BaseSession):
 
             self._router.attach(self)
 
-            roles.append(role.RoleBrokerFeatures())
-            roles.append(role.RoleDealerFeatures())
+            roles.append(role.RoleBrokerFeatures(event_retention = True))
+            roles.append(role.RoleDealerFeatures(call_result_caching = True))
 
             msg = message.Welcome(self._session_id, roles)
             self._transport.send(msg)
 
 
-            self.onJoin(SessionDetails(self._session_id))
+            self._run_callback(self.onJoin, SessionDetails(self._session_id))
          else:
             raise ProtocolError("Received {} message, and session is not yet established".format(msg.__class__))
 
@@ -1001,7 +1166,7 @@ class RouterSession(BaseSession):
                self._transport.send(reply)
 
             ## fire callback and close the transport
-            self.onLeave(types.CloseDetails(msg.reason, msg.message))
+            self._run_callback(self.onLeave, types.CloseDetails(msg.reason, msg.message))
 
             self._router.detach(self)
 
@@ -1028,9 +1193,9 @@ class RouterSession(BaseSession):
 
          ## fire callback and close the transport
          try:
-            self.onLeave(types.CloseDetails())
+            self._run_callback(self.onLeave, types.CloseDetails())
          except Exception as e:
-            print e
+            print(e)
 
          self._router.detach(self)
 
@@ -0,0 +1,450 @@
+###############################################################################
+##
+##  Copyright (C) 2014 Tavendo GmbH
+##
+##  Licensed under the Apache License, Version 2.0 (the "License");
+##  you may not use this file except in compliance with the License.
+##  You may obtain a copy of the License at
+##
+##      http://www.apache.org/licenses/LICENSE-2.0
+##
+##  Unless required by applicable law or agreed to in writing, software
+##  distributed under the License is distributed on an "AS IS" BASIS,
+##  WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+##  See the License for the specific language governing permissions and
+##  limitations under the License.
+##
+###############################################################################
+
+from __future__ import absolute_import
+
+
+__all__= ['WampRawSocketProtocol',
+          'WampRawSocketServerProtocol',
+          'WampRawSocketClientProtocol',
+          'WampRawSocketFactory',
+          'WampRawSocketServerFactory',
+          'WampRawSocketClientFactory']
+
+import struct
+
+from zope.interface import implementer
+
+from autobahn.wamp.interfaces import ITransport
+from autobahn.wamp.exception import ProtocolError, SerializationError, TransportLost
+
+
+## WAMP-over-RawSocket: after a 4 octet handshake, WAMP messages are sent
+## with a 4 octet header (1 octet message type, 3 octets payload length).
+##
+## Handshake (client to server):
+##
+##    0x7F, max. length exponent (high nibble) | serializer (low nibble), 0x00, 0x00
+##
+## where the peer may send messages up to 2**(9 + exponent) octets. The
+## server replies the same way (with its own max. length), or with an error
+## code (high nibble) and serializer 0, and closes the connection.
+
+MAGIC = 0x7F
+
+SERIALIZERS = {
+   'json': 1,
+   'msgpack': 2
+}
+"""
+Mapping of WAMP serializer IDs to RawSocket serializer codes.
+"""
+
+ERROR_SERIALIZER_UNSUPPORTED = 1
+ERROR_LEN_EXP_UNACCEPTABLE = 2
+ERROR_RESERVED_BITS = 3
+ERROR_MAX_CONNECTION_COUNT = 4
+
+ERROR_REASONS = {
+   ERROR_SERIALIZER_UNSUPPORTED: "serializer unsupported",
+   ERROR_LEN_EXP_UNACCEPTABLE: "maximum message length unacceptable",
+   ERROR_RESERVED_BITS: "use of reserved bits (unsupported feature)",
+   ERROR_MAX_CONNECTION_COUNT: "maximum connection count reached"
+}
+
+MSG_TYPE_REGULAR = 0
+MSG_TYPE_PING = 1
+MSG_TYPE_PONG = 2
+
+
+
+@implementer(ITransport)
+class WampRawSocketProtocol:
+   """
+   Base class for WAMP-over-RawSocket transport mixins.
+
+   Framework adapters call :meth:`_connectionMade`, :meth:`_dataReceived` and
+   :meth:`_connectionLost`, and provide :meth:`_write` and :meth:`_closeConnection`.
+   """
+
+   def _connectionMade(self):
+      self._session = None
+      self._handshakeDone = False
+      self._closing = False
+      self._wasClean = False
+
+      ## data received, but not processed yet: a list of chunks, their total
+      ## length, and the length needed before processing can continue (the
+      ## handshake, a message header or a whole message)
+      self._chunks = []
+      self._buffered = 0
+      self._needed = 4
+
+
+   def _connectionLost(self, reason):
+      if self._session is not None:
+         ## connection lost - fire off the WAMP session close callback
+         try:
+            self._session.onClose(self._wasClean)
+         except Exception as e:
+            ## silently ignore exceptions raised here ..
+            pass
+         self._session = None
+
+
+   def _dataReceived(self, data):
+      self._chunks.append(data)
+      self._buffered += len(data)
+
+      ## only join the chunks received once there is something to process
+      if self._buffered < self._needed or self._closing:
+         return
+      if len(self._chunks) > 1:
+         data = b''.join(self._chunks)
+
+      pos = 0
+      if not self._handshakeDone:
+         pos = 4
+         if not self._processHandshake(bytearray(data[:4])):
+            return
+
+      needed = 4
+      while len(data) - pos >= 4 and not self._closing:
+         header = struct.unpack("!L", data[pos:pos + 4])[0]
+         msgType = header >> 24
+         length = header & 0xffffff
+         if msgType > MSG_TYPE_PONG:
+            self._fail("invalid message type {}".format(msgType))
+            return
+         if length > self._maxLength:
+            self._fail("message of {} octets exceeds the maximum length of {} octets".format(length, self._maxLength))
+            return
+         if len(data) - pos - 4 < length:
+            needed = 4 + length
+            break
+         payload = data[pos + 4:pos + 4 + length]
+         pos += 4 + length
+
+         if msgType == MSG_TYPE_REGULAR:
+            self._onMessage(payload)
+         elif msgType == MSG_TYPE_PING:
+            self._write(self._header(MSG_TYPE_PONG, len(payload)) + payload)
+
+      if pos == 0:
+         self._chunks = [data]
+      elif pos < len(data):
+         self._chunks = [data[pos:]]
+      else:
+         self._chunks = []
+      self._buffered = len(data) - pos
+      self._needed = needed
+
+
+   def _onMessage(self, payload):
+      try:
+         msg = self._serializer.unserialize(payload, self._serializer._serializer.BINARY)
+         self._session.onMessage(msg)
+
+      except ProtocolError as e:
+         self._fail("WAMP Protocol Error ({})".format(e))
+
+      except Exception as e:
+         self._fail("WAMP Internal Error ({})".format(e))
+
+
+   def _header(self, msgType, length):
+      return struct.pack("!L", (msgType << 24) | length)
+
+
+   def _handshake(self, lengthExponent, serializerCode):
+      return struct.pack("!BBBB", MAGIC, (lengthExponent << 4) | serializerCode, 0, 0)
+
+
+   def _onOpen(self):
+      """
+      Called when the handshake has completed.
+      """
+      self._handshakeDone = True
+
+      ## now let the user WAMP session factory create a new WAMP session ..
+      self._session = self.factory._createSession()
+
+      ## and fire off WAMP session open callback
+      try:
+         self._session.onOpen(self)
+      except Exception as e:
+         ## Exceptions raised in onOpen are fatal ..
+         self._fail("WAMP Internal Error ({})".format(e))
+
+
+   def _fail(self, reason, abort = True):
+      """
+      Drop the connection (and the WAMP session).
+
+      :param reason: The reason (for logging).
+      :type reason: str
+      :param abort: If `True`, abort the connection (discarding data not yet
+                    written), else close it after writing pending data.
+      :type abort: bool
+      """
+      if self.factory.debug:
+         self.factory._log("dropping RawSocket connection: {}".format(reason))
+      self._closing = True
+      self._closeConnection(abort = abort)
+
+
+   def send(self, msg):
+      """
+      Implements :func:`autobahn.wamp.interfaces.ITransport.send`
+      """
+      if self.isOpen():
+         try:
+            bytes, isBinary = self._serializer.serialize(msg)
+         except Exception as e:
+            ## all exceptions raised from above should be serialization errors ..
+            raise SerializationError("Unable to serialize WAMP application payload ({})".format(e))
+         else:
+            if len(bytes) > self._peerMaxLength:
+               raise SerializationError("serialized WAMP message of {} octets exceeds the maximum length of {} octets accepted by the peer".format(len(bytes), self._peerMaxLength))
+            self._write(self._header(MSG_TYPE_REGULAR, len(bytes)) + bytes)
+      else:
+         raise TransportLost()
+
+
+   def isOpen(self):
+      """
+      Implements :func:`autobahn.wamp.interfaces.ITransport.isOpen`
+      """
+      return self._session is not None
+
+
+   def close(self):
+      """
+      Implements :func:`autobahn.wamp.interfaces.ITransport.close`
+      """
+      if self.isOpen():
+         self._closing = True
+         self._wasClean = True
+         self._closeConnection()
+      else:
+         raise TransportLost()
+
+
+   def abort(self):
+      """
+      Implements :func:`autobahn.wamp.interfaces.ITransport.abort`
+      """
+      if self.isOpen():
+         self._closing = True
+         self._closeConnection(abort = True)
+      else:
+         raise TransportLost()
+
+
+
+class WampRawSocketServerProtocol(WampRawSocketProtocol):
+   """
+   Mixin for WAMP-over-RawSocket server transports.
+   """
+
+   def _processHandshake(self, handshake):
+      if handshake[0] != MAGIC:
+         self._fail("invalid magic octet {} in handshake".format(handshake[0]))
+         return False
+
+      lengthExponent = handshake[1] >> 4
+      serializerCode = handshake[1] & 0x0f
+
+      if handshake[2] != 0 or handshake[3] != 0:
+         return self._failHandshake(ERROR_RESERVED_BITS)
+
+      if serializerCode not in self.factory._serializers:
+         return self._failHandshake(ERROR_SERIALIZER_UNSUPPORTED)
+
+      if self.factory.maxConnections and self.factory.countConnections > self.factory.maxConnections:
+         return self._failHandshake(ERROR_MAX_CONNECTION_COUNT)
+
+      if lengthExponent < self.factory.minPeerMessageLengthExponent:
+         return self._failHandshake(ERROR_LEN_EXP_UNACCEPTABLE)
+
+      self._serializer = self.factory._serializers[serializerCode]
+      self._maxLength = 2 ** (9 + self.factory.maxMessageLengthExponent)
+      self._peerMaxLength = 2 ** (9 + lengthExponent)
+
+      self._write(self._handshake(self.factory.maxMessageLengthExponent, serializerCode))
+      self._onOpen()
+      return True
+
+
+   def _failHandshake(self, error):
+      ## close gracefully (not abort), so the error reply still gets written
+      self._write(self._handshake(error, 0))
+      self._fail("handshake failed: {}".format(ERROR_REASONS[error]), abort = False)
+      return False
+
+
+
+class WampRawSocketClientProtocol(WampRawSocketProtocol):
+   """
+   Mixin for WAMP-over-RawSocket client transports.
+   """
+
+   def _connectionMade(self):
+      WampRawSocketProtocol._connectionMade(self)
+      self._serializer = self.factory._serializer
+      self._maxLength = 2 ** (9 + self.factory.maxMessageLengthExponent)
+      self._write(self._handshake(self.factory.maxMessageLengthExponent, SERIALIZERS[self._serializer.SERIALIZER_ID]))
+
+
+   def _processHandshake(self, handshake):
+      if handshake[0] != MAGIC:
+         self._fail("invalid magic octet {} in handshake".format(handshake[0]))
+         return False
+
+      serializerCode = handshake[1] & 0x0f
+
+      if serializerCode == 0:
+         error = handshake[1] >> 4
+         self._fail("handshake failed: {}".format(ERROR_REASONS.get(error, "error {}".format(error))))
+         return False
+
+      if serializerCode != SERIALIZERS[self._serializer.SERIALIZER_ID]:
+         self._fail("server replied with serializer {} in handshake".format(serializerCode))
+         return False
+
+      self._peerMaxLength = 2 ** (9 + (handshake[1] >> 4))
+      self._onOpen()
+      return True
+
+
+
+class WampRawSocketFactory:
+   """
+   Base class for WAMP-over-RawSocket transport factory mixins.
+   """
+
+   def __init__(self, factory, maxMessageLengthExponent = 15, debug = False):
+      """
+      :param factory: A callable that produces instances that implement
+                      :class:`autobahn.wamp.interfaces.ITransportHandler`
+      :type factory: callable
+      :param maxMessageLengthExponent: Accept messages of up to 2**(9 + maxMessageLengthExponent)
+                                       octets (0-15, default: 15, that is 16MB).
+      :type maxMessageLengthExponent: int
+      :param debug: Enable debug logging.
+      :type debug: bool
+      """
+      assert(callable(factory))
+      assert(0 <= maxMessageLengthExponent <= 15)
+      self._factory = factory
+      self.maxMessageLengthExponent = maxMessageLengthExponent
+      self.debug = debug
+
+
+   def _createSession(self):
+      """
+      Create a WAMP session for a newly opened transport.
+      """
+      return self._factory()
+
+
+
+class WampRawSocketServerFactory(WampRawSocketFactory):
+   """
+   Mixin for WAMP-over-RawSocket server transport factories.
+   """
+
+   def __init__(self, factory, serializers = None, maxMessageLengthExponent = 15, maxConnections = 0, minPeerMessageLengthExponent = 0, debug = False):
+      """
+      :param factory: See :class:`autobahn.wamp.rawsocket.WampRawSocketFactory`.
+      :param serializers: A list of WAMP serializers to accept (or None for default
+                          serializers). Serializers must implement
+                          :class:`autobahn.wamp.interfaces.ISerializer`.
+      :type serializers: list
+      :param maxMessageLengthExponent: See :class:`autobahn.wamp.rawsocket.WampRawSocketFactory`.
+      :param maxConnections: Maximum number of concurrent connections (0 for unlimited).
+      :type maxConnections: int
+      :param minPeerMessageLengthExponent: Refuse clients accepting messages of less than
+                                           2**(9 + minPeerMessageLengthExponent) octets
+                                           (0-15, default: 0, that is accept any client).
+      :type minPeerMessageLengthExponent: int
+      :param debug: See :class:`autobahn.wamp.rawsocket.WampRawSocketFactory`.
+      """
+      WampRawSocketFactory.__init__(self, factory, maxMessageLengthExponent, debug)
+
+      if serializers is None:
+         serializers = []
+
+         ## try MsgPack WAMP serializer
+         try:
+            from autobahn.wamp.serializer import MsgPackSerializer
+            serializers.append(MsgPackSerializer())
+         except ImportError:
+            pass
+
+         ## try JSON WAMP serializer
+         try:
+            from autobahn.wamp.serializer import JsonSerializer
+            serializers.append(JsonSerializer())
+         except ImportError:
+            pass
+
+         if not serializers:
+            raise Exception("could not import any WAMP serializers")
+
+      self._serializers = {}
+      for ser in serializers:
+         if ser.BATCHED or ser.SERIALIZER_ID not in SERIALIZERS:
+            raise Exception("WAMP serializer '{}' not supported over RawSocket".format(ser.SERIALIZER_ID))
+         self._serializers[SERIALIZERS[ser.SERIALIZER_ID]] = ser
+
+      assert(0 <= minPeerMessageLengthExponent <= 15)
+      self.maxConnections = maxConnections
+      self.minPeerMessageLengthExponent = minPeerMessageLengthExponent
+      self.countConnections = 0
+
+
+
+class WampRawSocketClientFactory(WampRawSocketFactory):
+   """
+   Mixin for WAMP-over-RawSocket client transport factories.
+   """
+
+   def __init__(self, factory, serializer = None, maxMessageLengthExponent = 15, debug = False):
+      """
+      :param factory: See :class:`autobahn.wamp.rawsocket.WampRawSocketFactory`.
+      :param serializer: The WAMP serializer to use (or None for a default serializer).
+                         The serializer must implement :class:`autobahn.wamp.interfaces.ISerializer`.
+      :type serializer: obj
+      :param maxMessageLengthExponent: See :class:`autobahn.wamp.rawsocket.WampRawSocketFactory`.
+      :param debug: See :class:`autobahn.wamp.rawsocket.WampRawSocketFactory`.
+      """
+      WampRawSocketFactory.__init__(self, factory, maxMessageLengthExponent, debug)
+
+      if serializer is None:
+         try:
+            from autobahn.wamp.serializer import MsgPackSerializer
+            serializer = MsgPackSerializer()
+         except ImportError:
+            from autobahn.wamp.serializer import JsonSerializer
+            serializer = JsonSerializer()
+
+      if serializer.BATCHED or serializer.SERIALIZER_ID not in SERIALIZERS:
+         raise Exception("WAMP serializer '{}' not supported over RawSocket".format(serializer.SERIALIZER_ID))
+
+      self._serializer = serializer
@@ -28,7 +28,7 @@ __all__ = ['RoleFeatures',
            'ROLE_NAME_TO_CLASS']
 
 
-import json, types
+import json
 from autobahn import util
 from autobahn.wamp.exception import ProtocolError
 
@@ -44,7 +44,7 @@ class RoleFeatures(util.EqualityMixin):
       ## check feature attributes
       for k in self.__dict__:
          if not k.startswith('_') and k != 'ROLE':
-            if type(getattr(self, k)) not in [types.NoneType, bool]:
+            if type(getattr(self, k)) not in [type(None), bool]:
                raise ProtocolError("invalid type {} for feature '{}' for role '{}'".format(getattr(self, k), k, self.ROLE))
 
 
@@ -72,6 +72,7 @@ class RoleBrokerFeatures(RoleCommonPubSubFeatures):
                 subscriber_metaevents = None,
                 subscriber_list = None,
                 event_history = None,
+                event_retention = None,
                 **kwargs):
       self.subscriber_blackwhite_listing = subscriber_blackwhite_listing
       self.publisher_exclusion = publisher_exclusion
@@ -80,6 +81,7 @@ class RoleBrokerFeatures(RoleCommonPubSubFeatures):
       self.subscriber_metaevents = subscriber_metaevents
       self.subscriber_list = subscriber_list
       self.event_history = event_history
+      self.event_retention = event_retention
       RoleCommonPubSubFeatures.__init__(self, **kwargs)
       self._check_all_bool()
 
@@ -146,11 +148,13 @@ class RoleDealerFeatures(RoleCommonRpcFeatures):
                 caller_exclusion = None,
                 call_trustlevels = None,
                 pattern_based_registration = None,
+                call_result_caching = None,
                 **kwargs):
       self.callee_blackwhite_listing = callee_blackwhite_listing
       self.caller_exclusion = caller_exclusion
       self.call_trustlevels = call_trustlevels
       self.pattern_based_registration = pattern_based_registration  
+      self.call_result_caching = call_result_caching
       RoleCommonRpcFeatures.__init__(self, **kwargs)
       self._check_all_bool()
 
@@ -34,15 +34,44 @@ class Router:
    Basic WAMP router.
 
    This class implements :class:`autobahn.wamp.interfaces.IRouter`.
+
+   The statistics of the router (see :func:`stats`) can be retrieved by calling
+   the meta procedure `wamp.metaproc.stats`, and are published periodically to
+   the meta topic `wamp.metaevent.stats` when the router factory has a
+   `statsInterval` set.
    """
 
    def __init__(self, factory, realm):
       self.factory = factory
       self.realm = realm
-      self._broker = Broker(realm)
+      self._broker = Broker(realm, factory.retain)
       self._dealer = Dealer(realm)
       self._attached = 0
 
+      self._dealer.registerMetaProcedure('wamp.metaproc.stats', lambda session: self.stats())
+
+      self._stats_call = None
+      if factory.statsInterval:
+         self._stats_call = factory._callLater(factory.statsInterval, self._publishStats)
+
+
+   def stats(self):
+      """
+      Get the statistics of this router.
+
+      :returns: dict -- The statistics: the realm, the number of sessions attached,
+                and the statistics of the broker and the dealer.
+      """
+      return {'realm': self.realm,
+              'sessions': self._attached,
+              'broker': self._broker.stats(),
+              'dealer': self._dealer.stats()}
+
+
+   def _publishStats(self):
+      self._broker.publish('wamp.metaevent.stats', args = [self.stats()])
+      self._stats_call = self.factory._callLater(self.factory.statsInterval, self._publishStats)
+
 
    def attach(self, session):
       """
@@ -61,6 +90,9 @@ class Router:
       self._dealer.detach(session)
       self._attached -= 1
       if not self._attached:
+         if self._stats_call:
+            self._stats_call.cancel()
+            self._stats_call = None
          self.factory.onLastDetach(self)
 
 
@@ -110,10 +142,34 @@ class RouterFactory:
    Basic WAMP Router factory.
 
    This class implements :class:`autobahn.wamp.interfaces.IRouterFactory`.
+
+   Publishing router statistics periodically requires a networking framework
+   specific router factory (which implements `_callLater`), e.g.
+   :class:`autobahn.twisted.wamp.RouterFactory`.
    """
 
-   def __init__(self):
+   def __init__(self, retain = None, statsInterval = None):
+      """
+      Constructor.
+
+      :param retain: Topics to retain events for (in all realms): a dict mapping
+                     topic URIs to the number of events to retain, see
+                     :func:`autobahn.wamp.broker.Broker.retain`.
+      :type retain: dict
+      :param statsInterval: If set, publish the statistics of each router to
+                            `wamp.metaevent.stats` in this interval (in seconds).
+                            Only supported by networking framework specific
+                            router factories.
+      :type statsInterval: float
+      """
+      assert(statsInterval is None or (type(statsInterval) in [int, float] and statsInterval > 0))
+
+      if statsInterval is not None and not hasattr(self, '_callLater'):
+         raise Exception("publishing statistics periodically (statsInterval) requires autobahn.twisted.wamp.RouterFactory or autobahn.asyncio.wamp.RouterFactory")
+
       self._routers = {}
+      self.retain = retain
+      self.statsInterval = statsInterval
 
 
    def get(self, realm):
@@ -19,15 +19,22 @@
 from __future__ import absolute_import
 
 __all__ = ['Serializer',
+           'JSON_BACKENDS',
+           'JSON_BACKEND_PREFERENCE',
+           'defaultJsonBackend',
            'JsonObjectSerializer',
            'JsonSerializer']
 
+import sys
+
 from zope.interface import implementer
 
 from autobahn.wamp.interfaces import IObjectSerializer, ISerializer
 from autobahn.wamp.exception import ProtocolError
 from autobahn.wamp import message
 
+PY3 = sys.version_info >= (3,)
+
 
 
 class Serializer:
@@ -66,22 +73,70 @@ class Serializer:
    Mapping of WAMP message type codes to WAMP message classes.
    """
 
+   PAYLOAD_SPLITS = {
+      message.Publish.MESSAGE_TYPE:         4,
+      message.Call.MESSAGE_TYPE:            4,
+      message.Yield.MESSAGE_TYPE:           3
+   }
+   """
+   Mapping of WAMP message type codes of messages whose application payload is
+   kept in serialized form in passthrough mode to the number of message elements
+   preceding the payload.
+   """
 
-   def __init__(self, serializer):
+   BATCHED = False
+   """
+   Flag indicating if this serializer packs several WAMP messages into one
+   transport message.
+   """
+
+
+   def __init__(self, serializer, passthrough = False, batched = False):
       """
       Constructor.
 
       :param serializer: The object serializer to use for WAMP wire-level serialization.
       :type serializer: An object that implements :class:`autobahn.interfaces.IObjectSerializer`.
+      :param passthrough: Iff `True`, keep the application payload (`args` and `kwargs`) of
+                          received `PUBLISH`, `CALL` and `YIELD` messages in serialized form
+                          (see :class:`autobahn.wamp.message.EncodedPayload`). This is for
+                          routers, which do not need to look into application payloads.
+      :type passthrough: bool
+      :param batched: Iff `True`, serialize to the batched variant of the serialization
+                      format, where the serializations of several WAMP messages are
+                      concatenated to form one transport message.
+      :type batched: bool
       """
       self._serializer = serializer
+      self._passthrough = passthrough
+      if batched:
+         self.BATCHED = True
+         self.SERIALIZER_ID = self.SERIALIZER_ID + ".batched"
 
 
    def serialize(self, msg):
       """
       Implements :func:`autobahn.wamp.interfaces.ISerializer.serialize`
       """
-      return msg.serialize(self._serializer), self._serializer.BINARY
+      if self.BATCHED:
+         return self._frame(msg.serialize(self._serializer)), self._serializer.BINARY
+      else:
+         return msg.serialize(self._serializer), self._serializer.BINARY
+
+
+   def unserializeBatch(self, payload, isBinary):
+      """
+      Implements :func:`autobahn.wamp.interfaces.ISerializer.unserializeBatch`
+      """
+      if not self.BATCHED:
+         return [self.unserialize(payload, isBinary)]
+
+      try:
+         parts = self._unframe(payload)
+      except Exception as e:
+         raise ProtocolError("invalid batch of WAMP messages ({})".format(e))
+
+      return [self.unserialize(part, isBinary) for part in parts]
 
 
    def unserialize(self, payload, isBinary):
@@ -92,7 +147,10 @@ class Serializer:
          raise ProtocolError("invalid serialization of WAMP message (binary {}, but expected {})".format(isBinary, self._serializer.BINARY))
 
       try:
-         raw_msg = self._serializer.unserialize(payload)
+         if self._passthrough:
+            raw_msg, tail = self._serializer.unserializeSplit(payload, self.PAYLOAD_SPLITS)
+         else:
+            raw_msg, tail = self._serializer.unserialize(payload), None
       except Exception as e:
          raise ProtocolError("invalid serialization of WAMP message ({})".format(e))
 
@@ -115,31 +173,188 @@ class Serializer:
       ## this might again raise `ProtocolError` ..
       msg = Klass.parse(raw_msg)
 
+      if tail is not None:
+         data, types = tail
+         if types not in ([list], [list, dict]):
+            raise ProtocolError("invalid application payload types {} in WAMP message type {}".format(types, message_type))
+         msg.payload = message.EncodedPayload(self._serializer, data, len(types))
+
       return msg
 
 
 ##
-## JSON serialization is always supported
+## JSON serialization is always supported (using the `json` module from
+## the standard library). Faster JSON libraries are available as backends
+## when installed, but only used when selected.
 ##
+import re
 import json
 
+_JSON_WHITESPACE = re.compile(r'[ \t\n\r]*')
+
+JSON_BACKENDS = {}
+"""
+Mapping of JSON backend names to `(dumps, loads)` pairs of functions. `dumps`
+must return the compact JSON serialization of an object as a byte string, and
+`loads` must unserialize a JSON byte string. Applications may add backends.
+"""
+
+JSON_BACKEND_PREFERENCE = ['json']
+"""
+Names of JSON backends in order of preference. The first one available is
+used by default. This is the standard library only, as other backends may
+differ in corner cases (e.g. float formatting). Applications may opt in to
+faster backends, e.g. `JSON_BACKEND_PREFERENCE.insert(0, 'orjson')`.
+"""
+
+if PY3:
+   ## on Python 3, the `json` module (and others) work with Unicode strings
+   def _bytesBackend(dumps, loads):
+      return (lambda obj: dumps(obj).encode('utf8'), lambda payload: loads(payload.decode('utf8')))
+else:
+   def _bytesBackend(dumps, loads):
+      return (dumps, loads)
+
+JSON_BACKENDS['json'] = _bytesBackend(lambda obj: json.dumps(obj, separators = (',',':')), json.loads)
+
+try:
+   import orjson
+except ImportError:
+   pass
+else:
+   JSON_BACKENDS['orjson'] = (orjson.dumps, orjson.loads)
+
+try:
+   import ujson
+except ImportError:
+   pass
+else:
+   ## older versions of ujson round floats (to 9 digits by default)
+   if ujson.loads(ujson.dumps(0.1 + 0.2)) == 0.1 + 0.2:
+      JSON_BACKENDS['ujson'] = _bytesBackend(ujson.dumps, ujson.loads)
+
+try:
+   import simplejson
+except ImportError:
+   pass
+else:
+   ## without its C speedups, simplejson is slower than the standard library
+   if getattr(simplejson.encoder, 'c_make_encoder', None) is not None:
+      JSON_BACKENDS['simplejson'] = _bytesBackend(lambda obj: simplejson.dumps(obj, separators = (',',':')), simplejson.loads)
+
+
+def defaultJsonBackend():
+   """
+   Get the name of the preferred JSON backend available.
+
+   :returns: str -- The backend name.
+   """
+   for name in JSON_BACKEND_PREFERENCE:
+      if name in JSON_BACKENDS:
+         return name
+   return 'json'
+
+
+
 @implementer(IObjectSerializer)
 class JsonObjectSerializer:
 
    BINARY = False
 
+   def __init__(self, backend = None):
+      """
+      Constructor.
+
+      :param backend: Name of the JSON backend to use (a key in
+                      :data:`autobahn.wamp.serializer.JSON_BACKENDS`), or `None`
+                      for the preferred backend available.
+      :type backend: str
+      """
+      if backend is None:
+         backend = defaultJsonBackend()
+      if backend not in JSON_BACKENDS:
+         raise Exception("JSON backend '{}' not available".format(backend))
+      self.backend = backend
+      self._dumps, self._loads = JSON_BACKENDS[backend]
+      self._decoder = json.JSONDecoder()
+
+
    def serialize(self, obj):
       """
       Implements :func:`autobahn.wamp.interfaces.IObjectSerializer.serialize`
       """
-      return json.dumps(obj, separators = (',',':'))
+      return self._dumps(obj)
 
 
    def unserialize(self, payload):
       """
       Implements :func:`autobahn.wamp.interfaces.IObjectSerializer.unserialize`
       """
-      return json.loads(payload)
+      return self._loads(payload)
+
+
+   def unserializeSplit(self, payload, splits):
+      """
+      Implements :func:`autobahn.wamp.interfaces.IObjectSerializer.unserializeSplit`
+
+      The message is parsed element by element (using the standard library JSON
+      decoder, whatever the backend) in a single pass. This checks the trailing
+      elements are valid JSON (so only valid JSON is ever forwarded) and locates
+      them in the JSON text received, which is then forwarded without being
+      serialized again.
+      """
+      if PY3:
+         text = payload.decode('utf8')
+      else:
+         text = payload
+
+      pos = _JSON_WHITESPACE.match(text, 0).end()
+      if text[pos:pos + 1] != '[':
+         return self._loads(payload), None
+      pos = _JSON_WHITESPACE.match(text, pos + 1).end()
+      if text[pos:pos + 1] == ']':
+         return self._loads(payload), None
+
+      message_type, pos = self._decoder.raw_decode(text, pos)
+      n = splits.get(message_type) if type(message_type) == int else None
+      if n is None:
+         return self._loads(payload), None
+
+      obj = [message_type]
+      start = None
+      while True:
+         pos = _JSON_WHITESPACE.match(text, pos).end()
+         c = text[pos:pos + 1]
+         if c == ']':
+            break
+         if c != ',':
+            raise Exception("expected ',' or ']' at position {} of JSON array".format(pos))
+         pos = _JSON_WHITESPACE.match(text, pos + 1).end()
+         if len(obj) == n:
+            start = pos
+         element, pos = self._decoder.raw_decode(text, pos)
+         obj.append(element)
+
+      if _JSON_WHITESPACE.match(text, pos + 1).end() != len(text):
+         raise Exception("extra data after JSON array")
+
+      if len(obj) <= n:
+         return obj, None
+
+      data = text[start:pos]
+      if PY3:
+         data = data.encode('utf8')
+      return obj[:n], (data, [type(o) for o in obj[n:]])
+
+
+   def serializeSplice(self, obj, data, count):
+      """
+      Implements :func:`autobahn.wamp.interfaces.IObjectSerializer.serializeSplice`
+      """
+      if obj:
+         return self.serialize(obj)[:-1] + b',' + data + b']'
+      else:
+         return b'[' + data + b']'
 
 
 
@@ -148,8 +363,32 @@ class JsonSerializer(Serializer):
 
    SERIALIZER_ID = "json"
 
-   def __init__(self):
-      Serializer.__init__(self, JsonObjectSerializer())
+   def __init__(self, passthrough = False, backend = None, batched = False):
+      """
+      Constructor.
+
+      :param passthrough: See :class:`autobahn.wamp.serializer.Serializer`.
+      :type passthrough: bool
+      :param backend: See :class:`autobahn.wamp.serializer.JsonObjectSerializer`.
+      :type backend: str
+      :param batched: See :class:`autobahn.wamp.serializer.Serializer`.
+      :type batched: bool
+      """
+      Serializer.__init__(self, JsonObjectSerializer(backend), passthrough, batched)
+
+
+   ## in batched mode, each message is terminated by an ASCII record separator
+   ## (which cannot occur in JSON text)
+
+   def _frame(self, data):
+      return data + b'\x1e'
+
+
+   def _unframe(self, payload):
+      parts = payload.split(b'\x1e')
+      if parts[-1]:
+         raise Exception("unterminated message in batch")
+      return parts[:-1]
 
 
 
@@ -161,6 +400,18 @@ try:
 except ImportError:
    pass
 else:
+   import struct
+
+   def _msgpackType(octet):
+      ## Python type of a serialized MsgPack object from its first octet
+      if 0x90 <= octet <= 0x9f or octet in (0xdc, 0xdd):
+         return list
+      elif 0x80 <= octet <= 0x8f or octet in (0xde, 0xdf):
+         return dict
+      else:
+         return object
+
+
    @implementer(IObjectSerializer)
    class MsgPackObjectSerializer:
 
@@ -179,6 +430,48 @@ else:
          """
          return msgpack.unpackb(payload, encoding = 'utf-8')
 
+
+      def unserializeSplit(self, payload, splits):
+         """
+         Implements :func:`autobahn.wamp.interfaces.IObjectSerializer.unserializeSplit`
+
+         The trailing elements are skipped over (which checks they are well-formed)
+         without being unserialized.
+         """
+         unpacker = msgpack.Unpacker(encoding = 'utf-8')
+         unpacker.feed(payload)
+         length = unpacker.read_array_header()
+         if length == 0:
+            return [], None
+
+         message_type = unpacker.unpack()
+         n = splits.get(message_type) if type(message_type) == int else None
+         if n is None or length <= n:
+            return self.unserialize(payload), None
+
+         obj = [message_type]
+         for i in range(n - 1):
+            obj.append(unpacker.unpack())
+
+         start = unpacker.tell()
+         types = []
+         for i in range(length - n):
+            types.append(_msgpackType(ord(payload[unpacker.tell():unpacker.tell() + 1])))
+            unpacker.skip()
+         end = unpacker.tell()
+         if end != len(payload):
+            raise Exception("extra data after MsgPack object")
+
+         return obj, (payload[start:end], types)
+
+
+      def serializeSplice(self, obj, data, count):
+         """
+         Implements :func:`autobahn.wamp.interfaces.IObjectSerializer.serializeSplice`
+         """
+         packer = msgpack.Packer(use_bin_type = True)
+         return packer.pack_array_header(len(obj) + count) + b''.join([packer.pack(o) for o in obj]) + data
+
    __all__.append('MsgPackObjectSerializer')
 
 
@@ -187,7 +480,37 @@ else:
 
       SERIALIZER_ID = "msgpack"
 
-      def __init__(self):
-         Serializer.__init__(self, MsgPackObjectSerializer())
+      def __init__(self, passthrough = False, batched = False):
+         """
+         Constructor.
+
+         :param passthrough: See :class:`autobahn.wamp.serializer.Serializer`.
+         :type passthrough: bool
+         :param batched: See :class:`autobahn.wamp.serializer.Serializer`.
+         :type batched: bool
+         """
+         Serializer.__init__(self, MsgPackObjectSerializer(), passthrough, batched)
+
+
+      ## in batched mode, each message is prefixed with its length
+      ## (4 octets, big endian)
+
+      def _frame(self, data):
+         return struct.pack("!L", len(data)) + data
+
+
+      def _unframe(self, payload):
+         parts = []
+         pos = 0
+         while pos < len(payload):
+            if pos + 4 > len(payload):
+               raise Exception("truncated length prefix in batch")
+            length = struct.unpack("!L", payload[pos:pos + 4])[0]
+            pos += 4
+            if pos + length > len(payload):
+               raise Exception("truncated message in batch")
+            parts.append(payload[pos:pos + length])
+            pos += length
+         return parts
 
    __all__.append('MsgPackSerializer')
@@ -0,0 +1,142 @@
+###############################################################################
+##
+##  Copyright (C) 2014 Tavendo GmbH
+##
+##  Licensed under the Apache License, Version 2.0 (the "License");
+##  you may not use this file except in compliance with the License.
+##  You may obtain a copy of the License at
+##
+##      http://www.apache.org/licenses/LICENSE-2.0
+##
+##  Unless required by applicable law or agreed to in writing, software
+##  distributed under the License is distributed on an "AS IS" BASIS,
+##  WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+##  See the License for the specific language governing permissions and
+##  limitations under the License.
+##
+###############################################################################
+
+from __future__ import absolute_import
+
+__all__ = ['FANOUT_BOUNDS',
+           'LATENCY_BOUNDS',
+           'Histogram',
+           'TopicStats',
+           'ProcedureStats']
+
+from bisect import bisect_left
+
+
+FANOUT_BOUNDS = [0, 1, 10, 100, 1000, 10000]
+"""
+Bucket bounds for histograms of the number of receivers of events.
+"""
+
+LATENCY_BOUNDS = [0.001, 0.002, 0.005, 0.01, 0.02, 0.05, 0.1, 0.2, 0.5, 1, 2, 5, 10]
+"""
+Bucket bounds (in seconds) for histograms of call latencies.
+"""
+
+
+
+class Histogram(object):
+   """
+   Histogram of values over fixed buckets, plus count, sum and maximum of
+   the values.
+   """
+
+   __slots__ = ('bounds', 'counts', 'count', 'sum', 'max')
+
+   def __init__(self, bounds):
+      """
+      Constructor.
+
+      :param bounds: The (inclusive) upper bounds of the buckets, in ascending
+                     order. Values larger than the last bound are counted in
+                     an extra bucket.
+      :type bounds: list
+      """
+      self.bounds = bounds
+      self.counts = [0] * (len(bounds) + 1)
+      self.count = 0
+      self.sum = 0
+      self.max = 0
+
+
+   def add(self, value):
+      """
+      Add a value to the histogram.
+      """
+      self.counts[bisect_left(self.bounds, value)] += 1
+      self.count += 1
+      self.sum += value
+      if value > self.max:
+         self.max = value
+
+
+   def marshal(self):
+      """
+      Marshal the histogram for sending it in WAMP messages.
+
+      :returns: dict -- The histogram.
+      """
+      return {'bounds': self.bounds,
+              'counts': self.counts,
+              'count': self.count,
+              'sum': self.sum,
+              'max': self.max}
+
+
+
+class TopicStats(object):
+   """
+   Statistics of the events published to a topic.
+   """
+
+   __slots__ = ('publishes', 'deliveries', 'fanout')
+
+   def __init__(self):
+      self.publishes = 0
+      self.deliveries = 0
+      self.fanout = Histogram(FANOUT_BOUNDS)
+
+
+   def add(self, receivers):
+      """
+      Count a publication.
+
+      :param receivers: The number of sessions the event was dispatched to.
+      :type receivers: int
+      """
+      self.publishes += 1
+      self.deliveries += receivers
+      self.fanout.add(receivers)
+
+
+   def marshal(self):
+      return {'publishes': self.publishes,
+              'deliveries': self.deliveries,
+              'fanout': self.fanout.marshal()}
+
+
+
+class ProcedureStats(object):
+   """
+   Statistics of the calls to a procedure. Calls answered from the cache of
+   results are counted in `calls` and `cached`, but not in `latency`.
+   """
+
+   __slots__ = ('calls', 'errors', 'cached', 'latency')
+
+   def __init__(self):
+      self.calls = 0
+      self.errors = 0
+      self.cached = 0
+      self.latency = Histogram(LATENCY_BOUNDS)
+
+
+   def marshal(self):
+      return {'calls': self.calls,
+              'errors': self.errors,
+              'cached': self.cached,
+              'latency': self.latency.marshal()}
@@ -0,0 +1,204 @@
+###############################################################################
+##
+##  Copyright (C) 2014 Tavendo GmbH
+##
+##  Licensed under the Apache License, Version 2.0 (the "License");
+##  you may not use this file except in compliance with the License.
+##  You may obtain a copy of the License at
+##
+##      http://www.apache.org/licenses/LICENSE-2.0
+##
+##  Unless required by applicable law or agreed to in writing, software
+##  distributed under the License is distributed on an "AS IS" BASIS,
+##  WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+##  See the License for the specific language governing permissions and
+##  limitations under the License.
+##
+###############################################################################
+
+from __future__ import absolute_import
+
+from twisted.trial import unittest
+
+try:
+   import asyncio
+except ImportError:
+   ## Python 2 has no asyncio: the tests are skipped
+   asyncio = None
+else:
+   from autobahn.asyncio.wamp import ApplicationSession
+   from autobahn.asyncio.websocket import WebSocketServerFactory, \
+                                          WebSocketServerProtocol
+
+from autobahn.wamp import types
+from autobahn.wamp.exception import ApplicationError
+from autobahn.wamp.router import RouterFactory
+from autobahn.wamp.protocol import RouterApplicationSession
+
+
+HANDSHAKE = b"\x0d\x0a".join([
+   b"GET / HTTP/1.1",
+   b"Host: localhost:9000",
+   b"Upgrade: websocket",
+   b"Connection: Upgrade",
+   b"Sec-WebSocket-Key: dGhlIHNhbXBsZSBub25jZQ==",
+   b"Sec-WebSocket-Version: 13",
+   b"", b""])
+
+
+
+class FakeTransport:
+   """
+   An asyncio transport stub that records the data written.
+   """
+
+   def __init__(self):
+      self.written = []
+      self.paused = False
+      self.closed = False
+
+   def write(self, data):
+      self.written.append(data)
+
+   def writelines(self, data):
+      self.written.extend(data)
+
+   def close(self):
+      self.closed = True
+
+   def pause_reading(self):
+      self.paused = True
+
+   def resume_reading(self):
+      self.paused = False
+
+   def get_extra_info(self, name):
+      return ('127.0.0.1', 45678)
+
+
+
+class AsyncioTestCase(unittest.TestCase):
+   """
+   Runs asyncio futures to completion on a fresh event loop.
+   """
+
+   def setUp(self):
+      if asyncio is None:
+         raise unittest.SkipTest("asyncio not available")
+      self.loop = asyncio.new_event_loop()
+      asyncio.set_event_loop(self.loop)
+
+   def tearDown(self):
+      asyncio.set_event_loop(None)
+      self.loop.close()
+
+   def wait(self, future):
+      return self.loop.run_until_complete(asyncio.wait_for(future, 5, loop = self.loop))
+
+
+
+class TestAsyncioSession(AsyncioTestCase):
+
+   def setUp(self):
+      AsyncioTestCase.setUp(self)
+
+      ## asyncio sessions run directly attached to a router
+      routerFactory = RouterFactory()
+      self.session = self.attach(routerFactory)
+      self.other = self.attach(routerFactory)
+
+   def attach(self, routerFactory):
+      session = ApplicationSession()
+      session.onConnect = lambda: session.join(u'realm1')
+      RouterApplicationSession(session, routerFactory)
+      return session
+
+   def test_call(self):
+      self.wait(self.session.register(lambda a, b: a + b, u'com.myapp.add2'))
+      self.assertEqual(self.wait(self.other.call(u'com.myapp.add2', 2, 3)), 5)
+
+      self.assertRaises(ApplicationError, self.wait, self.other.call(u'com.myapp.unknown'))
+
+   def test_publish(self):
+      publication = self.wait(self.session.publish(u'com.myapp.topic1', options = types.PublishOptions(acknowledge = True)))
+      self.assertNotEqual(publication.id, None)
+
+   def test_subscribe(self):
+      events = []
+      subscription = self.wait(self.session.subscribe(lambda *args, **kwargs: events.append((list(args), kwargs)), u'com.myapp.topic1'))
+      self.assertNotEqual(subscription.id, None)
+
+      self.wait(self.other.publish(u'com.myapp.topic1', 1, 2, a = 3, options = types.PublishOptions(acknowledge = True)))
+      self.assertEqual(events, [([1, 2], {u'a': 3})])
+
+
+
+class TestAsyncioStreaming(AsyncioTestCase):
+
+   def connect(self):
+      factory = WebSocketServerFactory(u"ws://localhost:9000", loop = self.loop)
+      factory.protocol = WebSocketServerProtocol
+      factory.setProtocolOptions(openHandshakeTimeout = 0, requireMaskedClientFrames = False)
+
+      proto = factory()
+      proto.STREAMING_MESSAGES = True
+      proto.STREAMING_READ_AHEAD = 4
+      self.messages = []
+      proto.onMessageStream = self.messages.append
+
+      proto.connection_made(FakeTransport())
+      self.receive(proto, HANDSHAKE)
+      proto.transport.written = []
+      return proto
+
+   def receive(self, proto, data):
+      proto.data_received(data)
+      ## received data is processed from a callback run by the loop
+      self.loop.run_until_complete(asyncio.sleep(0, loop = self.loop))
+
+   def readAll(self, message):
+      chunks = []
+      while True:
+         chunk = self.wait(message.read())
+         if chunk is None:
+            return chunks
+         chunks.append(chunk)
+
+   def test_receive(self):
+      proto = self.connect()
+      self.receive(proto, b"\x01\x03abc")
+      self.assertEqual(len(self.messages), 1)
+      self.assertFalse(self.messages[0].isBinary)
+
+      self.receive(proto, b"\x80\x02de")
+      self.assertEqual(self.readAll(self.messages[0]), [b"abc", b"de"])
+
+   def test_read_ahead(self):
+      proto = self.connect()
+
+      ## reading is paused while more than the read ahead is buffered
+      self.receive(proto, b"\x02\x06abcdef")
+      self.assertTrue(proto.transport.paused)
+      self.assertEqual(self.wait(self.messages[0].read()), b"abcdef")
+      self.assertFalse(proto.transport.paused)
+
+   def test_connection_lost(self):
+      proto = self.connect()
+      self.receive(proto, b"\x01\x03abc")
+      proto.connection_lost(None)
+
+      message = self.messages[0]
+      self.assertEqual(self.wait(message.read()), b"abc")
+      self.assertRaises(Exception, self.wait, message.read())
+
+   def test_send(self):
+      proto = self.connect()
+      self.wait(proto.sendMessageStream([b"ab", b"", b"cd"], isBinary = True))
+
+      ## a frame per (non-empty) chunk, and an empty final frame
+      self.assertEqual(b"".join(proto.transport.written), b"\x02\x02ab\x00\x02cd\x80\x00")
+
+   def test_send_closed(self):
+      proto = self.connect()
+      proto.connection_lost(None)
+      self.assertRaises(Exception, self.wait, proto.sendMessageStream([b"ab"]))
@@ -0,0 +1,128 @@
+###############################################################################
+##
+##  Copyright (C) 2014 Tavendo GmbH
+##
+##  Licensed under the Apache License, Version 2.0 (the "License");
+##  you may not use this file except in compliance with the License.
+##  You may obtain a copy of the License at
+##
+##      http://www.apache.org/licenses/LICENSE-2.0
+##
+##  Unless required by applicable law or agreed to in writing, software
+##  distributed under the License is distributed on an "AS IS" BASIS,
+##  WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+##  See the License for the specific language governing permissions and
+##  limitations under the License.
+##
+###############################################################################
+
+from __future__ import absolute_import
+
+from twisted.trial import unittest
+
+from autobahn import util
+from autobahn.wamp import message
+from autobahn.wamp.broker import Broker
+
+
+class RecordingSession:
+   """
+   A router-side WAMP session stub that records the messages sent to it.
+   """
+
+   def __init__(self):
+      self._session_id = util.id()
+      self._transport = self
+      self.sent = []
+
+   def send(self, msg):
+      self.sent.append(msg)
+
+
+
+class TestRetainedEvents(unittest.TestCase):
+
+   def setUp(self):
+      self.broker = Broker('realm1')
+      self.publisher = RecordingSession()
+      self.subscriber = RecordingSession()
+      self.broker.attach(self.publisher)
+      self.broker.attach(self.subscriber)
+
+   def publish(self, topic, *args, **options):
+      self.broker.processPublish(self.publisher, message.Publish(util.id(), topic, args = list(args), **options))
+
+   def subscribe(self, topic):
+      self.subscriber.sent = []
+      self.broker.processSubscribe(self.subscriber, message.Subscribe(util.id(), topic))
+      return self.subscriber.sent
+
+   def test_retain_option(self):
+      self.publish('com.myapp.topic1', 1, retain = True)
+      self.publish('com.myapp.topic1', 2, retain = True)
+      self.publish('com.myapp.topic2', 3)
+
+      sent = self.subscribe('com.myapp.topic1')
+      self.assertEqual(len(sent), 2)
+      self.assertIsInstance(sent[0], message.Subscribed)
+      self.assertIsInstance(sent[1], message.Event)
+      self.assertEqual(sent[1].subscription, sent[0].subscription)
+      self.assertEqual(sent[1].args, [2])
+      self.assertEqual(sent[1].retained, True)
+
+      self.assertEqual(len(self.subscribe('com.myapp.topic2')), 1)
+
+   def test_retain_topic(self):
+      self.broker.retain('com.myapp.topic1', 2)
+      for i in range(3):
+         self.publish('com.myapp.topic1', i)
+
+      sent = self.subscribe('com.myapp.topic1')
+      self.assertEqual([msg.args for msg in sent[1:]], [[1], [2]])
+
+      ## subscribing again does not dispatch retained events again
+      self.assertEqual(len(self.subscribe('com.myapp.topic1')), 1)
+
+      self.broker.retain('com.myapp.topic1', 0)
+      self.subscriber = RecordingSession()
+      self.broker.attach(self.subscriber)
+      self.assertEqual(len(self.subscribe('com.myapp.topic1')), 1)
+
+   def test_retain_bound(self):
+      self.broker.RETAIN_MAX_EVENTS = 3
+      self.broker.retain('com.myapp.topic1', 2)
+      self.broker.retain('com.myapp.topic2', 2)
+      self.publish('com.myapp.topic1', 1)
+      self.publish('com.myapp.topic1', 2)
+      self.publish('com.myapp.topic2', 3)
+      self.publish('com.myapp.topic2', 4)
+
+      ## the oldest event of the topic least recently published to was dropped
+      self.assertEqual([msg.args for msg in self.subscribe('com.myapp.topic1')[1:]], [[2]])
+      self.assertEqual([msg.args for msg in self.subscribe('com.myapp.topic2')[1:]], [[3], [4]])
+
+   def test_retain_bound_octets(self):
+      self.broker.RETAIN_MAX_OCTETS = 250
+      self.broker.retain('com.myapp.topic1', 10)
+      for i in range(3):
+         self.publish('com.myapp.topic1', u'x' * 100)
+
+      ## the oldest event was dropped to stay within the payload size bound
+      self.assertEqual(len(self.subscribe('com.myapp.topic1')), 3)
+      self.assertTrue(self.broker._retained_octets <= 250)
+
+      ## events retained do not keep the PUBLISH message
+      event = self.broker._retained['com.myapp.topic1'][0]
+      self.assertFalse(hasattr(event, 'topic'))
+
+   def test_retain_receivers(self):
+      self.publish('com.myapp.topic1', 1, retain = True, exclude = [self.subscriber._session_id])
+      self.assertEqual(len(self.subscribe('com.myapp.topic1')), 1)
+
+      self.publish('com.myapp.topic2', 2, retain = True, discloseMe = True)
+      sent = self.subscribe('com.myapp.topic2')
+      self.assertEqual(sent[1].publisher, self.publisher._session_id)
+
+      ## the publisher does not receive its own event (unless it asked to)
+      self.subscriber = self.publisher
+      self.assertEqual(len(self.subscribe('com.myapp.topic2')), 1)
@@ -0,0 +1,109 @@
+###############################################################################
+##
+##  Copyright (C) 2014 Tavendo GmbH
+##
+##  Licensed under the Apache License, Version 2.0 (the "License");
+##  you may not use this file except in compliance with the License.
+##  You may obtain a copy of the License at
+##
+##      http://www.apache.org/licenses/LICENSE-2.0
+##
+##  Unless required by applicable law or agreed to in writing, software
+##  distributed under the License is distributed on an "AS IS" BASIS,
+##  WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+##  See the License for the specific language governing permissions and
+##  limitations under the License.
+##
+###############################################################################
+
+from __future__ import absolute_import
+
+import zlib
+
+from twisted.trial import unittest
+
+from autobahn.websocket.compress import PerMessageDeflateOffer, \
+                                        PerMessageDeflateAcceptPolicy, \
+                                        PerMessageDeflate
+
+
+MESSAGES = [b"Hello, world! " * 10, b"Hello, world! " * 12, b"x", b"", b"abc" * 50]
+
+
+def compress(pmce, payload):
+   pmce.startCompressMessage()
+   return pmce.compressMessageData(payload) + pmce.endCompressMessage()
+
+
+def decompress(pmce, data):
+   pmce.startDecompressMessage()
+   payload = pmce.decompressMessageData(data)
+   pmce.endDecompressMessage()
+   return payload
+
+
+
+class FakeFactory:
+
+   def __init__(self, countConnections):
+      self.countConnections = countConnections
+
+
+
+class TestPerMessageDeflateAcceptPolicy(unittest.TestCase):
+
+   def test_budget(self):
+      offer = PerMessageDeflateOffer(acceptNoContextTakeover = True, acceptMaxWindowBits = True)
+      usage = PerMessageDeflateAcceptPolicy.memoryUsage(15, 8, 15)
+
+      accept = PerMessageDeflateAcceptPolicy(FakeFactory(10), 10 * usage)([offer])
+      self.assertEqual((accept.windowBits, accept.memLevel, accept.requestMaxWindowBits), (15, 8, 0))
+      self.assertEqual(accept.noContextTakeover, None)
+
+      accept = PerMessageDeflateAcceptPolicy(FakeFactory(11), 10 * usage)([offer])
+      self.assertEqual((accept.windowBits, accept.memLevel, accept.requestMaxWindowBits), (14, 7, 14))
+
+   def test_over_budget(self):
+      offer = PerMessageDeflateOffer(acceptNoContextTakeover = True, acceptMaxWindowBits = True)
+      accept = PerMessageDeflateAcceptPolicy(FakeFactory(1000000), 2**20)([offer])
+
+      self.assertTrue(accept.noContextTakeover)
+      self.assertTrue(accept.requestNoContextTakeover)
+      self.assertEqual(accept.getExtensionString(), "permessage-deflate; client_no_context_takeover")
+
+
+
+class TestPerMessageDeflate(unittest.TestCase):
+
+   def roundtrip(self, noContextTakeover):
+      server = PerMessageDeflate(True, noContextTakeover, noContextTakeover, 0, 0, 0)
+      client = PerMessageDeflate(False, noContextTakeover, noContextTakeover, 0, 0, 0)
+      sent = []
+      for payload in MESSAGES:
+         data = compress(server, payload)
+         self.assertEqual(decompress(client, data), payload)
+         sent.append(data)
+      return sent
+
+   def test_context_takeover(self):
+      sent = self.roundtrip(False)
+
+      ## later messages refer back to earlier ones
+      self.assertTrue(len(sent[1]) < len(compress(PerMessageDeflate(True, False, False, 0, 0, 0), MESSAGES[1])))
+
+   def test_no_context_takeover(self):
+      sent = self.roundtrip(True)
+
+      ## the reused compressor produces the same messages as a fresh one per message
+      self.assertEqual(sent, [compress(PerMessageDeflate(True, True, True, 0, 0, 0), payload) for payload in MESSAGES])
+
+   def test_final_block(self):
+      client = PerMessageDeflate(False, True, True, 0, 0, 0)
+
+      ## a peer ending a message with a final deflate block ends its stream,
+      ## and starts a new one for the next message
+      for payload in MESSAGES:
+         compressor = zlib.compressobj(zlib.Z_DEFAULT_COMPRESSION, zlib.DEFLATED, -zlib.MAX_WBITS)
+         data = compressor.compress(payload) + compressor.flush(zlib.Z_FINISH)
+         self.assertEqual(decompress(client, data), payload)
+         self.assertEqual(decompress(client, compress(PerMessageDeflate(True, True, True, 0, 0, 0), payload)), payload)
@@ -0,0 +1,218 @@
+###############################################################################
+##
+##  Copyright (C) 2014 Tavendo GmbH
+##
+##  Licensed under the Apache License, Version 2.0 (the "License");
+##  you may not use this file except in compliance with the License.
+##  You may obtain a copy of the License at
+##
+##      http://www.apache.org/licenses/LICENSE-2.0
+##
+##  Unless required by applicable law or agreed to in writing, software
+##  distributed under the License is distributed on an "AS IS" BASIS,
+##  WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+##  See the License for the specific language governing permissions and
+##  limitations under the License.
+##
+###############################################################################
+
+from __future__ import absolute_import
+
+import struct
+
+from twisted.trial import unittest
+from twisted.internet.task import Clock
+from twisted.test.proto_helpers import StringTransport
+
+from autobahn.twisted.websocket import WebSocketServerFactory, \
+                                       WebSocketServerProtocol, \
+                                       WebSocketClientFactory
+from autobahn.websocket.protocol import MaskSource
+from autobahn.wamp.tests.test_trafficstats import HANDSHAKE
+from autobahn.wamp.tests.test_websocket import CountingTransport
+
+
+def frames(data, masks = None):
+   """
+   Split octets sent into WebSocket frames, returning `(fin, opcode, payload)`
+   triples with payloads unmasked. The masks (or `None` for unmasked frames)
+   are appended to `masks`, if given.
+   """
+   res = []
+   while data:
+      b0, b1 = struct.unpack("!BB", data[:2])
+      length, pos = b1 & 0x7f, 2
+      if length == 126:
+         length, pos = struct.unpack("!H", data[2:4])[0], 4
+      elif length == 127:
+         length, pos = struct.unpack("!Q", data[2:10])[0], 10
+      payload = data[pos + 4 if b1 & 0x80 else pos:][:length]
+      if b1 & 0x80:
+         mask = bytearray(data[pos:pos + 4])
+         payload = bytes(bytearray(c ^ mask[i % 4] for i, c in enumerate(bytearray(payload))))
+         pos += 4
+      if masks is not None:
+         masks.append(bytes(mask) if b1 & 0x80 else None)
+      res.append((bool(b0 & 0x80), b0 & 0x0f, payload))
+      data = data[pos + length:]
+   return res
+
+
+
+class FramingTestCase(unittest.TestCase):
+
+   def connect(self, **options):
+      self.factory = WebSocketServerFactory("ws://localhost:9000")
+      self.factory.protocol = WebSocketServerProtocol
+      self.factory.reactor = Clock()
+      self.factory.setProtocolOptions(openHandshakeTimeout = 0, **options)
+      proto = self.factory.buildProtocol(None)
+      proto.makeConnection(StringTransport())
+      proto.dataReceived(HANDSHAKE)
+      proto.transport.clear()
+      return proto
+
+
+
+class TestFragmentation(FramingTestCase):
+
+   def check(self, payload, fragmentSize, masked = False):
+      proto = self.connect(maskServerFrames = masked)
+      proto.sendMessage(payload, isBinary = True, fragmentSize = fragmentSize)
+
+      masks = []
+      sent = frames(proto.transport.value(), masks)
+      self.assertEqual(len(sent), (len(payload) + fragmentSize - 1) // fragmentSize)
+      self.assertEqual([mask is not None for mask in masks], [masked] * len(sent))
+      self.assertEqual([opcode for (fin, opcode, data) in sent], [2] + [0] * (len(sent) - 1))
+      self.assertEqual([fin for (fin, opcode, data) in sent], [False] * (len(sent) - 1) + [True])
+      self.assertEqual([len(data) for (fin, opcode, data) in sent[:-1]], [fragmentSize] * (len(sent) - 1))
+      self.assertEqual(b''.join([data for (fin, opcode, data) in sent]), payload)
+
+   def test_small(self):
+      self.check(bytes(bytearray(range(256))) * 4, 100)
+
+   def test_large(self):
+      ## fragments large enough to be written as header and payload sequence
+      self.check(bytes(bytearray(range(256))) * 1000, 70000)
+
+   def test_masked(self):
+      self.check(bytes(bytearray(range(256))) * 4, 100, masked = True)
+      self.check(bytes(bytearray(range(256))) * 1000, 70000, masked = True)
+
+   def test_auto(self):
+      proto = self.connect(autoFragmentSize = 10)
+      proto.sendMessage(b"x" * 25)
+      self.assertEqual([(fin, opcode, len(data)) for (fin, opcode, data) in frames(proto.transport.value())],
+                       [(False, 1, 10), (False, 0, 10), (True, 0, 5)])
+
+
+
+class TestCork(FramingTestCase):
+
+   def connect(self, **options):
+      proto = FramingTestCase.connect(self, **options)
+      proto.transport = CountingTransport()
+      return proto
+
+   def sent(self, proto):
+      return [data for (fin, opcode, data) in frames(proto.transport.value())]
+
+   def test_not_corked(self):
+      proto = self.connect()
+      proto.sendMessage(b"a")
+      proto.sendMessage(b"b")
+      self.assertEqual(proto.transport.writes, 2)
+
+   def test_corked(self):
+      proto = self.connect(corkWrites = True)
+      for payload in [b"a", b"b", b"c" * 200]:
+         proto.sendMessage(payload)
+      self.assertEqual(proto.transport.writes, 0)
+
+      ## written out in order, in one go at the end of the reactor iteration
+      self.factory.reactor.advance(0)
+      self.assertEqual(proto.transport.writes, 1)
+      self.assertEqual(self.sent(proto), [b"a", b"b", b"c" * 200])
+
+   def test_cork_size(self):
+      proto = self.connect(corkWrites = True, corkBufferSize = 10)
+      proto.sendMessage(b"x" * 5)
+      self.assertEqual(proto.transport.writes, 0)
+
+      ## flushed early when the buffer has grown large enough
+      proto.sendMessage(b"y" * 5)
+      self.assertEqual(proto.transport.writes, 1)
+      self.assertEqual(self.sent(proto), [b"x" * 5, b"y" * 5])
+
+      self.factory.reactor.advance(0)
+      self.assertEqual(proto.transport.writes, 1)
+
+   def test_sync(self):
+      proto = self.connect(corkWrites = True)
+      proto.sendMessage(b"a")
+      proto.sendMessage(b"b", sync = True)
+      self.factory.reactor.advance(0)
+      self.assertEqual(self.sent(proto), [b"a", b"b"])
+
+   def test_close(self):
+      proto = self.connect(corkWrites = True)
+      proto.sendMessage(b"a")
+      proto.sendClose()
+      self.factory.reactor.advance(0)
+      self.assertEqual([opcode for (fin, opcode, data) in frames(proto.transport.value())], [1, 8])
+
+      ## the cork buffer is flushed when the connection is dropped
+      proto = self.connect(corkWrites = True)
+      proto.sendMessage(b"a")
+      proto.dropConnection()
+      self.assertEqual(self.sent(proto), [b"a"])
+
+
+
+class TestMaskSource(FramingTestCase):
+
+   def test_modes(self):
+      self.patch(MaskSource, 'POOL_SIZE', 4)
+      for mode in MaskSource.MODES:
+         source = MaskSource(mode)
+
+         ## pooled modes are refilled when used up
+         masks = [source.getMask() for i in range(10)]
+         self.assertEqual([len(mask) for mask in masks], [4] * 10)
+         self.assertIsInstance(masks[0], bytes)
+         self.assertTrue(len(set(masks)) > 1)
+
+      self.assertRaises(Exception, MaskSource, "foo")
+
+   def test_frames(self):
+      payloads = [b"", b"hello", bytes(bytearray(range(256))) * 300]
+      for mode in MaskSource.MODES:
+         proto = self.connect(maskServerFrames = True, maskSource = mode)
+         for payload in payloads:
+            proto.sendMessage(payload, isBinary = True)
+
+         ## a frame sent with the streaming API
+         proto.beginMessage(isBinary = True)
+         proto.beginMessageFrame(5)
+         proto.sendMessageFrameData(b"hel")
+         proto.sendMessageFrameData(b"lo")
+         proto.endMessage()
+
+         masks = []
+         sent = frames(proto.transport.value(), masks)
+         self.assertEqual([payload for (fin, opcode, payload) in sent], payloads + [b"hello", b""])
+
+         ## all frames are masked, with a new mask each
+         self.assertFalse(None in masks)
+         self.assertEqual(len(set(masks)), len(masks))
+
+   def test_prepared(self):
+      for mode in MaskSource.MODES:
+         factory = WebSocketClientFactory("ws://localhost:9000")
+         factory.setProtocolOptions(maskSource = mode)
+         msg = factory.prepareMessage(b"hello")
+
+         masks = []
+         self.assertEqual(frames(msg.payloadHybi, masks), [(True, 1, b"hello")])
+         self.assertNotEqual(masks, [None])
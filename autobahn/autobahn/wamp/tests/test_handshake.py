@@ -0,0 +1,91 @@
+###############################################################################
+##
+##  Copyright (C) 2014 Tavendo GmbH
+##
+##  Licensed under the Apache License, Version 2.0 (the "License");
+##  you may not use this file except in compliance with the License.
+##  You may obtain a copy of the License at
+##
+##      http://www.apache.org/licenses/LICENSE-2.0
+##
+##  Unless required by applicable law or agreed to in writing, software
+##  distributed under the License is distributed on an "AS IS" BASIS,
+##  WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+##  See the License for the specific language governing permissions and
+##  limitations under the License.
+##
+###############################################################################
+
+from __future__ import absolute_import
+
+from twisted.trial import unittest
+from twisted.internet.task import Clock
+from twisted.test.proto_helpers import StringTransport
+
+from autobahn.twisted.websocket import WebSocketServerFactory, \
+                                       WebSocketServerProtocol
+from autobahn.wamp.tests.test_trafficstats import HANDSHAKE
+
+
+
+class TestHandshakeCache(unittest.TestCase):
+
+   def setUp(self):
+      self.factory = WebSocketServerFactory("ws://localhost:9000", server = "MyServer")
+      self.factory.protocol = WebSocketServerProtocol
+      self.factory.reactor = Clock()
+      self.factory.setProtocolOptions(openHandshakeTimeout = 0)
+
+   def connect(self, *headers):
+      proto = self.factory.buildProtocol(None)
+      proto.makeConnection(StringTransport())
+      proto.dataReceived(HANDSHAKE[:-2] + b"".join([header + b"\x0d\x0a" for header in headers]) + b"\x0d\x0a")
+      return proto
+
+   def test_protocols(self):
+      header = b"Sec-WebSocket-Protocol: wamp.2.json, wamp.2.msgpack"
+      proto1 = self.connect(header)
+      proto2 = self.connect(header)
+
+      self.assertEqual(len(self.factory._protocolsHeaderCache), 1)
+      self.assertEqual(proto2.websocket_protocols, ['wamp.2.json', 'wamp.2.msgpack'])
+
+      ## the results handed out are not shared
+      proto1.websocket_protocols.append('foo')
+      self.assertEqual(self.connect(header).websocket_protocols, ['wamp.2.json', 'wamp.2.msgpack'])
+
+   def test_duplicate_protocol(self):
+      header = b"Sec-WebSocket-Protocol: wamp.2.json, wamp.2.json"
+      for i in range(2):
+         proto = self.connect(header)
+         self.assertTrue(proto.transport.value().startswith(b"HTTP/1.1 400"))
+
+   def test_extensions(self):
+      header = b"Sec-WebSocket-Extensions: permessage-deflate; client_max_window_bits"
+      proto1 = self.connect(header)
+      proto2 = self.connect(header)
+
+      self.assertEqual(len(self.factory._extensionsHeaderCache), 1)
+      self.assertEqual(proto2.websocket_extensions, [('permessage-deflate', {'client_max_window_bits': [True]})])
+
+      ## the results handed out are not shared
+      proto1.websocket_extensions[0][1]['client_max_window_bits'].append(10)
+      proto1.websocket_extensions[0][1]['foo'] = [True]
+      self.assertEqual(self.connect(header).websocket_extensions, [('permessage-deflate', {'client_max_window_bits': [True]})])
+
+   def test_evict(self):
+      self.patch(self.factory, 'HANDSHAKE_CACHE_SIZE', 2)
+      for protocol in [b"a", b"b", b"a", b"c"]:
+         self.connect(b"Sec-WebSocket-Protocol: " + protocol)
+
+      ## the least recently used header value is evicted
+      self.assertEqual(list(self.factory._protocolsHeaderCache), ['a', 'c'])
+
+   def test_response_head(self):
+      response = self.connect().transport.value()
+      self.assertTrue(response.startswith(b"HTTP/1.1 101 Switching Protocols\x0d\x0aServer: MyServer\x0d\x0a"))
+
+      self.factory.setSessionParameters("ws://localhost:9000", server = "MyServer/2", headers = {'X-Foo': 'bar'})
+      response = self.connect().transport.value()
+      self.assertTrue(response.startswith(b"HTTP/1.1 101 Switching Protocols\x0d\x0aServer: MyServer/2\x0d\x0a"))
+      self.assertIn(b"\x0d\x0aX-Foo: bar\x0d\x0a", response)
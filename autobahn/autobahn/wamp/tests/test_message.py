@@ -243,6 +243,22 @@ class TestPublishMessage(unittest.TestCase):
       self.assertEqual(msg.discloseMe, True)
       self.assertEqual(msg.marshal(), wmsg)
 
+      wmsg = [message.Publish.MESSAGE_TYPE, 123456, {'retain': True}, 'com.myapp.topic1']
+      msg = message.Publish.parse(wmsg)
+      self.assertEqual(msg.retain, True)
+      self.assertEqual(msg.marshal(), wmsg)
+
+
+   def test_parse_invalid(self):
+      for wmsg in [[message.Publish.MESSAGE_TYPE, 123456, {}],
+                   [message.Publish.MESSAGE_TYPE, -1, {}, 'com.myapp.topic1'],
+                   [message.Publish.MESSAGE_TYPE, 123456, {}, ''],
+                   [message.Publish.MESSAGE_TYPE, 123456, {}, 'com.myapp.topic1', None],
+                   [message.Publish.MESSAGE_TYPE, 123456, {1: True}, 'com.myapp.topic1'],
+                   [message.Publish.MESSAGE_TYPE, 123456, {'acknowledge': None}, 'com.myapp.topic1'],
+                   [message.Publish.MESSAGE_TYPE, 123456, {'exclude': [1, 'x']}, 'com.myapp.topic1']]:
+         self.assertRaises(ProtocolError, message.Publish.parse, wmsg)
+
 
 
 class TestPublishedMessage(unittest.TestCase):
@@ -327,6 +343,11 @@ class TestEventMessage(unittest.TestCase):
       self.assertEqual(msg.publisher, 300)
       self.assertEqual(msg.marshal(), wmsg)
 
+      wmsg = [message.Event.MESSAGE_TYPE, 123456, 789123, {'retained': True}]
+      msg = message.Event.parse(wmsg)
+      self.assertEqual(msg.retained, True)
+      self.assertEqual(msg.marshal(), wmsg)
+
 
 
 class TestRegisterMessage(unittest.TestCase):
@@ -366,6 +387,14 @@ class TestRegisterMessage(unittest.TestCase):
       self.assertEqual(msg.pkeys, [10, 11, 12])
       self.assertEqual(msg.marshal(), wmsg)
 
+      wmsg = [message.Register.MESSAGE_TYPE, 123456, {'cache': 1.5}, 'com.myapp.procedure1']
+      msg = message.Register.parse(wmsg)
+      self.assertEqual(msg.cache, 1.5)
+      self.assertEqual(msg.marshal(), wmsg)
+
+      wmsg = [message.Register.MESSAGE_TYPE, 123456, {'cache': 0}, 'com.myapp.procedure1']
+      self.assertRaises(ProtocolError, message.Register.parse, wmsg)
+
 
 
 class TestRegisteredMessage(unittest.TestCase):
@@ -0,0 +1,181 @@
+###############################################################################
+##
+##  Copyright (C) 2014 Tavendo GmbH
+##
+##  Licensed under the Apache License, Version 2.0 (the "License");
+##  you may not use this file except in compliance with the License.
+##  You may obtain a copy of the License at
+##
+##      http://www.apache.org/licenses/LICENSE-2.0
+##
+##  Unless required by applicable law or agreed to in writing, software
+##  distributed under the License is distributed on an "AS IS" BASIS,
+##  WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+##  See the License for the specific language governing permissions and
+##  limitations under the License.
+##
+###############################################################################
+
+from __future__ import absolute_import
+
+import struct
+
+from twisted.trial import unittest
+from twisted.internet.task import Clock
+from twisted.test.proto_helpers import StringTransport
+
+from autobahn.twisted.websocket import WebSocketServerFactory, WebSocketServerProtocol
+from autobahn.websocket.metrics import Histogram, WebSocketMetrics
+from autobahn.wamp.tests.test_trafficstats import HANDSHAKE, EchoServerProtocol
+
+
+
+class FakeFactory:
+
+   countConnections = 3
+
+
+
+class FrameServerProtocol(WebSocketServerProtocol):
+   """
+   Consumes messages through the frame-based API, so the default
+   onMessageEnd() never runs.
+   """
+
+   def onMessageBegin(self, isBinary):
+      pass
+
+   def onMessageFrameBegin(self, length):
+      pass
+
+   def onMessageFrameData(self, payload):
+      pass
+
+   def onMessageFrameEnd(self):
+      pass
+
+   def onMessageEnd(self):
+      pass
+
+
+
+def clientFrame(opcode, payload, fin = True):
+   ## a masked client frame with an all-zero mask
+   return struct.pack("!BB", (0x80 if fin else 0) | opcode, 0x80 | len(payload)) + b"\x00" * 4 + payload
+
+
+
+class TestHistogram(unittest.TestCase):
+
+   def test_buckets(self):
+      h = Histogram([1, 10])
+      for value in [0, 1, 1.5, 10, 11]:
+         h.observe(value)
+
+      ## bounds are inclusive, values above the last bound go to the extra bucket
+      self.assertEqual(h.counts, [2, 2, 1])
+      self.assertEqual(h.sum, 23.5)
+
+   def test_render(self):
+      h = Histogram([0.5, 2])
+      h.observe(0.5)
+      h.observe(3)
+
+      self.assertEqual(h.render("m", {"direction": "in"}),
+                       ['m_bucket{direction="in",le="0.5"} 1',
+                        'm_bucket{direction="in",le="2"} 1',
+                        'm_bucket{direction="in",le="+Inf"} 2',
+                        'm_sum{direction="in"} 3.5',
+                        'm_count{direction="in"} 2'])
+
+      self.assertEqual(Histogram([1]).render("m"),
+                       ['m_bucket{le="1"} 0',
+                        'm_bucket{le="+Inf"} 0',
+                        'm_sum 0',
+                        'm_count 0'])
+
+
+
+class TestWebSocketMetrics(unittest.TestCase):
+
+   def test_render(self):
+      metrics = WebSocketMetrics(FakeFactory())
+      metrics.openConnections = 2
+      metrics.handshakesSucceeded = 5
+      metrics.handshakeFailed(400)
+      metrics.handshakeFailed(400)
+      metrics.handshakeFailed(503)
+      metrics.incomingMessages = 7
+      metrics.incomingMessageSize.observe(100)
+      metrics.connectionClosed(1000, True)
+      metrics.connectionClosed(None, False)
+
+      lines = metrics.render().split("\n")
+
+      self.assertEqual(lines[-1], "")
+      for line in ['# TYPE autobahn_websocket_connections gauge',
+                   'autobahn_websocket_connections 3',
+                   'autobahn_websocket_open_connections 2',
+                   'autobahn_websocket_handshakes_total{result="success"} 5',
+                   'autobahn_websocket_handshakes_total{result="failure"} 3',
+                   'autobahn_websocket_handshake_failures_total{code="400"} 2',
+                   'autobahn_websocket_handshake_failures_total{code="503"} 1',
+                   '# TYPE autobahn_websocket_handshake_duration_seconds histogram',
+                   'autobahn_websocket_messages_total{direction="in"} 7',
+                   'autobahn_websocket_message_size_bytes_bucket{direction="in",le="64"} 0',
+                   'autobahn_websocket_message_size_bytes_bucket{direction="in",le="256"} 1',
+                   'autobahn_websocket_message_size_bytes_count{direction="out"} 0',
+                   'autobahn_websocket_closes_total{code="none",clean="false"} 1',
+                   'autobahn_websocket_closes_total{code="1000",clean="true"} 1']:
+         self.assertIn(line, lines)
+
+      ## every metric has a HELP and TYPE line, followed by its samples
+      names = [line.split()[2] for line in lines if line.startswith("# TYPE")]
+      self.assertEqual(len(names), 9)
+      for line in lines:
+         if line and not line.startswith("#"):
+            self.assertTrue(any(line.startswith(name) for name in names), line)
+
+   def test_disabled_while_open(self):
+      factory = WebSocketServerFactory("ws://localhost:9000")
+      factory.protocol = EchoServerProtocol
+      factory.reactor = Clock()
+      factory.setProtocolOptions(openHandshakeTimeout = 0, trackMetrics = True)
+      metrics = factory.metrics
+
+      proto = factory.buildProtocol(None)
+      proto.makeConnection(StringTransport())
+      proto.dataReceived(HANDSHAKE)
+      self.assertEqual(metrics.openConnections, 1)
+
+      factory.setProtocolOptions(trackMetrics = False)
+      proto.connectionLost(None)
+
+      self.assertEqual(metrics.openConnections, 0)
+      self.assertEqual(sum(metrics.closes.values()), 1)
+
+   def connect(self, protocol):
+      factory = WebSocketServerFactory("ws://localhost:9000")
+      factory.protocol = protocol
+      factory.reactor = Clock()
+      factory.setProtocolOptions(openHandshakeTimeout = 0, trackMetrics = True)
+
+      proto = factory.buildProtocol(None)
+      proto.makeConnection(StringTransport())
+      proto.dataReceived(HANDSHAKE)
+      return factory, proto
+
+   def test_incoming_frames(self):
+      factory, proto = self.connect(FrameServerProtocol)
+      proto.dataReceived(clientFrame(1, b"abc", fin = False) + clientFrame(0, b"defg"))
+
+      self.assertEqual(factory.metrics.incomingMessages, 1)
+      self.assertEqual(factory.metrics.incomingMessageSize.sum, 7)
+
+   def test_prepared(self):
+      factory, proto = self.connect(FrameServerProtocol)
+      proto.sendPreparedMessage(factory.prepareMessage(b"hello"))
+      proto.sendPreparedMessage(factory.prepareMessage(b"hi", doNotCompress = True))
+
+      self.assertEqual(factory.metrics.outgoingMessages, 2)
+      self.assertEqual(factory.metrics.outgoingMessageSize.sum, 7)
@@ -25,7 +25,7 @@ from twisted.internet.defer import Deferred, inlineCallbacks
 from autobahn import wamp
 from autobahn.wamp import message
 from autobahn.wamp import serializer
-from autobahn.wamp import protocol
+from autobahn.twisted.wamp import ApplicationSession
 from autobahn.wamp import role
 from autobahn import util
 from autobahn.wamp.exception import ApplicationError, NotAuthorized, InvalidTopic
@@ -41,10 +41,15 @@ class MockTransport:
       self._registrations = {}
       self._invocations = {}
 
+      self._my_session_id = util.id()
+
       self._handler.onOpen(self)
 
-      self._my_session_id = util.id()
+      ## a resumed session joins by itself
+      if self._handler._session_id is None:
+         self._welcome()
 
+   def _welcome(self):
       roles = [
          role.RoleBrokerFeatures(),
          role.RoleDealerFeatures()
@@ -60,7 +65,10 @@ class MockTransport:
 
       reply = None
 
-      if isinstance(msg, message.Publish):
+      if isinstance(msg, message.Hello):
+         self._welcome()
+
+      elif isinstance(msg, message.Publish):
          if msg.topic.startswith('com.myapp'):
             if msg.acknowledge:
                reply = message.Published(msg.request, util.id())
@@ -121,11 +129,25 @@ class MockTransport:
 
 
 
+class RejectingTransport(MockTransport):
+   """
+   A transport stub that rejects all subscriptions.
+   """
+
+   def send(self, msg):
+      if isinstance(msg, message.Subscribe):
+         self._handler.onMessage(message.Error(message.Subscribe.MESSAGE_TYPE, msg.request, 'wamp.error.not_authorized'))
+      else:
+         MockTransport.send(self, msg)
+
+
+
+
 class TestPublisher(unittest.TestCase):
 
    @inlineCallbacks
    def test_publish(self):
-      handler = protocol.ApplicationSession()
+      handler = ApplicationSession()
       transport = MockTransport(handler)
 
       publication = yield handler.publish('com.myapp.topic1')
@@ -146,7 +168,7 @@ class TestPublisher(unittest.TestCase):
 
    @inlineCallbacks
    def test_publish_acknowledged(self):
-      handler = protocol.ApplicationSession()
+      handler = ApplicationSession()
       transport = MockTransport(handler)
 
       publication = yield handler.publish('com.myapp.topic1', options = types.PublishOptions(acknowledge = True))
@@ -167,7 +189,7 @@ class TestPublisher(unittest.TestCase):
 
    @inlineCallbacks
    def test_publish_undefined_exception(self):
-      handler = protocol.ApplicationSession()
+      handler = ApplicationSession()
       transport = MockTransport(handler)
 
       options = types.PublishOptions(acknowledge = True)
@@ -178,7 +200,7 @@ class TestPublisher(unittest.TestCase):
 
    @inlineCallbacks
    def test_publish_defined_exception(self):
-      handler = protocol.ApplicationSession()
+      handler = ApplicationSession()
       transport = MockTransport(handler)
 
       options = types.PublishOptions(acknowledge = True)
@@ -192,7 +214,7 @@ class TestPublisher(unittest.TestCase):
 
    @inlineCallbacks
    def test_call(self):
-      handler = protocol.ApplicationSession()
+      handler = ApplicationSession()
       transport = MockTransport(handler)
 
       res = yield handler.call('com.myapp.procedure1')
@@ -213,7 +235,7 @@ class TestPublisher(unittest.TestCase):
 
    @inlineCallbacks
    def test_call_with_complex_result(self):
-      handler = protocol.ApplicationSession()
+      handler = ApplicationSession()
       transport = MockTransport(handler)
 
       res = yield handler.call('com.myapp.procedure2')
@@ -229,7 +251,7 @@ class TestPublisher(unittest.TestCase):
 
    @inlineCallbacks
    def test_subscribe(self):
-      handler = protocol.ApplicationSession()
+      handler = ApplicationSession()
       transport = MockTransport(handler)
 
       def on_event(*args, **kwargs):
@@ -244,7 +266,7 @@ class TestPublisher(unittest.TestCase):
 
    @inlineCallbacks
    def test_unsubscribe(self):
-      handler = protocol.ApplicationSession()
+      handler = ApplicationSession()
       transport = MockTransport(handler)
 
       def on_event(*args, **kwargs):
@@ -256,7 +278,7 @@ class TestPublisher(unittest.TestCase):
 
    @inlineCallbacks
    def test_register(self):
-      handler = protocol.ApplicationSession()
+      handler = ApplicationSession()
       transport = MockTransport(handler)
 
       def on_call(*args, **kwargs):
@@ -271,7 +293,7 @@ class TestPublisher(unittest.TestCase):
 
    @inlineCallbacks
    def test_unregister(self):
-      handler = protocol.ApplicationSession()
+      handler = ApplicationSession()
       transport = MockTransport(handler)
 
       def on_call(*args, **kwargs):
@@ -281,9 +303,55 @@ class TestPublisher(unittest.TestCase):
       yield registration.unregister()
 
 
+   @inlineCallbacks
+   def test_resume(self):
+      handler = ApplicationSession()
+      transport = MockTransport(handler)
+
+      subscription = yield handler.subscribe(lambda: None, 'com.myapp.topic1')
+      registration = yield handler.register(lambda: None, 'com.myapp.procedure1')
+      old_ids = (subscription.id, registration.id)
+
+      ## transport lost while joined, then a new transport is opened
+      handler.onClose(False)
+      transport = MockTransport(handler)
+
+      self.assertNotEqual(handler._session_id, None)
+      self.assertEqual(list(handler._subscriptions.keys()), [subscription.id])
+      self.assertEqual(list(handler._registrations.keys()), [registration.id])
+      self.assertNotEqual((subscription.id, registration.id), old_ids)
+      self.assertTrue(handler._subscriptions[subscription.id].subscription is subscription)
+
+   @inlineCallbacks
+   def test_resume_failed(self):
+      errors = []
+      handler = ApplicationSession()
+      handler.onUserError = lambda e, msg: errors.append(e)
+      transport = MockTransport(handler)
+
+      yield handler.subscribe(lambda: None, 'com.myapp.topic1')
+
+      ## the subscription is rejected when resuming
+      handler.onClose(False)
+      transport = RejectingTransport(handler)
+
+      self.assertEqual(len(errors), 1)
+      self.assertEqual(errors[0].error, "wamp.error.not_authorized")
+
+   @inlineCallbacks
+   def test_no_resume_after_leave(self):
+      handler = ApplicationSession()
+      transport = MockTransport(handler)
+
+      yield handler.subscribe(lambda: None, 'com.myapp.topic1')
+      handler._goodbye_sent = True
+      handler.onClose(True)
+
+      self.assertFalse(handler._resumable)
+
    @inlineCallbacks
    def test_invoke(self):
-      handler = protocol.ApplicationSession()
+      handler = ApplicationSession()
       transport = MockTransport(handler)
 
       def myproc1():
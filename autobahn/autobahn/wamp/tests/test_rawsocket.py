@@ -0,0 +1,176 @@
+###############################################################################
+##
+##  Copyright (C) 2014 Tavendo GmbH
+##
+##  Licensed under the Apache License, Version 2.0 (the "License");
+##  you may not use this file except in compliance with the License.
+##  You may obtain a copy of the License at
+##
+##      http://www.apache.org/licenses/LICENSE-2.0
+##
+##  Unless required by applicable law or agreed to in writing, software
+##  distributed under the License is distributed on an "AS IS" BASIS,
+##  WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+##  See the License for the specific language governing permissions and
+##  limitations under the License.
+##
+###############################################################################
+
+from __future__ import absolute_import
+
+import struct
+
+from twisted.trial import unittest
+from twisted.test.proto_helpers import StringTransport
+
+from autobahn.wamp import message
+from autobahn.wamp import serializer
+from autobahn.twisted.rawsocket import WampRawSocketServerFactory, \
+                                       WampRawSocketClientFactory
+
+
+class RecordingSession:
+   """
+   A WAMP session stub that records the messages received.
+   """
+
+   def __init__(self):
+      self.transport = None
+      self.received = []
+      self.closed = None
+
+   def onOpen(self, transport):
+      self.transport = transport
+
+   def onMessage(self, msg):
+      self.received.append(msg)
+
+   def onClose(self, wasClean):
+      self.closed = wasClean
+
+
+
+def connect(server, client):
+   """
+   Connect a client and a server protocol over string transports,
+   and run the handshake.
+   """
+   server.makeConnection(StringTransport())
+   client.makeConnection(StringTransport())
+   pump(client, server)
+   pump(server, client)
+
+
+def pump(source, target):
+   data = source.transport.value()
+   source.transport.clear()
+   target.dataReceived(data)
+
+
+
+class TestRawSocket(unittest.TestCase):
+
+   def setUp(self):
+      self.serverSession = RecordingSession()
+      self.clientSession = RecordingSession()
+      self.serverFactory = WampRawSocketServerFactory(lambda: self.serverSession, serializers = [serializer.JsonSerializer()], maxMessageLengthExponent = 1)
+      self.clientFactory = WampRawSocketClientFactory(lambda: self.clientSession, serializer = serializer.JsonSerializer())
+      self.server = self.serverFactory.buildProtocol(None)
+      self.client = self.clientFactory.buildProtocol(None)
+
+   def test_handshake(self):
+      self.client.makeConnection(StringTransport())
+      self.assertEqual(self.client.transport.value(), b'\x7f\xf1\x00\x00')
+
+      connect(self.server, self.client)
+      self.assertEqual(self.serverSession.transport, self.server)
+      self.assertEqual(self.clientSession.transport, self.client)
+      self.assertEqual(self.server._peerMaxLength, 2**24)
+      self.assertEqual(self.client._peerMaxLength, 2**10)
+
+   def test_messages(self):
+      connect(self.server, self.client)
+
+      msgs = [message.Call(i, u'com.example.proc', args = [i]) for i in range(1, 4)]
+      for msg in msgs:
+         self.client.send(msg)
+
+      ## messages split over reads are reassembled
+      data = self.client.transport.value()
+      self.server.dataReceived(data[:5])
+      self.server.dataReceived(data[5:-1])
+      self.assertEqual(self.serverSession.received, msgs[:2])
+      self.server.dataReceived(data[-1:])
+      self.assertEqual(self.serverSession.received, msgs)
+
+      self.server.send(message.Result(1, args = [1]))
+      pump(self.server, self.client)
+      self.assertEqual(self.clientSession.received, [message.Result(1, args = [1])])
+
+   def test_message_buffered(self):
+      connect(self.server, self.client)
+      msg = message.Call(1, u'com.example.proc', args = [u'x' * 100])
+      self.client.send(msg)
+      data = self.client.transport.value()
+
+      ## reads are buffered, and only joined once the whole message arrived
+      for i in range(len(data) - 1):
+         self.server.dataReceived(data[i:i + 1])
+      self.assertEqual(self.serverSession.received, [])
+      ## (the header was joined to find the length of the message)
+      self.assertEqual(len(self.server._chunks), len(data) - 4)
+      self.assertEqual(self.server._needed, len(data))
+
+      self.server.dataReceived(data[-1:])
+      self.assertEqual(self.serverSession.received, [msg])
+      self.assertEqual((self.server._chunks, self.server._buffered), ([], 0))
+
+   def test_ping(self):
+      connect(self.server, self.client)
+      self.server.dataReceived(struct.pack("!L", (1 << 24) | 4) + b'ping')
+      self.assertEqual(self.server.transport.value(), struct.pack("!L", (2 << 24) | 4) + b'ping')
+
+   def test_message_too_long(self):
+      connect(self.server, self.client)
+
+      ## the server accepts messages of up to 1024 octets
+      self.assertRaises(Exception, self.client.send, message.Call(1, u'com.example.proc', args = [u'x' * 1024]))
+
+      self.server.dataReceived(struct.pack("!L", 1025))
+      self.assertTrue(self.server.transport.disconnecting)
+
+   def test_serializer_unsupported(self):
+      self.clientFactory = WampRawSocketClientFactory(lambda: self.clientSession, serializer = serializer.MsgPackSerializer())
+      self.client = self.clientFactory.buildProtocol(None)
+      connect(self.server, self.client)
+
+      self.assertEqual(self.serverSession.transport, None)
+      self.assertEqual(self.clientSession.transport, None)
+      self.assertTrue(self.server.transport.disconnecting)
+      self.assertTrue(self.client.transport.disconnecting)
+
+      ## the server closed gracefully, so its error reply gets written
+      self.assertFalse(self.server.transport.disconnected)
+
+   def test_length_unacceptable(self):
+      self.serverFactory.minPeerMessageLengthExponent = 2
+      self.clientFactory = WampRawSocketClientFactory(lambda: self.clientSession, serializer = serializer.JsonSerializer(), maxMessageLengthExponent = 1)
+      self.client = self.clientFactory.buildProtocol(None)
+      self.server.makeConnection(StringTransport())
+      self.client.makeConnection(StringTransport())
+      pump(self.client, self.server)
+
+      ## the server refuses the client with error code 2
+      self.assertEqual(self.server.transport.value(), b'\x7f\x20\x00\x00')
+      pump(self.server, self.client)
+      self.assertEqual(self.serverSession.transport, None)
+      self.assertEqual(self.clientSession.transport, None)
+      self.assertTrue(self.client.transport.disconnecting)
+
+   def test_close(self):
+      connect(self.server, self.client)
+      self.client.close()
+      self.assertTrue(self.client.transport.disconnecting)
+      self.client.connectionLost(None)
+      self.assertEqual(self.clientSession.closed, True)
+      self.assertFalse(self.client.isOpen())
@@ -0,0 +1,94 @@
+###############################################################################
+##
+##  Copyright (C) 2014 Tavendo GmbH
+##
+##  Licensed under the Apache License, Version 2.0 (the "License");
+##  you may not use this file except in compliance with the License.
+##  You may obtain a copy of the License at
+##
+##      http://www.apache.org/licenses/LICENSE-2.0
+##
+##  Unless required by applicable law or agreed to in writing, software
+##  distributed under the License is distributed on an "AS IS" BASIS,
+##  WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+##  See the License for the specific language governing permissions and
+##  limitations under the License.
+##
+###############################################################################
+
+from __future__ import absolute_import
+
+import base64
+import hashlib
+
+from twisted.trial import unittest
+from twisted.internet.task import Clock
+from twisted.test.proto_helpers import StringTransport
+
+from autobahn.twisted.websocket import WebSocketClientFactory, \
+                                       WebSocketClientProtocol
+
+
+
+class FakeConnector:
+
+   def __init__(self):
+      self.attempts = 0
+
+   def connect(self):
+      self.attempts += 1
+
+
+
+class TestReconnect(unittest.TestCase):
+
+   def setUp(self):
+      self.factory = WebSocketClientFactory("ws://localhost:9000")
+      self.factory.protocol = WebSocketClientProtocol
+      self.factory.reactor = Clock()
+      self.factory.setProtocolOptions(openHandshakeTimeout = 0, closeHandshakeTimeout = 0)
+      self.factory.setReconnectOptions(autoReconnect = True, jitter = False)
+      self.connector = FakeConnector()
+
+   def connect(self):
+      proto = self.factory.buildProtocol(None)
+      proto.makeConnection(StringTransport())
+      accept = base64.b64encode(hashlib.sha1(proto.websocket_key + b"258EAFA5-E914-47DA-95CA-C5AB0DC85B11").digest())
+      proto.dataReceived(b"\x0d\x0a".join([b"HTTP/1.1 101 Switching Protocols",
+                                           b"Upgrade: websocket",
+                                           b"Connection: Upgrade",
+                                           b"Sec-WebSocket-Accept: " + accept,
+                                           b"", b""]))
+      self.assertEqual(proto.state, proto.STATE_OPEN)
+      return proto
+
+   def lose(self, proto):
+      proto.connectionLost(None)
+      self.factory.clientConnectionLost(self.connector, None)
+      self.factory.reactor.advance(self.factory.reconnectInitialDelay)
+
+   def test_lost(self):
+      self.lose(self.connect())
+      self.assertEqual(self.connector.attempts, 1)
+
+   def test_closed_by_peer(self):
+      proto = self.connect()
+      proto.dataReceived(b"\x88\x02\x03\xe9")
+      self.lose(proto)
+      self.assertEqual(self.connector.attempts, 1)
+
+   def test_closed_by_me(self):
+      proto = self.connect()
+      proto.sendClose()
+      self.lose(proto)
+      self.assertEqual(self.connector.attempts, 0)
+
+      ## the next connection is reconnected again when lost
+      self.lose(self.connect())
+      self.assertEqual(self.connector.attempts, 1)
+
+   def test_failed_by_me(self):
+      proto = self.connect()
+      proto.failConnection()
+      self.lose(proto)
+      self.assertEqual(self.connector.attempts, 1)
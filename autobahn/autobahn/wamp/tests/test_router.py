@@ -0,0 +1,265 @@
+###############################################################################
+##
+##  Copyright (C) 2014 Tavendo GmbH
+##
+##  Licensed under the Apache License, Version 2.0 (the "License");
+##  you may not use this file except in compliance with the License.
+##  You may obtain a copy of the License at
+##
+##      http://www.apache.org/licenses/LICENSE-2.0
+##
+##  Unless required by applicable law or agreed to in writing, software
+##  distributed under the License is distributed on an "AS IS" BASIS,
+##  WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+##  See the License for the specific language governing permissions and
+##  limitations under the License.
+##
+###############################################################################
+
+from __future__ import absolute_import
+
+from twisted.trial import unittest
+
+from autobahn import util
+from autobahn.wamp import message
+from autobahn.wamp.router import RouterFactory
+from autobahn.wamp.protocol import RouterApplicationSession
+from autobahn.wamp.serializer import JsonSerializer
+from autobahn.twisted.wamp import ApplicationSession
+from autobahn.wamp.tests.test_broker import RecordingSession
+
+
+class EmbeddedSession(ApplicationSession):
+   """
+   An application session run directly attached to the router.
+   """
+
+   def onConnect(self):
+      self.events = []
+      self.join(u'realm1')
+
+   def onJoin(self, details):
+      self.subscribe(lambda *args, **kwargs: self.events.append((list(args), kwargs)), u'com.myapp.topic1')
+      self.register(lambda a, b: a + b, u'com.myapp.add2')
+
+
+
+class TestRouterStats(unittest.TestCase):
+
+   def setUp(self):
+      self.router = RouterFactory().get('realm1')
+      self.caller = RecordingSession()
+      self.callee = RecordingSession()
+      self.router.attach(self.caller)
+      self.router.attach(self.callee)
+
+   def tearDown(self):
+      self.router.detach(self.caller)
+      self.router.detach(self.callee)
+
+   def call(self, procedure, *args):
+      self.caller.sent = []
+      self.router.process(self.caller, message.Call(util.id(), procedure, args = list(args)))
+      return self.caller.sent
+
+   def test_broker_stats(self):
+      self.router.process(self.callee, message.Subscribe(util.id(), 'com.myapp.topic1'))
+      for i in range(3):
+         self.router.process(self.caller, message.Publish(util.id(), 'com.myapp.topic1', args = [i]))
+      self.router.process(self.caller, message.Publish(util.id(), 'com.myapp.topic2'))
+
+      stats = self.router.stats()
+      self.assertEqual(stats['sessions'], 2)
+      self.assertEqual(stats['broker']['publishes'], 4)
+      self.assertEqual(stats['broker']['deliveries'], 3)
+      self.assertEqual(stats['broker']['subscriptions'], 1)
+
+      topic = stats['broker']['topics']['com.myapp.topic1']
+      self.assertEqual(topic['publishes'], 3)
+      self.assertEqual(topic['fanout']['counts'][1], 3)
+      self.assertEqual(stats['broker']['topics']['com.myapp.topic2']['fanout']['counts'][0], 1)
+
+   def test_dealer_stats(self):
+      self.router.process(self.callee, message.Register(util.id(), 'com.myapp.add2'))
+
+      for i in range(2):
+         self.call('com.myapp.add2', i, 1)
+         invocation = self.callee.sent[-1]
+         self.router.process(self.callee, message.Yield(invocation.request, args = [i + 1]))
+
+      self.call('com.myapp.add2', 'a', 1)
+      invocation = self.callee.sent[-1]
+      self.router.process(self.callee, message.Error(message.Invocation.MESSAGE_TYPE, invocation.request, 'wamp.error.invalid_argument'))
+
+      stats = self.router.stats()['dealer']
+      self.assertEqual(stats['calls'], 3)
+      self.assertEqual(stats['errors'], 1)
+      self.assertEqual(stats['pending'], 0)
+
+      procedure = stats['procedures']['com.myapp.add2']
+      self.assertEqual(procedure['calls'], 3)
+      self.assertEqual(procedure['errors'], 1)
+      self.assertEqual(procedure['latency']['count'], 2)
+
+   def test_meta_procedure(self):
+      sent = self.call('wamp.metaproc.stats')
+      self.assertEqual(len(sent), 1)
+      self.assertIsInstance(sent[0], message.Result)
+      self.assertEqual(sent[0].args[0]['realm'], 'realm1')
+      self.assertEqual(sent[0].args[0]['dealer']['calls'], 1)
+
+      sent = self.call('wamp.metaproc.stats', 23)
+      self.assertIsInstance(sent[0], message.Error)
+      self.assertEqual(sent[0].error, 'wamp.error.runtime_error')
+
+      self.callee.sent = []
+      self.router.process(self.callee, message.Register(util.id(), 'wamp.metaproc.stats'))
+      self.assertIsInstance(self.callee.sent[0], message.Error)
+
+   def test_evict_cold(self):
+      self.patch(self.router._broker, 'STATS_MAX_TOPICS', 2)
+      for topic in ['com.myapp.topic1', 'com.myapp.topic2', 'com.myapp.topic1', 'com.myapp.topic3']:
+         self.router.process(self.caller, message.Publish(util.id(), topic))
+
+      stats = self.router.stats()['broker']
+      self.assertEqual(sorted(stats['topics']), ['com.myapp.topic1', 'com.myapp.topic3'])
+      self.assertEqual(stats['topics']['com.myapp.topic1']['publishes'], 2)
+      self.assertEqual(stats['publishes'], 4)
+
+      self.patch(self.router._dealer, 'STATS_MAX_PROCEDURES', 1)
+      for procedure in ['com.myapp.proc1', 'com.myapp.proc2']:
+         self.router.process(self.callee, message.Register(util.id(), procedure))
+         self.call(procedure)
+
+      stats = self.router.stats()['dealer']
+      self.assertEqual(list(stats['procedures']), ['com.myapp.proc2'])
+      self.assertEqual(stats['calls'], 2)
+
+   def test_interval_requires_timer(self):
+      self.assertRaises(Exception, RouterFactory, statsInterval = 5)
+
+
+
+class TestEmbeddedSession(unittest.TestCase):
+
+   def setUp(self):
+      routerFactory = RouterFactory()
+      self.session = EmbeddedSession()
+      RouterApplicationSession(self.session, routerFactory)
+
+      ## a remote session whose messages are received in passthrough mode
+      self.router = routerFactory.get('realm1')
+      self.remote = RecordingSession()
+      self.router.attach(self.remote)
+      self.serializer = JsonSerializer(passthrough = True)
+
+   def process(self, data):
+      msg = self.serializer.unserialize(data, False)
+      self.assertNotEqual(msg.payload, None)
+      self.router.process(self.remote, msg)
+
+   def test_event(self):
+      self.process(b'[16, 1, {}, "com.myapp.topic1", [1, 2], {"a": 3}]')
+      self.process(b'[16, 2, {}, "com.myapp.topic1", [4]]')
+      self.assertEqual(self.session.events, [([1, 2], {u'a': 3}), ([4], {})])
+
+   def test_invocation(self):
+      self.process(b'[48, 1, {}, "com.myapp.add2", [2, 3]]')
+      self.assertIsInstance(self.remote.sent[-1], message.Result)
+      self.assertEqual(self.remote.sent[-1].args, [5])
+
+   def test_result(self):
+      self.router.process(self.remote, message.Register(util.id(), u'com.myapp.remote'))
+      results = []
+      self.session.call(u'com.myapp.remote').addCallback(results.append)
+      invocation = self.remote.sent[-1]
+      self.process(b'[70, ' + str(invocation.request).encode('ascii') + b', {}, [7]]')
+      self.assertEqual(results, [7])
+
+
+
+class TestResultCache(unittest.TestCase):
+
+   def setUp(self):
+      self.router = RouterFactory().get('realm1')
+      self.caller = RecordingSession()
+      self.callee = RecordingSession()
+      self.router.attach(self.caller)
+      self.router.attach(self.callee)
+      self.register('com.myapp.lookup', cache = 60)
+
+   def tearDown(self):
+      self.router.detach(self.caller)
+      self.router.detach(self.callee)
+
+   def register(self, procedure, **options):
+      self.callee.sent = []
+      self.router.process(self.callee, message.Register(util.id(), procedure, **options))
+      return self.callee.sent[0].registration
+
+   def call(self, procedure, *args):
+      """
+      Call a procedure, and let the callee (if invoked) yield the first argument.
+      Returns the result and whether the callee was invoked.
+      """
+      self.caller.sent = []
+      self.callee.sent = []
+      self.router.process(self.caller, message.Call(util.id(), procedure, args = list(args)))
+      invoked = len(self.callee.sent) == 1
+      if invoked:
+         self.router.process(self.callee, message.Yield(self.callee.sent[0].request, args = [args[0]]))
+      return self.caller.sent[-1].args, invoked
+
+   def test_cached(self):
+      self.assertEqual(self.call('com.myapp.lookup', 1), ([1], True))
+      self.assertEqual(self.call('com.myapp.lookup', 1), ([1], False))
+      self.assertEqual(self.call('com.myapp.lookup', 2), ([2], True))
+
+      stats = self.router.stats()['dealer']
+      self.assertEqual(stats['cached'], 1)
+      self.assertEqual(stats['cache'], 2)
+      self.assertEqual(stats['procedures']['com.myapp.lookup']['cached'], 1)
+
+   def test_not_cached(self):
+      self.register('com.myapp.update')
+      self.call('com.myapp.update', 1)
+      self.assertEqual(self.call('com.myapp.update', 1), ([1], True))
+
+   def test_expired(self):
+      self.call('com.myapp.lookup', 1)
+      for key, entry in self.router._dealer._cache.items():
+         self.router._dealer._cache[key] = (0,) + entry[1:]
+      self.assertEqual(self.call('com.myapp.lookup', 1), ([1], True))
+
+   def test_invalidate(self):
+      self.call('com.myapp.lookup', 1)
+      self.assertEqual(self.call('wamp.metaproc.cache.invalidate', 'com.myapp.lookup'), ([1], False))
+      self.assertEqual(self.call('com.myapp.lookup', 1), ([1], True))
+
+   def test_unregister(self):
+      registration = self.router._dealer._procs_to_regs['com.myapp.lookup'][0]
+      self.call('com.myapp.lookup', 1)
+      self.router.process(self.callee, message.Unregister(util.id(), registration))
+      self.register('com.myapp.lookup', cache = 60)
+      self.assertEqual(self.call('com.myapp.lookup', 1), ([1], True))
+
+   def test_bounded(self):
+      self.patch(self.router._dealer, 'CACHE_MAX_ENTRIES', 2)
+      for i in range(3):
+         self.call('com.myapp.lookup', i)
+      self.assertEqual(self.call('com.myapp.lookup', 0), ([0], True))
+      self.assertEqual(self.call('com.myapp.lookup', 2), ([2], False))
+
+   def test_invalidate_pending(self):
+      self.router.process(self.caller, message.Call(util.id(), 'com.myapp.lookup', args = [1]))
+      invocation = self.callee.sent[-1]
+      self.call('wamp.metaproc.cache.invalidate', 'com.myapp.lookup')
+      self.router.process(self.callee, message.Yield(invocation.request, args = ['OLD']))
+      self.assertEqual(self.call('com.myapp.lookup', 1), ([1], True))
+
+   def test_key_types(self):
+      self.assertEqual(self.call('com.myapp.lookup', {1: 'a'}), ([{1: 'a'}], True))
+      self.assertEqual(self.call('com.myapp.lookup', {'1': 'a'}), ([{'1': 'a'}], True))
+      self.assertEqual(self.call('com.myapp.lookup', True), ([True], True))
+      self.assertEqual(self.call('com.myapp.lookup', 1), ([1], True))
+      self.assertEqual(self.call('com.myapp.lookup', {1: 'a'}), ([{1: 'a'}], False))
@@ -25,6 +25,7 @@ from autobahn import wamp
 from autobahn.wamp import message
 from autobahn.wamp import role
 from autobahn.wamp import serializer
+from autobahn.wamp.exception import ProtocolError
 
 
 def generate_test_messages():
@@ -95,22 +96,146 @@ class TestSerializer(unittest.TestCase):
 
    def test_caching(self):
       for msg in generate_test_messages():
-         ## message serialization cache is initially empty
-         self.assertEqual(msg._serialized, {})
+         serialized = []
          for serializer in self.serializers:
-
-            ## verify message serialization is not yet cached
-            self.assertFalse(serializer._serializer in msg._serialized)
             bytes, binary = serializer.serialize(msg)
+            serialized.append(bytes)
+
+         ## now the message serializations must be cached
+         for serializer, bytes in zip(self.serializers, serialized):
+            self.assertTrue(serializer.serialize(msg)[0] is bytes)
+
+         ## and after resetting the serialization cache, messages
+         ## are serialized again
+         msg.uncache()
+         for serializer, bytes in zip(self.serializers, serialized):
+            bytes2, binary = serializer.serialize(msg)
+            self.assertFalse(bytes2 is bytes)
+            self.assertEqual(bytes2, bytes)
+
+
+   def test_slots(self):
+      for msg in generate_test_messages():
+         ## messages have no per-instance dictionary
+         self.assertFalse(hasattr(msg, '__dict__'))
+
+
+   def test_passthrough(self):
+      forward = {
+         message.Publish: lambda msg: message.Event(1, 2, payload = msg.payload),
+         message.Call: lambda msg: message.Invocation(1, 2, payload = msg.payload),
+         message.Yield: lambda msg: message.Result(1, payload = msg.payload)
+      }
+      for msg in generate_test_messages():
+         if msg.__class__ in forward and msg.args:
+            for serializer in self.serializers:
+               passthrough = serializer.__class__(passthrough = True)
+
+               ## the payload is kept in serialized form
+               msg2 = passthrough.unserialize(*serializer.serialize(msg))
+               self.assertEqual((msg2.args, msg2.kwargs), (None, None))
+               self.assertEqual(msg2.payload.serializer.__class__, serializer._serializer.__class__)
+
+               ## and arrives unchanged, with the same or another serializer
+               for serializer2 in self.serializers:
+                  msg3 = serializer2.unserialize(*serializer2.serialize(forward[msg.__class__](msg2)))
+                  self.assertEqual((msg3.args, msg3.kwargs), (msg.args, msg.kwargs))
+
+
+   def test_passthrough_json(self):
+      passthrough = serializer.JsonSerializer(passthrough = True)
+
+      ## the JSON payload is located in the text received, whitespace and all
+      msg = passthrough.unserialize(b' [16 , 1, {}, "com.myapp.topic1" ,[1, "]"] , {"a": [2]} ] ', False)
+      self.assertEqual(msg.topic, u'com.myapp.topic1')
+      self.assertEqual(msg.payload.data, b'[1, "]"] , {"a": [2]} ')
+      self.assertEqual(msg.payload.unserialize(), [[1, u']'], {u'a': [2]}])
+
+      ## messages without payload, or of other types, are unserialized completely
+      self.assertEqual(passthrough.unserialize(b'[16, 1, {}, "com.myapp.topic1"]', False).payload, None)
+      self.assertEqual(passthrough.unserialize(b'[36, 1, 2, {}, [1]]', False).args, [1])
+
+      ## only valid JSON is forwarded
+      for data in [b'[16, 1, {}, "com.myapp.topic1", [1, 2}]',
+                   b'[16, 1, {}, "com.myapp.topic1", [1] {}]',
+                   b'[16, 1, {}, "com.myapp.topic1", [1]] x',
+                   b'[16, 1, {}, "com.myapp.topic1", [1]',
+                   b'[16, 1, {}, "com.myapp.topic1", 1]']:
+         self.assertRaises(ProtocolError, passthrough.unserialize, data, False)
+
+
+
+   def test_batched(self):
+      msgs = generate_test_messages()
+      for ser in self.serializers:
+         batched = ser.__class__(batched = True)
+         self.assertEqual(batched.SERIALIZER_ID, ser.SERIALIZER_ID + ".batched")
+
+         ## serializations of messages concatenate to a batch
+         payload = b''.join([batched.serialize(msg)[0] for msg in msgs])
+         self.assertEqual(batched.unserializeBatch(payload, batched._serializer.BINARY), msgs)
+
+         ## a truncated batch is a protocol error
+         self.assertRaises(ProtocolError, batched.unserializeBatch, payload[:-1], batched._serializer.BINARY)
+
+         ## non-batched serializers unserialize one message
+         bytes, binary = ser.serialize(msgs[0])
+         self.assertEqual(ser.unserializeBatch(bytes, binary), [msgs[0]])
+
+
+
+class TestJsonBackends(unittest.TestCase):
+
+   ARGS = [u'hello', u'gr\u00fc\u00dfe', u'\u4f60\u597d', u'\U0001f600', u'a/b "c" \\d\n',
+           0, -1, 2**31, 2**53, -2**53, 1.5, -0.25, 0.1 + 0.2, 1e-300, True, False, None,
+           [], {}, [1, [2, [3]]], {u'x': {u'y': [u'z']}}]
+
+   def checkConformance(self, backend):
+      if backend not in serializer.JSON_BACKENDS:
+         raise unittest.SkipTest("JSON backend '{}' not available".format(backend))
+
+      msgs = [message.Event(123456, 2**53, args = self.ARGS, kwargs = {u'gr\u00fc\u00dfe': self.ARGS}),
+              message.Call(2**53, u'com.myapp.\u00fcber', args = self.ARGS),
+              message.Result(123456, args = [self.ARGS], kwargs = {u'a': 2**53})]
+
+      reference = serializer.JsonSerializer(backend = 'json')
+
+      json = serializer.JsonSerializer(backend = backend)
+      for msg in msgs:
+         ## all backends produce equivalent WAMP messages, and
+         ## understand each others output
+         bytes, binary = json.serialize(msg)
+         self.assertEqual(reference.unserialize(bytes, binary), msg)
+         self.assertEqual(json.unserialize(bytes, binary), msg)
+         self.assertEqual(json.unserialize(*reference.serialize(msg)), msg)
+
+      ## UTF-8 encoded byte strings are serialized as the strings they encode
+      msg = json.unserialize(*json.serialize(message.Event(1, 2, args = [u'gr\u00fc\u00dfe'.encode('utf8')])))
+      self.assertEqual(msg.args, [u'gr\u00fc\u00dfe'])
+
+   def test_conformance_json(self):
+      self.checkConformance('json')
+
+   def test_conformance_orjson(self):
+      self.checkConformance('orjson')
+
+   def test_conformance_ujson(self):
+      self.checkConformance('ujson')
+
+   def test_conformance_simplejson(self):
+      self.checkConformance('simplejson')
+
 
-            ## now the message serialization must be cached
-            self.assertTrue(serializer._serializer in msg._serialized)
-            self.assertEqual(msg._serialized[serializer._serializer], bytes)
+   def test_backend(self):
+      ## the standard library is used unless selected otherwise
+      self.assertEqual(serializer.defaultJsonBackend(), 'json')
+      self.assertEqual(serializer.JsonObjectSerializer().backend, 'json')
 
-            ## and after resetting the serialization cache, message
-            ## serialization is gone
-            msg.uncache()
-            self.assertFalse(serializer._serializer in msg._serialized)
+      ## applications opt in to other backends, when available
+      self.patch(serializer, 'JSON_BACKEND_PREFERENCE', ['nonexistent', 'json'])
+      self.assertEqual(serializer.defaultJsonBackend(), 'json')
+      self.assertEqual(serializer.JsonObjectSerializer('json').backend, 'json')
+      self.assertRaises(Exception, serializer.JsonObjectSerializer, 'nonexistent')
 
 
 
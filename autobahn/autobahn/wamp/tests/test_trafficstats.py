@@ -0,0 +1,107 @@
+###############################################################################
+##
+##  Copyright (C) 2014 Tavendo GmbH
+##
+##  Licensed under the Apache License, Version 2.0 (the "License");
+##  you may not use this file except in compliance with the License.
+##  You may obtain a copy of the License at
+##
+##      http://www.apache.org/licenses/LICENSE-2.0
+##
+##  Unless required by applicable law or agreed to in writing, software
+##  distributed under the License is distributed on an "AS IS" BASIS,
+##  WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+##  See the License for the specific language governing permissions and
+##  limitations under the License.
+##
+###############################################################################
+
+from __future__ import absolute_import
+
+import struct
+
+from twisted.trial import unittest
+from twisted.internet.task import Clock
+from twisted.test.proto_helpers import StringTransport
+
+from autobahn.twisted.websocket import WebSocketServerFactory, \
+                                       WebSocketServerProtocol
+from autobahn.websocket.protocol import TrafficStats, NullTrafficStats
+
+
+HANDSHAKE = b"\x0d\x0a".join([
+   b"GET / HTTP/1.1",
+   b"Host: localhost:9000",
+   b"Upgrade: websocket",
+   b"Connection: Upgrade",
+   b"Sec-WebSocket-Key: dGhlIHNhbXBsZSBub25jZQ==",
+   b"Sec-WebSocket-Version: 13",
+   b"", b""])
+
+
+
+class EchoServerProtocol(WebSocketServerProtocol):
+
+   def onMessage(self, payload, isBinary):
+      self.sendMessage(payload, isBinary)
+
+
+
+class TestTrafficStatsSampling(unittest.TestCase):
+
+   def connect(self, sampling, **options):
+      """
+      Open connections with the given sampling and echo one message on each.
+      """
+      factory = WebSocketServerFactory("ws://localhost:9000")
+      factory.protocol = EchoServerProtocol
+      factory.reactor = Clock()
+      factory.setProtocolOptions(openHandshakeTimeout = 0, requireMaskedClientFrames = False, trafficStatsSampling = sampling, **options)
+
+      protos = []
+      for i in range(4):
+         proto = factory.buildProtocol(None)
+         proto.makeConnection(StringTransport())
+         proto.dataReceived(HANDSHAKE)
+         proto.dataReceived(struct.pack("!BB", 0x81, 5) + b"hello")
+         self.assertIn(b"hello", proto.transport.value())
+         protos.append(proto)
+      return protos
+
+   def assertTracked(self, proto):
+      self.assertEqual(proto.trafficStats.__class__, TrafficStats)
+      self.assertEqual(proto.trafficStats.incomingWebSocketMessages, 1)
+      self.assertEqual(proto.trafficStats.outgoingWebSocketMessages, 1)
+      self.assertEqual(proto.trafficStats.incomingOctetsAppLevel, 5)
+      self.assertEqual(proto.trafficStats.outgoingOctetsWireLevel, 7)
+
+   def assertNotTracked(self, proto):
+      self.assertIsInstance(proto.trafficStats, TrafficStats)
+      self.assertIsInstance(proto.trafficStats, NullTrafficStats)
+      self.assertFalse(proto._trackTraffic)
+      self.assertEqual(proto.trafficStats.incomingWebSocketMessages, 0)
+      self.assertEqual(proto.trafficStats.outgoingWebSocketMessages, 0)
+      self.assertEqual(proto.trafficStats.__json__()['outgoingOctetsWireLevel'], 0)
+
+   def test_every_connection(self):
+      for proto in self.connect(1):
+         self.assertTracked(proto)
+
+   def test_no_connection(self):
+      for proto in self.connect(0):
+         self.assertNotTracked(proto)
+         ## the per-read/per-write methods without accounting are used
+         self.assertEqual(proto.sendData, proto._sendDataUntracked)
+
+   def test_no_connection_metrics(self):
+      ## with factory metrics, the accounting methods run but leave the stats alone
+      for proto in self.connect(0, trackMetrics = True):
+         self.assertNotTracked(proto)
+         self.assertNotEqual(proto.sendData, proto._sendDataUntracked)
+
+   def test_one_in_n(self):
+      protos = self.connect(2)
+      self.assertTracked(protos[0])
+      self.assertNotTracked(protos[1])
+      self.assertTracked(protos[2])
+      self.assertNotTracked(protos[3])
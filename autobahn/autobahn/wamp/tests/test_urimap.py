@@ -0,0 +1,67 @@
+###############################################################################
+##
+##  Copyright (C) 2014 Tavendo GmbH
+##
+##  Licensed under the Apache License, Version 2.0 (the "License");
+##  you may not use this file except in compliance with the License.
+##  You may obtain a copy of the License at
+##
+##      http://www.apache.org/licenses/LICENSE-2.0
+##
+##  Unless required by applicable law or agreed to in writing, software
+##  distributed under the License is distributed on an "AS IS" BASIS,
+##  WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+##  See the License for the specific language governing permissions and
+##  limitations under the License.
+##
+###############################################################################
+
+from __future__ import absolute_import
+
+from twisted.trial import unittest
+
+from autobahn.wamp1.urimap import UriMap
+
+
+
+class TestUriMap(unittest.TestCase):
+
+   def test_longest_prefix(self):
+      m = UriMap()
+      m["http://example.com/"] = 1
+      m["http://example.com/event#"] = 2
+      m["http://example.com/event#a"] = 3
+
+      self.assertEqual(m.longestPrefix("http://example.com/event#a"), ("http://example.com/event#a", 3))
+      self.assertEqual(m.longestPrefix("http://example.com/event#b"), ("http://example.com/event#", 2))
+      self.assertEqual(m.longestPrefix("http://example.com/other"), ("http://example.com/", 1))
+      self.assertEqual(m.longestPrefix("http://example.com"), None)
+
+      del m["http://example.com/event#"]
+      self.assertEqual(m.longestPrefix("http://example.com/event#b"), ("http://example.com/", 1))
+
+   def test_dict_methods(self):
+      m = UriMap({"a/": 1}, b = 2)
+      m.update([("ab/", 3)])
+      m.update({"abc/": 4})
+      m.setdefault("abcd/", 5)
+      self.assertEqual(m.longestPrefix("abcd/x"), ("abcd/", 5))
+      self.assertEqual(m.longestPrefix("bx"), ("b", 2))
+
+      self.assertEqual(m.pop("abcd/"), 5)
+      self.assertEqual(m.pop("abcd/", None), None)
+      self.assertEqual(m.longestPrefix("abcd/x"), None)
+      self.assertEqual(m.longestPrefix("abc/x"), ("abc/", 4))
+
+      n = m.copy()
+      self.assertIsInstance(n, UriMap)
+      while m:
+         m.popitem()
+      self.assertEqual(m._lengths, [])
+      self.assertEqual(m.longestPrefix("abc/x"), None)
+      self.assertEqual(n.longestPrefix("abc/x"), ("abc/", 4))
+
+      n.clear()
+      self.assertEqual(n.longestPrefix("abc/x"), None)
+      n["abc/"] = 6
+      self.assertEqual(n.longestPrefix("abc/x"), ("abc/", 6))
@@ -0,0 +1,204 @@
+###############################################################################
+##
+##  Copyright (C) 2014 Tavendo GmbH
+##
+##  Licensed under the Apache License, Version 2.0 (the "License");
+##  you may not use this file except in compliance with the License.
+##  You may obtain a copy of the License at
+##
+##      http://www.apache.org/licenses/LICENSE-2.0
+##
+##  Unless required by applicable law or agreed to in writing, software
+##  distributed under the License is distributed on an "AS IS" BASIS,
+##  WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+##  See the License for the specific language governing permissions and
+##  limitations under the License.
+##
+###############################################################################
+
+from __future__ import absolute_import
+
+import struct
+
+from twisted.trial import unittest
+from twisted.internet.task import Clock
+from twisted.test.proto_helpers import StringTransport
+
+from autobahn.wamp import message
+from autobahn.wamp import serializer
+from autobahn.twisted.websocket import WampWebSocketServerFactory, \
+                                       WebSocketServerFactory, \
+                                       WebSocketServerProtocol
+
+
+HANDSHAKE = b"\x0d\x0a".join([
+   b"GET / HTTP/1.1",
+   b"Host: localhost:9000",
+   b"Upgrade: websocket",
+   b"Connection: Upgrade",
+   b"Sec-WebSocket-Key: dGhlIHNhbXBsZSBub25jZQ==",
+   b"Sec-WebSocket-Version: 13",
+   b"Sec-WebSocket-Protocol: wamp.2.json",
+   b"", b""])
+
+
+def frame(payload):
+   ## unmasked text frame (the factory is told to accept those)
+   assert len(payload) <= 125
+   return struct.pack("!BB", 0x81, len(payload)) + payload
+
+
+
+class CountingTransport(StringTransport):
+
+   def __init__(self):
+      StringTransport.__init__(self)
+      self.writes = 0
+
+   def write(self, data):
+      self.writes += 1
+      StringTransport.write(self, data)
+
+   def writeSequence(self, data):
+      self.writes += 1
+      StringTransport.write(self, b''.join(data))
+
+
+
+class EchoSession:
+   """
+   A WAMP session stub that answers every message with an Error.
+   """
+
+   def __init__(self):
+      self.received = []
+
+   def onOpen(self, transport):
+      self._transport = transport
+
+   def onMessage(self, msg):
+      self.received.append(msg)
+      self._transport.send(message.Error(message.Call.MESSAGE_TYPE, msg.request, u'com.example.error'))
+
+   def onClose(self, wasClean):
+      pass
+
+
+
+class TestWampWebSocketBatch(unittest.TestCase):
+
+   def setUp(self):
+      self.session = EchoSession()
+      self.factory = WampWebSocketServerFactory(lambda: self.session, "ws://localhost:9000", serializers = [serializer.JsonSerializer()])
+      self.factory.reactor = Clock()
+      self.factory.setProtocolOptions(openHandshakeTimeout = 0, requireMaskedClientFrames = False)
+      self.proto = self.factory.buildProtocol(None)
+      self.proto.makeConnection(StringTransport())
+      self.proto.dataReceived(HANDSHAKE)
+      self.proto.transport = CountingTransport()
+
+   def tearDown(self):
+      self.proto.connectionLost(None)
+
+   def test_batch(self):
+      s = serializer.JsonSerializer()
+      data = b''.join([frame(s.serialize(message.Call(i, u'com.example.proc'))[0]) for i in range(1, 4)])
+
+      self.proto.dataReceived(data)
+
+      self.assertEqual([msg.request for msg in self.session.received], [1, 2, 3])
+
+      ## all three replies went out with one write
+      self.assertEqual(self.proto.transport.writes, 1)
+      self.assertEqual(self.proto.transport.value().count(b'com.example.error'), 3)
+
+   def test_batch_split(self):
+      s = serializer.JsonSerializer()
+      data = b''.join([frame(s.serialize(message.Call(i, u'com.example.proc'))[0]) for i in range(1, 3)])
+
+      ## second message completes with the second read only
+      self.proto.dataReceived(data[:-3])
+      self.assertEqual([msg.request for msg in self.session.received], [1])
+      self.assertEqual(self.proto.transport.writes, 1)
+
+      self.proto.dataReceived(data[-3:])
+      self.assertEqual([msg.request for msg in self.session.received], [1, 2])
+      self.assertEqual(self.proto.transport.writes, 2)
+
+   def test_batch_protocol_error(self):
+      s = serializer.JsonSerializer()
+      data = b''.join([frame(b'[1000]'), frame(s.serialize(message.Call(1, u'com.example.proc'))[0])])
+
+      self.proto.dataReceived(data)
+
+      ## the connection was failed on the first message, so the second is not processed
+      self.assertEqual(self.session.received, [])
+      self.assertTrue(self.proto.failedByMe)
+
+
+
+class TestWampWebSocketBatched(unittest.TestCase):
+
+   def setUp(self):
+      self.session = EchoSession()
+      self.factory = WampWebSocketServerFactory(lambda: self.session, "ws://localhost:9000")
+      self.factory.reactor = Clock()
+      self.factory.setProtocolOptions(openHandshakeTimeout = 0, requireMaskedClientFrames = False)
+      self.proto = self.factory.buildProtocol(None)
+      self.proto.makeConnection(StringTransport())
+      self.proto.dataReceived(HANDSHAKE.replace(b"wamp.2.json", b"wamp.2.json.batched"))
+      self.proto.transport = CountingTransport()
+
+   def tearDown(self):
+      self.proto.connectionLost(None)
+
+   def test_batched(self):
+      self.assertEqual(self.proto._serializer.SERIALIZER_ID, "json.batched")
+
+      s = serializer.JsonSerializer(batched = True)
+      self.proto.dataReceived(frame(b''.join([s.serialize(message.Call(i, u'com.example.proc'))[0] for i in range(1, 4)])))
+
+      ## all messages in the WebSocket message were processed, and the
+      ## replies went out as one WebSocket message
+      self.assertEqual([msg.request for msg in self.session.received], [1, 2, 3])
+      self.assertEqual(self.proto.transport.writes, 1)
+      data = self.proto.transport.value()
+      self.assertEqual(len(s.unserializeBatch(data[2:], False)), 3)
+
+   def test_batched_flush(self):
+      self.proto.send(message.Result(1))
+      self.proto.send(message.Result(2))
+      self.assertEqual(self.proto.transport.writes, 0)
+
+      ## messages sent are flushed at the end of the reactor iteration
+      self.factory.reactor.advance(0)
+      self.assertEqual(self.proto.transport.writes, 1)
+
+      ## or when the batch has grown large enough
+      self.proto.MAX_BATCH_SIZE = 20
+      self.proto.send(message.Result(3, args = [u'x' * 20]))
+      self.assertEqual(self.proto.transport.writes, 2)
+
+
+
+class TestPreparedMessage(unittest.TestCase):
+
+   def test_payload(self):
+      factory = WebSocketServerFactory("ws://localhost:9000")
+      factory.protocol = WebSocketServerProtocol
+      factory.reactor = Clock()
+      factory.setProtocolOptions(openHandshakeTimeout = 0)
+      proto = factory.buildProtocol(None)
+      proto.makeConnection(StringTransport())
+      proto.dataReceived(HANDSHAKE.replace(b"Sec-WebSocket-Protocol: wamp.2.json\x0d\x0a", b""))
+      proto.transport.clear()
+
+      for payload in [b"", b"hello", b"x" * 70000]:
+         msg = factory.prepareMessage(payload, isBinary = True)
+         self.assertIsInstance(msg.payloadHybi, bytes)
+
+         proto.sendPreparedMessage(msg)
+         self.assertEqual(proto.transport.value(), msg.payloadHybi)
+         proto.transport.clear()
+
+      self.assertEqual(factory.prepareMessage(b"hello").payloadHybi, b"\x81\x05hello")
@@ -0,0 +1,110 @@
+###############################################################################
+##
+##  Copyright (C) 2014 Tavendo GmbH
+##
+##  Licensed under the Apache License, Version 2.0 (the "License");
+##  you may not use this file except in compliance with the License.
+##  You may obtain a copy of the License at
+##
+##      http://www.apache.org/licenses/LICENSE-2.0
+##
+##  Unless required by applicable law or agreed to in writing, software
+##  distributed under the License is distributed on an "AS IS" BASIS,
+##  WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+##  See the License for the specific language governing permissions and
+##  limitations under the License.
+##
+###############################################################################
+
+from __future__ import absolute_import
+
+import struct
+
+from twisted.trial import unittest
+from twisted.internet.task import Clock
+from twisted.internet.protocol import Factory, Protocol
+from twisted.test.proto_helpers import StringTransport
+
+from autobahn.twisted.websocket import WrappingWebSocketServerFactory
+from autobahn.wamp.tests.test_trafficstats import HANDSHAKE
+
+
+def messages(data):
+   """
+   Split the (unmasked, unfragmented) binary WebSocket messages sent by a server,
+   skipping control frames.
+   """
+   res = []
+   while data:
+      b0, b1 = struct.unpack("!BB", data[:2])
+      length, pos = b1, 2
+      if length == 126:
+         length, pos = struct.unpack("!H", data[2:4])[0], 4
+      if b0 != 0x88:
+         assert b0 == 0x82
+         res.append(data[pos:pos + length])
+      data = data[pos + length:]
+   return res
+
+
+
+class TestWrappingWebSocketAdapter(unittest.TestCase):
+
+   def connect(self, **kwargs):
+      self.factory = WrappingWebSocketServerFactory(Factory.forProtocol(Protocol),
+                                                    "ws://localhost:9000",
+                                                    reactor = Clock(),
+                                                    enableCompression = False,
+                                                    **kwargs)
+      self.factory.setProtocolOptions(openHandshakeTimeout = 0)
+      self.proto = self.factory.buildProtocol(None)
+      self.proto.makeConnection(StringTransport())
+      self.proto.dataReceived(HANDSHAKE.replace(b"\x0d\x0a\x0d\x0a", b"\x0d\x0aSec-WebSocket-Protocol: binary\x0d\x0a\x0d\x0a"))
+      self.proto.transport.clear()
+      return self.proto._proto.transport
+
+   def sent(self):
+      return messages(self.proto.transport.value())
+
+   def test_write_through(self):
+      transport = self.connect()
+      transport.write(b"abc")
+      transport.write(b"def")
+      self.assertEqual(self.sent(), [b"abc", b"def"])
+
+   def test_coalesce(self):
+      transport = self.connect(coalesceSize = 1024)
+      transport.write(b"abc")
+      transport.write(b"def")
+      self.assertEqual(self.sent(), [])
+
+      ## flushed at the end of the reactor iteration
+      self.factory.reactor.advance(0)
+      self.assertEqual(self.sent(), [b"abcdef"])
+
+   def test_coalesce_flush(self):
+      transport = self.connect(coalesceSize = 4)
+      transport.write(b"abc")
+      transport.write(b"def")
+
+      ## flushed early when reaching the coalesce size
+      self.assertEqual(self.sent(), [b"abcdef"])
+      self.factory.reactor.advance(0)
+      self.assertEqual(self.sent(), [b"abcdef"])
+
+      ## .. and when closing
+      transport.write(b"ghi")
+      transport.loseConnection()
+      self.assertEqual(self.sent()[1], b"ghi")
+
+   def test_write_sequence(self):
+      transport = self.connect()
+      transport.writeSequence([b"abc", b"def"])
+      self.assertEqual(self.sent(), [b"abcdef"])
+
+      self.proto.transport.clear()
+      transport = self.connect(coalesceSize = 1024)
+      transport.writeSequence([b"abc", b"def"])
+      transport.write(b"ghi")
+      self.factory.reactor.advance(0)
+      self.assertEqual(self.sent(), [b"abcdefghi"])
@@ -18,6 +18,13 @@
 
 from __future__ import absolute_import
 
+import sys
+
+PY3 = sys.version_info >= (3,)
+
+if PY3:
+   long = int
+
 
 
 class SessionDetails:
@@ -76,7 +83,7 @@ class EventDetails:
    Provides details on an event when calling an event handler
    previously registered.
    """
-   def __init__(self, publication, publisher = None):
+   def __init__(self, publication, publisher = None, retained = None):
       """
       Ctor.
 
@@ -84,9 +91,13 @@ class EventDetails:
       :type publication: int
       :param publisher: The WAMP session ID of the original publisher of this event.
       :type publisher: int
+      :param retained: If True, the event was published before subscribing, and
+                       retained by the broker.
+      :type retained: bool
       """
       self.publication = publication
       self.publisher = publisher
+      self.retained = retained
 
 
 
@@ -101,7 +112,8 @@ class PublishOptions:
                 excludeMe = None,
                 exclude = None,
                 eligible = None,
-                discloseMe = None):
+                discloseMe = None,
+                retain = None):
       """
       Constructor.
       
@@ -118,19 +130,24 @@ class PublishOptions:
       :param discloseMe: If True, request to disclose the publisher of this event
                          to subscribers.
       :type discloseMe: bool
+      :param retain: If True, request the broker to retain this event and dispatch
+                     it to sessions subscribing to the topic later.
+      :type retain: bool
       """
       assert(acknowledge is None or type(acknowledge) == bool)
       assert(excludeMe is None or type(excludeMe) == bool)
       assert(exclude is None or (type(exclude) == list and all(type(x) in [int, long] for x in exclude)))
       assert(eligible is None or (type(eligible) == list and all(type(x) in [int, long] for x in eligible)))
       assert(discloseMe is None or type(discloseMe) == bool)
+      assert(retain is None or type(retain) == bool)
 
       self.options = {
          'acknowledge': acknowledge,
          'excludeMe': excludeMe,
          'exclude': exclude,
          'eligible': eligible,
-         'discloseMe': discloseMe
+         'discloseMe': discloseMe,
+         'retain': retain
       }
 
 
@@ -141,17 +158,22 @@ class RegisterOptions:
    :func:`autobahn.wamp.interfaces.ICallee.register`.
    """
 
-   def __init__(self, details_arg = None, pkeys = None):
+   def __init__(self, details_arg = None, pkeys = None, cache = None):
       """
       Ctor.
 
       :param details_arg: When invoking the endpoint, provide call details
                           in this keyword argument to the callable.
       :type details_arg: str
+      :param cache: If set, the endpoint is idempotent (e.g. a pure lookup): let
+                    the dealer answer calls with the same arguments from a cache
+                    of results for this time (in seconds).
+      :type cache: float
       """
       assert(details_arg is None or type(details_arg) == str)
+      assert(cache is None or (type(cache) in [int, long, float] and cache > 0))
       self.details_arg = details_arg
-      self.options = {'pkeys': pkeys}
+      self.options = {'pkeys': pkeys, 'cache': cache}
 
 
 
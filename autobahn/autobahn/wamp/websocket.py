@@ -40,13 +40,24 @@ class WampWebSocketProtocol:
    Base class for WAMP-over-WebSocket transport mixins.
    """
 
+   MAX_BATCH_SIZE = 65536
+   """
+   With a batched serializer, WAMP messages sent are collected and sent as one
+   WebSocket message at the end of the current reactor/loop iteration, or right
+   away when this many octets were collected.
+   """
+
    def onOpen(self):
       """
       Callback from :func:`autobahn.websocket.interfaces.IWebSocketChannel.onOpen`
       """
+      self._batch = []
+      self._batchLen = 0
+      self._batchFlushPending = False
+
       ## WebSocket connection established - now let the
       ## user WAMP session factory create a new WAMP session ..
-      self._session = self.factory._factory()
+      self._session = self.factory._createSession()
 
       ## and fire off WAMP session open callback
       try:
@@ -77,8 +88,14 @@ class WampWebSocketProtocol:
       Callback from :func:`autobahn.websocket.interfaces.IWebSocketChannel.onMessage`
       """
       try:
-         msg = self._serializer.unserialize(payload, isBinary)
-         self._session.onMessage(msg)
+         if self._serializer.BATCHED:
+            for msg in self._serializer.unserializeBatch(payload, isBinary):
+               if self.failedByMe or self._session is None:
+                  break
+               self._session.onMessage(msg)
+         else:
+            msg = self._serializer.unserialize(payload, isBinary)
+            self._session.onMessage(msg)
 
       except ProtocolError as e:
          reason = "WAMP Protocol Error ({})".format(e)
@@ -89,6 +106,21 @@ class WampWebSocketProtocol:
          self.failConnection(protocol.WebSocketProtocol.CLOSE_STATUS_CODE_INTERNAL_ERROR, reason = reason)
 
 
+   def onMessageBatch(self, messages):
+      """
+      Callback from :func:`autobahn.websocket.interfaces.IWebSocketChannel.onMessageBatch`
+
+      Process all WAMP messages received from one read. Replies sent while
+      doing so are written to the transport in one go (and with a batched
+      serializer, sent as one WebSocket message).
+      """
+      for payload, isBinary in messages:
+         if self.failedByMe or self._session is None:
+            break
+         self.onMessage(payload, isBinary)
+      self._flushBatch()
+
+
    def send(self, msg):
       """
       Implements :func:`autobahn.wamp.interfaces.ITransport.send`
@@ -100,11 +132,46 @@ class WampWebSocketProtocol:
             ## all exceptions raised from above should be serialization errors ..
             raise SerializationError("Unable to serialize WAMP application payload ({})".format(e))
          else:
-            self.sendMessage(bytes, isBinary)
+            if self._serializer.BATCHED:
+               self._addToBatch(bytes, isBinary)
+            else:
+               self.sendMessage(bytes, isBinary)
       else:
          raise TransportLost()
 
 
+   def _addToBatch(self, bytes, isBinary):
+      """
+      Add a serialized WAMP message to the batch to be sent.
+      """
+      self._batch.append(bytes)
+      self._batchLen += len(bytes)
+      self._batchIsBinary = isBinary
+
+      if self._batchLen >= self.MAX_BATCH_SIZE:
+         self._flushBatch()
+      elif not self._batchFlushPending:
+         self._batchFlushPending = True
+         self.factory._callSoon(self._onBatchFlush)
+
+
+   def _onBatchFlush(self):
+      self._batchFlushPending = False
+      self._flushBatch()
+
+
+   def _flushBatch(self):
+      """
+      Send the WAMP messages collected as one WebSocket message.
+      """
+      if self._batch:
+         payload = b''.join(self._batch)
+         self._batch = []
+         self._batchLen = 0
+         if self.state == protocol.WebSocketProtocol.STATE_OPEN:
+            self.sendMessage(payload, self._batchIsBinary)
+
+
    def isOpen(self):
       """
       Implements :func:`autobahn.wamp.interfaces.ITransport.isOpen`
@@ -117,6 +184,7 @@ class WampWebSocketProtocol:
       Implements :func:`autobahn.wamp.interfaces.ITransport.close`
       """
       if self.isOpen():
+         self._flushBatch()
          self.sendClose(protocol.WebSocketProtocol.CLOSE_STATUS_CODE_NORMAL)
       else:
          raise TransportLost()
@@ -139,7 +207,7 @@ def parseSubprotocolIdentifier(subprotocol):
       if s[0] != "wamp":
          raise Exception("invalid protocol %s" % s[0])
       version = int(s[1])
-      serializerId = s[2]
+      serializerId = '.'.join(s[2:])
       return version, serializerId
    except:
       return None, None
@@ -232,6 +300,10 @@ class WampWebSocketFactory:
          except ImportError:
             pass
 
+         ## batched variants of the above (only used when a client
+         ## prefers those)
+         serializers.extend([ser.__class__(batched = True) for ser in serializers])
+
          if not serializers:
             raise Exception("could not import any WAMP serializers")
 
@@ -242,6 +314,13 @@ class WampWebSocketFactory:
       self._protocols = ["wamp.2.%s" % ser.SERIALIZER_ID for ser in serializers]
 
 
+   def _createSession(self):
+      """
+      Create a WAMP session for a newly opened transport.
+      """
+      return self._factory()
+
+
 
 class WampWebSocketServerFactory(WampWebSocketFactory):
    """
@@ -254,3 +333,19 @@ class WampWebSocketClientFactory(WampWebSocketFactory):
    """
    Mixin for WAMP-over-WebSocket client transport factories.
    """
+
+   def __init__(self, factory, serializers = None):
+      WampWebSocketFactory.__init__(self, factory, serializers)
+      self._session = None
+
+
+   def _createSession(self):
+      """
+      Create a WAMP session for a newly opened transport. With auto-reconnect
+      enabled, a session whose transport was lost while joined is resumed
+      (re-joins its realm and replays subscriptions and registrations) instead
+      of being replaced.
+      """
+      if not (self.autoReconnect and getattr(self._session, '_resumable', False)):
+         self._session = self._factory()
+      return self._session
@@ -61,6 +61,7 @@ from autobahn.twisted.websocket import WebSocketClientProtocol, \
                                        WebSocketServerProtocol
 from autobahn.wamp1.pbkdf2 import pbkdf2_bin
 from autobahn.wamp1.prefixmap import PrefixMap
+from autobahn.wamp1.urimap import UriMap
 from autobahn.util import utcnow, newid
 
 
@@ -575,11 +576,11 @@ class WampServerProtocol(WebSocketServerProtocol, WampProtocol):
 
       ## Publication handlers registered in this session (a URI map of (object, pubHandler) pairs
       ## pairs for object methods (handlers) or (None, None) for topic without handler)
-      self.pubHandlers = {}
+      self.pubHandlers = UriMap()
 
       ## Subscription handlers registered in this session (a URI map of (object, subHandler) pairs
       ## pairs for object methods (handlers) or (None, None) for topic without handler)
-      self.subHandlers = {}
+      self.subHandlers = UriMap()
 
       self.handlerMapping = {
          self.MESSAGE_TYPEID_CALL: CallHandler(self, self.prefixes),
@@ -616,11 +617,10 @@ class WampServerProtocol(WebSocketServerProtocol, WampProtocol):
       ## publication handler.
       ## Returns a 5-tuple (consumedUriPart, unconsumedUriPart, handlerObj, handlerProc, prefixMatch)
       ##
-      for i in xrange(len(topicUri), -1, -1):
-         tt = topicUri[:i]
-         if self.pubHandlers.has_key(tt):
-            h = self.pubHandlers[tt]
-            return (tt, topicUri[i:], h[0], h[1], h[2])
+      m = self.pubHandlers.longestPrefix(topicUri)
+      if m:
+         tt, h = m
+         return (tt, topicUri[len(tt):], h[0], h[1], h[2])
       return None
 
 
@@ -629,11 +629,10 @@ class WampServerProtocol(WebSocketServerProtocol, WampProtocol):
       ## subscription handler.
       ## Returns a 5-tuple (consumedUriPart, unconsumedUriPart, handlerObj, handlerProc, prefixMatch)
       ##
-      for i in xrange(len(topicUri), -1, -1):
-         tt = topicUri[:i]
-         if self.subHandlers.has_key(tt):
-            h = self.subHandlers[tt]
-            return (tt, topicUri[i:], h[0], h[1], h[2])
+      m = self.subHandlers.longestPrefix(topicUri)
+      if m:
+         tt, h = m
+         return (tt, topicUri[len(tt):], h[0], h[1], h[2])
       return None
 
 
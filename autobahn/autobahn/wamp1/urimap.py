@@ -0,0 +1,131 @@
+###############################################################################
+##
+##  Copyright (C) 2011-2013 Tavendo GmbH
+##
+##  Licensed under the Apache License, Version 2.0 (the "License");
+##  you may not use this file except in compliance with the License.
+##  You may obtain a copy of the License at
+##
+##      http://www.apache.org/licenses/LICENSE-2.0
+##
+##  Unless required by applicable law or agreed to in writing, software
+##  distributed under the License is distributed on an "AS IS" BASIS,
+##  WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+##  See the License for the specific language governing permissions and
+##  limitations under the License.
+##
+###############################################################################
+
+
+__all__ = ("UriMap",)
+
+
+class UriMap(dict):
+   """
+   A map from URIs to values supporting resolution of a URI to the
+   longest matching URI present in the map.
+
+   Resolution only probes the prefix lengths of URIs actually present
+   in the map (longest first), instead of every prefix of the URI
+   being resolved, which keeps the cost independent of the URI length.
+   """
+
+   def __init__(self, *args, **kwargs):
+      dict.__init__(self)
+      self._counts = {}
+      self._lengths = []
+      self.update(*args, **kwargs)
+
+
+   def _added(self, uri):
+      n = len(uri)
+      if n in self._counts:
+         self._counts[n] += 1
+      else:
+         self._counts[n] = 1
+         self._lengths.append(n)
+         self._lengths.sort(reverse = True)
+
+
+   def _removed(self, uri):
+      n = len(uri)
+      self._counts[n] -= 1
+      if not self._counts[n]:
+         del self._counts[n]
+         self._lengths.remove(n)
+
+
+   ## all methods modifying the set of URIs in the map go through the
+   ## following, so that the prefix lengths are kept in sync
+
+   def __setitem__(self, uri, value):
+      if not dict.__contains__(self, uri):
+         self._added(uri)
+      dict.__setitem__(self, uri, value)
+
+
+   def __delitem__(self, uri):
+      dict.__delitem__(self, uri)
+      self._removed(uri)
+
+
+   def update(self, *args, **kwargs):
+      if len(args) > 1:
+         raise TypeError("update expected at most 1 arguments, got %d" % len(args))
+      if args:
+         other = args[0]
+         if hasattr(other, 'keys'):
+            for uri in other.keys():
+               self[uri] = other[uri]
+         else:
+            for uri, value in other:
+               self[uri] = value
+      for uri, value in kwargs.items():
+         self[uri] = value
+
+
+   def setdefault(self, uri, default = None):
+      if not dict.__contains__(self, uri):
+         self[uri] = default
+      return dict.__getitem__(self, uri)
+
+
+   def pop(self, uri, *default):
+      if dict.__contains__(self, uri):
+         value = dict.pop(self, uri)
+         self._removed(uri)
+         return value
+      return dict.pop(self, uri, *default)
+
+
+   def popitem(self):
+      uri, value = dict.popitem(self)
+      self._removed(uri)
+      return uri, value
+
+
+   def clear(self):
+      dict.clear(self)
+      self._counts = {}
+      self._lengths = []
+
+
+   def copy(self):
+      return UriMap(self)
+
+
+   def longestPrefix(self, uri):
+      """
+      Resolve a URI to the longest URI in this map that is a prefix of it.
+
+      :param uri: URI to resolve.
+      :type uri: str
+      :returns: tuple -- A pair `(prefix, value)` or None when no prefix of the URI is in the map.
+      """
+      l = len(uri)
+      for n in self._lengths:
+         if n <= l:
+            prefix = uri[:n]
+            if dict.__contains__(self, prefix):
+               return (prefix, dict.__getitem__(self, prefix))
+      return None
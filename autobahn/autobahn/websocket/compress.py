@@ -30,6 +30,7 @@ __all__ = ["PerMessageCompressOffer",
            "PerMessageDeflateResponse",
            "PerMessageDeflateResponseAccept",
            "PerMessageDeflate",
+           "PerMessageDeflateAcceptPolicy",
 
            "PerMessageBzip2Offer",
            "PerMessageBzip2OfferAccept",
@@ -59,4 +59,12 @@ class PerMessageCompress:
    """
    Base class for WebSocket compression negotiated parameters.
    """
-   pass
+
+   def release(self):
+      """
+      Called periodically (between messages) on connections using the extension
+      when `perMessageCompressionIdleTimeout` is set. Implementations may free
+      state that is not carried over between messages if it was not used since
+      the last call. The default implementation does nothing.
+      """
+      pass
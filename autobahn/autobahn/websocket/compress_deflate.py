@@ -24,7 +24,8 @@ __all__ = ["PerMessageDeflateMixin",
            "PerMessageDeflateOfferAccept",
            "PerMessageDeflateResponse",
            "PerMessageDeflateResponseAccept",
-           "PerMessageDeflate"]
+           "PerMessageDeflate",
+           "PerMessageDeflateAcceptPolicy"]
 
 
 import zlib
@@ -561,6 +562,7 @@ class PerMessageDeflate(PerMessageCompress, PerMessageDeflateMixin):
 
       self._compressor = None
       self._decompressor = None
+      self._used = False
 
 
    def __json__(self):
@@ -582,11 +584,17 @@ class PerMessageDeflate(PerMessageCompress, PerMessageDeflateMixin):
       # http://bugs.python.org/issue19278
       # http://hg.python.org/cpython/rev/c54c8e71b79a
       #
-      if self._isServer:
-         if self._compressor is None or self.server_no_context_takeover:
+      self._used = True
+
+      ## With no context takeover, the compressor is still created only once:
+      ## endCompressMessage() then flushes with Z_FULL_FLUSH, which resets the
+      ## compression state so that the next message does not refer back to
+      ## previous ones. This avoids setting up a new zlib stream per message.
+      ##
+      if self._compressor is None:
+         if self._isServer:
             self._compressor = zlib.compressobj(zlib.Z_DEFAULT_COMPRESSION, zlib.DEFLATED, -self.server_max_window_bits, self.mem_level)
-      else:
-         if self._compressor is None or self.client_no_context_takeover:
+         else:
             self._compressor = zlib.compressobj(zlib.Z_DEFAULT_COMPRESSION, zlib.DEFLATED, -self.client_max_window_bits, self.mem_level)
 
 
@@ -595,16 +603,24 @@ class PerMessageDeflate(PerMessageCompress, PerMessageDeflateMixin):
 
 
    def endCompressMessage(self):
-      data = self._compressor.flush(zlib.Z_SYNC_FLUSH)
+      if self._isServer:
+         noContextTakeover = self.server_no_context_takeover
+      else:
+         noContextTakeover = self.client_no_context_takeover
+      data = self._compressor.flush(zlib.Z_FULL_FLUSH if noContextTakeover else zlib.Z_SYNC_FLUSH)
       return data[:-4]
 
 
    def startDecompressMessage(self):
-      if self._isServer:
-         if self._decompressor is None or self.client_no_context_takeover:
+      ## With no context takeover, the peer does not refer back to previous
+      ## messages, so a decompressor (which is at a block boundary after each
+      ## message) can be reused as is.
+      ##
+      self._used = True
+      if self._decompressor is None:
+         if self._isServer:
             self._decompressor = zlib.decompressobj(-self.client_max_window_bits)
-      else:
-         if self._decompressor is None or self.server_no_context_takeover:
+         else:
             self._decompressor = zlib.decompressobj(-self.server_max_window_bits)
 
 
@@ -617,3 +633,134 @@ class PerMessageDeflate(PerMessageCompress, PerMessageDeflateMixin):
       ## for Z_SYNC_FLUSH.
       ##
       self._decompressor.decompress(b'\x00\x00\xff\xff')
+
+      ## A peer may end a message with a final deflate block (BFINAL set), which
+      ## ends the stream: a decompressor can't be reused after that.
+      ##
+      if self._decompressor.unused_data:
+         self._decompressor = None
+
+
+   def release(self):
+      """
+      Implements :func:`autobahn.websocket.compress_base.PerMessageCompress.release`
+
+      Drops the compressor and decompressor of directions without context
+      takeover when they were not used since the last call. They are
+      recreated on the next message.
+      """
+      if self._used:
+         self._used = False
+      else:
+         if self._isServer:
+            if self.server_no_context_takeover:
+               self._compressor = None
+            if self.client_no_context_takeover:
+               self._decompressor = None
+         else:
+            if self.client_no_context_takeover:
+               self._compressor = None
+            if self.server_no_context_takeover:
+               self._decompressor = None
+
+
+
+class PerMessageDeflateAcceptPolicy:
+   """
+   A server-side acceptor for `permessage-deflate` offers (usable as
+   `perMessageCompressionAccept`) that keeps the memory held by zlib
+   within a budget for all connections of a factory.
+
+   With context takeover, each connection permanently holds a compressor and
+   a decompressor, sized by window bits and memory level. The policy picks
+   the largest window (and matching memory level) for which the current
+   connection count times the memory per connection fits the budget. When
+   not even the smallest window fits, it accepts with no context takeover
+   in both directions (as far as the client supports that), so that zlib
+   state is only held while messages are processed. Combine with
+   `perMessageCompressionIdleTimeout` to have that state released from
+   idle connections.
+
+   The budget is checked against the parameters of new connections only -
+   existing connections keep what they negotiated.
+   """
+
+   MIN_WINDOW_BITS = 9
+   """
+   Smallest window size used (zlib does not support raw deflate streams with
+   a window size of 8 consistently).
+   """
+
+   def __init__(self, factory, memoryBudget, requestNoContextTakeover = False):
+      """
+      Constructor.
+
+      :param factory: The WebSocket server factory whose connections are counted.
+      :type factory: obj
+      :param memoryBudget: Memory (in octets) that zlib state of all connections with context takeover may take.
+      :type memoryBudget: int
+      :param requestNoContextTakeover: Iff `True`, always request no context takeover from clients that support it.
+      :type requestNoContextTakeover: bool
+      """
+      self.factory = factory
+      self.memoryBudget = memoryBudget
+      self.requestNoContextTakeover = requestNoContextTakeover
+
+
+   @staticmethod
+   def memoryUsage(windowBits, memLevel, clientWindowBits):
+      """
+      Estimate memory held by zlib for one connection with context takeover
+      (following the formulas from zlib's `zconf.h`).
+
+      :param windowBits: Window size of the server's compressor.
+      :type windowBits: int
+      :param memLevel: Memory level of the server's compressor.
+      :type memLevel: int
+      :param clientWindowBits: Window size the client compresses with (server's decompressor).
+      :type clientWindowBits: int
+
+      :returns: int -- Estimated memory in octets.
+      """
+      return (1 << (windowBits + 2)) + (1 << (memLevel + 9)) + (1 << clientWindowBits)
+
+
+   def __call__(self, offers):
+      for offer in offers:
+         if isinstance(offer, PerMessageDeflateOffer):
+            return self.accept(offer)
+      return None
+
+
+   def accept(self, offer):
+      """
+      Accept a `permessage-deflate` offer with parameters fitting the budget.
+
+      :param offer: The offer from the client.
+      :type offer: Instance of :class:`autobahn.compress.PerMessageDeflateOffer`.
+
+      :returns: obj -- An instance of :class:`autobahn.compress.PerMessageDeflateOfferAccept`.
+      """
+      requestNoContextTakeover = self.requestNoContextTakeover and offer.acceptNoContextTakeover
+
+      maxWindowBits = offer.requestMaxWindowBits or PerMessageDeflate.DEFAULT_WINDOW_BITS
+      connections = max(1, self.factory.countConnections)
+
+      for windowBits in range(maxWindowBits, self.MIN_WINDOW_BITS - 1, -1):
+         memLevel = min(PerMessageDeflate.DEFAULT_MEM_LEVEL, windowBits - 7)
+         if offer.acceptMaxWindowBits:
+            clientWindowBits = windowBits
+         else:
+            clientWindowBits = PerMessageDeflate.DEFAULT_WINDOW_BITS
+         if connections * self.memoryUsage(windowBits, memLevel, clientWindowBits) <= self.memoryBudget:
+            return PerMessageDeflateOfferAccept(offer,
+                                                requestNoContextTakeover = requestNoContextTakeover,
+                                                requestMaxWindowBits = clientWindowBits if clientWindowBits < PerMessageDeflate.DEFAULT_WINDOW_BITS else 0,
+                                                windowBits = windowBits,
+                                                memLevel = memLevel)
+
+      ## over budget: no context takeover, so zlib state is only needed while
+      ## messages are processed
+      return PerMessageDeflateOfferAccept(offer,
+                                          requestNoContextTakeover = offer.acceptNoContextTakeover,
+                                          noContextTakeover = True)
@@ -83,6 +83,17 @@ class IWebSocketChannel(Interface):
       :type isBinary: bool
       """
 
+   def onMessageBatch(messages):
+      """
+      Optional callback fired with all complete WebSocket messages received from one
+      read on the underlying transport. When a protocol implements this, it is fired
+      instead of :func:`onMessage`. Messages sent while processing the batch are
+      written out together once the callback returns.
+
+      :param messages: List of `(payload, isBinary)` pairs, in the order received.
+      :type messages: list of tuples
+      """
+
    def sendClose(code = None, reason = None):
       """
       Starts a WebSocket closing handshake tearing down the WebSocket connection.
@@ -0,0 +1,212 @@
+###############################################################################
+##
+##  Copyright (C) 2014 Tavendo GmbH
+##
+##  Licensed under the Apache License, Version 2.0 (the "License");
+##  you may not use this file except in compliance with the License.
+##  You may obtain a copy of the License at
+##
+##      http://www.apache.org/licenses/LICENSE-2.0
+##
+##  Unless required by applicable law or agreed to in writing, software
+##  distributed under the License is distributed on an "AS IS" BASIS,
+##  WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+##  See the License for the specific language governing permissions and
+##  limitations under the License.
+##
+###############################################################################
+
+from __future__ import absolute_import
+
+__all__ = ["Histogram",
+           "WebSocketMetrics"]
+
+from bisect import bisect_left
+
+
+class Histogram:
+   """
+   A histogram with fixed buckets, rendered as a Prometheus histogram.
+   """
+
+   def __init__(self, buckets):
+      """
+      Constructor.
+
+      :param buckets: Upper bounds of the buckets (ascending). A final bucket
+                      for values above the last bound is added automatically.
+      :type buckets: list of float
+      """
+      self.buckets = list(buckets)
+      self.counts = [0] * (len(self.buckets) + 1)
+      self.sum = 0
+
+
+   def observe(self, value):
+      """
+      Add a value to the histogram.
+      """
+      self.counts[bisect_left(self.buckets, value)] += 1
+      self.sum += value
+
+
+   def render(self, name, labels = None):
+      """
+      Render the histogram samples in Prometheus text format.
+
+      :returns: list of str -- The sample lines.
+      """
+      prefix = ",".join('%s="%s"' % l for l in sorted(labels.items())) + "," if labels else ""
+      lines = []
+      total = 0
+      for bound, count in zip(self.buckets, self.counts):
+         total += count
+         lines.append('%s_bucket{%sle="%s"} %d' % (name, prefix, _formatValue(bound), total))
+      total += self.counts[-1]
+      lines.append('%s_bucket{%sle="+Inf"} %d' % (name, prefix, total))
+      suffix = "{%s}" % prefix[:-1] if prefix else ""
+      lines.append('%s_sum%s %s' % (name, suffix, _formatValue(self.sum)))
+      lines.append('%s_count%s %d' % (name, suffix, total))
+      return lines
+
+
+
+def _formatValue(value):
+   if isinstance(value, float):
+      return repr(value)
+   return str(value)
+
+
+
+class WebSocketMetrics:
+   """
+   Factory-wide metrics of a WebSocket server, aggregated over all connections
+   and rendered in the Prometheus text exposition format.
+
+   Protocols update the counters directly at the points where they also update
+   their per-connection :class:`autobahn.websocket.protocol.TrafficStats`.
+   """
+
+   MESSAGE_SIZE_BUCKETS = [64, 256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304, 16777216]
+   """
+   Bucket bounds (octets) of the message size histograms.
+   """
+
+   HANDSHAKE_DURATION_BUCKETS = [0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1., 2.5, 5., 10.]
+   """
+   Bucket bounds (seconds) of the opening handshake duration histogram.
+   """
+
+   def __init__(self, factory):
+      """
+      Constructor.
+
+      :param factory: The factory the metrics are tracked for.
+      :type factory: obj
+      """
+      self.factory = factory
+      self.reset()
+
+
+   def reset(self):
+      ## connections currently in state open
+      self.openConnections = 0
+
+      ## opening handshakes
+      self.handshakesSucceeded = 0
+      self.handshakesFailed = {}
+      self.handshakeDuration = Histogram(WebSocketMetrics.HANDSHAKE_DURATION_BUCKETS)
+
+      ## data messages and wire-level octets
+      self.incomingMessages = 0
+      self.outgoingMessages = 0
+      self.incomingMessageSize = Histogram(WebSocketMetrics.MESSAGE_SIZE_BUCKETS)
+      self.outgoingMessageSize = Histogram(WebSocketMetrics.MESSAGE_SIZE_BUCKETS)
+      self.incomingOctets = 0
+      self.outgoingOctets = 0
+
+      ## closed connections by close code and cleanliness
+      self.closes = {}
+
+
+   def handshakeFailed(self, code):
+      """
+      Count a failed opening handshake.
+
+      :param code: HTTP status code sent.
+      :type code: int
+      """
+      self.handshakesFailed[code] = self.handshakesFailed.get(code, 0) + 1
+
+
+   def connectionClosed(self, code, wasClean):
+      """
+      Count a closed WebSocket connection.
+
+      :param code: Close code (from the peer, if it sent one, else the one we sent) or `None`.
+      :type code: int
+      :param wasClean: `True` iff the connection was closed cleanly.
+      :type wasClean: bool
+      """
+      key = (code, bool(wasClean))
+      self.closes[key] = self.closes.get(key, 0) + 1
+
+
+   def render(self):
+      """
+      Render all metrics in the Prometheus text exposition format (version 0.0.4).
+
+      :returns: str -- The metrics.
+      """
+      lines = []
+
+      def metric(name, type, help, samples):
+         lines.append("# HELP %s %s" % (name, help))
+         lines.append("# TYPE %s %s" % (name, type))
+         lines.extend(samples)
+
+      metric("autobahn_websocket_connections", "gauge",
+             "Current number of transport connections.",
+             ["autobahn_websocket_connections %d" % self.factory.countConnections])
+
+      metric("autobahn_websocket_open_connections", "gauge",
+             "Current number of WebSocket connections in state open.",
+             ["autobahn_websocket_open_connections %d" % self.openConnections])
+
+      metric("autobahn_websocket_handshakes_total", "counter",
+             "Completed opening handshakes by result.",
+             ['autobahn_websocket_handshakes_total{result="success"} %d' % self.handshakesSucceeded,
+              'autobahn_websocket_handshakes_total{result="failure"} %d' % sum(self.handshakesFailed.values())])
+
+      metric("autobahn_websocket_handshake_failures_total", "counter",
+             "Failed opening handshakes by HTTP status code sent.",
+             ['autobahn_websocket_handshake_failures_total{code="%s"} %d' % (code, count) for code, count in sorted(self.handshakesFailed.items())])
+
+      metric("autobahn_websocket_handshake_duration_seconds", "histogram",
+             "Time from accepting a connection until the opening handshake succeeded.",
+             self.handshakeDuration.render("autobahn_websocket_handshake_duration_seconds"))
+
+      metric("autobahn_websocket_messages_total", "counter",
+             "Data messages by direction.",
+             ['autobahn_websocket_messages_total{direction="in"} %d' % self.incomingMessages,
+              'autobahn_websocket_messages_total{direction="out"} %d' % self.outgoingMessages])
+
+      metric("autobahn_websocket_message_size_bytes", "histogram",
+             "Data message payload sizes by direction.",
+             self.incomingMessageSize.render("autobahn_websocket_message_size_bytes", {"direction": "in"}) +
+             self.outgoingMessageSize.render("autobahn_websocket_message_size_bytes", {"direction": "out"}))
+
+      metric("autobahn_websocket_octets_total", "counter",
+             "Wire-level octets of open WebSocket connections by direction.",
+             ['autobahn_websocket_octets_total{direction="in"} %d' % self.incomingOctets,
+              'autobahn_websocket_octets_total{direction="out"} %d' % self.outgoingOctets])
+
+      samples = []
+      for (code, wasClean), count in sorted(self.closes.items(), key = lambda i: (i[0][0] is not None, i[0])):
+         samples.append('autobahn_websocket_closes_total{code="%s",clean="%s"} %d' % (code if code is not None else "none", "true" if wasClean else "false", count))
+      metric("autobahn_websocket_closes_total", "counter",
+             "Closed WebSocket connections by close code and whether the close was clean.",
+             samples)
+
+      lines.append("")
+      return "\n".join(lines)
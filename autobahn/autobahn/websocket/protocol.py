@@ -28,6 +28,7 @@ __all__ = ["createWsUrl",
            "ConnectionRequest",
            "ConnectionResponse",
            "Timings",
+           "MaskSource",
 
            "WebSocketProtocol",
            "WebSocketFactory",
@@ -52,6 +53,7 @@ urlparse.uses_params.extend(wsschemes)
 urlparse.uses_query.extend(wsschemes)
 urlparse.uses_fragment.extend(wsschemes)
 
+import re
 import urllib
 import binascii
 import hashlib
@@ -59,12 +61,14 @@ import base64
 import struct
 import random
 import os
+import functools
+import time
 import pickle
 import copy
 import json
 
 from pprint import pformat
-from collections import deque
+from collections import deque, OrderedDict
 
 from zope.interface import implementer
 
@@ -77,6 +81,7 @@ from autobahn.websocket.interfaces import IWebSocketChannel, \
 from autobahn.util import Stopwatch
 from autobahn.websocket.utf8validator import Utf8Validator
 from autobahn.websocket.xormasker import XorMaskerNull, createXorMasker
+from autobahn.websocket.metrics import WebSocketMetrics
 from autobahn.websocket.compress import *
 from autobahn.websocket import http
 
@@ -242,6 +247,15 @@ class TrafficStats:
 
 
 
+class NullTrafficStats(TrafficStats):
+   """
+   Traffic stats of connections not tracking traffic stats (see the protocol
+   option `trafficStatsSampling`): all counters stay `0`, since the
+   protocol does not update them.
+   """
+
+
+
 class FrameHeader:
    """
    Thin-wrapper for storing WebSocket frame metadata.
@@ -272,6 +286,70 @@ class FrameHeader:
 
 
 
+class MaskSource:
+   """
+   Source of 4-octet masks for masking outgoing frames. One instance is
+   shared by all connections of a factory.
+
+   Modes:
+
+     * `"random"`: a new mask from :func:`random.getrandbits` for every frame (default)
+     * `"urandom"`: masks from :func:`os.urandom` (cryptographically strong), pooled
+     * `"fast"`: masks from :func:`random.getrandbits`, pooled
+
+   Pooled modes generate masks in bulk into a ring of :attr:`POOL_SIZE` masks,
+   which are then handed out without further work per frame. The ring is filled
+   with fresh masks whenever it has been used up, so masks are never reused.
+   """
+
+   MODES = ["random", "urandom", "fast"]
+   """
+   Supported mask source modes.
+   """
+
+   POOL_SIZE = 4096
+   """
+   Number of masks generated in one go in pooled modes.
+   """
+
+   def __init__(self, mode = "random"):
+      """
+      Constructor.
+
+      :param mode: Mask source mode, one of :attr:`MODES`.
+      :type mode: str
+      """
+      if mode not in MaskSource.MODES:
+         raise Exception("invalid mask source mode '%s' (allowed values: %s)" % (mode, MaskSource.MODES))
+      self.mode = mode
+      if mode != "random":
+         ## hand out masks straight from a generator running over the ring
+         self.getMask = functools.partial(next, self._masks())
+
+
+   def _masks(self):
+      n = MaskSource.POOL_SIZE
+      while True:
+         if self.mode == "urandom":
+            data = os.urandom(4 * n)
+         elif PY3:
+            data = random.getrandbits(32 * n).to_bytes(4 * n, 'big')
+         else:
+            data = binascii.unhexlify('%0*x' % (8 * n, random.getrandbits(32 * n)))
+         for mask in [data[i:i + 4] for i in range(0, 4 * n, 4)]:
+            yield mask
+
+
+   def getMask(self):
+      """
+      Get a new mask.
+
+      :returns: bytes -- A 4-octet mask.
+      """
+      return struct.pack("!I", random.getrandbits(32))
+
+
+
 class ConnectionRequest:
    """
    Thin-wrapper for WebSocket connection request information provided in
@@ -388,17 +466,17 @@ def parseHttpHeader(data):
    http_headers = {}
    http_headers_cnt = {}
    for h in raw[1:]:
-      i = h.find(":")
-      if i > 0:
+      key, sep, value = h.partition(u":")
+      if sep and key:
          ## HTTP header keys are case-insensitive
-         key = h[:i].strip().lower()
+         key = key.strip().lower()
 
          ## not sure if UTF-8 is allowed for HTTP header values..
-         value = h[i+1:].strip()
+         value = value.strip()
 
          ## handle HTTP headers split across multiple lines
          if key in http_headers:
-            http_headers[key] += ", %s" % value
+            http_headers[key] += u", " + value
             http_headers_cnt[key] += 1
          else:
             http_headers[key] = value
@@ -410,6 +488,28 @@ def parseHttpHeader(data):
 
 
 
+def parseProtocolsHeader(header):
+   """
+   Parses a Sec-WebSocket-Protocol header value into the list of subprotocols
+   in the order the client sent them.
+
+   FOR INTERNAL USE ONLY!
+
+   :param header: The Sec-WebSocket-Protocol header value.
+   :type header: str
+
+   :returns: tuple -- Tuple of the list of subprotocols and the first duplicate protocol (or None).
+   """
+   protocols = [str(x.strip()) for x in header.split(",")]
+   seen = set()
+   for p in protocols:
+      if p in seen:
+         return (protocols, p)
+      seen.add(p)
+   return (protocols, None)
+
+
+
 class Timings:
    """
    Helper class to track timings by key. This class also supports item access,
@@ -539,6 +639,12 @@ class WebSocketProtocol:
    For synched/chopped writes, this is the reactor reentry delay in seconds.
    """
 
+   _SCATTER_WRITE_MIN_PAYLOAD = 65536
+   """
+   Frames with at least this many octets of payload have header and payload
+   handed to the transport as a sequence instead of being concatenated.
+   """
+
    MESSAGE_TYPE_TEXT = 1
    """
    WebSocket text message type (UTF-8 payload).
@@ -632,7 +738,11 @@ class WebSocketProtocol:
                           'echoCloseCodeReason',
                           'openHandshakeTimeout',
                           'closeHandshakeTimeout',
-                          'tcpNoDelay']
+                          'tcpNoDelay',
+                          'corkWrites',
+                          'corkBufferSize',
+                          'trafficStatsSampling',
+                          'perMessageCompressionIdleTimeout']
    """
    Configuration attributes common to servers and clients.
    """
@@ -731,7 +841,10 @@ class WebSocketProtocol:
          payload = b''.join(self.message_data)
          if self.trackedTimings:
             self.trackedTimings.track("onMessage")
-         self._onMessage(payload, self.message_is_binary)
+         if self._messageBatch is not None:
+            self._messageBatch.append((payload, self.message_is_binary))
+         else:
+            self._onMessage(payload, self.message_is_binary)
 
       self.message_data = None
 
@@ -960,6 +1073,9 @@ class WebSocketProtocol:
          self.droppedByMe = True
          self.state = WebSocketProtocol.STATE_CLOSED
 
+         if self._corkBuffer and not abort:
+            self._flushCork(force = True)
+
          self._closeConnection(abort)
       else:
          if self.debugCodePaths:
@@ -1075,16 +1191,20 @@ class WebSocketProtocol:
       ## those), but only copy if not already set on protocol instance (allow
       ## to set configuration individually)
       ##
-      configAttrLog = []
+      configAttrCopied = set()
       for configAttr in self.CONFIG_ATTRS:
          if not hasattr(self, configAttr):
             setattr(self, configAttr, getattr(self.factory, configAttr))
-            configAttrSource = self.factory.__class__.__name__
-         else:
-            configAttrSource = self.__class__.__name__
-         configAttrLog.append((configAttr, getattr(self, configAttr), configAttrSource))
+            configAttrCopied.add(configAttr)
 
       if self.debug:
+         configAttrLog = []
+         for configAttr in self.CONFIG_ATTRS:
+            if configAttr in configAttrCopied:
+               configAttrSource = self.factory.__class__.__name__
+            else:
+               configAttrSource = self.__class__.__name__
+            configAttrLog.append((configAttr, getattr(self, configAttr), configAttrSource))
          #self.factory._log(configAttrLog)
          self.factory._log("\n" + pformat(configAttrLog))
 
@@ -1095,8 +1215,26 @@ class WebSocketProtocol:
       self.trackedTimings = None
       self.setTrackTimings(self.trackTimings)
 
-      ## Traffic stats
-      self.trafficStats = TrafficStats()
+      ## Traffic stats, tracked on 1-in-N connections (or none at all)
+      tracked = False
+      if self.trafficStatsSampling > 0:
+         tracked = self.factory._trafficStatsSamplingCount % self.trafficStatsSampling == 0
+         self.factory._trafficStatsSamplingCount += 1
+      if tracked:
+         self.trafficStats = TrafficStats()
+      else:
+         self.trafficStats = NullTrafficStats()
+      self._trackTraffic = tracked
+
+      ## without traffic stats (and factory metrics), use variants of the
+      ## per-read and per-write methods that do no accounting at all
+      if not tracked and self.factory.metrics is None:
+         for name, untracked in [('_dataReceived', self._dataReceivedUntracked),
+                                 ('sendData', self._sendDataUntracked),
+                                 ('_sendDataSequence', self._sendDataSequenceUntracked)]:
+            ## .. unless overridden in a derived class
+            if getattr(self.__class__, name) == getattr(WebSocketProtocol, name):
+               setattr(self, name, untracked)
 
       ## initial state
       if not self.factory.isServer and self.factory.proxy is not None:
@@ -1112,6 +1250,20 @@ class WebSocketProtocol:
       self.send_queue = deque()
       self.triggered = False
 
+      ## for corked writes, octets written during one reactor/loop iteration
+      ## are buffered here and written out in one go at the end of the iteration
+      self._corkBuffer = []
+      self._corkBufferLen = 0
+      self._corkFlushPending = False
+      self._corked = False
+
+      ## when the protocol implements onMessageBatch(), complete messages
+      ## received from one read are collected here and delivered together
+      if getattr(self, 'onMessageBatch', None) is not None:
+         self._messageBatch = []
+      else:
+         self._messageBatch = None
+
       ## incremental UTF8 validator
       self.utf8validator = Utf8Validator()
 
@@ -1168,6 +1320,7 @@ class WebSocketProtocol:
          self.serverConnectionDropTimeoutCall = None
       self.openHandshakeTimeoutCall = None
       self.closeHandshakeTimeoutCall = None
+      self.perMessageCompressionIdleCall = None
 
       # set opening handshake timeout handler
       if self.openHandshakeTimeout > 0:
@@ -1188,6 +1341,12 @@ class WebSocketProtocol:
          self.serverConnectionDropTimeoutCall.cancel()
          self.serverConnectionDropTimeoutCall = None
 
+      ## cancel any permessage-compress idle timer if present
+      ##
+      if self.perMessageCompressionIdleCall is not None:
+         self.perMessageCompressionIdleCall.cancel()
+         self.perMessageCompressionIdleCall = None
+
       self.state = WebSocketProtocol.STATE_CLOSED
       if not self.wasClean:
          if not self.droppedByMe and self.wasNotCleanReason is None:
@@ -1197,6 +1356,31 @@ class WebSocketProtocol:
          self._onClose(self.wasClean, self.remoteCloseCode, self.remoteCloseReason)
 
 
+   def _startPerMessageCompressionIdleTimer(self):
+      """
+      Start the timer that periodically lets the negotiated permessage-compress
+      extension release state not used since the last period (when
+      `perMessageCompressionIdleTimeout` is set).
+      """
+      if self.perMessageCompressionIdleTimeout > 0:
+         self.perMessageCompressionIdleCall = self.factory._callLater(self.perMessageCompressionIdleTimeout, self.onPerMessageCompressionIdleTimeout)
+
+
+   def onPerMessageCompressionIdleTimeout(self):
+      """
+      We check for idle permessage-compress state every `perMessageCompressionIdleTimeout`
+      seconds. State is only released between messages.
+
+      Modes: Hybi
+      """
+      self.perMessageCompressionIdleCall = None
+      if self.state == WebSocketProtocol.STATE_CLOSED:
+         return
+      if not self.inside_message and self.send_state == WebSocketProtocol.SEND_STATE_GROUND:
+         self._perMessageCompress.release()
+      self._startPerMessageCompressionIdleTimer()
+
+
    def logRxOctets(self, data):
       """
       Hook fired right after raw octets have been received, but only when self.logOctets == True.
@@ -1259,10 +1443,14 @@ class WebSocketProtocol:
 
       Modes: Hybi, Hixie
       """
-      if self.state == WebSocketProtocol.STATE_OPEN:
-         self.trafficStats.incomingOctetsWireLevel += len(data)
-      elif self.state == WebSocketProtocol.STATE_CONNECTING or self.state == WebSocketProtocol.STATE_PROXY_CONNECTING:
-         self.trafficStats.preopenIncomingOctetsWireLevel += len(data)
+      if self._trackTraffic:
+         if self.state == WebSocketProtocol.STATE_OPEN:
+            self.trafficStats.incomingOctetsWireLevel += len(data)
+         elif self.state == WebSocketProtocol.STATE_CONNECTING or self.state == WebSocketProtocol.STATE_PROXY_CONNECTING:
+            self.trafficStats.preopenIncomingOctetsWireLevel += len(data)
+
+      if self.factory.metrics is not None and self.state == WebSocketProtocol.STATE_OPEN:
+         self.factory.metrics.incomingOctets += len(data)
 
       if self.logOctets:
          self.logRxOctets(data)
@@ -1270,6 +1458,18 @@ class WebSocketProtocol:
       self.consumeData()
 
 
+   def _dataReceivedUntracked(self, data):
+      """
+      Variant of :meth:`_dataReceived` without any traffic accounting.
+
+      Modes: Hybi, Hixie
+      """
+      if self.logOctets:
+         self.logRxOctets(data)
+      self.data += data
+      self.consumeData()
+
+
    def consumeData(self):
       """
       Consume buffered (incoming) data.
@@ -1286,6 +1486,11 @@ class WebSocketProtocol:
          while self.processData() and self.state != WebSocketProtocol.STATE_CLOSED:
             pass
 
+         ## deliver all messages received in one go, when batching
+         ##
+         if self._messageBatch:
+            self._deliverMessageBatch()
+
       ## need to establish proxy connection
       ##
       elif self.state == WebSocketProtocol.STATE_PROXY_CONNECTING:
@@ -1360,10 +1565,7 @@ class WebSocketProtocol:
 
             self.transport.write(e[0])
 
-            if self.state == WebSocketProtocol.STATE_OPEN:
-               self.trafficStats.outgoingOctetsWireLevel += len(e[0])
-            elif self.state == WebSocketProtocol.STATE_CONNECTING or self.state == WebSocketProtocol.STATE_PROXY_CONNECTING:
-               self.trafficStats.preopenOutgoingOctetsWireLevel += len(e[0])
+            self._trackOutgoingOctets(len(e[0]))
 
             if self.logOctets:
                self.logTxOctets(e[0], e[1])
@@ -1391,6 +1593,12 @@ class WebSocketProtocol:
 
       Modes: Hybi, Hixie
       """
+      if self._corkBuffer:
+         ## keep ordering: corked octets go out before anything written here
+         ## that is not corked itself
+         if (chopsize and chopsize > 0) or sync or len(self.send_queue) > 0 or not self._corking():
+            self._flushCork()
+
       if chopsize and chopsize > 0:
          i = 0
          n = len(data)
@@ -1408,29 +1616,199 @@ class WebSocketProtocol:
             self.send_queue.append((data, sync))
             self._trigger()
          else:
-            self.transport.write(data)
+            if self._corking():
+               self._cork([data])
+            else:
+               self.transport.write(data)
 
-            if self.state == WebSocketProtocol.STATE_OPEN:
-               self.trafficStats.outgoingOctetsWireLevel += len(data)
-            elif self.state == WebSocketProtocol.STATE_CONNECTING or self.state == WebSocketProtocol.STATE_PROXY_CONNECTING:
-               self.trafficStats.preopenOutgoingOctetsWireLevel += len(data)
+            if self._trackTraffic:
+               if self.state == WebSocketProtocol.STATE_OPEN:
+                  self.trafficStats.outgoingOctetsWireLevel += len(data)
+               elif self.state == WebSocketProtocol.STATE_CONNECTING or self.state == WebSocketProtocol.STATE_PROXY_CONNECTING:
+                  self.trafficStats.preopenOutgoingOctetsWireLevel += len(data)
+
+            if self.factory.metrics is not None and self.state == WebSocketProtocol.STATE_OPEN:
+               self.factory.metrics.outgoingOctets += len(data)
 
             if self.logOctets:
                self.logTxOctets(data, False)
 
 
+   def _sendDataUntracked(self, data, sync = False, chopsize = None):
+      """
+      Variant of :meth:`sendData` without any traffic accounting. Only plain
+      writes are handled here, anything else goes to :meth:`sendData`.
+
+      Modes: Hybi, Hixie
+      """
+      if (chopsize and chopsize > 0) or sync or len(self.send_queue) > 0 or self.logOctets:
+         WebSocketProtocol.sendData(self, data, sync, chopsize)
+      elif self._corking():
+         self._cork([data])
+      else:
+         if self._corkBuffer:
+            self._flushCork()
+         self.transport.write(data)
+
+
+   def _trackOutgoingOctets(self, n):
+      """
+      Account for octets written to the transport.
+
+      Modes: Hybi, Hixie
+      """
+      if self._trackTraffic:
+         if self.state == WebSocketProtocol.STATE_OPEN:
+            self.trafficStats.outgoingOctetsWireLevel += n
+         elif self.state == WebSocketProtocol.STATE_CONNECTING or self.state == WebSocketProtocol.STATE_PROXY_CONNECTING:
+            self.trafficStats.preopenOutgoingOctetsWireLevel += n
+
+      if self.factory.metrics is not None and self.state == WebSocketProtocol.STATE_OPEN:
+         self.factory.metrics.outgoingOctets += n
+
+
+   def _sendDataSequence(self, data, sync = False, chopsize = None):
+      """
+      Like :meth:`sendData`, but takes a list of octet strings (e.g. frame
+      header and payload) to be sent back to back. When the data goes straight
+      to the transport, the list is handed over as is (scatter-gather write),
+      so that the payload is never copied just to glue the header in front of it.
+      Chopped, synched or queued writes (and octet logging) need contiguous
+      data, and fall back to concatenating.
+
+      Modes: Hybi
+      """
+      if (chopsize and chopsize > 0) or sync or len(self.send_queue) > 0 or self.logOctets:
+         self.sendData(b''.join(data), sync, chopsize)
+      else:
+         if self._corking():
+            self._cork(data)
+         else:
+            if self._corkBuffer:
+               self._flushCork()
+            self._writeSequence(data)
+
+         if self._trackTraffic:
+            if self.state == WebSocketProtocol.STATE_OPEN:
+               self.trafficStats.outgoingOctetsWireLevel += sum(map(len, data))
+            elif self.state == WebSocketProtocol.STATE_CONNECTING or self.state == WebSocketProtocol.STATE_PROXY_CONNECTING:
+               self.trafficStats.preopenOutgoingOctetsWireLevel += sum(map(len, data))
+
+         if self.factory.metrics is not None and self.state == WebSocketProtocol.STATE_OPEN:
+            self.factory.metrics.outgoingOctets += sum(map(len, data))
+
+
+   def _sendDataSequenceUntracked(self, data, sync = False, chopsize = None):
+      """
+      Variant of :meth:`_sendDataSequence` without any traffic accounting.
+
+      Modes: Hybi
+      """
+      if (chopsize and chopsize > 0) or sync or len(self.send_queue) > 0 or self.logOctets:
+         WebSocketProtocol._sendDataSequence(self, data, sync, chopsize)
+      elif self._corking():
+         self._cork(data)
+      else:
+         if self._corkBuffer:
+            self._flushCork()
+         self._writeSequence(data)
+
+
+   def _deliverMessageBatch(self):
+      """
+      Fire onMessageBatch() with the messages received so far. Anything sent
+      (synchronously) while processing the batch is corked and written out
+      in one go after the batch was processed.
+
+      Modes: Hybi, Hixie
+      """
+      messages = self._messageBatch
+      self._messageBatch = []
+      self._corked = True
+      try:
+         self._onMessageBatch(messages)
+      finally:
+         self._corked = False
+         self._flushCork()
+
+
+   def _corking(self):
+      """
+      Check if writes are currently corked. Only writes on open connections
+      are corked (the opening handshake, and anything sent once the closing
+      handshake started, is written right away).
+
+      Modes: Hybi, Hixie
+      """
+      return (self.corkWrites or self._corked) and self.state == WebSocketProtocol.STATE_OPEN
+
+
+   def _cork(self, data):
+      """
+      Add octets (a list of octet strings) to the cork buffer. The buffer is
+      flushed at the end of the current reactor/loop iteration, or right away
+      when it has grown to `corkBufferSize` octets.
+
+      Modes: Hybi, Hixie
+      """
+      n = self._corkBufferLen
+      for d in data:
+         n += len(d)
+
+      if n >= self.corkBufferSize:
+         if self._corkBuffer:
+            self._corkBuffer.extend(data)
+            data = self._corkBuffer
+            self._corkBuffer = []
+            self._corkBufferLen = 0
+         self._writeSequence(data)
+         return
+
+      self._corkBuffer.extend(data)
+      self._corkBufferLen = n
+
+      if not self._corkFlushPending and not self._corked:
+         self._corkFlushPending = True
+         self.factory._callSoon(self._onCorkFlush)
+
+
+   def _onCorkFlush(self):
+      self._corkFlushPending = False
+      self._flushCork()
+
+
+   def _flushCork(self, force = False):
+      """
+      Write out the cork buffer to the transport.
+
+      Modes: Hybi, Hixie
+      """
+      if self._corkBuffer:
+         data = self._corkBuffer
+         self._corkBuffer = []
+         self._corkBufferLen = 0
+         if self.state != WebSocketProtocol.STATE_CLOSED or force:
+            self._writeSequence(data)
+
+
    def sendPreparedMessage(self, preparedMsg):
       """
       Implements :func:`autobahn.websocket.interfaces.IWebSocketChannel.sendPreparedMessage`
       """
       if self.websocket_version != 0:
          if self._perMessageCompress is None or preparedMsg.doNotCompress:
-            self.sendData(preparedMsg.payloadHybi)
+            self._sendDataSequence(preparedMsg._chunksHybi)
          else:
+            ## counted in the metrics by sendMessage()
             self.sendMessage(preparedMsg.payload, preparedMsg.binary)
+            return
       else:
          self.sendData(preparedMsg.payloadHixie)
 
+      if self.factory.metrics is not None:
+         self.factory.metrics.outgoingMessages += 1
+         self.factory.metrics.outgoingMessageSize.observe(preparedMsg._payloadLength)
+
 
    def processData(self):
       """
@@ -1474,6 +1852,7 @@ class WebSocketProtocol:
                self.data = self.data[1:]
                if self.trackedTimings:
                   self.trackedTimings.track("onMessageBegin")
+               self._incomingMessageLength = 0
                self._onMessageBegin(False)
 
             ## Hixie close from peer received
@@ -1509,10 +1888,14 @@ class WebSocketProtocol:
             if self.invalidPayload("encountered invalid UTF-8 while processing text message at payload octet index %d" % self.utf8validateLast[3]):
                return False
 
+      self._incomingMessageLength += len(payload)
       self._onMessageFrameData(payload)
 
       if end_index > 0:
          self.inside_message = False
+         if self.factory.metrics is not None:
+            self.factory.metrics.incomingMessages += 1
+            self.factory.metrics.incomingMessageSize.observe(self._incomingMessageLength)
          self._onMessageEnd()
 
       return len(self.data) > 0
@@ -1803,6 +2186,7 @@ class WebSocketProtocol:
 
             ## fire onMessageBegin
             ##
+            self._incomingMessageLength = 0
             self._onMessageBegin(self.current_frame.opcode == WebSocketProtocol.MESSAGE_TYPE_BINARY)
 
          self._onMessageFrameBegin(self.current_frame.length)
@@ -1831,10 +2215,13 @@ class WebSocketProtocol:
             compressedLen = l
             uncompressedLen = l
 
-         if self.state == WebSocketProtocol.STATE_OPEN:
+         if self._trackTraffic and self.state == WebSocketProtocol.STATE_OPEN:
             self.trafficStats.incomingOctetsWebSocketLevel += compressedLen
             self.trafficStats.incomingOctetsAppLevel += uncompressedLen
 
+         ## (application level) length of the message so far, for metrics
+         self._incomingMessageLength += uncompressedLen
+
          ## incrementally validate UTF-8 payload
          ##
          if self.utf8validateIncomingCurrentMessage:
@@ -1857,7 +2244,7 @@ class WebSocketProtocol:
             self.logRxFrame(self.current_frame, self.control_frame_data)
          self.processControlFrame()
       else:
-         if self.state == WebSocketProtocol.STATE_OPEN:
+         if self._trackTraffic and self.state == WebSocketProtocol.STATE_OPEN:
             self.trafficStats.incomingWebSocketFrames += 1
          if self.logFrames:
             self.logRxFrame(self.current_frame, self.frame_data)
@@ -1882,7 +2269,11 @@ class WebSocketProtocol:
             #   self.factory._log("Traffic statistics:\n" + str(self.trafficStats))
 
             if self.state == WebSocketProtocol.STATE_OPEN:
-               self.trafficStats.incomingWebSocketMessages += 1
+               if self._trackTraffic:
+                  self.trafficStats.incomingWebSocketMessages += 1
+               if self.factory.metrics is not None:
+                  self.factory.metrics.incomingMessages += 1
+                  self.factory.metrics.incomingMessageSize.observe(self._incomingMessageLength)
 
             self._onMessageEnd()
             self.inside_message = False
@@ -1984,7 +2375,7 @@ class WebSocketProtocol:
       if mask or (not self.factory.isServer and self.maskClientFrames) or (self.factory.isServer and self.maskServerFrames):
          b1 |= 1 << 7
          if not mask:
-            mask = struct.pack("!I", random.getrandbits(32))
+            mask = self.factory._maskSource.getMask()
             mv = mask
          else:
             mv = b''
@@ -1993,6 +2384,8 @@ class WebSocketProtocol:
          ##
          if l > 0 and self.applyMask:
             masker = createXorMasker(mask, l)
+            if isinstance(pl, memoryview):
+               pl = pl.tobytes()
             plm = masker.process(pl)
          else:
             plm = pl
@@ -2013,21 +2406,27 @@ class WebSocketProtocol:
       else:
          raise Exception("invalid payload length")
 
+      ## frame header and (masked) payload of larger frames are sent as a
+      ## sequence, so the payload is not copied only to prepend the header
+      ##
       if PY3:
-         raw = b''.join([b0.to_bytes(1, 'big'), b1.to_bytes(1, 'big'), el, mv, plm])
+         header = b''.join([b0.to_bytes(1, 'big'), b1.to_bytes(1, 'big'), el, mv])
       else:
-         raw = b''.join([chr(b0), chr(b1), el, mv, plm])
+         header = b''.join([chr(b0), chr(b1), el, mv])
 
-      if opcode in [0, 1, 2]:
+      if self._trackTraffic and opcode in [0, 1, 2]:
          self.trafficStats.outgoingWebSocketFrames += 1
 
       if self.logFrames:
          frameHeader = FrameHeader(opcode, fin, rsv, l, mask)
-         self.logTxFrame(frameHeader, payload, payload_len, chopsize, sync)
+         self.logTxFrame(frameHeader, bytes(payload), payload_len, chopsize, sync)
 
       ## send frame octets
       ##
-      self.sendData(raw, sync, chopsize)
+      if l >= WebSocketProtocol._SCATTER_WRITE_MIN_PAYLOAD:
+         self._sendDataSequence([header, plm], sync, chopsize)
+      else:
+         self.sendData(header + plm, sync, chopsize)
 
 
    def sendPing(self, payload = None):
@@ -2172,7 +2571,10 @@ class WebSocketProtocol:
          else:
             self.send_compressed = False
 
-      self.trafficStats.outgoingWebSocketMessages += 1
+      if self._trackTraffic:
+         self.trafficStats.outgoingWebSocketMessages += 1
+      if self.factory.metrics is not None:
+         self.factory.metrics.outgoingMessages += 1
 
 
    def beginMessageFrame(self, length):
@@ -2195,14 +2597,15 @@ class WebSocketProtocol:
 
       self.send_message_frame_length = length
 
-      self.trafficStats.outgoingWebSocketFrames += 1
+      if self._trackTraffic:
+         self.trafficStats.outgoingWebSocketFrames += 1
 
       if (not self.factory.isServer and self.maskClientFrames) or (self.factory.isServer and self.maskServerFrames):
          ## automatic mask:
          ##  - client-to-server masking (if not deactivated)
          ##  - server-to-client masking (if activated)
          ##
-         self.send_message_frame_mask = struct.pack("!I", random.getrandbits(32))
+         self.send_message_frame_mask = self.factory._maskSource.getMask()
 
       else:
          ## no mask
@@ -2273,9 +2676,10 @@ class WebSocketProtocol:
       if self.state != WebSocketProtocol.STATE_OPEN:
          return
 
-      if not self.send_compressed:
-         self.trafficStats.outgoingOctetsAppLevel += len(payload)
-      self.trafficStats.outgoingOctetsWebSocketLevel += len(payload)
+      if self._trackTraffic:
+         if not self.send_compressed:
+            self.trafficStats.outgoingOctetsAppLevel += len(payload)
+         self.trafficStats.outgoingOctetsWebSocketLevel += len(payload)
 
       if self.websocket_version == 0:
          ## Hixie Mode
@@ -2338,7 +2742,8 @@ class WebSocketProtocol:
       else:
          if self.send_compressed:
             payload = self._perMessageCompress.endCompressMessage()
-            self.trafficStats.outgoingOctetsWebSocketLevel += len(payload)
+            if self._trackTraffic:
+               self.trafficStats.outgoingOctetsWebSocketLevel += len(payload)
          else:
             ## send continuation frame with empty payload and FIN set to end message
             payload = b''
@@ -2358,7 +2763,8 @@ class WebSocketProtocol:
          return
 
       if self.send_compressed:
-         self.trafficStats.outgoingOctetsAppLevel += len(payload)
+         if self._trackTraffic:
+            self.trafficStats.outgoingOctetsAppLevel += len(payload)
          payload = self._perMessageCompress.compressMessageData(payload)
 
       self.beginMessageFrame(len(payload))
@@ -2410,6 +2816,11 @@ class WebSocketProtocol:
       """
       Hybi-Variant of sendMessage().
 
+      Fragments are sent without copying them out of the payload on Python 3
+      only, and only when not masking (i.e. on servers). On Python 2, the
+      transports need octet strings, so fragments are sliced copies. Masked
+      fragments are copied by the masker anyway.
+
       Modes: Hybi
       """
       ## (initial) frame opcode
@@ -2419,7 +2830,11 @@ class WebSocketProtocol:
       else:
          opcode = 1
 
-      self.trafficStats.outgoingWebSocketMessages += 1
+      if self._trackTraffic:
+         self.trafficStats.outgoingWebSocketMessages += 1
+      if self.factory.metrics is not None:
+         self.factory.metrics.outgoingMessages += 1
+         self.factory.metrics.outgoingMessageSize.observe(len(payload))
 
       ## setup compressor
       ##
@@ -2428,19 +2843,22 @@ class WebSocketProtocol:
 
          self._perMessageCompress.startCompressMessage()
 
-         self.trafficStats.outgoingOctetsAppLevel += len(payload)
+         if self._trackTraffic:
+            self.trafficStats.outgoingOctetsAppLevel += len(payload)
 
          payload1 = self._perMessageCompress.compressMessageData(payload)
          payload2 = self._perMessageCompress.endCompressMessage()
          payload = b''.join([payload1, payload2])
 
-         self.trafficStats.outgoingOctetsWebSocketLevel += len(payload)
+         if self._trackTraffic:
+            self.trafficStats.outgoingOctetsWebSocketLevel += len(payload)
 
       else:
          sendCompressed = False
          l = len(payload)
-         self.trafficStats.outgoingOctetsAppLevel += l
-         self.trafficStats.outgoingOctetsWebSocketLevel += l
+         if self._trackTraffic:
+            self.trafficStats.outgoingOctetsAppLevel += l
+            self.trafficStats.outgoingOctetsWebSocketLevel += l
 
       ## explicit fragmentSize arguments overrides autoFragmentSize setting
       ##
@@ -2462,6 +2880,14 @@ class WebSocketProtocol:
       else:
          if pfs < 1:
             raise Exception("payload fragment size must be at least 1 (was %d)" % pfs)
+
+         ## on Python 3, fragments are memoryview slices of the payload that
+         ## are handed down to the transport without copying (Python 2 transports
+         ## need str, so there fragments still are sliced copies)
+         ##
+         if PY3:
+            payload = memoryview(payload)
+
          n = len(payload)
          i = 0
          done = False
@@ -2523,7 +2949,7 @@ class PreparedMessage:
    This can be used for optimizing Broadcast/PubSub.
    """
 
-   def __init__(self, payload, isBinary, applyMask, doNotCompress):
+   def __init__(self, payload, isBinary, applyMask, doNotCompress, maskSource = None):
       """
       Ctor for a prepared message.
 
@@ -2538,6 +2964,8 @@ class PreparedMessage:
                             the WebSocket connection. Use when you know the payload
                             uncompressible (e.g. encrypted or already compressed).
       :type doNotCompress: bool
+      :param maskSource: Source for the mask when `applyMask` is `True` (default: a new random mask).
+      :type maskSource: obj -- An instance of :class:`autobahn.websocket.protocol.MaskSource`
       """
       if not doNotCompress:
          ## we need to store original payload for compressed WS
@@ -2546,12 +2974,13 @@ class PreparedMessage:
          self.payload = payload
          self.binary = isBinary
       self.doNotCompress = doNotCompress
+      self._payloadLength = len(payload)
 
       ## store pre-framed octets to be sent to Hixie-76 peers
       self._initHixie(payload, isBinary)
 
       ## store pre-framed octets to be sent to Hybi peers
-      self._initHybi(payload, isBinary, applyMask)
+      self._initHybi(payload, isBinary, applyMask, maskSource)
 
 
    def _initHixie(self, payload, binary):
@@ -2564,7 +2993,7 @@ class PreparedMessage:
          self.payloadHixie = '\x00' + payload + '\xff'
 
 
-   def _initHybi(self, payload, binary, masked):
+   def _initHybi(self, payload, binary, masked, maskSource = None):
       l = len(payload)
 
       ## first byte
@@ -2575,7 +3004,10 @@ class PreparedMessage:
       ##
       if masked:
          b1 = 1 << 7
-         mask = struct.pack("!I", random.getrandbits(32))
+         if maskSource is not None:
+            mask = maskSource.getMask()
+         else:
+            mask = struct.pack("!I", random.getrandbits(32))
          if l == 0:
             plm = payload
          else:
@@ -2599,12 +3031,31 @@ class PreparedMessage:
       else:
          raise Exception("invalid payload length")
 
-      ## raw WS message (single frame)
+      ## raw WS message (single frame), kept as a list of frame header and
+      ## (masked) payload, which is handed to the transport as is
       ##
       if PY3:
-         self.payloadHybi = b''.join([b0.to_bytes(1, 'big'), b1.to_bytes(1, 'big'), el, mask, plm])
+         header = b''.join([b0.to_bytes(1, 'big'), b1.to_bytes(1, 'big'), el, mask])
+      else:
+         header = b''.join([chr(b0), chr(b1), el, mask])
+      if l > 0:
+         self._chunksHybi = [header, plm]
       else:
-         self.payloadHybi = b''.join([chr(b0), chr(b1), el, mask, plm])
+         self._chunksHybi = [header]
+      self._payloadHybi = None
+
+
+   @property
+   def payloadHybi(self):
+      """
+      The raw WS message (single frame) to be sent to Hybi peers. Joined
+      from frame header and payload on first access only, so that prepared
+      messages sent via :meth:`sendPreparedMessage` don't hold a second copy
+      of the payload.
+      """
+      if self._payloadHybi is None:
+         self._payloadHybi = b''.join(self._chunksHybi)
+      return self._payloadHybi
 
 
 
@@ -2615,6 +3066,17 @@ class WebSocketFactory:
    :class:`autobahn.websocket.protocol.WebSocketServerFactory`.
    """
 
+   _trafficStatsSamplingCount = 0
+   """
+   Number of connections so far that were subject to traffic stats sampling.
+   """
+
+   metrics = None
+   """
+   Factory-wide metrics (an instance of :class:`autobahn.websocket.metrics.WebSocketMetrics`)
+   or `None` when metrics are not tracked.
+   """
+
    def prepareMessage(self, payload, isBinary = False, doNotCompress = False):
       """
       Prepare a WebSocket message. This can be later sent on multiple
@@ -2638,7 +3100,7 @@ class WebSocketFactory:
       :returns: obj -- An instance of :class:`autobahn.websocket.protocol.PreparedMessage`.
       """
       applyMask = not self.isServer
-      return PreparedMessage(payload, isBinary, applyMask, doNotCompress)
+      return PreparedMessage(payload, isBinary, applyMask, doNotCompress, self._maskSource)
 
 
 
@@ -2649,6 +3111,11 @@ class WebSocketServerProtocol(WebSocketProtocol):
 
    CONFIG_ATTRS = WebSocketProtocol.CONFIG_ATTRS_COMMON + WebSocketProtocol.CONFIG_ATTRS_SERVER
 
+   _WS_KEY_PAT = re.compile(r"^[a-zA-Z0-9+/]{22}==$")
+   """
+   Well-formed (base64 encoded 16 octets) Sec-WebSocket-Key.
+   """
+
 
    def onConnect(self, request):
       """
@@ -2680,6 +3147,13 @@ class WebSocketServerProtocol(WebSocketProtocol):
       """
       WebSocketProtocol._connectionMade(self)
       self.factory.countConnections += 1
+      ## the metrics the connection was counted in as open (metrics might
+      ## be turned off or reset while the connection is open)
+      self._metricsOpen = None
+      if self.factory.metrics is not None:
+         self._connectionMadeAt = time.time()
+      else:
+         self._connectionMadeAt = None
       if self.debug:
          self.factory._log("connection accepted from peer %s" % self.peer)
 
@@ -2693,6 +3167,12 @@ class WebSocketServerProtocol(WebSocketProtocol):
       """
       WebSocketProtocol._connectionLost(self, reason)
       self.factory.countConnections -= 1
+      metrics = self._metricsOpen
+      if metrics is not None:
+         self._metricsOpen = None
+         metrics.openConnections -= 1
+         code = self.remoteCloseCode if self.remoteCloseCode is not None else self.localCloseCode
+         metrics.connectionClosed(code, self.wasClean)
       if self.debug:
          self.factory._log("connection from %s lost" % self.peer)
 
@@ -2725,277 +3205,306 @@ class WebSocketServerProtocol(WebSocketProtocol):
          ##
          (self.http_status_line, self.http_headers, http_headers_cnt) = parseHttpHeader(self.http_request_data)
 
-         ## validate WebSocket opening handshake client request
-         ##
-         if self.debug:
-            self.factory._log("received HTTP status line in opening handshake : %s" % str(self.http_status_line))
-            self.factory._log("received HTTP headers in opening handshake : %s" % str(self.http_headers))
+         self.processHandshakeRequest(http_headers_cnt, end_of_header + 4)
 
-         ## HTTP Request line : METHOD, VERSION
-         ##
-         rl = self.http_status_line.split()
-         if len(rl) != 3:
-            return self.failHandshake("Bad HTTP request status line '%s'" % self.http_status_line)
-         if rl[0].strip() != "GET":
-            return self.failHandshake("HTTP method '%s' not allowed" % rl[0], http.METHOD_NOT_ALLOWED[0])
-         vs = rl[2].strip().split("/")
-         if len(vs) != 2 or vs[0] != "HTTP" or vs[1] not in ["1.1"]:
-            return self.failHandshake("Unsupported HTTP version '%s'" % rl[2], http.UNSUPPORTED_HTTP_VERSION[0])
-
-         ## HTTP Request line : REQUEST-URI
-         ##
-         self.http_request_uri = rl[1].strip()
+
+   def processHandshakeRequest(self, http_headers_cnt, body_start):
+      """
+      Validate the (already parsed) WebSocket opening handshake request from
+      the client and fire `onConnect()`. Expects `http_status_line` and
+      `http_headers` to be set.
+
+      This is used directly when the HTTP request was already parsed, e.g.
+      by :class:`autobahn.twisted.resource.WebSocketResource`.
+
+      :param http_headers_cnt: Mapping of (lower-cased) HTTP header names to the number of times the header appeared.
+      :type http_headers_cnt: dict
+      :param body_start: Offset in received data where the HTTP request body (if any) starts.
+      :type body_start: int
+      """
+      ## validate WebSocket opening handshake client request
+      ##
+      if self.debug:
+         self.factory._log("received HTTP status line in opening handshake : %s" % str(self.http_status_line))
+         self.factory._log("received HTTP headers in opening handshake : %s" % str(self.http_headers))
+
+      ## HTTP Request line : METHOD, VERSION
+      ##
+      rl = self.http_status_line.split()
+      if len(rl) != 3:
+         return self.failHandshake("Bad HTTP request status line '%s'" % self.http_status_line)
+      if rl[0].strip() != "GET":
+         return self.failHandshake("HTTP method '%s' not allowed" % rl[0], http.METHOD_NOT_ALLOWED[0])
+      vs = rl[2].strip().split("/")
+      if len(vs) != 2 or vs[0] != "HTTP" or vs[1] not in ["1.1"]:
+         return self.failHandshake("Unsupported HTTP version '%s'" % rl[2], http.UNSUPPORTED_HTTP_VERSION[0])
+
+      ## HTTP Request line : REQUEST-URI
+      ##
+      self.http_request_uri = rl[1].strip()
+      try:
+         (scheme, netloc, path, params, query, fragment) = urlparse.urlparse(self.http_request_uri)
+
+         ## FIXME: check that if absolute resource URI is given,
+         ## the scheme/netloc matches the server
+         if scheme != "" or netloc != "":
+            pass
+
+         ## Fragment identifiers are meaningless in the context of WebSocket
+         ## URIs, and MUST NOT be used on these URIs.
+         if fragment != "":
+            return self.failHandshake("HTTP requested resource contains a fragment identifier '%s'" % fragment)
+
+         ## resource path and query parameters .. this will get forwarded
+         ## to onConnect()
+         self.http_request_path = path
+         self.http_request_params = urlparse.parse_qs(query)
+      except:
+         return self.failHandshake("Bad HTTP request resource - could not parse '%s'" % rl[1].strip())
+
+      ## Host
+      ##
+      if not 'host' in self.http_headers:
+         return self.failHandshake("HTTP Host header missing in opening handshake request")
+      if http_headers_cnt["host"] > 1:
+         return self.failHandshake("HTTP Host header appears more than once in opening handshake request")
+      self.http_request_host = self.http_headers["host"].strip()
+      if self.http_request_host.find(":") >= 0:
+         (h, p) = self.http_request_host.split(":")
          try:
-            (scheme, netloc, path, params, query, fragment) = urlparse.urlparse(self.http_request_uri)
-
-            ## FIXME: check that if absolute resource URI is given,
-            ## the scheme/netloc matches the server
-            if scheme != "" or netloc != "":
-               pass
-
-            ## Fragment identifiers are meaningless in the context of WebSocket
-            ## URIs, and MUST NOT be used on these URIs.
-            if fragment != "":
-               return self.failHandshake("HTTP requested resource contains a fragment identifier '%s'" % fragment)
-
-            ## resource path and query parameters .. this will get forwarded
-            ## to onConnect()
-            self.http_request_path = path
-            self.http_request_params = urlparse.parse_qs(query)
+            port = int(str(p.strip()))
          except:
-            return self.failHandshake("Bad HTTP request resource - could not parse '%s'" % rl[1].strip())
+            return self.failHandshake("invalid port '%s' in HTTP Host header '%s'" % (str(p.strip()), str(self.http_request_host)))
+         if port != self.factory.externalPort:
+            return self.failHandshake("port %d in HTTP Host header '%s' does not match server listening port %s" % (port, str(self.http_request_host), self.factory.externalPort))
+         self.http_request_host = h
+      else:
+         if not ((self.factory.isSecure and self.factory.externalPort == 443) or (not self.factory.isSecure and self.factory.externalPort == 80)):
+            return self.failHandshake("missing port in HTTP Host header '%s' and server runs on non-standard port %d (wss = %s)" % (str(self.http_request_host), self.factory.externalPort, self.factory.isSecure))
 
-         ## Host
+      ## Upgrade
+      ##
+      if not 'upgrade' in self.http_headers:
+         ## When no WS upgrade and metrics are tracked, render metrics on the metrics path
          ##
-         if not 'host' in self.http_headers:
-            return self.failHandshake("HTTP Host header missing in opening handshake request")
-         if http_headers_cnt["host"] > 1:
-            return self.failHandshake("HTTP Host header appears more than once in opening handshake request")
-         self.http_request_host = self.http_headers["host"].strip()
-         if self.http_request_host.find(":") >= 0:
-            (h, p) = self.http_request_host.split(":")
-            try:
-               port = int(str(p.strip()))
-            except:
-               return self.failHandshake("invalid port '%s' in HTTP Host header '%s'" % (str(p.strip()), str(self.http_request_host)))
-            if port != self.factory.externalPort:
-               return self.failHandshake("port %d in HTTP Host header '%s' does not match server listening port %s" % (port, str(self.http_request_host), self.factory.externalPort))
-            self.http_request_host = h
-         else:
-            if not ((self.factory.isSecure and self.factory.externalPort == 443) or (not self.factory.isSecure and self.factory.externalPort == 80)):
-               return self.failHandshake("missing port in HTTP Host header '%s' and server runs on non-standard port %d (wss = %s)" % (str(self.http_request_host), self.factory.externalPort, self.factory.isSecure))
+         if self.factory.metrics is not None and self.http_request_path == self.factory.metricsPath:
+            if self.debugCodePaths:
+               self.factory._log("HTTP Upgrade header missing : render metrics")
+            self.sendMetrics()
+            self.dropConnection(abort = False)
+            return
 
-         ## Upgrade
+         ## When no WS upgrade, render HTML server status page
          ##
-         if not 'upgrade' in self.http_headers:
-            ## When no WS upgrade, render HTML server status page
-            ##
-            if self.webStatus:
-               if 'redirect' in self.http_request_params and len(self.http_request_params['redirect']) > 0:
-                  ## To specifiy an URL for redirection, encode the URL, i.e. from JavaScript:
-                  ##
-                  ##    var url = encodeURIComponent("http://autobahn.ws/python");
-                  ##
-                  ## and append the encoded string as a query parameter 'redirect'
-                  ##
-                  ##    http://localhost:9000?redirect=http%3A%2F%2Fautobahn.ws%2Fpython
-                  ##    https://localhost:9000?redirect=https%3A%2F%2Ftwitter.com%2F
-                  ##
-                  ## This will perform an immediate HTTP-303 redirection. If you provide
-                  ## an additional parameter 'after' (int >= 0), the redirection happens
-                  ## via Meta-Refresh in the rendered HTML status page, i.e.
-                  ##
-                  ##    https://localhost:9000/?redirect=https%3A%2F%2Ftwitter.com%2F&after=3
-                  ##
-                  url = self.http_request_params['redirect'][0]
-                  if 'after' in self.http_request_params and len(self.http_request_params['after']) > 0:
-                     after = int(self.http_request_params['after'][0])
-                     if self.debugCodePaths:
-                        self.factory._log("HTTP Upgrade header missing : render server status page and meta-refresh-redirecting to %s after %d seconds" % (url, after))
-                     self.sendServerStatus(url, after)
-                  else:
-                     if self.debugCodePaths:
-                        self.factory._log("HTTP Upgrade header missing : 303-redirecting to %s" % url)
-                     self.sendRedirect(url)
+         if self.webStatus:
+            if 'redirect' in self.http_request_params and len(self.http_request_params['redirect']) > 0:
+               ## To specifiy an URL for redirection, encode the URL, i.e. from JavaScript:
+               ##
+               ##    var url = encodeURIComponent("http://autobahn.ws/python");
+               ##
+               ## and append the encoded string as a query parameter 'redirect'
+               ##
+               ##    http://localhost:9000?redirect=http%3A%2F%2Fautobahn.ws%2Fpython
+               ##    https://localhost:9000?redirect=https%3A%2F%2Ftwitter.com%2F
+               ##
+               ## This will perform an immediate HTTP-303 redirection. If you provide
+               ## an additional parameter 'after' (int >= 0), the redirection happens
+               ## via Meta-Refresh in the rendered HTML status page, i.e.
+               ##
+               ##    https://localhost:9000/?redirect=https%3A%2F%2Ftwitter.com%2F&after=3
+               ##
+               url = self.http_request_params['redirect'][0]
+               if 'after' in self.http_request_params and len(self.http_request_params['after']) > 0:
+                  after = int(self.http_request_params['after'][0])
+                  if self.debugCodePaths:
+                     self.factory._log("HTTP Upgrade header missing : render server status page and meta-refresh-redirecting to %s after %d seconds" % (url, after))
+                  self.sendServerStatus(url, after)
                else:
                   if self.debugCodePaths:
-                     self.factory._log("HTTP Upgrade header missing : render server status page")
-                  self.sendServerStatus()
-               self.dropConnection(abort = False)
-               return
+                     self.factory._log("HTTP Upgrade header missing : 303-redirecting to %s" % url)
+                  self.sendRedirect(url)
             else:
-               return self.failHandshake("HTTP Upgrade header missing", http.UPGRADE_REQUIRED[0])
-         upgradeWebSocket = False
-         for u in self.http_headers["upgrade"].split(","):
-            if u.strip().lower() == "websocket":
-               upgradeWebSocket = True
-               break
-         if not upgradeWebSocket:
-            return self.failHandshake("HTTP Upgrade headers do not include 'websocket' value (case-insensitive) : %s" % self.http_headers["upgrade"])
-
-         ## Connection
-         ##
-         if not 'connection' in self.http_headers:
-            return self.failHandshake("HTTP Connection header missing")
-         connectionUpgrade = False
-         for c in self.http_headers["connection"].split(","):
-            if c.strip().lower() == "upgrade":
-               connectionUpgrade = True
-               break
-         if not connectionUpgrade:
-            return self.failHandshake("HTTP Connection headers do not include 'upgrade' value (case-insensitive) : %s" % self.http_headers["connection"])
-
-         ## Sec-WebSocket-Version PLUS determine mode: Hybi or Hixie
-         ##
-         if not 'sec-websocket-version' in self.http_headers:
-            if self.debugCodePaths:
-               self.factory._log("Hixie76 protocol detected")
-            if self.allowHixie76:
-               version = 0
-            else:
-               return self.failHandshake("WebSocket connection denied - Hixie76 protocol mode disabled.")
+               if self.debugCodePaths:
+                  self.factory._log("HTTP Upgrade header missing : render server status page")
+               self.sendServerStatus()
+            self.dropConnection(abort = False)
+            return
          else:
-            if self.debugCodePaths:
-               self.factory._log("Hybi protocol detected")
-            if http_headers_cnt["sec-websocket-version"] > 1:
-               return self.failHandshake("HTTP Sec-WebSocket-Version header appears more than once in opening handshake request")
-            try:
-               version = int(self.http_headers["sec-websocket-version"])
-            except:
-               return self.failHandshake("could not parse HTTP Sec-WebSocket-Version header '%s' in opening handshake request" % self.http_headers["sec-websocket-version"])
-
-         if version not in self.versions:
-
-            ## respond with list of supported versions (descending order)
-            ##
-            sv = sorted(self.versions)
-            sv.reverse()
-            svs = ','.join([str(x) for x in sv])
-            return self.failHandshake("WebSocket version %d not supported (supported versions: %s)" % (version, svs),
-                                      http.BAD_REQUEST[0],
-                                      [("Sec-WebSocket-Version", svs)])
+            return self.failHandshake("HTTP Upgrade header missing", http.UPGRADE_REQUIRED[0])
+      upgradeWebSocket = False
+      for u in self.http_headers["upgrade"].split(","):
+         if u.strip().lower() == "websocket":
+            upgradeWebSocket = True
+            break
+      if not upgradeWebSocket:
+         return self.failHandshake("HTTP Upgrade headers do not include 'websocket' value (case-insensitive) : %s" % self.http_headers["upgrade"])
+
+      ## Connection
+      ##
+      if not 'connection' in self.http_headers:
+         return self.failHandshake("HTTP Connection header missing")
+      connectionUpgrade = False
+      for c in self.http_headers["connection"].split(","):
+         if c.strip().lower() == "upgrade":
+            connectionUpgrade = True
+            break
+      if not connectionUpgrade:
+         return self.failHandshake("HTTP Connection headers do not include 'upgrade' value (case-insensitive) : %s" % self.http_headers["connection"])
+
+      ## Sec-WebSocket-Version PLUS determine mode: Hybi or Hixie
+      ##
+      if not 'sec-websocket-version' in self.http_headers:
+         if self.debugCodePaths:
+            self.factory._log("Hixie76 protocol detected")
+         if self.allowHixie76:
+            version = 0
          else:
-            ## store the protocol version we are supposed to talk
-            self.websocket_version = version
+            return self.failHandshake("WebSocket connection denied - Hixie76 protocol mode disabled.")
+      else:
+         if self.debugCodePaths:
+            self.factory._log("Hybi protocol detected")
+         if http_headers_cnt["sec-websocket-version"] > 1:
+            return self.failHandshake("HTTP Sec-WebSocket-Version header appears more than once in opening handshake request")
+         try:
+            version = int(self.http_headers["sec-websocket-version"])
+         except:
+            return self.failHandshake("could not parse HTTP Sec-WebSocket-Version header '%s' in opening handshake request" % self.http_headers["sec-websocket-version"])
 
-         ## Sec-WebSocket-Protocol
-         ##
-         if 'sec-websocket-protocol' in self.http_headers:
-            protocols = [str(x.strip()) for x in self.http_headers["sec-websocket-protocol"].split(",")]
-            # check for duplicates in protocol header
-            pp = {}
-            for p in protocols:
-               if p in pp:
-                  return self.failHandshake("duplicate protocol '%s' specified in HTTP Sec-WebSocket-Protocol header" % p)
-               else:
-                  pp[p] = 1
-            # ok, no duplicates, save list in order the client sent it
-            self.websocket_protocols = protocols
-         else:
-            self.websocket_protocols = []
+      if version not in self.versions:
 
-         ## Origin / Sec-WebSocket-Origin
-         ## http://tools.ietf.org/html/draft-ietf-websec-origin-02
+         ## respond with list of supported versions (descending order)
          ##
-         if self.websocket_version < 13 and self.websocket_version != 0:
-            # Hybi, but only < Hybi-13
-            websocket_origin_header_key = 'sec-websocket-origin'
-         else:
-            # RFC6455, >= Hybi-13 and Hixie
-            websocket_origin_header_key = "origin"
-
-         self.websocket_origin = None
-         if websocket_origin_header_key in self.http_headers:
-            if http_headers_cnt[websocket_origin_header_key] > 1:
-               return self.failHandshake("HTTP Origin header appears more than once in opening handshake request")
-            self.websocket_origin = self.http_headers[websocket_origin_header_key].strip()
-         else:
-            # non-browser clients are allowed to omit this header
-            pass
+         sv = sorted(self.versions)
+         sv.reverse()
+         svs = ','.join([str(x) for x in sv])
+         return self.failHandshake("WebSocket version %d not supported (supported versions: %s)" % (version, svs),
+                                   http.BAD_REQUEST[0],
+                                   [("Sec-WebSocket-Version", svs)])
+      else:
+         ## store the protocol version we are supposed to talk
+         self.websocket_version = version
 
-         ## Sec-WebSocket-Key (Hybi) or Sec-WebSocket-Key1/Sec-WebSocket-Key2 (Hixie-76)
-         ##
-         if self.websocket_version == 0:
-            for kk in ['Sec-WebSocket-Key1', 'Sec-WebSocket-Key2']:
-               k = kk.lower()
-               if not k in self.http_headers:
-                  return self.failHandshake("HTTP %s header missing" % kk)
-               if http_headers_cnt[k] > 1:
-                  return self.failHandshake("HTTP %s header appears more than once in opening handshake request" % kk)
-               try:
-                  key1 = self.parseHixie76Key(self.http_headers["sec-websocket-key1"].strip())
-                  key2 = self.parseHixie76Key(self.http_headers["sec-websocket-key2"].strip())
-               except:
-                  return self.failHandshake("could not parse Sec-WebSocket-Key1/2")
-         else:
-            if not 'sec-websocket-key' in self.http_headers:
-               return self.failHandshake("HTTP Sec-WebSocket-Key header missing")
-            if http_headers_cnt["sec-websocket-key"] > 1:
-               return self.failHandshake("HTTP Sec-WebSocket-Key header appears more than once in opening handshake request")
-            key = self.http_headers["sec-websocket-key"].strip()
-            if len(key) != 24: # 16 bytes => (ceil(128/24)*24)/6 == 24
-               return self.failHandshake("bad Sec-WebSocket-Key (length must be 24 ASCII chars) '%s'" % key)
-            if key[-2:] != "==": # 24 - ceil(128/6) == 2
-               return self.failHandshake("bad Sec-WebSocket-Key (invalid base64 encoding) '%s'" % key)
+      ## Sec-WebSocket-Protocol
+      ##
+      if 'sec-websocket-protocol' in self.http_headers:
+         (protocols, duplicate) = self.factory._parseHandshakeHeader(self.factory._protocolsHeaderCache,
+                                                                     self.http_headers["sec-websocket-protocol"],
+                                                                     parseProtocolsHeader)
+         # check for duplicates in protocol header
+         if duplicate is not None:
+            return self.failHandshake("duplicate protocol '%s' specified in HTTP Sec-WebSocket-Protocol header" % duplicate)
+         # ok, no duplicates, save list in order the client sent it
+         self.websocket_protocols = list(protocols)
+      else:
+         self.websocket_protocols = []
+
+      ## Origin / Sec-WebSocket-Origin
+      ## http://tools.ietf.org/html/draft-ietf-websec-origin-02
+      ##
+      if self.websocket_version < 13 and self.websocket_version != 0:
+         # Hybi, but only < Hybi-13
+         websocket_origin_header_key = 'sec-websocket-origin'
+      else:
+         # RFC6455, >= Hybi-13 and Hixie
+         websocket_origin_header_key = "origin"
+
+      self.websocket_origin = None
+      if websocket_origin_header_key in self.http_headers:
+         if http_headers_cnt[websocket_origin_header_key] > 1:
+            return self.failHandshake("HTTP Origin header appears more than once in opening handshake request")
+         self.websocket_origin = self.http_headers[websocket_origin_header_key].strip()
+      else:
+         # non-browser clients are allowed to omit this header
+         pass
+
+      ## Sec-WebSocket-Key (Hybi) or Sec-WebSocket-Key1/Sec-WebSocket-Key2 (Hixie-76)
+      ##
+      if self.websocket_version == 0:
+         for kk in ['Sec-WebSocket-Key1', 'Sec-WebSocket-Key2']:
+            k = kk.lower()
+            if not k in self.http_headers:
+               return self.failHandshake("HTTP %s header missing" % kk)
+            if http_headers_cnt[k] > 1:
+               return self.failHandshake("HTTP %s header appears more than once in opening handshake request" % kk)
+            try:
+               key1 = self.parseHixie76Key(self.http_headers["sec-websocket-key1"].strip())
+               key2 = self.parseHixie76Key(self.http_headers["sec-websocket-key2"].strip())
+            except:
+               return self.failHandshake("could not parse Sec-WebSocket-Key1/2")
+      else:
+         if not 'sec-websocket-key' in self.http_headers:
+            return self.failHandshake("HTTP Sec-WebSocket-Key header missing")
+         if http_headers_cnt["sec-websocket-key"] > 1:
+            return self.failHandshake("HTTP Sec-WebSocket-Key header appears more than once in opening handshake request")
+         key = self.http_headers["sec-websocket-key"].strip()
+         if len(key) != 24: # 16 bytes => (ceil(128/24)*24)/6 == 24
+            return self.failHandshake("bad Sec-WebSocket-Key (length must be 24 ASCII chars) '%s'" % key)
+         if key[-2:] != "==": # 24 - ceil(128/6) == 2
+            return self.failHandshake("bad Sec-WebSocket-Key (invalid base64 encoding) '%s'" % key)
+         if not WebSocketServerProtocol._WS_KEY_PAT.match(key):
             for c in key[:-2]:
                if c not in "abcdefghijklmnopqrstuvwxyzABCDEFGHIJKLMNOPQRSTUVWXYZ0123456789+/":
-                  return self.failHandshake("bad character '%s' in Sec-WebSocket-Key (invalid base64 encoding) '%s'" (c, key))
+                  return self.failHandshake("bad character '%s' in Sec-WebSocket-Key (invalid base64 encoding) '%s'" % (c, key))
 
-         ## Sec-WebSocket-Extensions
-         ##
-         self.websocket_extensions = []
-         if 'sec-websocket-extensions' in self.http_headers:
-
-            if self.websocket_version == 0:
-               return self.failHandshake("HTTP Sec-WebSocket-Extensions header encountered for Hixie-76")
-            else:
-               if http_headers_cnt["sec-websocket-extensions"] > 1:
-                  return self.failHandshake("HTTP Sec-WebSocket-Extensions header appears more than once in opening handshake request")
-               else:
-                  ## extensions requested/offered by client
-                  ##
-                  self.websocket_extensions = self._parseExtensionsHeader(self.http_headers["sec-websocket-extensions"])
+      ## Sec-WebSocket-Extensions
+      ##
+      self.websocket_extensions = []
+      if 'sec-websocket-extensions' in self.http_headers:
 
-         ## For Hixie-76, we need 8 octets of HTTP request body to complete HS!
-         ##
          if self.websocket_version == 0:
-            if len(self.data) < end_of_header + 4 + 8:
-               return
+            return self.failHandshake("HTTP Sec-WebSocket-Extensions header encountered for Hixie-76")
+         else:
+            if http_headers_cnt["sec-websocket-extensions"] > 1:
+               return self.failHandshake("HTTP Sec-WebSocket-Extensions header appears more than once in opening handshake request")
             else:
-               key3 =  self.data[end_of_header + 4:end_of_header + 4 + 8]
-               if self.debug:
-                  self.factory._log("received HTTP request body containing key3 for Hixie-76: %s" % key3)
+               ## extensions requested/offered by client
+               ##
+               extensions = self.factory._parseHandshakeHeader(self.factory._extensionsHeaderCache,
+                                                               self.http_headers["sec-websocket-extensions"],
+                                                               self._parseExtensionsHeader)
+               for (extension, params) in extensions:
+                  self.websocket_extensions.append((extension, dict((k, list(v)) for (k, v) in params.items())))
 
-         ## Ok, got complete HS input, remember rest (if any)
-         ##
-         if self.websocket_version == 0:
-            self.data = self.data[end_of_header + 4 + 8:]
+      ## For Hixie-76, we need 8 octets of HTTP request body to complete HS!
+      ##
+      if self.websocket_version == 0:
+         if len(self.data) < body_start + 8:
+            return
          else:
-            self.data = self.data[end_of_header + 4:]
+            key3 =  self.data[body_start:body_start + 8]
+            if self.debug:
+               self.factory._log("received HTTP request body containing key3 for Hixie-76: %s" % key3)
 
-         ## store WS key
-         ##
-         if self.websocket_version == 0:
-            self._wskey = (key1, key2, key3)
-         else:
-            self._wskey = key
+      ## Ok, got complete HS input, remember rest (if any)
+      ##
+      if self.websocket_version == 0:
+         self.data = self.data[body_start + 8:]
+      else:
+         self.data = self.data[body_start:]
 
-         ## WebSocket handshake validated => produce opening handshake response
+      ## store WS key
+      ##
+      if self.websocket_version == 0:
+         self._wskey = (key1, key2, key3)
+      else:
+         self._wskey = key
 
-         ## Now fire onConnect() on derived class, to give that class a chance to accept or deny
-         ## the connection. onConnect() may throw, in which case the connection is denied, or it
-         ## may return a protocol from the protocols provided by client or None.
-         ##
-         request = ConnectionRequest(self.peer,
-                                     self.http_headers,
-                                     self.http_request_host,
-                                     self.http_request_path,
-                                     self.http_request_params,
-                                     self.websocket_version,
-                                     self.websocket_origin,
-                                     self.websocket_protocols,
-                                     self.websocket_extensions)
-         self._onConnect(request)
+      ## WebSocket handshake validated => produce opening handshake response
+
+      ## Now fire onConnect() on derived class, to give that class a chance to accept or deny
+      ## the connection. onConnect() may throw, in which case the connection is denied, or it
+      ## may return a protocol from the protocols provided by client or None.
+      ##
+      request = ConnectionRequest(self.peer,
+                                  self.http_headers,
+                                  self.http_request_host,
+                                  self.http_request_path,
+                                  self.http_request_params,
+                                  self.websocket_version,
+                                  self.websocket_origin,
+                                  self.websocket_protocols,
+                                  self.websocket_extensions)
+      self._onConnect(request)
 
 
    def succeedHandshake(self, res):
@@ -3064,39 +3573,32 @@ class WebSocketServerProtocol(WebSocketProtocol):
             PMCE = PERMESSAGE_COMPRESSION_EXTENSION[accept.EXTENSION_NAME]
             self._perMessageCompress = PMCE['PMCE'].createFromOfferAccept(self.factory.isServer, accept)
             self.websocket_extensions_in_use.append(self._perMessageCompress)
+            self._startPerMessageCompressionIdleTimer()
             extensionResponse.append(accept.getExtensionString())
          else:
             if self.debug:
                self.factory._log("client request permessage-compress extension, but we did not accept any offer [%s]" % pmceOffers)
 
 
-      ## build response to complete WebSocket handshake
+      ## build response to complete WebSocket handshake: status line, server,
+      ## upgrade and factory headers are pre-rendered once per factory
       ##
-      response = "HTTP/1.1 %d Switching Protocols\x0d\x0a" % http.SWITCHING_PROTOCOLS[0]
-
-      if self.factory.server is not None and self.factory.server != "":
-         response += "Server: %s\x0d\x0a" % self.factory.server
-
-      response += "Upgrade: WebSocket\x0d\x0a"
-      response += "Connection: Upgrade\x0d\x0a"
+      response = [self.factory._getHandshakeResponseHead()]
 
       ## optional, user supplied additional HTTP headers
       ##
-      ## headers from factory
-      for uh in self.factory.headers.items():
-         response += "%s: %s\x0d\x0a" % (uh[0], uh[1])
       ## headers from onConnect
       for uh in headers.items():
-         response += "%s: %s\x0d\x0a" % (uh[0], uh[1])
+         response.append("%s: %s\x0d\x0a" % (uh[0], uh[1]))
 
       if self.websocket_protocol_in_use is not None:
-         response += "Sec-WebSocket-Protocol: %s\x0d\x0a" % str(self.websocket_protocol_in_use)
+         response.append("Sec-WebSocket-Protocol: %s\x0d\x0a" % str(self.websocket_protocol_in_use))
 
       if self.websocket_version == 0:
 
          if self.websocket_origin:
             ## browser client provide the header, and expect it to be echo'ed
-            response += "Sec-WebSocket-Origin: %s\x0d\x0a" % str(self.websocket_origin)
+            response.append("Sec-WebSocket-Origin: %s\x0d\x0a" % str(self.websocket_origin))
 
          if self.debugCodePaths:
             self.factory._log('factory isSecure = %s port = %s' % (self.factory.isSecure, self.factory.externalPort))
@@ -3121,10 +3623,10 @@ class WebSocketServerProtocol(WebSocketProtocol):
          location = "%s://%s%s%s" % ('wss' if self.factory.isSecure else 'ws', response_host, response_port, response_path)
 
          # Safari is very picky about this one
-         response += "Sec-WebSocket-Location: %s\x0d\x0a" % location
+         response.append("Sec-WebSocket-Location: %s\x0d\x0a" % location)
 
          ## end of HTTP response headers
-         response += "\x0d\x0a"
+         response.append("\x0d\x0a")
 
          ## compute accept body
          ##
@@ -3138,17 +3640,19 @@ class WebSocketServerProtocol(WebSocketProtocol):
          sha1.update(key.encode('utf8') + WebSocketProtocol._WS_MAGIC)
          sec_websocket_accept = base64.b64encode(sha1.digest())
 
-         response += "Sec-WebSocket-Accept: %s\x0d\x0a" % sec_websocket_accept.decode()
+         response.append("Sec-WebSocket-Accept: %s\x0d\x0a" % sec_websocket_accept.decode())
 
          ## agreed extensions
          ##
          if len(extensionResponse) > 0:
-            response += "Sec-WebSocket-Extensions: %s\x0d\x0a" % ', '.join(extensionResponse)
+            response.append("Sec-WebSocket-Extensions: %s\x0d\x0a" % ', '.join(extensionResponse))
 
          ## end of HTTP response headers
-         response += "\x0d\x0a"
+         response.append("\x0d\x0a")
          response_body = None
 
+      response = ''.join(response)
+
       ## send out opening handshake response
       ##
       if self.debug:
@@ -3168,6 +3672,13 @@ class WebSocketServerProtocol(WebSocketProtocol):
       ##
       self.state = WebSocketProtocol.STATE_OPEN
 
+      metrics = self.factory.metrics
+      if metrics is not None and self._connectionMadeAt is not None:
+         metrics.handshakesSucceeded += 1
+         metrics.handshakeDuration.observe(time.time() - self._connectionMadeAt)
+         metrics.openConnections += 1
+         self._metricsOpen = metrics
+
       ## cancel any opening HS timer if present
       ##
       if self.openHandshakeTimeoutCall is not None:
@@ -3201,6 +3712,8 @@ class WebSocketServerProtocol(WebSocketProtocol):
       """
       if self.debug:
          self.factory._log("failing WebSocket opening handshake ('%s')" % reason)
+      if self.factory.metrics is not None:
+         self.factory.metrics.handshakeFailed(code)
       self.sendHttpErrorResponse(code, reason, responseHeaders)
       self.dropConnection(abort = False)
 
@@ -3243,6 +3756,23 @@ class WebSocketServerProtocol(WebSocketProtocol):
       self.sendData(response.encode('utf8'))
 
 
+   def sendMetrics(self):
+      """
+      Send out the factory metrics in Prometheus text format upon receiving a
+      HTTP/GET without upgrade to WebSocket header on the metrics path (and option
+      trackMetrics is True).
+      """
+      responseBody = self.factory.metrics.render().encode('utf8')
+      response  = "HTTP/1.1 %d %s\x0d\x0a" % (http.OK[0], http.OK[1])
+      if self.factory.server is not None and self.factory.server != "":
+         response += "Server: %s\x0d\x0a" % self.factory.server
+      response += "Content-Type: text/plain; version=0.0.4; charset=UTF-8\x0d\x0a"
+      response += "Content-Length: %d\x0d\x0a" % len(responseBody)
+      response += "\x0d\x0a"
+      self.sendData(response.encode('utf8'))
+      self.sendData(responseBody)
+
+
    def sendServerStatus(self, redirectUrl = None, redirectAfter = 0):
       """
       Used to send out server status/version upon receiving a HTTP/GET without
@@ -3301,6 +3831,12 @@ class WebSocketServerFactory(WebSocketFactory):
    Flag indicating if this factory is client- or server-side.
    """
 
+   HANDSHAKE_CACHE_SIZE = 256
+   """
+   Maximum number of distinct `Sec-WebSocket-Protocol` and `Sec-WebSocket-Extensions`
+   header values for which parse results are cached (each).
+   """
+
 
    def __init__(self,
                 url = None,
@@ -3355,6 +3891,12 @@ class WebSocketServerFactory(WebSocketFactory):
       ##
       self.countConnections = 0
 
+      ## parsed opening handshake header values (clients of one
+      ## application tend to send identical headers)
+      ##
+      self._protocolsHeaderCache = OrderedDict()
+      self._extensionsHeaderCache = OrderedDict()
+
 
    def setSessionParameters(self,
                             url = None,
@@ -3372,6 +3914,8 @@ class WebSocketServerFactory(WebSocketFactory):
       :param server: Server as announced in HTTP response header during opening handshake.
       :type server: str
       :param headers: An optional mapping of additional HTTP headers to send during the WebSocket opening handshake.
+                      The opening handshake response is rendered from `server` and `headers` once, so
+                      change these through this method (not in place).
       :type headers: dict
       :param externalPort: Optionally, the external visible port this server will be reachable under (i.e. when running behind a L2/L3 forwarding device).
       :type externalPort: int
@@ -3398,6 +3942,9 @@ class WebSocketServerFactory(WebSocketFactory):
       self.headers = headers
       self.externalPort = externalPort if externalPort is not None else self.port
 
+      ## static part of the opening handshake response, rendered on first use
+      self._handshakeResponseHead = None
+
 
    def resetProtocolOptions(self):
       """
@@ -3406,6 +3953,9 @@ class WebSocketServerFactory(WebSocketFactory):
       self.versions = WebSocketProtocol.SUPPORTED_PROTOCOL_VERSIONS
       self.allowHixie76 = WebSocketProtocol.DEFAULT_ALLOW_HIXIE76
       self.webStatus = True
+      self.trackMetrics = False
+      self.metricsPath = "/metrics"
+      self.metrics = None
       self.utf8validateIncoming = True
       self.requireMaskedClientFrames = True
       self.maskServerFrames = False
@@ -3418,16 +3968,24 @@ class WebSocketServerFactory(WebSocketFactory):
       self.openHandshakeTimeout = 5
       self.closeHandshakeTimeout = 1
       self.tcpNoDelay = True
+      self.corkWrites = False
+      self.corkBufferSize = 65536
+      self.maskSource = "random"
+      self._maskSource = MaskSource(self.maskSource)
+      self.trafficStatsSampling = 1
 
       ## permessage-XXX extension
       ##
       self.perMessageCompressionAccept = lambda _: None
+      self.perMessageCompressionIdleTimeout = 0
 
 
    def setProtocolOptions(self,
                           versions = None,
                           allowHixie76 = None,
                           webStatus = None,
+                          trackMetrics = None,
+                          metricsPath = None,
                           utf8validateIncoming = None,
                           maskServerFrames = None,
                           requireMaskedClientFrames = None,
@@ -3440,7 +3998,12 @@ class WebSocketServerFactory(WebSocketFactory):
                           openHandshakeTimeout = None,
                           closeHandshakeTimeout = None,
                           tcpNoDelay = None,
-                          perMessageCompressionAccept = None):
+                          corkWrites = None,
+                          corkBufferSize = None,
+                          maskSource = None,
+                          trafficStatsSampling = None,
+                          perMessageCompressionAccept = None,
+                          perMessageCompressionIdleTimeout = None):
       """
       Set WebSocket protocol options used as defaults for new protocol instances.
 
@@ -3450,6 +4013,10 @@ class WebSocketServerFactory(WebSocketFactory):
       :type allowHixie76: bool
       :param webStatus: Return server status/version on HTTP/GET without WebSocket upgrade header (default: `True`).
       :type webStatus: bool
+      :param trackMetrics: Track factory-wide metrics (see :class:`autobahn.websocket.metrics.WebSocketMetrics`) and return them in Prometheus text format on HTTP/GET of `metricsPath` without WebSocket upgrade header (default: `False`).
+      :type trackMetrics: bool
+      :param metricsPath: HTTP path the metrics are served on (default: `"/metrics"`).
+      :type metricsPath: str
       :param utf8validateIncoming: Validate incoming UTF-8 in text message payloads (default: `True`).
       :type utf8validateIncoming: bool
       :param maskServerFrames: Mask server-to-client frames (default: `False`).
@@ -3474,8 +4041,18 @@ class WebSocketServerFactory(WebSocketFactory):
       :type closeHandshakeTimeout: float
       :param tcpNoDelay: TCP NODELAY ("Nagle") socket option (default: `True`).
       :type tcpNoDelay: bool
+      :param corkWrites: Buffer (cork) octets written during one reactor/loop iteration and write them out in one go at the end of the iteration (default: `False`).
+      :type corkWrites: bool
+      :param corkBufferSize: When corking writes, flush the buffer early when it reaches this many octets (default: `65536`).
+      :type corkBufferSize: int
+      :param maskSource: Where frame masks come from: `"random"` (a new random mask per frame), `"urandom"` (cryptographically strong, pooled) or `"fast"` (pooled) (default: `"random"`).
+      :type maskSource: str
+      :param trafficStatsSampling: Track traffic stats (`trafficStats` on protocol instances) on every connection (`1`), on one in this many connections, or on no connection at all (`0`). Connections without traffic stats have a :class:`NullTrafficStats` as `trafficStats` (default: `1`).
+      :type trafficStatsSampling: int
       :param perMessageCompressionAccept: Acceptor function for offers.
       :type perMessageCompressionAccept: callable
+      :param perMessageCompressionIdleTimeout: When permessage-compress is in use, release compression state not carried over between messages (e.g. with no context takeover) after this many seconds without messages, or `0` to deactivate (default: `0`).
+      :type perMessageCompressionIdleTimeout: float
       """
       if allowHixie76 is not None and allowHixie76 != self.allowHixie76:
          self.allowHixie76 = allowHixie76
@@ -3492,6 +4069,16 @@ class WebSocketServerFactory(WebSocketFactory):
       if webStatus is not None and webStatus != self.webStatus:
          self.webStatus = webStatus
 
+      if trackMetrics is not None and trackMetrics != self.trackMetrics:
+         self.trackMetrics = trackMetrics
+         if trackMetrics:
+            self.metrics = WebSocketMetrics(self)
+         else:
+            self.metrics = None
+
+      if metricsPath is not None and metricsPath != self.metricsPath:
+         self.metricsPath = metricsPath
+
       if utf8validateIncoming is not None and utf8validateIncoming != self.utf8validateIncoming:
          self.utf8validateIncoming = utf8validateIncoming
 
@@ -3528,9 +4115,29 @@ class WebSocketServerFactory(WebSocketFactory):
       if tcpNoDelay is not None and tcpNoDelay != self.tcpNoDelay:
          self.tcpNoDelay = tcpNoDelay
 
+      if corkWrites is not None and corkWrites != self.corkWrites:
+         self.corkWrites = corkWrites
+
+      if corkBufferSize is not None and corkBufferSize != self.corkBufferSize:
+         if corkBufferSize < 1:
+            raise Exception("invalid cork buffer size %s (must be at least 1)" % corkBufferSize)
+         self.corkBufferSize = corkBufferSize
+
+      if maskSource is not None and maskSource != self.maskSource:
+         self._maskSource = MaskSource(maskSource)
+         self.maskSource = maskSource
+
+      if trafficStatsSampling is not None and trafficStatsSampling != self.trafficStatsSampling:
+         if trafficStatsSampling < 0:
+            raise Exception("invalid traffic stats sampling %s (must be 0 or positive)" % trafficStatsSampling)
+         self.trafficStatsSampling = trafficStatsSampling
+
       if perMessageCompressionAccept is not None and perMessageCompressionAccept != self.perMessageCompressionAccept:
          self.perMessageCompressionAccept = perMessageCompressionAccept
 
+      if perMessageCompressionIdleTimeout is not None and perMessageCompressionIdleTimeout != self.perMessageCompressionIdleTimeout:
+         self.perMessageCompressionIdleTimeout = perMessageCompressionIdleTimeout
+
 
    def getConnectionCount(self):
       """
@@ -3541,6 +4148,47 @@ class WebSocketServerFactory(WebSocketFactory):
       return self.countConnections
 
 
+   def _parseHandshakeHeader(self, cache, value, parse):
+      """
+      Parse an opening handshake header value, using a bounded cache of
+      previous parse results (least recently used are evicted first).
+      The result is shared with later calls, so callers copy what they
+      hand on.
+      """
+      try:
+         res = cache.pop(value)
+      except KeyError:
+         res = parse(value)
+         if len(cache) >= self.HANDSHAKE_CACHE_SIZE:
+            cache.popitem(last = False)
+      cache[value] = res
+      return res
+
+
+   def _getHandshakeResponseHead(self):
+      """
+      Get the static head of the opening handshake response (status line,
+      Server, Upgrade, Connection and factory headers). This is rendered once,
+      and again after :meth:`setSessionParameters` was called.
+      """
+      if self._handshakeResponseHead is None:
+
+         head = ["HTTP/1.1 %d Switching Protocols\x0d\x0a" % http.SWITCHING_PROTOCOLS[0]]
+
+         if self.server is not None and self.server != "":
+            head.append("Server: %s\x0d\x0a" % self.server)
+
+         head.append("Upgrade: WebSocket\x0d\x0a")
+         head.append("Connection: Upgrade\x0d\x0a")
+
+         for uh in self.headers.items():
+            head.append("%s: %s\x0d\x0a" % (uh[0], uh[1]))
+
+         self._handshakeResponseHead = ''.join(head)
+
+      return self._handshakeResponseHead
+
+
 
 class WebSocketClientProtocol(WebSocketProtocol):
    """
@@ -3591,6 +4239,11 @@ class WebSocketClientProtocol(WebSocketProtocol):
       if self.debug:
          self.factory._log("connection to %s lost" % self.peer)
 
+      ## a connection we closed ourselves (other than for failing it, e.g.
+      ## because the application left) is not reconnected automatically
+      ##
+      self.factory._reconnectOnLost = not self.closedByMe or self.failedByMe
+
 
    def startProxyConnect(self):
       """
@@ -3949,6 +4602,7 @@ class WebSocketClientProtocol(WebSocketProtocol):
                   self._perMessageCompress = PMCE['PMCE'].createFromResponseAccept(self.factory.isServer, accept)
 
                   self.websocket_extensions_in_use.append(self._perMessageCompress)
+                  self._startPerMessageCompressionIdleTimer()
 
                else:
                   return self.failHandshake("server wants to use extension '%s' we did not request, haven't implemented or did not enable" % extension)
@@ -4010,6 +4664,10 @@ class WebSocketClientProtocol(WebSocketProtocol):
             ##
             self.failConnection(1000, str(e))
          else:
+            ## connection is up: restart reconnect backoff from scratch
+            ##
+            self.factory._resetReconnectDelay()
+
             ## fire handler on derived class
             ##
             if self.trackedTimings:
@@ -4101,6 +4759,10 @@ class WebSocketClientFactory(WebSocketFactory):
       ##
       self.resetProtocolOptions()
 
+      ## default auto-reconnect options
+      ##
+      self.resetReconnectOptions()
+
 
    def setSessionParameters(self,
                             url = None,
@@ -4169,11 +4831,17 @@ class WebSocketClientFactory(WebSocketFactory):
       self.openHandshakeTimeout = 5
       self.closeHandshakeTimeout = 1
       self.tcpNoDelay = True
+      self.corkWrites = False
+      self.corkBufferSize = 65536
+      self.maskSource = "random"
+      self._maskSource = MaskSource(self.maskSource)
+      self.trafficStatsSampling = 1
 
       ## permessage-XXX extensions
       ##
       self.perMessageCompressionOffers = []
       self.perMessageCompressionAccept = lambda _: None
+      self.perMessageCompressionIdleTimeout = 0
 
 
    def setProtocolOptions(self,
@@ -4192,8 +4860,13 @@ class WebSocketClientFactory(WebSocketFactory):
                           openHandshakeTimeout = None,
                           closeHandshakeTimeout = None,
                           tcpNoDelay = None,
+                          corkWrites = None,
+                          corkBufferSize = None,
+                          maskSource = None,
+                          trafficStatsSampling = None,
                           perMessageCompressionOffers = None,
-                          perMessageCompressionAccept = None):
+                          perMessageCompressionAccept = None,
+                          perMessageCompressionIdleTimeout = None):
       """
       Set WebSocket protocol options used as defaults for _new_ protocol instances.
 
@@ -4224,10 +4897,20 @@ class WebSocketClientFactory(WebSocketFactory):
       :type closeHandshakeTimeout: float
       :param tcpNoDelay: TCP NODELAY ("Nagle"): bool socket option (default: `True`).
       :type tcpNoDelay: bool
+      :param corkWrites: Buffer (cork) octets written during one reactor/loop iteration and write them out in one go at the end of the iteration (default: `False`).
+      :type corkWrites: bool
+      :param corkBufferSize: When corking writes, flush the buffer early when it reaches this many octets (default: `65536`).
+      :type corkBufferSize: int
+      :param maskSource: Where frame masks come from: `"random"` (a new random mask per frame), `"urandom"` (cryptographically strong, pooled) or `"fast"` (pooled) (default: `"random"`).
+      :type maskSource: str
+      :param trafficStatsSampling: Track traffic stats (`trafficStats` on protocol instances) on every connection (`1`), on one in this many connections, or on no connection at all (`0`). Connections without traffic stats have a :class:`NullTrafficStats` as `trafficStats` (default: `1`).
+      :type trafficStatsSampling: int
       :param perMessageCompressionOffers: A list of offers to provide to the server for the permessage-compress WebSocket extension. Must be a list of instances of subclass of PerMessageCompressOffer.
       :type perMessageCompressionOffers: list of instance of subclass of PerMessageCompressOffer
       :param perMessageCompressionAccept: Acceptor function for responses.
       :type perMessageCompressionAccept: callable
+      :param perMessageCompressionIdleTimeout: When permessage-compress is in use, release compression state not carried over between messages (e.g. with no context takeover) after this many seconds without messages, or `0` to deactivate (default: `0`).
+      :type perMessageCompressionIdleTimeout: float
       """
       if allowHixie76 is not None and allowHixie76 != self.allowHixie76:
          self.allowHixie76 = allowHixie76
@@ -4279,6 +4962,23 @@ class WebSocketClientFactory(WebSocketFactory):
       if tcpNoDelay is not None and tcpNoDelay != self.tcpNoDelay:
          self.tcpNoDelay = tcpNoDelay
 
+      if corkWrites is not None and corkWrites != self.corkWrites:
+         self.corkWrites = corkWrites
+
+      if corkBufferSize is not None and corkBufferSize != self.corkBufferSize:
+         if corkBufferSize < 1:
+            raise Exception("invalid cork buffer size %s (must be at least 1)" % corkBufferSize)
+         self.corkBufferSize = corkBufferSize
+
+      if maskSource is not None and maskSource != self.maskSource:
+         self._maskSource = MaskSource(maskSource)
+         self.maskSource = maskSource
+
+      if trafficStatsSampling is not None and trafficStatsSampling != self.trafficStatsSampling:
+         if trafficStatsSampling < 0:
+            raise Exception("invalid traffic stats sampling %s (must be 0 or positive)" % trafficStatsSampling)
+         self.trafficStatsSampling = trafficStatsSampling
+
       if perMessageCompressionOffers is not None and pickle.dumps(perMessageCompressionOffers) != pickle.dumps(self.perMessageCompressionOffers):
          if type(perMessageCompressionOffers) == list:
             ##
@@ -4290,3 +4990,152 @@ class WebSocketClientFactory(WebSocketFactory):
 
       if perMessageCompressionAccept is not None and perMessageCompressionAccept != self.perMessageCompressionAccept:
          self.perMessageCompressionAccept = perMessageCompressionAccept
+
+      if perMessageCompressionIdleTimeout is not None and perMessageCompressionIdleTimeout != self.perMessageCompressionIdleTimeout:
+         self.perMessageCompressionIdleTimeout = perMessageCompressionIdleTimeout
+
+
+   def resetReconnectOptions(self):
+      """
+      Reset all auto-reconnect options to defaults (auto-reconnect disabled).
+      """
+      self.autoReconnect = False
+      self.reconnectInitialDelay = 1.
+      self.reconnectMaxDelay = 60.
+      self.reconnectMultiplier = 2.
+      self.reconnectJitter = True
+      self.reconnectMaxRetries = 0
+      self.connectTimeout = 30
+
+      self.reconnectRetries = 0
+      self._reconnectCeiling = self.reconnectInitialDelay
+      self._reconnectCall = None
+      self._reconnectOnLost = True
+
+
+   def setReconnectOptions(self,
+                           autoReconnect = None,
+                           initialDelay = None,
+                           maxDelay = None,
+                           multiplier = None,
+                           jitter = None,
+                           maxRetries = None,
+                           connectTimeout = None):
+      """
+      Set auto-reconnect options. When auto-reconnect is enabled, failed connection
+      attempts and lost connections are retried using capped exponential backoff.
+      Connections closed by this side (by starting the WebSocket closing handshake,
+      other than for failing the connection) are not reconnected.
+
+      :param autoReconnect: Enable automatic reconnection (default: `False`).
+      :type autoReconnect: bool
+      :param initialDelay: Backoff ceiling for the first retry in seconds (default: `1`).
+      :type initialDelay: float
+      :param maxDelay: Maximum backoff ceiling in seconds (default: `60`).
+      :type maxDelay: float
+      :param multiplier: Factor by which the backoff ceiling grows with every retry (default: `2`).
+      :type multiplier: float
+      :param jitter: Iff true, use "full jitter": the actual delay is drawn uniformly from `[0, ceiling]`. Otherwise wait for the ceiling itself (default: `True`).
+      :type jitter: bool
+      :param maxRetries: Give up after this many consecutive retries or `0` for unlimited (default: `0`).
+      :type maxRetries: int
+      :param connectTimeout: Timeout in seconds for establishing the TCP connection (default: `30`).
+      :type connectTimeout: float
+      """
+      if autoReconnect is not None and autoReconnect != self.autoReconnect:
+         self.autoReconnect = autoReconnect
+
+      if initialDelay is not None and initialDelay != self.reconnectInitialDelay:
+         if initialDelay <= 0:
+            raise Exception("invalid value %s for initialDelay - must be positive" % initialDelay)
+         self.reconnectInitialDelay = initialDelay
+         self._reconnectCeiling = initialDelay
+
+      if maxDelay is not None and maxDelay != self.reconnectMaxDelay:
+         if maxDelay < self.reconnectInitialDelay:
+            raise Exception("invalid value %s for maxDelay - must not be smaller than initialDelay" % maxDelay)
+         self.reconnectMaxDelay = maxDelay
+
+      if multiplier is not None and multiplier != self.reconnectMultiplier:
+         if multiplier < 1:
+            raise Exception("invalid value %s for multiplier - must be >= 1" % multiplier)
+         self.reconnectMultiplier = multiplier
+
+      if jitter is not None and jitter != self.reconnectJitter:
+         self.reconnectJitter = jitter
+
+      if maxRetries is not None and maxRetries != self.reconnectMaxRetries:
+         self.reconnectMaxRetries = maxRetries
+
+      if connectTimeout is not None and connectTimeout != self.connectTimeout:
+         self.connectTimeout = connectTimeout
+
+
+   def stopReconnecting(self):
+      """
+      Disable auto-reconnect and cancel a pending reconnection attempt, if any.
+      """
+      self.autoReconnect = False
+      if self._reconnectCall is not None:
+         self._reconnectCall.cancel()
+         self._reconnectCall = None
+
+
+   def _nextReconnectDelay(self):
+      """
+      Compute the delay before the next reconnection attempt, or `None` when
+      auto-reconnect is disabled or the retry budget is exhausted.
+
+      With jitter enabled, the delay is drawn uniformly from `[0, ceiling]`,
+      so clients that lost the same server at the same instant spread their
+      reconnects instead of arriving together.
+      """
+      if not self.autoReconnect:
+         return None
+
+      if self.reconnectMaxRetries and self.reconnectRetries >= self.reconnectMaxRetries:
+         return None
+
+      ceiling = self._reconnectCeiling
+      self._reconnectCeiling = min(self.reconnectMaxDelay, ceiling * self.reconnectMultiplier)
+      self.reconnectRetries += 1
+
+      if self.reconnectJitter:
+         return random.uniform(0, ceiling)
+      else:
+         return ceiling
+
+
+   def _resetReconnectDelay(self):
+      """
+      Called when a WebSocket connection was established (opening handshake
+      completed) to restart backoff from the initial delay.
+      """
+      self.reconnectRetries = 0
+      self._reconnectCeiling = self.reconnectInitialDelay
+
+
+   def _scheduleReconnect(self, connect):
+      """
+      Schedule a reconnection attempt using the next backoff delay.
+
+      :param connect: Callable (taking no arguments) that starts a new connection attempt.
+      :type connect: callable
+
+      :returns: bool -- `True` iff a reconnection attempt was scheduled.
+      """
+      delay = self._nextReconnectDelay()
+      if delay is None:
+         if self.autoReconnect and self.debug:
+            self._log("giving up reconnecting to %s after %d retries" % (self.url, self.reconnectRetries))
+         return False
+
+      if self.debug:
+         self._log("reconnecting to %s in %s seconds (retry %d)" % (self.url, delay, self.reconnectRetries))
+
+      def reconnect():
+         self._reconnectCall = None
+         connect()
+
+      self._reconnectCall = self._callLater(delay, reconnect)
+      return True
@@ -0,0 +1,68 @@
+###############################################################################
+##
+##  Copyright (C) 2014 Tavendo GmbH
+##
+##  Licensed under the Apache License, Version 2.0 (the "License");
+##  you may not use this file except in compliance with the License.
+##  You may obtain a copy of the License at
+##
+##      http://www.apache.org/licenses/LICENSE-2.0
+##
+##  Unless required by applicable law or agreed to in writing, software
+##  distributed under the License is distributed on an "AS IS" BASIS,
+##  WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+##  See the License for the specific language governing permissions and
+##  limitations under the License.
+##
+###############################################################################
+
+import asyncio
+
+from autobahn.wamp.exception import ApplicationError
+from autobahn.asyncio.wamp import ApplicationSession, \
+                                  ApplicationSessionFactory
+from autobahn.asyncio.websocket import WampWebSocketClientFactory
+
+
+class Client(ApplicationSession):
+   """
+   Calls the procedure concurrently: the calls take one second
+   each, but all results come in after about a second.
+   """
+
+   def onConnect(self):
+      self.join("realm1")
+
+
+   @asyncio.coroutine
+   def onJoin(self, details):
+
+      @asyncio.coroutine
+      def square(x):
+         try:
+            res = yield from self.call('com.example.slowsquare', x)
+            print("{} squared is {}".format(x, res))
+         except ApplicationError as e:
+            print("could not square {}: {}".format(x, e.error))
+
+      yield from asyncio.wait([square(x) for x in range(1, 8)])
+      self.leave()
+
+
+   def onLeave(self, details):
+      asyncio.get_event_loop().stop()
+
+
+
+if __name__ == '__main__':
+
+   session_factory = ApplicationSessionFactory()
+   session_factory.session = Client
+
+   transport_factory = WampWebSocketClientFactory(session_factory, "ws://localhost:9000", debug = False)
+
+   loop = asyncio.get_event_loop()
+   coro = loop.create_connection(transport_factory, '127.0.0.1', 9000)
+   loop.run_until_complete(coro)
+   loop.run_forever()
+   loop.close()
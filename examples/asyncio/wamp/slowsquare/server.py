@@ -0,0 +1,72 @@
+###############################################################################
+##
+##  Copyright (C) 2014 Tavendo GmbH
+##
+##  Licensed under the Apache License, Version 2.0 (the "License");
+##  you may not use this file except in compliance with the License.
+##  You may obtain a copy of the License at
+##
+##      http://www.apache.org/licenses/LICENSE-2.0
+##
+##  Unless required by applicable law or agreed to in writing, software
+##  distributed under the License is distributed on an "AS IS" BASIS,
+##  WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+##  See the License for the specific language governing permissions and
+##  limitations under the License.
+##
+###############################################################################
+
+import asyncio
+
+from autobahn.wamp.router import RouterFactory
+from autobahn.wamp.exception import ApplicationError
+from autobahn.asyncio.wamp import ApplicationSession, \
+                                  RouterSessionFactory
+from autobahn.asyncio.websocket import WampWebSocketServerFactory
+
+
+class SlowSquare(ApplicationSession):
+   """
+   Application component providing a procedure implemented as a coroutine.
+   It runs embedded in the router.
+   """
+
+   def onConnect(self):
+      self.join("realm1")
+
+
+   @asyncio.coroutine
+   def onJoin(self, details):
+
+      @asyncio.coroutine
+      def slowsquare(x):
+         if x > 5:
+            raise ApplicationError("com.example.number_too_large", x)
+         yield from asyncio.sleep(1)
+         return x * x
+
+      yield from self.register(slowsquare, 'com.example.slowsquare')
+      print("procedure registered")
+
+
+
+if __name__ == '__main__':
+
+   router_factory = RouterFactory()
+
+   session_factory = RouterSessionFactory(router_factory)
+   session_factory.add(SlowSquare())
+
+   transport_factory = WampWebSocketServerFactory(session_factory, "ws://localhost:9000", debug = False)
+
+   loop = asyncio.get_event_loop()
+   coro = loop.create_server(transport_factory, '127.0.0.1', 9000)
+   server = loop.run_until_complete(coro)
+
+   try:
+      loop.run_forever()
+   except KeyboardInterrupt:
+      pass
+   finally:
+      server.close()
+      loop.close()
@@ -0,0 +1,87 @@
+###############################################################################
+##
+##  Copyright (C) 2014 Tavendo GmbH
+##
+##  Licensed under the Apache License, Version 2.0 (the "License");
+##  you may not use this file except in compliance with the License.
+##  You may obtain a copy of the License at
+##
+##      http://www.apache.org/licenses/LICENSE-2.0
+##
+##  Unless required by applicable law or agreed to in writing, software
+##  distributed under the License is distributed on an "AS IS" BASIS,
+##  WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+##  See the License for the specific language governing permissions and
+##  limitations under the License.
+##
+###############################################################################
+
+import gc
+import sys
+import time
+
+from autobahn.wamp import message
+from autobahn.wamp.serializer import JsonSerializer
+
+
+ARGS = [1, 2, 3]
+KWARGS = {'foo': 23, 'bar': 'hello'}
+
+MESSAGES = [
+   ("EVENT", lambda i: message.Event(i, i, args = ARGS, kwargs = KWARGS)),
+   ("CALL", lambda i: message.Call(i, 'com.myapp.procedure1', args = ARGS, kwargs = KWARGS)),
+   ("RESULT", lambda i: message.Result(i, args = ARGS, kwargs = KWARGS))
+]
+
+
+def footprint(create, serializer, count):
+   """
+   Create and serialize `count` messages and return the number of
+   (garbage collector tracked) objects and bytes they hold on to per message.
+   Application payloads and serialized octets are shared or not tracked, so
+   this is the overhead of the message objects themselves.
+   """
+   gc.collect()
+   before = set(id(o) for o in gc.get_objects())
+
+   msgs = []
+   for i in xrange(count):
+      msg = create(i)
+      serializer.serialize(msg)
+      msgs.append(msg)
+
+   new = [o for o in gc.get_objects() if id(o) not in before and o is not msgs]
+   objects = len(new)
+   octets = sum(sys.getsizeof(o) for o in new)
+   del new
+   return float(objects) / count, float(octets) / count
+
+
+def speed(create, serializer, count):
+   """
+   Return microseconds to create and serialize one message.
+   """
+   started = time.time()
+   for i in xrange(count):
+      serializer.serialize(create(i))
+   return (time.time() - started) / count * 1000000.
+
+
+
+if __name__ == '__main__':
+
+   import argparse
+
+   parser = argparse.ArgumentParser()
+
+   parser.add_argument("-n", "--count", type = int, default = 100000,
+                       help = "Number of messages per run.")
+
+   args = parser.parse_args()
+
+   serializer = JsonSerializer()
+
+   for name, create in MESSAGES:
+      objects, octets = footprint(create, serializer, args.count)
+      us = speed(create, serializer, args.count)
+      print("{}: {:.1f} objects, {:.0f} bytes per message, {:.2f} us to create and serialize".format(name, objects, octets, us))
@@ -0,0 +1,99 @@
+###############################################################################
+##
+##  Copyright (C) 2014 Tavendo GmbH
+##
+##  Licensed under the Apache License, Version 2.0 (the "License");
+##  you may not use this file except in compliance with the License.
+##  You may obtain a copy of the License at
+##
+##      http://www.apache.org/licenses/LICENSE-2.0
+##
+##  Unless required by applicable law or agreed to in writing, software
+##  distributed under the License is distributed on an "AS IS" BASIS,
+##  WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+##  See the License for the specific language governing permissions and
+##  limitations under the License.
+##
+###############################################################################
+
+import time
+
+from autobahn.wamp import message
+from autobahn.wamp.serializer import JsonSerializer
+
+try:
+   from autobahn.wamp.serializer import MsgPackSerializer
+except ImportError:
+   MsgPackSerializer = None
+
+
+def message_mix():
+   """
+   A mix of messages as seen by a router and its clients: mostly events,
+   some calls (with invocations, yields and results) and publications.
+   """
+   msgs = []
+   for i in range(1, 101):
+      args = [i, u'sensor-%d' % i, {u'value': i * 1.5, u'unit': u'celsius'}]
+      if i % 10 < 4:
+         msgs.append(message.Event(1000 + i, 2000 + i, args = args))
+      elif i % 10 < 5:
+         msgs.append(message.Event(1000 + i, 2000 + i, args = args, publisher = 3000 + i))
+      elif i % 10 < 7:
+         msgs.append(message.Publish(i, u'com.example.sensor.update', args = args, acknowledge = (i % 2 == 0), excludeMe = False))
+      elif i % 10 < 8:
+         msgs.append(message.Call(i, u'com.example.sensor.get', args = [i], timeout = 1000))
+         msgs.append(message.Invocation(i, 4000 + i, args = [i], timeout = 1000, caller = 3000 + i))
+      else:
+         msgs.append(message.Yield(i, args = args, kwargs = {u'cached': False}))
+         msgs.append(message.Result(i, args = args, kwargs = {u'cached': False}, progress = (i % 10 == 9)))
+   return msgs
+
+
+
+def run(fun, items, count):
+   """
+   Apply `fun` to `items` until `count` items were processed and
+   return the number of items processed per second.
+   """
+   rounds = max(1, count // len(items))
+   started = time.time()
+   for i in xrange(rounds):
+      for item in items:
+         fun(item)
+   return rounds * len(items) / (time.time() - started)
+
+
+
+if __name__ == '__main__':
+
+   import argparse
+
+   parser = argparse.ArgumentParser()
+
+   parser.add_argument("-n", "--count", type = int, default = 200000,
+                       help = "Number of messages per run.")
+
+   parser.add_argument("-r", "--runs", type = int, default = 3,
+                       help = "Number of runs.")
+
+   args = parser.parse_args()
+
+   msgs = message_mix()
+
+   serializers = [JsonSerializer()]
+   if MsgPackSerializer:
+      serializers.append(MsgPackSerializer())
+
+   ## parsing unserialized messages (lists) into message objects
+   raw = [msg.marshal() for msg in msgs]
+   for i in range(args.runs):
+      rate = run(lambda m: serializers[0].MESSAGE_TYPE_MAP[m[0]].parse(m), raw, args.count)
+      print("parse, run {}: {:.0f} messages/s".format(i + 1, rate))
+
+   ## unserializing and parsing serialized messages
+   for serializer in serializers:
+      data = [serializer.serialize(msg) for msg in msgs]
+      for i in range(args.runs):
+         rate = run(lambda d: serializer.unserialize(*d), data, args.count)
+         print("unserialize ({}), run {}: {:.0f} messages/s".format(serializer.SERIALIZER_ID, i + 1, rate))
@@ -0,0 +1,170 @@
+###############################################################################
+##
+##  Copyright (C) 2014 Tavendo GmbH
+##
+##  Licensed under the Apache License, Version 2.0 (the "License");
+##  you may not use this file except in compliance with the License.
+##  You may obtain a copy of the License at
+##
+##      http://www.apache.org/licenses/LICENSE-2.0
+##
+##  Unless required by applicable law or agreed to in writing, software
+##  distributed under the License is distributed on an "AS IS" BASIS,
+##  WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+##  See the License for the specific language governing permissions and
+##  limitations under the License.
+##
+###############################################################################
+
+import time
+
+from twisted.internet import reactor
+from twisted.internet.defer import Deferred, DeferredList, inlineCallbacks
+
+from autobahn.wamp.router import RouterFactory
+from autobahn.twisted.wamp import ApplicationSession, \
+                                  ApplicationSessionFactory, \
+                                  RouterSessionFactory
+from autobahn.twisted.websocket import WampWebSocketServerFactory, \
+                                       WampWebSocketClientFactory
+from autobahn.twisted.rawsocket import WampRawSocketServerFactory, \
+                                       WampRawSocketClientFactory
+from autobahn.wamp.serializer import JsonSerializer
+
+try:
+   from autobahn.wamp.serializer import MsgPackSerializer
+except ImportError:
+   MsgPackSerializer = None
+
+
+class Callee(ApplicationSession):
+   """
+   Provides the procedure called.
+   """
+
+   def onConnect(self):
+      self.join("realm1")
+
+
+   @inlineCallbacks
+   def onJoin(self, details):
+      yield self.register(lambda payload: payload, 'com.example.echo')
+      self.factory.ready.callback(self)
+
+
+
+class Caller(ApplicationSession):
+   """
+   Calls the procedure as fast as possible.
+   """
+
+   def onConnect(self):
+      self.join("realm1")
+
+
+   def onJoin(self, details):
+      self.factory.ready.callback(self)
+
+
+   @inlineCallbacks
+   def run(self, count, concurrency, payload):
+      """
+      Issue `count` calls, keeping `concurrency` calls outstanding,
+      and set `rate` to the number of calls per second.
+      """
+      started = time.time()
+      remaining = [count]
+
+      @inlineCallbacks
+      def loop():
+         while remaining[0] > 0:
+            remaining[0] -= 1
+            yield self.call('com.example.echo', payload)
+
+      yield DeferredList([loop() for i in range(concurrency)])
+      self.rate = count / (time.time() - started)
+
+
+
+def session(klass, transport, port, serializer):
+   """
+   Connect a session of the given class and return a Deferred
+   that fires with the session when it has joined.
+   """
+   session_factory = ApplicationSessionFactory()
+   session_factory.session = klass
+   session_factory.ready = Deferred()
+
+   if transport == 'websocket':
+      transport_factory = WampWebSocketClientFactory(session_factory, "ws://127.0.0.1:%d" % port, serializers = [serializer])
+   else:
+      transport_factory = WampRawSocketClientFactory(session_factory, serializer = serializer)
+
+   reactor.connectTCP("127.0.0.1", port, transport_factory)
+   return session_factory.ready
+
+
+
+@inlineCallbacks
+def main(args):
+   router_factory = RouterFactory()
+   session_factory = RouterSessionFactory(router_factory)
+
+   serializers = [JsonSerializer()]
+   if MsgPackSerializer:
+      serializers.append(MsgPackSerializer())
+
+   websocket = WampWebSocketServerFactory(session_factory, "ws://127.0.0.1:%d" % args.port, serializers = serializers)
+   websocket.setProtocolOptions(failByDrop = False)
+   rawsocket = WampRawSocketServerFactory(session_factory, serializers = serializers)
+
+   ports = {
+      'websocket': args.port,
+      'rawsocket': args.port + 1
+   }
+   for transport, factory in [('websocket', websocket), ('rawsocket', rawsocket)]:
+      reactor.listenTCP(ports[transport], factory, interface = "127.0.0.1")
+
+   payload = u'*' * args.size
+
+   for serializer in serializers:
+      for transport in ['websocket', 'rawsocket']:
+         callee = yield session(Callee, transport, ports[transport], serializer)
+         caller = yield session(Caller, transport, ports[transport], serializer)
+
+         for i in range(args.runs):
+            yield caller.run(args.count, args.concurrency, payload)
+            print("{} ({}), run {}: {:.0f} calls/s".format(transport, serializer.SERIALIZER_ID, i + 1, caller.rate))
+
+         caller.leave()
+         callee.leave()
+
+   reactor.stop()
+
+
+
+if __name__ == '__main__':
+
+   import argparse
+
+   parser = argparse.ArgumentParser()
+
+   parser.add_argument("-n", "--count", type = int, default = 10000,
+                       help = "Number of calls per run.")
+
+   parser.add_argument("-c", "--concurrency", type = int, default = 10,
+                       help = "Number of calls outstanding.")
+
+   parser.add_argument("-s", "--size", type = int, default = 100,
+                       help = "Size of the call argument.")
+
+   parser.add_argument("-r", "--runs", type = int, default = 3,
+                       help = "Number of runs.")
+
+   parser.add_argument("-p", "--port", type = int, default = 9000,
+                       help = "Listening port for WebSocket (RawSocket listens on the next port).")
+
+   args = parser.parse_args()
+
+   reactor.callWhenRunning(main, args)
+   reactor.run()
@@ -0,0 +1,87 @@
+###############################################################################
+##
+##  Copyright (C) 2014 Tavendo GmbH
+##
+##  Licensed under the Apache License, Version 2.0 (the "License");
+##  you may not use this file except in compliance with the License.
+##  You may obtain a copy of the License at
+##
+##      http://www.apache.org/licenses/LICENSE-2.0
+##
+##  Unless required by applicable law or agreed to in writing, software
+##  distributed under the License is distributed on an "AS IS" BASIS,
+##  WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+##  See the License for the specific language governing permissions and
+##  limitations under the License.
+##
+###############################################################################
+
+import time
+
+from twisted.test.proto_helpers import StringTransport
+
+from autobahn.twisted.websocket import WebSocketServerProtocol, \
+                                       WebSocketServerFactory
+
+
+REQUEST = b"\x0d\x0a".join([
+   b"GET / HTTP/1.1",
+   b"Host: localhost:9000",
+   b"Upgrade: websocket",
+   b"Connection: Upgrade",
+   b"Origin: http://localhost:8080",
+   b"Sec-WebSocket-Key: dGhlIHNhbXBsZSBub25jZQ==",
+   b"Sec-WebSocket-Version: 13",
+   b"Sec-WebSocket-Protocol: wamp.2.msgpack, wamp.2.json",
+   b"Sec-WebSocket-Extensions: permessage-deflate; client_max_window_bits, x-webkit-deflate-frame",
+   b"User-Agent: Mozilla/5.0 (X11; Linux x86_64; rv:30.0) Gecko/20100101 Firefox/30.0",
+   b"", b""])
+
+
+class BenchmarkServerProtocol(WebSocketServerProtocol):
+
+   def onConnect(self, request):
+      return request.protocols[0]
+
+
+
+def run(factory, count):
+   """
+   Run `count` complete opening handshakes (in-process, over a string
+   transport) and return the number of handshakes per second.
+   """
+   started = time.time()
+   for i in xrange(count):
+      proto = factory.buildProtocol(None)
+      transport = StringTransport()
+      proto.makeConnection(transport)
+      proto.dataReceived(REQUEST)
+      assert(proto.state == WebSocketServerProtocol.STATE_OPEN)
+      proto.connectionLost(None)
+   return count / (time.time() - started)
+
+
+
+if __name__ == '__main__':
+
+   import argparse
+
+   parser = argparse.ArgumentParser()
+
+   parser.add_argument("-n", "--count", type = int, default = 20000,
+                       help = "Number of handshakes per run.")
+
+   parser.add_argument("-r", "--runs", type = int, default = 5,
+                       help = "Number of runs.")
+
+   args = parser.parse_args()
+
+   factory = WebSocketServerFactory("ws://localhost:9000", protocols = ['wamp.2.msgpack', 'wamp.2.json'])
+   factory.protocol = BenchmarkServerProtocol
+   factory.setProtocolOptions(openHandshakeTimeout = 0)
+
+   ## warm up
+   run(factory, 1000)
+
+   for i in range(args.runs):
+      print("run {}: {:.0f} handshakes/sec".format(i + 1, run(factory, args.count)))
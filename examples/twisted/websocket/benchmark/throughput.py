@@ -0,0 +1,137 @@
+###############################################################################
+##
+##  Copyright (C) 2014 Tavendo GmbH
+##
+##  Licensed under the Apache License, Version 2.0 (the "License");
+##  you may not use this file except in compliance with the License.
+##  You may obtain a copy of the License at
+##
+##      http://www.apache.org/licenses/LICENSE-2.0
+##
+##  Unless required by applicable law or agreed to in writing, software
+##  distributed under the License is distributed on an "AS IS" BASIS,
+##  WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+##  See the License for the specific language governing permissions and
+##  limitations under the License.
+##
+###############################################################################
+
+import time
+
+from twisted.internet.task import Clock
+from twisted.test.proto_helpers import StringTransport
+
+from autobahn.twisted.websocket import WebSocketServerProtocol, \
+                                       WebSocketServerFactory
+
+
+REQUEST = b"\x0d\x0a".join([
+   b"GET / HTTP/1.1",
+   b"Host: localhost:9000",
+   b"Upgrade: websocket",
+   b"Connection: Upgrade",
+   b"Sec-WebSocket-Key: dGhlIHNhbXBsZSBub25jZQ==",
+   b"Sec-WebSocket-Version: 13",
+   b"", b""])
+
+
+SIZES = [1024, 64 * 1024, 16 * 1024 * 1024]
+
+
+class NullTransport(StringTransport):
+   """
+   A transport that only counts the octets written, so the benchmark
+   measures Autobahn and not buffering in the transport.
+   """
+
+   def __init__(self):
+      StringTransport.__init__(self)
+      self.written = 0
+      self.writes = 0
+
+   def write(self, data):
+      self.writes += 1
+      self.written += len(data)
+
+   def writeSequence(self, data):
+      self.writes += 1
+      for d in data:
+         self.written += len(d)
+
+
+
+def connect(factory):
+   """
+   Create a server protocol, run the opening handshake and return the
+   protocol (now in OPEN state, writing to a null transport).
+   """
+   proto = factory.buildProtocol(None)
+   proto.makeConnection(StringTransport())
+   proto.dataReceived(REQUEST)
+   assert(proto.state == WebSocketServerProtocol.STATE_OPEN)
+   proto.transport = NullTransport()
+   return proto
+
+
+
+def run(proto, payload, total):
+   """
+   Send binary messages with the given payload until at least `total` octets
+   of payload were sent, and return the throughput in MB/s and the number
+   of transport writes per message.
+
+   Messages are sent in batches of 100 per (simulated) reactor iteration,
+   which matters when writes are corked.
+   """
+   count = max(1, total // len(payload))
+   writes = proto.transport.writes
+   started = time.time()
+   for i in xrange(count):
+      proto.sendMessage(payload, isBinary = True)
+      if i % 100 == 99:
+         proto.factory.reactor.advance(0)
+   proto.factory.reactor.advance(0)
+   duration = time.time() - started
+   return count * len(payload) / duration / 2**20, float(proto.transport.writes - writes) / count
+
+
+
+if __name__ == '__main__':
+
+   import argparse
+
+   parser = argparse.ArgumentParser()
+
+   parser.add_argument("-t", "--total", type = int, default = 256,
+                       help = "Payload MB to send per run and message size.")
+
+   parser.add_argument("-r", "--runs", type = int, default = 5,
+                       help = "Number of runs.")
+
+   parser.add_argument("-m", "--mask", action = "store_true",
+                       help = "Mask frames (as a client would).")
+
+   parser.add_argument("-c", "--cork", action = "store_true",
+                       help = "Cork writes (coalesce writes per reactor iteration).")
+
+   parser.add_argument("-s", "--sample", type = int, default = 1,
+                       help = "Track traffic stats on 1-in-N connections (0: none).")
+
+   args = parser.parse_args()
+
+   factory = WebSocketServerFactory("ws://localhost:9000")
+   factory.protocol = WebSocketServerProtocol
+   factory.reactor = Clock()
+   factory.setProtocolOptions(openHandshakeTimeout = 0, maskServerFrames = args.mask, corkWrites = args.cork, trafficStatsSampling = args.sample)
+
+   proto = connect(factory)
+
+   for size in SIZES:
+      payload = b'*' * size
+
+      ## warm up
+      run(proto, payload, 2**20)
+
+      for i in range(args.runs):
+         mbps, writes = run(proto, payload, args.total * 2**20)
+         print("{} octets, run {}: {:.1f} MB/s, {:.2f} writes/message".format(size, i + 1, mbps, writes))